@@ -15,15 +15,36 @@ public class MyListener : MonoBehaviour
     TcpListener server;
     TcpClient client;
     bool running;
+    volatile bool backendReady;
+
+    // True once the Python backend reports that its models are loaded and
+    // warmed up. The backend resends the signal on every new connection.
+    public bool IsBackendReady => backendReady;
+
+    // Payload schema versions this parser understands; see
+    // Assets/backend/payload_schema.py for what each version changed.
+    public const int MinSchemaVersion = 1;
+    public const int MaxSchemaVersion = 2;
+    volatile int schemaVersion = MinSchemaVersion;
+
+    // Version agreed with the backend in the connection handshake.
+    public int SchemaVersion => schemaVersion;
 
     // Thread-safe payload data accessible to other scripts
     private PosePayload latestPayload;
     private readonly object payloadLock = new object();
 
+    // Sequence matches are one-off events, so they are queued instead of
+    // being overwritten by the next payload.
+    private const int MaxQueuedSequenceMatches = 64;
+    private readonly Queue<SequenceMatchData> sequenceMatches = new Queue<SequenceMatchData>();
+
     public struct PoseMetrics
     {
         public int BodyLandmarkCount;
         public int HandLandmarkCount;
+        // Body landmarks whose visibility passed the backend threshold.
+        public int BodyVisibleCount;
     }
 
     public struct HandStateData
@@ -33,6 +54,41 @@ public class MyListener : MonoBehaviour
         public string Direction;
         public bool IsPointing;
         public string Gesture;
+        // Handedness score from the hand detector, in [0, 1]; 1 when not sent.
+        public float Score;
+
+        // Capture time in seconds on the backend's monotonic clock.
+        public float Timestamp;
+        public bool HasKinematics;
+        // Wrist velocity/acceleration in image pixels per second (squared).
+        public Vector2 Velocity;
+        public Vector2 Acceleration;
+        // Wrist velocity/acceleration in metres per second (squared).
+        public Vector3 WorldVelocity;
+        public Vector3 WorldAcceleration;
+        // Keyed by fingertip landmark index (4, 8, 12, 16, 20); only sent when enabled.
+        public Dictionary<int, Vector2> FingertipVelocities;
+        public HandMotionEventData[] Events;
+    }
+
+    public struct HandMotionEventData
+    {
+        // "swipe", "flick" or "hold".
+        public string Kind;
+        // "left", "right", "up", "down" or null for holds.
+        public string Direction;
+        // Capture time (backend clock) at which the motion started.
+        public float Onset;
+    }
+
+    public struct SequenceMatchData
+    {
+        // Template name, e.g. "wave_right" or "clap".
+        public string Name;
+        public float Confidence;
+        // Capture times (backend clock, seconds) of the first and last matched frames.
+        public float Start;
+        public float End;
     }
 
     public struct ArmSegmentData
@@ -45,20 +101,30 @@ public class MyListener : MonoBehaviour
     {
         public Vector3[] BodyWorld = System.Array.Empty<Vector3>();
         public Vector3[] BodyImage = System.Array.Empty<Vector3>();
+        // Per-landmark visibility in [0, 1] for whichever body section was sent.
+        public float[] BodyVisibility = System.Array.Empty<float>();
         public Dictionary<string, Vector3[]> Hands = new Dictionary<string, Vector3[]>();
         public PoseMetrics Metrics;
         public string Gesture;
+        public string Status;
+        // Newest schema version offered by a "hello" section; 0 when absent.
+        public int OfferedSchemaVersion;
+        public bool HasPoseData;
         public Dictionary<string, ArmSegmentData> ArmSegments = new Dictionary<string, ArmSegmentData>();
         public Dictionary<string, HandStateData> HandStates = new Dictionary<string, HandStateData>();
+        public List<SequenceMatchData> Sequences = new List<SequenceMatchData>();
 
         public PosePayload DeepCopy()
         {
             var copy = new PosePayload
             {
                 Gesture = Gesture,
+                Status = Status,
+                HasPoseData = HasPoseData,
                 Metrics = Metrics,
                 BodyWorld = BodyWorld != null ? (Vector3[])BodyWorld.Clone() : null,
                 BodyImage = BodyImage != null ? (Vector3[])BodyImage.Clone() : null,
+                BodyVisibility = BodyVisibility != null ? (float[])BodyVisibility.Clone() : null,
             };
 
             foreach (var kvp in Hands)
@@ -76,6 +142,8 @@ public class MyListener : MonoBehaviour
                 copy.HandStates[kvp.Key] = kvp.Value;
             }
 
+            copy.Sequences.AddRange(Sequences);
+
             return copy;
         }
     }
@@ -139,11 +207,31 @@ public class MyListener : MonoBehaviour
             if (!string.IsNullOrEmpty(dataReceived))
             {
                 PosePayload payload = ParsePayload(dataReceived);
-                if (payload != null)
+                if (payload != null && payload.OfferedSchemaVersion > 0)
+                {
+                    AnswerHandshake(nwStream, payload.OfferedSchemaVersion);
+                }
+
+                if (payload != null && payload.Status == "ready" && !backendReady)
+                {
+                    backendReady = true;
+                    Debug.Log("[MyListener] Backend ready");
+                }
+
+                if (payload != null && payload.HasPoseData)
                 {
                     lock (payloadLock)
                     {
                         latestPayload = payload;
+                        foreach (SequenceMatchData match in payload.Sequences)
+                        {
+                            if (sequenceMatches.Count >= MaxQueuedSequenceMatches)
+                            {
+                                sequenceMatches.Dequeue();
+                            }
+
+                            sequenceMatches.Enqueue(match);
+                        }
                     }
 
                     if (payload.ArmSegments.Count > 0)
@@ -159,6 +247,15 @@ public class MyListener : MonoBehaviour
         }
     }
 
+    private void AnswerHandshake(NetworkStream stream, int offeredVersion)
+    {
+        int version = Mathf.Clamp(offeredVersion, MinSchemaVersion, MaxSchemaVersion);
+        byte[] reply = Encoding.UTF8.GetBytes($"hello:schema={version}\n");
+        stream.Write(reply, 0, reply.Length);
+        schemaVersion = version;
+        Debug.Log($"[MyListener] Using payload schema version {version}");
+    }
+
     public Vector3[] GetLatestPositions()
     {
         lock (payloadLock)
@@ -216,6 +313,22 @@ public class MyListener : MonoBehaviour
         return false;
     }
 
+    // Returns recognized multi-frame gestures in arrival order, each once.
+    public bool TryDequeueSequenceMatch(out SequenceMatchData match)
+    {
+        lock (payloadLock)
+        {
+            if (sequenceMatches.Count > 0)
+            {
+                match = sequenceMatches.Dequeue();
+                return true;
+            }
+        }
+
+        match = default;
+        return false;
+    }
+
     public bool TryGetLatestPayload(out PosePayload payload)
     {
         lock (payloadLock)
@@ -255,7 +368,7 @@ public class MyListener : MonoBehaviour
 
             if (token.StartsWith("body_world:", System.StringComparison.OrdinalIgnoreCase))
             {
-                payload.BodyWorld = ParseIndexedVector3List(token.Substring("body_world:".Length));
+                payload.BodyWorld = ParseIndexedVector3List(token.Substring("body_world:".Length), out payload.BodyVisibility);
                 hasData = true;
                 index++;
                 continue;
@@ -263,7 +376,7 @@ public class MyListener : MonoBehaviour
 
             if (token.StartsWith("body_image:", System.StringComparison.OrdinalIgnoreCase))
             {
-                payload.BodyImage = ParseIndexedVector3List(token.Substring("body_image:".Length));
+                payload.BodyImage = ParseIndexedVector3List(token.Substring("body_image:".Length), out payload.BodyVisibility);
                 hasData = true;
                 index++;
                 continue;
@@ -277,6 +390,20 @@ public class MyListener : MonoBehaviour
                 continue;
             }
 
+            if (token.StartsWith("hello:", System.StringComparison.OrdinalIgnoreCase))
+            {
+                payload.OfferedSchemaVersion = ParseOfferedSchemaVersion(token.Substring("hello:".Length));
+                index++;
+                continue;
+            }
+
+            if (token.StartsWith("status:", System.StringComparison.OrdinalIgnoreCase))
+            {
+                payload.Status = token.Substring("status:".Length).ToLowerInvariant();
+                index++;
+                continue;
+            }
+
             if (token.StartsWith("gesture:", System.StringComparison.OrdinalIgnoreCase))
             {
                 payload.Gesture = token.Substring("gesture:".Length);
@@ -378,10 +505,41 @@ public class MyListener : MonoBehaviour
                 continue;
             }
 
+            if (token.StartsWith("sequences:", System.StringComparison.OrdinalIgnoreCase))
+            {
+                List<string> sequenceParts = new List<string>();
+                string first = token.Substring("sequences:".Length);
+                if (!string.IsNullOrEmpty(first))
+                {
+                    sequenceParts.Add(first);
+                }
+
+                index++;
+                while (index < tokens.Length)
+                {
+                    string peek = tokens[index].Trim();
+                    if (IsSectionHeader(peek))
+                    {
+                        break;
+                    }
+
+                    if (!string.IsNullOrEmpty(peek))
+                    {
+                        sequenceParts.Add(peek);
+                    }
+
+                    index++;
+                }
+
+                ParseSequences(sequenceParts, payload.Sequences);
+                continue;
+            }
+
             index++;
         }
 
-        return hasData ? payload : null;
+        payload.HasPoseData = hasData;
+        return hasData || payload.Status != null || payload.OfferedSchemaVersion > 0 ? payload : null;
     }
 
     private static bool IsSectionHeader(string token)
@@ -391,17 +549,29 @@ public class MyListener : MonoBehaviour
             return false;
         }
 
-        return token.StartsWith("body_world:", System.StringComparison.OrdinalIgnoreCase) ||
+        return token.StartsWith("hello:", System.StringComparison.OrdinalIgnoreCase) ||
+               token.StartsWith("body_world:", System.StringComparison.OrdinalIgnoreCase) ||
                token.StartsWith("body_image:", System.StringComparison.OrdinalIgnoreCase) ||
                token.StartsWith("hands:", System.StringComparison.OrdinalIgnoreCase) ||
                token.StartsWith("hand_states:", System.StringComparison.OrdinalIgnoreCase) ||
                token.StartsWith("metrics:", System.StringComparison.OrdinalIgnoreCase) ||
                token.StartsWith("gesture:", System.StringComparison.OrdinalIgnoreCase) ||
-               token.StartsWith("arm_segments:", System.StringComparison.OrdinalIgnoreCase);
+               token.StartsWith("status:", System.StringComparison.OrdinalIgnoreCase) ||
+               token.StartsWith("arm_segments:", System.StringComparison.OrdinalIgnoreCase) ||
+               token.StartsWith("sequences:", System.StringComparison.OrdinalIgnoreCase);
     }
 
     private static Vector3[] ParseIndexedVector3List(string data)
     {
+        return ParseIndexedVector3List(data, out _);
+    }
+
+    // Entries are "x,y,z" (schema 2+, index = position) or "index:x,y,z"
+    // (schema 1), with an optional fourth value: the landmark visibility in
+    // whole percent. Landmarks without one count as visible.
+    private static Vector3[] ParseIndexedVector3List(string data, out float[] visibility)
+    {
+        visibility = System.Array.Empty<float>();
         if (string.IsNullOrWhiteSpace(data))
         {
             return System.Array.Empty<Vector3>();
@@ -409,8 +579,10 @@ public class MyListener : MonoBehaviour
 
         string[] entries = data.Split(';');
         Dictionary<int, Vector3> parsed = new Dictionary<int, Vector3>();
+        Dictionary<int, float> parsedVisibility = new Dictionary<int, float>();
         int maxIndex = -1;
 
+        int position = -1;
         foreach (string entry in entries)
         {
             string trimmed = entry.Trim();
@@ -419,13 +591,14 @@ public class MyListener : MonoBehaviour
                 continue;
             }
 
+            position++;
             string[] pair = trimmed.Split(':');
-            if (pair.Length != 2)
+            int index = position;
+            if (pair.Length == 1)
             {
-                continue;
+                pair = new[] { null, pair[0] };
             }
-
-            if (!int.TryParse(pair[0], out int index))
+            else if (pair.Length != 2 || !int.TryParse(pair[0], out index))
             {
                 continue;
             }
@@ -434,6 +607,7 @@ public class MyListener : MonoBehaviour
             if (vector.HasValue)
             {
                 parsed[index] = vector.Value;
+                parsedVisibility[index] = ParseVisibility(pair[1]);
                 if (index > maxIndex)
                 {
                     maxIndex = index;
@@ -447,17 +621,31 @@ public class MyListener : MonoBehaviour
         }
 
         Vector3[] result = new Vector3[maxIndex + 1];
+        visibility = new float[maxIndex + 1];
         for (int i = 0; i <= maxIndex; i++)
         {
             if (parsed.TryGetValue(i, out Vector3 value))
             {
                 result[i] = value;
+                visibility[i] = parsedVisibility[i];
             }
         }
 
         return result;
     }
 
+    private static float ParseVisibility(string value)
+    {
+        string[] comps = value.Split(',');
+        float percent = 100f;
+        if (comps.Length >= 4)
+        {
+            TryParseFloat(comps[3], ref percent);
+        }
+
+        return percent / 100f;
+    }
+
     private static void ParseHands(IEnumerable<string> parts, Dictionary<string, Vector3[]> destination)
     {
         foreach (string part in parts)
@@ -513,6 +701,15 @@ public class MyListener : MonoBehaviour
             string direction = null;
             bool pointing = false;
             string gesture = null;
+            float score = 1f;
+            float timestamp = 0f;
+            bool hasKinematics = false;
+            Vector2 velocity = Vector2.zero;
+            Vector2 acceleration = Vector2.zero;
+            Vector3 worldVelocity = Vector3.zero;
+            Vector3 worldAcceleration = Vector3.zero;
+            Dictionary<int, Vector2> fingertipVelocities = null;
+            HandMotionEventData[] events = System.Array.Empty<HandMotionEventData>();
 
             foreach (string property in properties)
             {
@@ -551,6 +748,56 @@ public class MyListener : MonoBehaviour
                     case "gesture":
                         gesture = value;
                         break;
+                    case "score":
+                        TryParseFloat(value, ref score);
+                        break;
+                    case "ts":
+                        TryParseFloat(value, ref timestamp);
+                        break;
+                    case "vx":
+                        hasKinematics |= TryParseFloat(value, ref velocity.x);
+                        break;
+                    case "vy":
+                        hasKinematics |= TryParseFloat(value, ref velocity.y);
+                        break;
+                    case "ax":
+                        TryParseFloat(value, ref acceleration.x);
+                        break;
+                    case "ay":
+                        TryParseFloat(value, ref acceleration.y);
+                        break;
+                    case "wvx":
+                        TryParseFloat(value, ref worldVelocity.x);
+                        break;
+                    case "wvy":
+                        TryParseFloat(value, ref worldVelocity.y);
+                        break;
+                    case "wvz":
+                        TryParseFloat(value, ref worldVelocity.z);
+                        break;
+                    case "wax":
+                        TryParseFloat(value, ref worldAcceleration.x);
+                        break;
+                    case "way":
+                        TryParseFloat(value, ref worldAcceleration.y);
+                        break;
+                    case "waz":
+                        TryParseFloat(value, ref worldAcceleration.z);
+                        break;
+                    case "events":
+                        events = ParseHandEvents(value);
+                        break;
+                    default:
+                        if (TryParseFingertipVelocity(key, value, out int tip, out Vector2 tipVelocity))
+                        {
+                            if (fingertipVelocities == null)
+                            {
+                                fingertipVelocities = new Dictionary<int, Vector2>();
+                            }
+
+                            fingertipVelocities[tip] = tipVelocity;
+                        }
+                        break;
                 }
             }
 
@@ -561,12 +808,116 @@ public class MyListener : MonoBehaviour
                 Direction = string.IsNullOrEmpty(direction) ? "none" : direction,
                 IsPointing = pointing,
                 Gesture = string.IsNullOrEmpty(gesture) ? "none" : gesture,
+                Score = score,
+                Timestamp = timestamp,
+                HasKinematics = hasKinematics,
+                Velocity = velocity,
+                Acceleration = acceleration,
+                WorldVelocity = worldVelocity,
+                WorldAcceleration = worldAcceleration,
+                FingertipVelocities = fingertipVelocities,
+                Events = events,
             };
 
             destination[handKey] = state;
         }
     }
 
+    private static bool TryParseFloat(string value, ref float target)
+    {
+        if (float.TryParse(value, NumberStyles.Float, CultureInfo.InvariantCulture, out float parsed))
+        {
+            target = parsed;
+            return true;
+        }
+
+        return false;
+    }
+
+    // Parses "t8v=12.5;-3.0" into fingertip 8 and its velocity.
+    private static bool TryParseFingertipVelocity(string key, string value, out int tip, out Vector2 velocity)
+    {
+        tip = 0;
+        velocity = Vector2.zero;
+        if (key.Length < 3 || key[0] != 't' || key[key.Length - 1] != 'v' ||
+            !int.TryParse(key.Substring(1, key.Length - 2), NumberStyles.Integer, CultureInfo.InvariantCulture, out tip))
+        {
+            return false;
+        }
+
+        string[] components = value.Split(';');
+        return components.Length == 2 &&
+               TryParseFloat(components[0], ref velocity.x) &&
+               TryParseFloat(components[1], ref velocity.y);
+    }
+
+    // Parses "swipe_right@12.3456+hold@11.0000".
+    private static HandMotionEventData[] ParseHandEvents(string value)
+    {
+        List<HandMotionEventData> events = new List<HandMotionEventData>();
+        foreach (string token in value.Split('+'))
+        {
+            int at = token.IndexOf('@');
+            if (at <= 0)
+            {
+                continue;
+            }
+
+            string name = token.Substring(0, at);
+            float onset = 0f;
+            TryParseFloat(token.Substring(at + 1), ref onset);
+
+            int underscore = name.IndexOf('_');
+            events.Add(new HandMotionEventData
+            {
+                Kind = underscore > 0 ? name.Substring(0, underscore) : name,
+                Direction = underscore > 0 ? name.Substring(underscore + 1) : null,
+                Onset = onset,
+            });
+        }
+
+        return events.ToArray();
+    }
+
+    // Parses "wave_right:conf=0.812,start=12.3000,end=13.1000".
+    private static void ParseSequences(IEnumerable<string> parts, List<SequenceMatchData> destination)
+    {
+        foreach (string part in parts)
+        {
+            string trimmed = part.Trim();
+            int colonIndex = trimmed.IndexOf(':');
+            if (colonIndex <= 0)
+            {
+                continue;
+            }
+
+            SequenceMatchData match = new SequenceMatchData { Name = trimmed.Substring(0, colonIndex) };
+            foreach (string property in trimmed.Substring(colonIndex + 1).Split(','))
+            {
+                string[] kvp = property.Split('=');
+                if (kvp.Length != 2)
+                {
+                    continue;
+                }
+
+                switch (kvp[0])
+                {
+                    case "conf":
+                        TryParseFloat(kvp[1], ref match.Confidence);
+                        break;
+                    case "start":
+                        TryParseFloat(kvp[1], ref match.Start);
+                        break;
+                    case "end":
+                        TryParseFloat(kvp[1], ref match.End);
+                        break;
+                }
+            }
+
+            destination.Add(match);
+        }
+    }
+
     private static void ParseArmSegments(IEnumerable<string> parts, Dictionary<string, ArmSegmentData> destination)
     {
         foreach (string part in parts)
@@ -649,6 +1000,20 @@ public class MyListener : MonoBehaviour
         return null;
     }
 
+    private static int ParseOfferedSchemaVersion(string value)
+    {
+        foreach (string part in value.Split(','))
+        {
+            string[] kvp = part.Split('=');
+            if (kvp.Length == 2 && kvp[0] == "schema" && int.TryParse(kvp[1], out int version))
+            {
+                return version;
+            }
+        }
+
+        return 0;
+    }
+
     private static PoseMetrics ParseMetrics(string value)
     {
         PoseMetrics metrics = new PoseMetrics();
@@ -670,6 +1035,10 @@ public class MyListener : MonoBehaviour
             {
                 metrics.HandLandmarkCount = handCount;
             }
+            else if (kvp[0] == "visible" && int.TryParse(kvp[1], out int visibleCount))
+            {
+                metrics.BodyVisibleCount = visibleCount;
+            }
         }
 
         return metrics;
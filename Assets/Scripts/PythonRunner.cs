@@ -1,4 +1,6 @@
 using System.IO;
+using System.Net.Sockets;
+using System.Text;
 using UnityEngine;
 using Process = System.Diagnostics.Process;
 using ProcessStartInfo = System.Diagnostics.ProcessStartInfo;
@@ -12,6 +14,14 @@ public class PythonRunner : MonoBehaviour
     [SerializeField] private string pythonBinary = "/usr/bin/python3";
     [SerializeField, HideInInspector] private string scriptAssetPath = string.Empty;
 
+    [Header("Persistent backend service")]
+    [Tooltip("Attach to backend_service.py instead of launching the script on every Play. " +
+             "The service keeps models warm and is only told to start/stop streaming.")]
+    [SerializeField] private bool useBackendService = false;
+    [SerializeField] private int controlPort = 25002;
+    [Tooltip("Pipeline preset or file passed to the service when it has to be launched.")]
+    [SerializeField] private string serviceConfig = "headless";
+
 #if UNITY_EDITOR
     [SerializeField] private DefaultAsset scriptAsset;
     private void OnValidate() => scriptAssetPath = scriptAsset ? AssetDatabase.GetAssetPath(scriptAsset) : string.Empty;
@@ -27,19 +37,47 @@ public class PythonRunner : MonoBehaviour
         }
     }
 
-    private void OnDestroy() => TryKillProcess();
+    private void OnDestroy()
+    {
+        if (useBackendService)
+        {
+            // Leave the service (and its warm models) running for the next session.
+            TrySendControl("stop");
+            return;
+        }
+
+        TryKillProcess();
+    }
 
     [ContextMenu("Run Python Script")]
     public void RunPython()
     {
-        var scriptPath = ResolveScriptPath(scriptAssetPath);
+        if (useBackendService)
+        {
+            if (TrySendControl("start"))
+            {
+                return;
+            }
+
+            var servicePath = Path.Combine(
+                Path.GetDirectoryName(ResolveScriptPath(scriptAssetPath)) ?? Application.dataPath,
+                "backend_service.py");
+            StartProcess(servicePath, $"--config \"{serviceConfig}\" --port {controlPort} --autostart");
+            return;
+        }
 
         TryKillProcess();
+        StartProcess(ResolveScriptPath(scriptAssetPath), string.Empty);
+    }
 
+    private void StartProcess(string scriptPath, string extraArguments)
+    {
         var startInfo = new ProcessStartInfo
         {
             FileName = pythonBinary,
-            Arguments = scriptPath,
+            Arguments = string.IsNullOrEmpty(extraArguments)
+                ? $"\"{scriptPath}\""
+                : $"\"{scriptPath}\" {extraArguments}",
             WorkingDirectory = Path.GetDirectoryName(scriptPath) ?? Application.dataPath,
             UseShellExecute = false,
             RedirectStandardOutput = true,
@@ -81,7 +119,44 @@ public class PythonRunner : MonoBehaviour
     }
 
     [ContextMenu("Stop Python Script")]
-    public void StopPython() => TryKillProcess();
+    public void StopPython()
+    {
+        if (useBackendService)
+        {
+            TrySendControl("shutdown");
+        }
+
+        TryKillProcess();
+    }
+
+    private bool TrySendControl(string command)
+    {
+        try
+        {
+            using (var client = new TcpClient())
+            {
+                var connect = client.BeginConnect("127.0.0.1", controlPort, null, null);
+                if (!connect.AsyncWaitHandle.WaitOne(250))
+                {
+                    return false;
+                }
+
+                client.EndConnect(connect);
+                var stream = client.GetStream();
+                byte[] request = Encoding.UTF8.GetBytes($"{{\"command\": \"{command}\"}}\n");
+                stream.Write(request, 0, request.Length);
+                stream.ReadTimeout = 2000;
+                byte[] buffer = new byte[1024];
+                int read = stream.Read(buffer, 0, buffer.Length);
+                string reply = Encoding.UTF8.GetString(buffer, 0, read);
+                return reply.Contains("\"ok\": true");
+            }
+        }
+        catch (System.Exception)
+        {
+            return false;
+        }
+    }
 
     private void TryKillProcess()
     {
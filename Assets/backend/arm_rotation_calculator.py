@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional
+from typing import Iterable, List, Optional
 
 import numpy as np
 from numpy.linalg import norm
 
+from landmark_arrays import LandmarkGate, landmark_confidence, landmarks_to_array
+from subject_state import SubjectStateStore
+
 ROTATION_180_X = np.diag([1.0, -1.0, -1.0])
 FLIP_X = np.diag([-1.0, 1.0, 1.0])
 
@@ -43,28 +47,49 @@ class ArmRotationCalculator:
     RIGHT_SHOULDER_IDX = 12
     NOSE_IDX = 0
 
-    def __init__(self, smoothing_factor: float = 0.5) -> None:
+    def __init__(
+        self,
+        smoothing_factor: float = 0.5,
+        min_visibility: float = 0.5,
+        hold_s: float = 0.25,
+        state_ttl_s: Optional[float] = 1.0,
+    ) -> None:
         """Initialize calculator with optional exponential smoothing.
 
         Args:
             smoothing_factor: Value in [0, 1]. When 0, the output is fully
                 smoothed (no response to new samples). When 1, no smoothing is
                 applied. Defaults to 0.5 for light smoothing.
+            min_visibility: Joints below this MediaPipe visibility are not
+                trusted; segments touching them keep their last good pose for
+                ``hold_s`` seconds and are then left out.
+            state_ttl_s: Smoothing history of a segment that was not seen
+                for this long is dropped, so a returning body does not blend
+                with where the last one was.
         """
 
         self.smoothing_factor = float(np.clip(smoothing_factor, 0.0, 1.0))
-        self._previous_directions: Dict[str, np.ndarray] = {}
+        self._state = SubjectStateStore(len(tuple(self.SEGMENTS)) + 1, state_ttl_s)
+        self._previous_directions = self._state.add("direction", (3,), fill=np.nan)
+        self._gate = LandmarkGate(min_visibility, hold_s)
 
     def reset(self) -> None:
         """Clear the smoothing history."""
 
-        self._previous_directions.clear()
+        self._state.reset()
+        self._gate.reset()
 
-    def compute(self, body_result) -> List[ArmSegmentRotation]:
+    def compute(self, body_result, timestamp_s: Optional[float] = None) -> List[ArmSegmentRotation]:
         if not body_result or not body_result.world_landmarks:
             return []
 
-        landmarks = body_result.world_landmarks.landmark
+        if timestamp_s is None:
+            timestamp_s = time.monotonic()
+        landmarks, _ = self._gate.update(
+            landmarks_to_array(body_result.world_landmarks, dtype=np.float64),
+            landmark_confidence(body_result.world_landmarks),
+            timestamp_s,
+        )
         segment_rotations: List[ArmSegmentRotation] = []
 
         for config in self.SEGMENTS:
@@ -88,44 +113,44 @@ class ArmRotationCalculator:
                 )
             )
 
-        head_rotation = self._compute_head_rotation(landmarks)
+        head_rotation = self._compute_head_rotation(landmarks, timestamp_s)
         if head_rotation is not None:
             segment_rotations.append(head_rotation)
 
         return segment_rotations
 
     @staticmethod
-    def _landmark_to_array(landmarks, index: int) -> Optional[np.ndarray]:
-        if index < 0 or index >= len(landmarks):
+    def _landmark_to_array(landmarks: np.ndarray, index: int) -> Optional[np.ndarray]:
+        if index < 0 or index >= len(landmarks) or np.isnan(landmarks[index, 0]):
             return None
-        landmark = landmarks[index]
-        return np.array([landmark.x, landmark.y, landmark.z], dtype=np.float64)
+        return landmarks[index]
 
     def _apply_low_pass(
-        self, key: str, direction: np.ndarray
+        self, key: str, direction: np.ndarray, timestamp_s: float
     ) -> np.ndarray:
+        (slot,) = self._state.acquire([key], timestamp_s)
         if self.smoothing_factor >= 0.999:
-            self._previous_directions[key] = direction
+            self._previous_directions[slot] = direction
             return direction
 
         alpha = self.smoothing_factor
 
-        prev_direction = self._previous_directions.get(key)
-        if prev_direction is None:
+        prev_direction = self._previous_directions[slot]
+        if np.isnan(prev_direction[0]):
             direction_smoothed = direction
         else:
             direction_smoothed = alpha * direction + (1.0 - alpha) * prev_direction
             norm = np.linalg.norm(direction_smoothed)
             if norm < 1e-6:
-                direction_smoothed = prev_direction
+                direction_smoothed = prev_direction.copy()
             else:
                 direction_smoothed /= norm
 
-        self._previous_directions[key] = direction_smoothed
+        self._previous_directions[slot] = direction_smoothed
 
         return direction_smoothed
 
-    def _compute_head_rotation(self, landmarks) -> Optional[ArmSegmentRotation]:
+    def _compute_head_rotation(self, landmarks, timestamp_s: float) -> Optional[ArmSegmentRotation]:
         left_shoulder = self._landmark_to_array(landmarks, self.LEFT_SHOULDER_IDX)
         right_shoulder = self._landmark_to_array(landmarks, self.RIGHT_SHOULDER_IDX)
         nose = self._landmark_to_array(landmarks, self.NOSE_IDX)
@@ -141,7 +166,7 @@ class ArmRotationCalculator:
 
         direction_unit = direction / norm
         direction_smoothed = self._apply_low_pass(
-            self.HEAD_CONFIG.name, direction_unit
+            self.HEAD_CONFIG.name, direction_unit, timestamp_s
         )
 
         return ArmSegmentRotation(
@@ -0,0 +1,301 @@
+"""Long-lived backend that keeps models warm between Unity play sessions.
+
+The service opens a pipeline once and then waits for commands on a local
+control channel. Commands and replies are single-line JSON objects:
+
+    {"command": "start"}
+    {"command": "stop"}
+    {"command": "switch", "config": "headless"}
+    {"command": "health"}
+    {"command": "stats"}
+    {"command": "profile", "action": "capture", "seconds": 5, "mode": "sample"}
+    {"command": "shutdown"}
+
+Every reply carries ``"ok"``; failed commands also carry ``"error"``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+from network_runtime import AsyncControlServer
+from pipeline import (
+    PipelineConfig,
+    PipelineRunner,
+    add_runtime_arguments,
+    apply_runtime_arguments,
+    resolve_config,
+)
+from pipeline_profiler import FrameProfiler, install_signal_handlers
+
+DEFAULT_CONTROL_PORT = 25002
+
+
+class BackendService:
+    """Runs one pipeline in a background thread and obeys control commands."""
+
+    def __init__(
+        self,
+        config: Union[str, PipelineConfig] = "headless",
+        autostart: bool = False,
+    ) -> None:
+        self._config_name = config if isinstance(config, str) else "custom"
+        self._runner = PipelineRunner(resolve_config(config))
+        self._autostart = autostart
+
+        # Guards the runner: the stream thread holds it for each frame and
+        # control commands hold it to swap or close the runner.
+        self._lock = threading.Lock()
+        self._streaming = threading.Event()
+        self._shutdown = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._started_at = time.time()
+        self._frames = 0
+        self._stream_started_at: Optional[float] = None
+        self._stream_frames = 0
+        self._last_error: Optional[str] = None
+
+    def open(self) -> None:
+        self._runner.open()
+        self._thread = threading.Thread(
+            target=self._stream_loop, name="pose-stream", daemon=True
+        )
+        self._thread.start()
+        if self._autostart:
+            self.start()
+
+    def start(self) -> Dict[str, Any]:
+        if not self._streaming.is_set():
+            self._stream_started_at = time.time()
+            self._stream_frames = 0
+            self._streaming.set()
+        return {"streaming": True}
+
+    def stop(self) -> Dict[str, Any]:
+        self._streaming.clear()
+        return {"streaming": False}
+
+    def switch(self, config: Union[str, PipelineConfig]) -> Dict[str, Any]:
+        """Replace the pipeline and keep stages that did not change open."""
+        new_runner = PipelineRunner(resolve_config(config))
+        # Reject bad params before anything leaves the running pipeline.
+        new_runner.check_params()
+        with self._lock:
+            old_runner = self._runner
+            reused = new_runner.adopt(old_runner)
+            try:
+                new_runner.open()
+            except Exception:
+                new_runner.give_back(old_runner)
+                new_runner.close()
+                raise
+            self._runner = new_runner
+            self._config_name = config if isinstance(config, str) else "custom"
+        old_runner.close()
+        return {"config": self._config_name, "reused": reused}
+
+    def health(self) -> Dict[str, Any]:
+        alive = self._thread is not None and self._thread.is_alive()
+        return {
+            "status": "ok" if alive and self._last_error is None else "degraded",
+            "streaming": self._streaming.is_set(),
+            "config": self._config_name,
+            "last_error": self._last_error,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        stream_seconds = (
+            now - self._stream_started_at
+            if self._streaming.is_set() and self._stream_started_at is not None
+            else 0.0
+        )
+        report = self._runner.startup_report
+        metrics = self._runner.metrics
+        return {
+            "uptime_s": round(now - self._started_at, 3),
+            "frames": self._frames,
+            "stream_frames": self._stream_frames,
+            "stream_fps": round(self._stream_frames / stream_seconds, 2)
+            if stream_seconds > 0
+            else 0.0,
+            "startup_ms": round(report.total_ms, 1),
+            "stages": [stage.name for stage in self._runner.stages],
+            "metrics": metrics.snapshot() if metrics is not None else None,
+        }
+
+    def profile(
+        self,
+        action: str = "report",
+        seconds: Optional[float] = None,
+        mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Stage timing (``start``/``stop``/``report``) or a ``capture``."""
+        profiler = self._runner.profiler
+        if action == "start":
+            profiler.start_timing()
+            return {"timing": True}
+        if action == "stop":
+            return {"timing": False, "report": profiler.stop_timing()}
+        if action == "report":
+            return {
+                "timing": profiler.timing,
+                "report": profiler.report(),
+                "capturing": profiler.capturing,
+                "last_capture": profiler.last_capture,
+            }
+        if action == "capture":
+            path = profiler.capture(seconds, mode)
+            return {"capture": os.path.abspath(path)}
+        raise ValueError(f"Unknown profile action: {action!r}")
+
+    @property
+    def profiler(self) -> FrameProfiler:
+        return self._runner.profiler
+
+    def shutdown(self) -> None:
+        self._streaming.clear()
+        self._shutdown.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        with self._lock:
+            self._runner.close()
+
+    @property
+    def is_shut_down(self) -> bool:
+        return self._shutdown.is_set()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one control request and build its reply."""
+        command = request.get("command")
+        try:
+            if command == "start":
+                result = self.start()
+            elif command == "stop":
+                result = self.stop()
+            elif command == "switch":
+                if "config" not in request:
+                    raise ValueError("'switch' needs a 'config'")
+                result = self.switch(request["config"])
+            elif command == "health":
+                result = self.health()
+            elif command == "stats":
+                result = self.stats()
+            elif command == "profile":
+                result = self.profile(
+                    request.get("action", "report"),
+                    seconds=request.get("seconds"),
+                    mode=request.get("mode"),
+                )
+            elif command == "shutdown":
+                self.stop()
+                self._shutdown.set()
+                result = {"shutting_down": True}
+            else:
+                raise ValueError(f"Unknown command: {command!r}")
+        except Exception as exc:  # replies must never kill the control thread
+            return {"ok": False, "error": str(exc)}
+        return dict(result, ok=True)
+
+    def _stream_loop(self) -> None:
+        while not self._shutdown.is_set():
+            if not self._streaming.wait(timeout=0.1):
+                continue
+            with self._lock:
+                try:
+                    context = self._runner.step()
+                except Exception as exc:
+                    self._last_error = f"{type(exc).__name__}: {exc}"
+                    self._streaming.clear()
+                    continue
+            if context is None:
+                # A sink asked to stop, e.g. 'q' in the preview window.
+                self._streaming.clear()
+            elif context.frame is None:
+                time.sleep(0.005)  # camera not delivering; avoid spinning
+            else:
+                self._frames += 1
+                self._stream_frames += 1
+                self._last_error = None
+
+
+def reply_to_line(service: BackendService, line: bytes) -> bytes:
+    """Decode one request line, run it and encode the reply line."""
+    try:
+        request = json.loads(line.strip().decode("utf-8"))
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+    except ValueError as exc:
+        reply = {"ok": False, "error": f"Bad request: {exc}"}
+    else:
+        reply = service.handle(request)
+    return json.dumps(reply).encode("utf-8") + b"\n"
+
+
+def serve(
+    config: Union[str, PipelineConfig] = "headless",
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_CONTROL_PORT,
+    autostart: bool = False,
+) -> None:
+    service = BackendService(config, autostart=autostart)
+    install_signal_handlers(lambda: service.profiler)
+    server: Optional[AsyncControlServer] = None
+    try:
+        service.open()
+        # Served from the network runtime's event loop, next to any
+        # async_sender streams, rather than a thread per connection.
+        server = AsyncControlServer(
+            lambda line: reply_to_line(service, line),
+            host,
+            port,
+            should_close=lambda: service.is_shut_down,
+        )
+        print(f"[service] control channel on {host}:{server.address[1]}")
+        while not service.is_shut_down:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.close()
+        service.shutdown()
+
+
+def is_service_running(host: str = "127.0.0.1", port: int = DEFAULT_CONTROL_PORT) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the persistent pose backend.")
+    parser.add_argument(
+        "--config",
+        default="headless",
+        help="Preset name or pipeline file. Headless is the default because "
+        "OpenCV windows must not be driven from the stream thread on macOS.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_CONTROL_PORT)
+    parser.add_argument(
+        "--autostart", action="store_true", help="Start streaming immediately."
+    )
+    add_runtime_arguments(parser)
+    args = parser.parse_args()
+    config = apply_runtime_arguments(args.config, args)
+    serve(config, args.host, args.port, autostart=args.autostart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""Extract landmarks from image folders and videos on every core.
+
+    python batch_landmarks.py dataset/ --output landmarks.npz
+    python batch_landmarks.py "shots/**/*.jpg" clip.mp4 --output landmarks.npz \\
+        --annotate out/annotated --plot out/plots --workers 8
+
+Inputs are directories (searched recursively), glob patterns or files.
+Each worker process builds its own estimators once. Images are sent to the
+workers in chunks and run in static image mode; a video is one work item,
+processed in order so tracking between frames works.
+
+Every processed frame becomes one row of a single ``.npz`` file holding
+one array per column (see ``landmark_arrays.RESULT_COLUMNS``); read it
+with ``load_landmarks``. Missing bodies and hands are NaN. Annotated
+images (and videos) and world landmark plots are optional and are written
+by the workers too.
+
+With ``--cache DIR`` image results are kept in a ``LandmarkCache``, so a
+re-run only runs inference on new or changed images. Videos are not
+cached.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from landmark_arrays import (
+    MAX_HANDS,
+    RESULT_COLUMNS,
+    landmarks_to_array,
+    results_to_row,
+    row_to_results,
+)
+from landmark_cache import LandmarkCache, fingerprint
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+
+# (index, path, output name) of one input.
+Item = Tuple[int, str, str]
+
+
+def default_estimators(static_image_mode: bool):
+    """Body and hand estimators for one worker."""
+    from body_pose_estimator import BodyPoseEstimator
+    from hand_pose_estimator import HandPoseEstimator
+
+    return (
+        BodyPoseEstimator(static_image_mode=static_image_mode),
+        HandPoseEstimator(max_num_hands=MAX_HANDS, static_image_mode=static_image_mode),
+    )
+
+
+@dataclass
+class BatchOptions:
+    """What the workers write besides landmarks. Must be picklable."""
+
+    annotate_dir: Optional[str] = None
+    plot_dir: Optional[str] = None
+    plot_dpi: int = 100
+    video_stride: int = 1
+    estimators: Callable[[bool], Tuple[Any, Any]] = default_estimators
+    cache_dir: Optional[str] = None
+    cache_max_bytes: int = 1 << 30
+
+
+@dataclass
+class ItemResult:
+    index: int
+    source: str
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    error: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def rows(self) -> int:
+        frames = self.columns.get("frame")
+        return 0 if frames is None else len(frames)
+
+
+def is_video(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+
+def collect_inputs(patterns: Sequence[str]) -> List[str]:
+    """Expand directories and globs into image and video files, in order."""
+    extensions = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+    paths: List[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(pattern)
+                for name in names
+                if os.path.splitext(name)[1].lower() in extensions
+            ]
+        elif glob.has_magic(pattern):
+            matches = [
+                path
+                for path in glob.glob(pattern, recursive=True)
+                if os.path.isfile(path) and os.path.splitext(path)[1].lower() in extensions
+            ]
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            raise FileNotFoundError(f"No such file or directory: {pattern}")
+        if not matches:
+            raise FileNotFoundError(f"No images or videos found for {pattern}")
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+
+def _output_names(paths: Sequence[str]) -> List[str]:
+    """File stems for the optional outputs, made unique across folders."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        count = seen.get(stem, 0)
+        seen[stem] = count + 1
+        names.append(stem if count == 0 else f"{stem}-{count}")
+    return names
+
+
+def _stack(
+    rows: List[Dict[str, np.ndarray]], source: str, frames: List[int]
+) -> Dict[str, np.ndarray]:
+    columns = {
+        "source": np.array([source] * len(rows)),
+        "frame": np.array(frames, dtype=np.int32),
+    }
+    shapes = dict(RESULT_COLUMNS, handedness=(MAX_HANDS,))
+    for name, shape in shapes.items():
+        if rows:
+            columns[name] = np.stack([row[name] for row in rows])
+        else:
+            columns[name] = np.empty((0,) + shape, "<U8" if name == "handedness" else np.float32)
+    return columns
+
+
+def _read_image(path: str, data: Optional[bytes] = None):
+    import cv2
+
+    if data is None:
+        frame = cv2.imread(path)
+    else:
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("not a readable image")
+    return frame
+
+
+class _Worker:
+    """Estimators and writers of one worker process."""
+
+    def __init__(self, options: BatchOptions) -> None:
+        self.options = options
+        self._image_estimators: Optional[Tuple[Any, Any]] = None
+        self._visualizer = None
+        self._plot = None
+        self._cache: Optional[LandmarkCache] = None
+        if options.cache_dir:
+            factory = options.estimators
+            self._cache = LandmarkCache(
+                options.cache_dir,
+                options.cache_max_bytes,
+                fingerprint(
+                    estimators=f"{factory.__module__}.{factory.__qualname__}",
+                    static_image_mode=True,
+                    max_hands=MAX_HANDS,
+                ),
+            )
+        for directory in (options.annotate_dir, options.plot_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def run(self, items: Sequence[Item]) -> List[ItemResult]:
+        results = []
+        for index, path, name in items:
+            try:
+                if is_video(path):
+                    results.append(ItemResult(index, path, self._video(path, name)))
+                else:
+                    columns, cached = self._image(path, name)
+                    results.append(ItemResult(index, path, columns, cached=cached))
+            except Exception as exc:  # one bad file must not end the batch
+                results.append(ItemResult(index, path, error=f"{type(exc).__name__}: {exc}"))
+        return results
+
+    def _image(self, path: str, name: str) -> Tuple[Dict[str, np.ndarray], bool]:
+        import cv2
+
+        key = data = row = None
+        if self._cache is not None:
+            key, data = self._cache.key_for_file(path)
+            row = self._cache.get(key)
+        cached = row is not None
+        frame = body_result = hand_result = None
+        if row is None:
+            frame = _read_image(path, data)
+            if self._image_estimators is None:
+                self._image_estimators = self.options.estimators(True)
+            body, hands = self._image_estimators
+            body_result = body.get_body_pose(frame)
+            hand_result = hands.get_hand_pose(frame)
+            row = results_to_row(body_result, hand_result)
+            if self._cache is not None:
+                self._cache.put(key, row)
+        elif self.options.annotate_dir or self.options.plot_dir:
+            body_result, hand_result = row_to_results(row)
+
+        if self.options.annotate_dir:
+            if frame is None:
+                frame = _read_image(path, data)
+            self._draw(frame, body_result, hand_result)
+            extension = os.path.splitext(path)[1]
+            cv2.imwrite(os.path.join(self.options.annotate_dir, f"{name}_annotated{extension}"), frame)
+        if self.options.plot_dir and body_result.world_landmarks:
+            if self._plot is None:
+                from world_plot import WorldPlotFigure
+
+                self._plot = WorldPlotFigure(dpi=self.options.plot_dpi)
+            self._plot.save(
+                landmarks_to_array(body_result.world_landmarks),
+                self.options.plot_dir,
+                name,
+                title=os.path.basename(path),
+                separate=False,
+            )
+        return _stack([row], path, [0]), cached
+
+    def _video(self, path: str, name: str) -> Dict[str, np.ndarray]:
+        import cv2
+
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise ValueError("not a readable video")
+        stride = max(1, int(self.options.video_stride))
+        body, hands = self.options.estimators(False)  # fresh tracking per video
+        writer = None
+        rows: List[Dict[str, Any]] = []
+        frames: List[int] = []
+        frame_index = 0
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if frame_index % stride == 0:
+                    body_result = body.get_body_pose(frame)
+                    hand_result = hands.get_hand_pose(frame)
+                    rows.append(results_to_row(body_result, hand_result))
+                    frames.append(frame_index)
+                    if self.options.annotate_dir:
+                        if writer is None:
+                            fps = (capture.get(cv2.CAP_PROP_FPS) or 30.0) / stride
+                            height, width = frame.shape[:2]
+                            writer = cv2.VideoWriter(
+                                os.path.join(self.options.annotate_dir, f"{name}_annotated.mp4"),
+                                cv2.VideoWriter_fourcc(*"mp4v"),
+                                fps,
+                                (width, height),
+                            )
+                        self._draw(frame, body_result, hand_result)
+                        writer.write(frame)
+                frame_index += 1
+        finally:
+            capture.release()
+            if writer is not None:
+                writer.release()
+            body.close()
+            hands.close()
+        return _stack(rows, path, frames)
+
+    def _draw(self, frame, body_result, hand_result) -> None:
+        if self._visualizer is None:
+            from pose_visualizer import PoseVisualizer
+
+            self._visualizer = PoseVisualizer()
+        self._visualizer.draw(frame, body_result, hand_result)
+
+    def close(self) -> None:
+        for estimator in self._image_estimators or ():
+            estimator.close()
+        self._image_estimators = None
+
+
+_worker: Optional[_Worker] = None
+
+
+def _init_worker(options: BatchOptions) -> None:
+    global _worker
+    _worker = _Worker(options)
+
+
+def _run_chunk(items: Sequence[Item]) -> List[ItemResult]:
+    return _worker.run(items)
+
+
+def _chunks(paths: Sequence[str], chunk_size: int) -> List[List[Item]]:
+    """Images grouped ``chunk_size`` at a time; every video on its own."""
+    chunks: List[List[Item]] = []
+    images: List[Item] = []
+    for index, (path, name) in enumerate(zip(paths, _output_names(paths))):
+        if is_video(path):
+            chunks.append([(index, path, name)])
+            continue
+        images.append((index, path, name))
+        if len(images) == chunk_size:
+            chunks.append(images)
+            images = []
+    if images:
+        chunks.append(images)
+    # Long videos first, so they do not end up alone at the tail of the run.
+    chunks.sort(key=lambda chunk: not is_video(chunk[0][1]))
+    return chunks
+
+
+class _Progress:
+    """Prints a progress line at most every ``interval`` seconds."""
+
+    def __init__(self, total: int, interval: float = 1.0, stream=None) -> None:
+        self.total = total
+        self.done = 0
+        self.rows = 0
+        self.failed = 0
+        self._interval = interval
+        self._stream = stream or sys.stderr
+        self._started = time.perf_counter()
+        self._last_print = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def update(self, results: Sequence[ItemResult]) -> None:
+        self.done += len(results)
+        self.rows += sum(result.rows for result in results)
+        self.failed += sum(result.error is not None for result in results)
+        now = time.perf_counter()
+        if now - self._last_print >= self._interval or self.done == self.total:
+            self._last_print = now
+            self._print()
+
+    def _print(self) -> None:
+        elapsed = self.elapsed
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) * elapsed / self.done if self.done else 0.0
+        # On a terminal the line is redrawn in place.
+        tty = self._stream.isatty()
+        start = "\r" if tty else ""
+        end = "\n" if self.done == self.total or not tty else ""
+        self._stream.write(
+            f"{start}[batch] {self.done}/{self.total} inputs ({self.done / self.total:.0%}), "
+            f"{self.rows} frames, {rate:.1f} frames/s, eta {remaining:.0f} s{end}"
+        )
+        self._stream.flush()
+
+
+def run_batch(
+    inputs: Sequence[str],
+    output_path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    options: Optional[BatchOptions] = None,
+) -> Dict[str, np.ndarray]:
+    """Process ``inputs`` and write the landmark columns to ``output_path``.
+
+    ``workers=0`` runs in this process, which is easier to debug. Returns
+    the columns that were written.
+    """
+    options = options or BatchOptions()
+    paths = collect_inputs(inputs)
+    chunks = _chunks(paths, max(1, chunk_size))
+    progress = _Progress(len(paths))
+    results: List[ItemResult] = []
+
+    if workers == 0:
+        worker = _Worker(options)
+        try:
+            for chunk in chunks:
+                chunk_results = worker.run(chunk)
+                results.extend(chunk_results)
+                progress.update(chunk_results)
+        finally:
+            worker.close()
+    else:
+        import multiprocessing
+
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        # MediaPipe starts threads of its own; spawn rather than fork them.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(options,),
+        ) as executor:
+            pending = {executor.submit(_run_chunk, chunk) for chunk in chunks}
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk_results = future.result()
+                    results.extend(chunk_results)
+                    progress.update(chunk_results)
+
+    results.sort(key=lambda result: result.index)
+    for result in results:
+        if result.error is not None:
+            print(f"[batch] skipped {result.source}: {result.error}")
+    columns = _concatenate([result.columns for result in results if result.error is None])
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "wb") as handle:
+        np.savez(handle, **columns)
+    print(
+        f"[batch] wrote {len(columns['frame'])} frames from {len(paths) - progress.failed} inputs "
+        f"to {output_path} in {progress.elapsed:.1f} s"
+    )
+    if options.cache_dir:
+        cached = sum(result.cached for result in results)
+        print(f"[batch] {cached} of {len(paths)} inputs came from the cache in {options.cache_dir}")
+    return columns
+
+
+def _concatenate(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if not parts:
+        return _stack([], "", [])
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def load_landmarks(path: str) -> Dict[str, np.ndarray]:
+    """Columns written by ``run_batch``."""
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="Image or video files, directories or globs.")
+    parser.add_argument("--output", required=True, help="Landmark file to write (.npz).")
+    parser.add_argument(
+        "--workers", type=int, help="Worker processes; defaults to the CPU count, 0 runs in-process."
+    )
+    parser.add_argument("--chunk-size", type=int, default=16, help="Images per work item.")
+    parser.add_argument("--annotate", help="Write annotated images and videos to this folder.")
+    parser.add_argument("--plot", help="Write world landmark plots of images to this folder.")
+    parser.add_argument("--plot-dpi", type=int, default=100)
+    parser.add_argument("--video-stride", type=int, default=1, help="Process every Nth video frame.")
+    parser.add_argument("--cache", help="Reuse image results stored in this folder.")
+    parser.add_argument("--cache-size-mb", type=int, default=1024)
+    args = parser.parse_args(argv)
+    options = BatchOptions(
+        annotate_dir=args.annotate,
+        plot_dir=args.plot,
+        plot_dpi=args.plot_dpi,
+        video_stride=args.video_stride,
+        cache_dir=args.cache,
+        cache_max_bytes=args.cache_size_mb * 1024 * 1024,
+    )
+    run_batch(args.inputs, args.output, args.workers, args.chunk_size, options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Body gestures defined as data and evaluated in one vectorized pass.
+
+A rule file (JSON, or TOML on Python 3.11+) lists gestures in priority
+order. Each gesture is a set of predicates over pose landmarks:
+
+    {
+        "default": "neutral",
+        "hold_ms": 100,
+        "gestures": [
+            {"name": "both_hands_up",
+             "all": ["left_wrist.y < left_shoulder.y", "right_wrist.y < right_shoulder.y"]},
+            {"name": "elbow_bent",
+             "all": ["angle(left_shoulder, left_elbow, left_wrist) < 100"]}
+        ]
+    }
+
+Predicates compare linear expressions of landmark coordinates
+(``left_wrist.y``), 2D distances (``distance(a, b)``) and joint angles in
+degrees (``angle(a, b, c)``, measured at ``b``). Landmarks are named as in
+MediaPipe; ``distance`` and ``angle`` also take indices. A gesture is a candidate when all of its
+``all`` predicates hold and, if it has any, one of its ``any`` predicates.
+
+The rules are compiled once into a matrix: every predicate's margin is
+``W @ features + b``. A frame then costs one feature gather and one matrix
+product, however many rules there are.
+
+Hysteresis: a predicate turns on when its margin exceeds ``hysteresis``
+(``angle_hysteresis`` for predicates with angles) and only turns off when
+the margin drops below minus that amount. A gesture becomes active after
+being a candidate for ``hold_ms``, and stays active for ``release_ms``
+after it stops being one. These can be set for the whole file or per
+gesture.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from landmark_arrays import POSE_LANDMARK_NAMES
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "rules", "body_gestures.json")
+
+_AXES = {"x": 0, "y": 1, "z": 2}
+_LANDMARKS = {name: idx for idx, name in enumerate(POSE_LANDMARK_NAMES)}
+_TOKEN = re.compile(
+    r"\s*(?:(?P<number>\d+\.\d*|\.\d+|\d+)|(?P<name>[A-Za-z_][A-Za-z_0-9]*(?:\.[xyz])?)"
+    r"|(?P<op><=|>=|<|>|[-+*(),]))"
+)
+
+# Feature keys: ("coord", landmark, axis), ("distance", a, b), ("angle", a, b, c).
+FeatureKey = Tuple[Any, ...]
+Linear = Tuple[Dict[FeatureKey, float], float]
+
+
+class RuleError(ValueError):
+    """Raised when a rule file cannot be parsed or compiled."""
+
+
+def load_rules(path: str) -> Dict[str, Any]:
+    """Load a rule file from JSON or TOML."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError as exc:  # Python < 3.11
+            raise RuleError("TOML rule files require Python 3.11+; use JSON instead") from exc
+        with open(path, "rb") as handle:
+            return tomllib.load(handle)
+    raise RuleError(f"Unsupported rule file type: {path}")
+
+
+class _Parser:
+    """Recursive-descent parser for one predicate, producing linear forms."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                raise RuleError(f"Cannot parse {self.text!r} at {text[position:]!r}")
+            kind = match.lastgroup or ""
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+        self.index = 0
+
+    def predicate(self) -> Tuple[Linear, bool]:
+        """Return ``(lhs - rhs, uses_angles)`` oriented so that > 0 means true."""
+        left = self.expression()
+        operator = self.take("op")
+        if operator not in ("<", "<=", ">", ">="):
+            raise RuleError(f"Expected a comparison in {self.text!r}")
+        right = self.expression()
+        if self.index != len(self.tokens):
+            raise RuleError(f"Unexpected {self.tokens[self.index][1]!r} in {self.text!r}")
+        difference = _combine(left, right, -1.0)
+        if operator in ("<", "<="):
+            difference = _scale(difference, -1.0)
+        if not difference[0]:
+            raise RuleError(f"{self.text!r} does not use any landmark")
+        uses_angles = any(key[0] == "angle" for key in difference[0])
+        return difference, uses_angles
+
+    def expression(self) -> Linear:
+        value = self.term()
+        while self.peek() in ("+", "-"):
+            sign = 1.0 if self.take("op") == "+" else -1.0
+            value = _combine(value, self.term(), sign)
+        return value
+
+    def term(self) -> Linear:
+        value = self.factor()
+        while self.peek() == "*":
+            self.take("op")
+            other = self.factor()
+            if value[0] and other[0]:
+                raise RuleError(f"Only multiplication by a constant is allowed in {self.text!r}")
+            if value[0]:
+                value = _scale(value, other[1])
+            else:
+                value = _scale(other, value[1])
+        return value
+
+    def factor(self) -> Linear:
+        kind, text = self.next()
+        if kind == "number":
+            return {}, float(text)
+        if text == "-":
+            return _scale(self.factor(), -1.0)
+        if text == "(":
+            value = self.expression()
+            self.expect(")")
+            return value
+        if kind == "name" and text in ("distance", "angle"):
+            self.expect("(")
+            points = [self.landmark()]
+            while self.peek() == ",":
+                self.take("op")
+                points.append(self.landmark())
+            self.expect(")")
+            expected = 2 if text == "distance" else 3
+            if len(points) != expected:
+                raise RuleError(f"{text}() takes {expected} landmarks in {self.text!r}")
+            return {(text,) + tuple(points): 1.0}, 0.0
+        if kind == "name" and "." in text:
+            name, axis = text.split(".")
+            return {("coord", self._landmark_index(name), _AXES[axis]): 1.0}, 0.0
+        raise RuleError(f"Unexpected {text!r} in {self.text!r}")
+
+    def landmark(self) -> int:
+        kind, text = self.next()
+        if kind not in ("name", "number"):
+            raise RuleError(f"Expected a landmark in {self.text!r}")
+        return self._landmark_index(text)
+
+    def _landmark_index(self, name: str) -> int:
+        if name.isdigit() and int(name) < len(POSE_LANDMARK_NAMES):
+            return int(name)
+        if name not in _LANDMARKS:
+            raise RuleError(f"Unknown landmark {name!r} in {self.text!r}")
+        return _LANDMARKS[name]
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.index][1] if self.index < len(self.tokens) else None
+
+    def next(self) -> Tuple[str, str]:
+        if self.index >= len(self.tokens):
+            raise RuleError(f"Unexpected end of {self.text!r}")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def take(self, kind: str) -> str:
+        token_kind, text = self.next()
+        if token_kind != kind:
+            raise RuleError(f"Unexpected {text!r} in {self.text!r}")
+        return text
+
+    def expect(self, text: str) -> None:
+        if self.next()[1] != text:
+            raise RuleError(f"Expected {text!r} in {self.text!r}")
+
+
+def _combine(left: Linear, right: Linear, sign: float) -> Linear:
+    coefficients = dict(left[0])
+    for key, value in right[0].items():
+        coefficients[key] = coefficients.get(key, 0.0) + sign * value
+    return {key: value for key, value in coefficients.items() if value != 0.0}, left[1] + sign * right[1]
+
+
+def _scale(value: Linear, factor: float) -> Linear:
+    return {key: coefficient * factor for key, coefficient in value[0].items()}, value[1] * factor
+
+
+@dataclass
+class _Settings:
+    hysteresis: float = 0.02
+    angle_hysteresis: float = 3.0
+    hold_ms: float = 0.0
+    release_ms: float = 0.0
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict[str, Any], defaults: Optional[_Settings] = None) -> _Settings:
+        base = defaults or cls()
+        return cls(
+            hysteresis=float(mapping.get("hysteresis", base.hysteresis)),
+            angle_hysteresis=float(mapping.get("angle_hysteresis", base.angle_hysteresis)),
+            hold_ms=float(mapping.get("hold_ms", base.hold_ms)),
+            release_ms=float(mapping.get("release_ms", base.release_ms)),
+        )
+
+
+_GESTURE_KEYS = {"name", "all", "any", "hysteresis", "angle_hysteresis", "hold_ms", "release_ms"}
+
+
+class GestureRuleEngine:
+    """Compiled rule set; ``evaluate`` returns the highest-priority active gesture.
+
+    With ``temporal=False`` hysteresis and hold times are ignored and each
+    frame is judged on its own, e.g. for single images.
+    """
+
+    def __init__(self, rules: Dict[str, Any], temporal: bool = True) -> None:
+        if not isinstance(rules, dict) or not isinstance(rules.get("gestures"), list):
+            raise RuleError("A rule file needs a 'gestures' list")
+        self.default = str(rules.get("default", "neutral"))
+        self._temporal = temporal
+        defaults = _Settings.from_mapping(rules)
+
+        features: Dict[FeatureKey, int] = {}
+        rows: List[Tuple[Dict[FeatureKey, float], float, float]] = []
+        all_members: List[List[int]] = []
+        any_members: List[List[int]] = []
+        names: List[str] = []
+        holds: List[float] = []
+        releases: List[float] = []
+        for gesture in rules["gestures"]:
+            if not isinstance(gesture, dict) or not gesture.get("name"):
+                raise RuleError(f"Every gesture needs a 'name': {gesture!r}")
+            name = str(gesture["name"])
+            unknown = set(gesture) - _GESTURE_KEYS
+            if unknown:
+                raise RuleError(f"Unknown keys for gesture '{name}': {', '.join(sorted(unknown))}")
+            if not gesture.get("all") and not gesture.get("any"):
+                raise RuleError(f"Gesture '{name}' has no predicates")
+            settings = _Settings.from_mapping(gesture, defaults)
+            members = []
+            for group in ("all", "any"):
+                indices = []
+                for text in gesture.get(group) or []:
+                    (coefficients, constant), uses_angles = _Parser(str(text)).predicate()
+                    for key in coefficients:
+                        features.setdefault(key, len(features))
+                    margin = settings.angle_hysteresis if uses_angles else settings.hysteresis
+                    indices.append(len(rows))
+                    rows.append((coefficients, constant, margin))
+                members.append(indices)
+            names.append(name)
+            all_members.append(members[0])
+            any_members.append(members[1])
+            holds.append(settings.hold_ms / 1000.0)
+            releases.append(settings.release_ms / 1000.0)
+
+        self.names = tuple(names)
+        self._compile_features(list(features))
+        count = len(rows)
+        self._weights = np.zeros((count, len(features)))
+        self._bias = np.zeros(count)
+        self._hysteresis = np.zeros(count)
+        for row, (coefficients, constant, margin) in enumerate(rows):
+            for key, coefficient in coefficients.items():
+                self._weights[row, features[key]] = coefficient
+            self._bias[row] = constant
+            self._hysteresis[row] = margin
+        self._all = np.zeros((len(names), count))
+        self._any = np.zeros((len(names), count))
+        for rule, (all_rows, any_rows) in enumerate(zip(all_members, any_members)):
+            self._all[rule, all_rows] = 1.0
+            self._any[rule, any_rows] = 1.0
+        self._has_any = self._any.any(axis=1)
+        self._hold = np.array(holds)
+        self._release = np.array(releases)
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str, temporal: bool = True) -> GestureRuleEngine:
+        return cls(load_rules(path), temporal=temporal)
+
+    def _compile_features(self, keys: Sequence[FeatureKey]) -> None:
+        # Features are computed grouped by kind and then put back in
+        # column order.
+        kinds: Dict[str, List[int]] = {"coord": [], "distance": [], "angle": []}
+        for column, key in enumerate(keys):
+            kinds[key[0]].append(column)
+        self._coord_columns = np.array(kinds["coord"], dtype=np.intp)
+        self._coord_index = np.array([keys[c][1:] for c in kinds["coord"]], dtype=np.intp).reshape(-1, 2)
+        self._distance_columns = np.array(kinds["distance"], dtype=np.intp)
+        self._distance_index = np.array([keys[c][1:] for c in kinds["distance"]], dtype=np.intp).reshape(-1, 2)
+        self._angle_columns = np.array(kinds["angle"], dtype=np.intp)
+        self._angle_index = np.array([keys[c][1:] for c in kinds["angle"]], dtype=np.intp).reshape(-1, 3)
+        used = [key[1] if key[0] == "coord" else max(key[1:]) for key in keys]
+        self.required_landmarks = 1 + max(used, default=-1)
+        self._feature_count = len(keys)
+
+    def reset(self) -> None:
+        count = len(self.names)
+        self._predicates = np.zeros(len(self._bias), dtype=bool)
+        self._candidate_since = np.full(count, np.nan)
+        self._released_at = np.full(count, np.nan)
+        self._active = np.zeros(count, dtype=bool)
+
+    def features(self, points: np.ndarray) -> np.ndarray:
+        """Compute every feature the rules use from ``(N, 3)`` landmarks."""
+        values = np.empty(self._feature_count)
+        if len(self._coord_columns):
+            values[self._coord_columns] = points[self._coord_index[:, 0], self._coord_index[:, 1]]
+        if len(self._distance_columns):
+            a, b = self._distance_index.T
+            values[self._distance_columns] = np.linalg.norm(points[a, :2] - points[b, :2], axis=1)
+        if len(self._angle_columns):
+            a, b, c = self._angle_index.T
+            first = points[a, :2] - points[b, :2]
+            second = points[c, :2] - points[b, :2]
+            cosine = np.einsum("kd,kd->k", first, second) / np.maximum(
+                np.linalg.norm(first, axis=1) * np.linalg.norm(second, axis=1), 1e-9
+            )
+            values[self._angle_columns] = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+        return values
+
+    def active(self, points: np.ndarray, timestamp_s: float) -> np.ndarray:
+        """Update the rule states with one frame; returns the active mask."""
+        margins = self._weights @ self.features(points) + self._bias
+        with np.errstate(invalid="ignore"):
+            if self._temporal:
+                threshold = np.where(self._predicates, -self._hysteresis, self._hysteresis)
+                predicates = margins > threshold
+            else:
+                predicates = margins > 0.0
+        self._predicates = predicates
+
+        failed = self._all @ ~predicates
+        matched = self._any @ predicates
+        candidate = (failed == 0) & ((matched > 0) | ~self._has_any)
+        if not self._temporal:
+            self._active = candidate
+            return candidate
+
+        now = timestamp_s
+        since = np.where(candidate, np.where(np.isnan(self._candidate_since), now, self._candidate_since), np.nan)
+        released = np.where(candidate, np.nan, np.where(np.isnan(self._released_at), now, self._released_at))
+        held = candidate & ((now - since >= self._hold) | self._active)
+        lingering = ~candidate & self._active & (now - released < self._release)
+        self._candidate_since, self._released_at = since, released
+        self._active = held | lingering
+        return self._active
+
+    def evaluate(self, points: np.ndarray, timestamp_s: float) -> str:
+        """Return the first active gesture in file order, or the default."""
+        active = np.flatnonzero(self.active(points, timestamp_s))
+        return self.names[active[0]] if len(active) else self.default
@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Dict, Optional, Sequence
 
 import cv2
 import mediapipe as mp
 
+from quality_governor import scale_frame
+
 
 @dataclass
 class BodyPoseResult:
@@ -18,26 +20,65 @@ class BodyPoseResult:
 
 
 class BodyPoseEstimator:
-    """Thin wrapper around MediaPipe Pose."""
+    """Thin wrapper around MediaPipe Pose.
+
+    Frames are downscaled by ``input_scale`` before inference; landmarks
+    are normalized, so they are unaffected. ``model_complexities`` builds
+    extra graphs up front so ``set_model_complexity`` can switch between
+    them without loading a model. Use ``static_image_mode`` for unrelated
+    images, where tracking from the previous frame does not apply.
+    """
 
     def __init__(
         self,
         min_detection_confidence: float = 0.5,
         min_tracking_confidence: float = 0.5,
         model_complexity: int = 1,
+        input_scale: float = 1.0,
+        model_complexities: Optional[Sequence[int]] = None,
+        static_image_mode: bool = False,
     ) -> None:
-        self._pose = mp.solutions.pose.Pose(
-            min_detection_confidence=min_detection_confidence,
-            min_tracking_confidence=min_tracking_confidence,
-            model_complexity=model_complexity,
-        )
+        self._options = {
+            "static_image_mode": static_image_mode,
+            "min_detection_confidence": min_detection_confidence,
+            "min_tracking_confidence": min_tracking_confidence,
+        }
+        self._graphs: Dict[int, Any] = {}
+        self.input_scale = input_scale
+        self.prepare(model_complexities or ())
+        self.set_model_complexity(model_complexity)
+
+    def prepare(self, model_complexities: Sequence[int]) -> None:
+        """Build (but do not switch to) a graph for each complexity."""
+        for complexity in model_complexities:
+            self._graph(complexity)
+
+    def _graph(self, complexity: int):
+        graph = self._graphs.get(complexity)
+        if graph is None:
+            graph = self._graphs[complexity] = mp.solutions.pose.Pose(
+                model_complexity=complexity, **self._options
+            )
+        return graph
+
+    def set_model_complexity(self, complexity: int) -> None:
+        self._pose = self._graph(complexity)
+        self.model_complexity = complexity
+
+    def warm_up(self, frame) -> None:
+        """Run every prepared graph once, then return to the current one."""
+        current = self.model_complexity
+        for complexity in list(self._graphs):
+            self.set_model_complexity(complexity)
+            self.get_body_pose(frame)
+        self.set_model_complexity(current)
 
     def get_body_pose(self, frame):  # -> BodyPoseResult:
         """Estimate body pose for the provided BGR frame."""
         if frame is None:
             return BodyPoseResult(None, None)
 
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image_rgb = cv2.cvtColor(scale_frame(frame, self.input_scale), cv2.COLOR_BGR2RGB)
         image_rgb.flags.writeable = False
         results = self._pose.process(image_rgb)
         return BodyPoseResult(
@@ -46,9 +87,10 @@ class BodyPoseEstimator:
         )
 
     def close(self) -> None:
-        if getattr(self, "_pose", None) is not None:
-            self._pose.close()
-            self._pose = None
+        for graph in getattr(self, "_graphs", {}).values():
+            graph.close()
+        self._graphs = {}
+        self._pose = None
 
     def __del__(self) -> None:
         self.close()
@@ -0,0 +1,114 @@
+"""Command-line client for the backend service control channel."""
+
+from __future__ import annotations
+
+import json
+import socket
+from typing import Any, Dict, Optional
+
+from backend_service import DEFAULT_CONTROL_PORT
+
+
+class ControlClient:
+    """Sends JSON commands to a running backend service."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_CONTROL_PORT,
+        timeout: float = 10.0,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._socket: Optional[socket.socket] = None
+        self._reader = None
+
+    def request(self, command: str, **arguments: Any) -> Dict[str, Any]:
+        """Send one command and return the decoded reply."""
+        if self._socket is None:
+            self._socket = socket.create_connection(
+                (self._host, self._port), timeout=self._timeout
+            )
+            self._reader = self._socket.makefile("rb")
+        message = dict(arguments, command=command)
+        self._socket.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        line = self._reader.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("Backend service closed the control channel")
+        return json.loads(line.decode("utf-8"))
+
+    def start(self) -> Dict[str, Any]:
+        return self.request("start")
+
+    def stop(self) -> Dict[str, Any]:
+        return self.request("stop")
+
+    def switch(self, config: Any) -> Dict[str, Any]:
+        return self.request("switch", config=config)
+
+    def health(self) -> Dict[str, Any]:
+        return self.request("health")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request("stats")
+
+    def profile(self, action: str = "report", **arguments: Any) -> Dict[str, Any]:
+        return self.request("profile", action=action, **arguments)
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self.request("shutdown")
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+    def __enter__(self) -> "ControlClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Control a running pose backend.")
+    parser.add_argument(
+        "command",
+        choices=["start", "stop", "switch", "health", "stats", "profile", "shutdown"],
+    )
+    parser.add_argument(
+        "argument",
+        nargs="?",
+        help="Preset or file for 'switch'; start, stop, report or capture for 'profile'.",
+    )
+    parser.add_argument("--seconds", type=float, help="Length of a profile capture.")
+    parser.add_argument("--mode", choices=["sample", "cprofile"], help="Profile capture mode.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_CONTROL_PORT)
+    args = parser.parse_args()
+
+    arguments: Dict[str, Any] = {}
+    if args.command == "switch":
+        arguments["config"] = args.argument
+    elif args.command == "profile":
+        arguments["action"] = args.argument or "report"
+        if args.seconds is not None:
+            arguments["seconds"] = args.seconds
+        if args.mode is not None:
+            arguments["mode"] = args.mode
+    with ControlClient(args.host, args.port) as client:
+        print(json.dumps(client.request(args.command, **arguments), indent=2))
+
+
+if __name__ == "__main__":
+    main()
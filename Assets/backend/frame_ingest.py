@@ -0,0 +1,610 @@
+"""Frames pushed by other processes instead of read from a local camera.
+
+A Unity render texture, a capture service or a video decoder can feed
+the pipeline through the ``ingest`` source. There are two ways in:
+
+- Shared-memory rings. The producer creates a ring with
+  ``FrameRingWriter`` (or writes the same layout itself) and the source
+  attaches to it by name.
+- A socket. Producers connect to ``listen_port`` and send each frame as a
+  header followed by its pixels (``FrameSocketWriter``).
+
+Every frame starts with ``FRAME_HEADER``, little-endian:
+
+    magic "PFRM", header version (u8), layout (u8, index into LAYOUTS),
+    producer id (u16), width (u32), height (u32), pixel bytes (u32),
+    sequence (i64), producer timestamp in ns (i64)
+
+The pixels follow as tightly packed rows. ``bgr8`` frames reach the
+estimators as NumPy views of the ring slot or of the socket receive
+buffer, with no copy. Other layouts are converted to BGR once.
+
+Any number of rings and socket connections can feed one source. Each
+producer keeps only its newest frame, and the source takes frames from
+the producers in turn. The pipeline thus runs at its own rate however
+fast the producers push, and no producer can starve the others. A frame
+handed out stays valid until the next ``get_frame`` call.
+
+Ring layout, after a 64-byte block of ``RING_HEADER`` (magic "PRNG",
+version, slot count, slot bytes, latest slot, held slot): ``slots`` slots
+of ``slot_stride(slot_bytes)`` bytes. A slot is an i64 generation, the
+frame header at offset 8 and the pixels at offset 64. The writer sets
+the generation to -1 while it writes and to the frame's sequence number
+(from 1) when done, then points ``latest`` at the slot; -2 in ``latest``
+means the writer closed the ring. The reader claims a slot by writing it
+to ``held``, and the writer never starts on the held slot.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import selectors
+import socket
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Set, Tuple
+
+import cv2
+import numpy as np
+
+FRAME_MAGIC = b"PFRM"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<4sBBHIIIqq")
+
+RING_MAGIC = b"PRNG"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<4sHHIIqq")
+RING_BLOCK = 64
+SLOT_HEADER_BYTES = 64
+_LATEST_OFFSET = 16
+_HELD_OFFSET = 24
+RING_CLOSED = -2
+_INT64 = struct.Struct("<q")
+
+# Pixel layouts: channels and the conversion to the BGR the estimators take.
+LAYOUTS = ("bgr8", "rgb8", "bgra8", "rgba8", "gray8")
+_CHANNELS = (3, 3, 4, 4, 1)
+_TO_BGR = (None, cv2.COLOR_RGB2BGR, cv2.COLOR_BGRA2BGR, cv2.COLOR_RGBA2BGR, cv2.COLOR_GRAY2BGR)
+
+# How often a source polls its rings, and retries attaching a missing one.
+RING_POLL_S = 0.001
+ATTACH_RETRY_S = 0.5
+
+
+class FrameFormatError(ValueError):
+    """Raised for a frame header or frame that does not fit the protocol."""
+
+
+@dataclass
+class FrameHeader:
+    layout: str
+    width: int
+    height: int
+    producer: int = 0
+    sequence: int = 0
+    timestamp_ns: int = 0
+
+    @property
+    def channels(self) -> int:
+        return _CHANNELS[LAYOUTS.index(self.layout)]
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.width * self.height * self.channels
+
+    def pack(self) -> bytes:
+        return FRAME_HEADER.pack(
+            FRAME_MAGIC,
+            FRAME_VERSION,
+            LAYOUTS.index(self.layout),
+            self.producer,
+            self.width,
+            self.height,
+            self.frame_bytes,
+            self.sequence,
+            self.timestamp_ns,
+        )
+
+    @classmethod
+    def unpack(cls, data, offset: int = 0) -> "FrameHeader":
+        magic, version, layout, producer, width, height, size, sequence, timestamp_ns = (
+            FRAME_HEADER.unpack_from(data, offset)
+        )
+        if magic != FRAME_MAGIC or version != FRAME_VERSION:
+            raise FrameFormatError(f"Not a version {FRAME_VERSION} frame header")
+        if layout >= len(LAYOUTS):
+            raise FrameFormatError(f"Unknown pixel layout {layout}")
+        header = cls(LAYOUTS[layout], width, height, producer, sequence, timestamp_ns)
+        if not width or not height or size != header.frame_bytes:
+            raise FrameFormatError(
+                f"{size} pixel bytes do not fit a {width}x{height} {header.layout} frame"
+            )
+        return header
+
+    @classmethod
+    def describe(cls, frame: np.ndarray, layout: str, **fields) -> "FrameHeader":
+        """The header for sending ``frame`` as ``layout``."""
+        if layout not in LAYOUTS:
+            raise FrameFormatError(f"Unknown pixel layout '{layout}'; expected one of {', '.join(LAYOUTS)}")
+        header = cls(layout, frame.shape[1], frame.shape[0], **fields)
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        if frame.dtype != np.uint8 or channels != header.channels:
+            raise FrameFormatError(f"A {frame.dtype} frame of shape {frame.shape} is not {layout}")
+        return header
+
+
+def as_bgr(header: FrameHeader, buffer, offset: int = 0) -> np.ndarray:
+    """The frame in ``buffer`` as a BGR image; a view when it already is one."""
+    pixels = np.frombuffer(buffer, np.uint8, header.frame_bytes, offset)
+    if header.channels == 1:
+        image = pixels.reshape(header.height, header.width)
+    else:
+        image = pixels.reshape(header.height, header.width, header.channels)
+    code = _TO_BGR[LAYOUTS.index(header.layout)]
+    return image if code is None else cv2.cvtColor(image, code)
+
+
+def slot_stride(slot_bytes: int) -> int:
+    return SLOT_HEADER_BYTES + -(-slot_bytes // 64) * 64
+
+
+class _Mapping:
+    """An attached ring that stays mapped while any frame still views it.
+
+    Arrays made from it keep it alive, so the memory is closed only after
+    the pipeline dropped the last frame in it.
+    """
+
+    def __init__(self, name: str) -> None:
+        if sys.version_info >= (3, 13):
+            self.memory = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            if os.name == "posix" and name not in _OWN_RINGS:
+                # Before 3.13 the resource tracker unlinks attached segments
+                # when this process exits, pulling the ring from its writer.
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister(self.memory._name, "shared_memory")
+        # The array interface takes the address, not a buffer export, so
+        # the memory can be closed in __del__.
+        pointer = ctypes.c_char.from_buffer(self.memory.buf)
+        self.__array_interface__ = {
+            "data": (ctypes.addressof(pointer), False),
+            "shape": (self.memory.size,),
+            "typestr": "|u1",
+            "version": 3,
+        }
+        del pointer
+
+    def __del__(self) -> None:
+        if hasattr(self, "memory"):
+            self.memory.close()
+
+
+# Rings written by this process, whose resource tracker entry must stay.
+_OWN_RINGS: Set[str] = set()
+
+
+# --- Producers --------------------------------------------------------------
+
+
+class FrameRingWriter:
+    """Publishes frames into a shared-memory ring that sources attach to by name.
+
+    ``slot_bytes`` is the largest frame the ring takes, e.g.
+    ``1920 * 1080 * 3``. Writes never wait for the reader.
+    """
+
+    def __init__(self, name: str, slot_bytes: int, slots: int = 3, producer: int = 0) -> None:
+        if slots < 3:
+            raise ValueError("A ring needs at least 3 slots")
+        self.name = name
+        self.producer = producer
+        self._slots = slots
+        self._slot_bytes = slot_bytes
+        self._stride = slot_stride(slot_bytes)
+        size = RING_BLOCK + slots * self._stride
+        try:
+            self._memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a writer that did not close its ring.
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _OWN_RINGS.add(name)
+        RING_HEADER.pack_into(self._memory.buf, 0, RING_MAGIC, RING_VERSION, 0, slots, slot_bytes, -1, -1)
+        self._next = 0
+        self.sequence = 0
+
+    def write(self, frame: np.ndarray, layout: str = "bgr8", timestamp_ns: Optional[int] = None) -> int:
+        """Copy ``frame`` into the next free slot and publish it; returns its sequence."""
+        header = FrameHeader.describe(
+            frame,
+            layout,
+            producer=self.producer,
+            sequence=self.sequence + 1,
+            timestamp_ns=time.monotonic_ns() if timestamp_ns is None else timestamp_ns,
+        )
+        if header.frame_bytes > self._slot_bytes:
+            raise FrameFormatError(
+                f"A {header.frame_bytes}-byte frame does not fit {self._slot_bytes}-byte slots"
+            )
+        buffer = self._memory.buf
+        slot = self._next
+        while True:
+            base = RING_BLOCK + slot * self._stride
+            generation = _INT64.unpack_from(buffer, base)[0]
+            # Mark the slot before looking at the reader's claim; the reader
+            # claims before checking the mark. A frame overwritten in a race
+            # is still caught, and counted, when the reader releases it.
+            _INT64.pack_into(buffer, base, -1)
+            if _INT64.unpack_from(buffer, _HELD_OFFSET)[0] != slot:
+                break
+            _INT64.pack_into(buffer, base, generation)
+            slot = (slot + 1) % self._slots
+        buffer[base + 8 : base + 8 + FRAME_HEADER.size] = header.pack()
+        destination = np.frombuffer(buffer, np.uint8, header.frame_bytes, base + SLOT_HEADER_BYTES)
+        destination[:] = np.ascontiguousarray(frame).reshape(-1)
+        del destination
+        self.sequence = header.sequence
+        _INT64.pack_into(buffer, base, self.sequence)
+        _INT64.pack_into(buffer, _LATEST_OFFSET, slot)
+        self._next = (slot + 1) % self._slots
+        return self.sequence
+
+    def close(self) -> None:
+        if getattr(self, "_memory", None) is None:
+            return
+        _INT64.pack_into(self._memory.buf, _LATEST_OFFSET, RING_CLOSED)
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+        _OWN_RINGS.discard(self.name)
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class FrameSocketWriter:
+    """Sends frames to an ``ingest`` source's ``listen_port``."""
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 25003, producer: int = 0, timeout: float = 2.0
+    ) -> None:
+        self.producer = producer
+        self.sequence = 0
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def write(self, frame: np.ndarray, layout: str = "bgr8", timestamp_ns: Optional[int] = None) -> int:
+        """Send ``frame``; blocks while the source is behind. Returns its sequence."""
+        header = FrameHeader.describe(
+            frame,
+            layout,
+            producer=self.producer,
+            sequence=self.sequence + 1,
+            timestamp_ns=time.monotonic_ns() if timestamp_ns is None else timestamp_ns,
+        )
+        self._socket.sendall(header.pack())
+        self._socket.sendall(memoryview(np.ascontiguousarray(frame)).cast("B"))
+        self.sequence = header.sequence
+        return self.sequence
+
+    def close(self) -> None:
+        if getattr(self, "_socket", None) is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __del__(self) -> None:
+        self.close()
+
+
+# --- Source -----------------------------------------------------------------
+
+
+class _RingInput:
+    """The reading side of one shared-memory ring."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.ring: Optional[np.ndarray] = None  # the whole mapping, as bytes
+        self._slots = 0
+        self._stride = 0
+        self._generation = 0  # newest sequence taken
+        self._held: Optional[Tuple[int, int]] = None  # (slot, generation)
+        self._next_attach = 0.0
+        self.skipped = 0
+        self.torn = 0
+
+    def _attach(self, now: float) -> bool:
+        if self.ring is not None:
+            return True
+        if now < self._next_attach:
+            return False
+        self._next_attach = now + ATTACH_RETRY_S
+        try:
+            ring = np.asarray(_Mapping(self.name))
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            return False  # created but not sized yet; cannot be mapped
+        magic, version, _, slots, slot_bytes, latest, _ = RING_HEADER.unpack_from(ring, 0)
+        if magic != RING_MAGIC:
+            return False  # not written yet, or not a ring; try again later
+        if version != RING_VERSION:
+            raise FrameFormatError(f"Frame ring '{self.name}' has version {version}, not {RING_VERSION}")
+        self.ring, self._slots, self._stride = ring, slots, slot_stride(slot_bytes)
+        # Frames written before we came are not counted as skipped.
+        self._generation = max(0, self._int(RING_BLOCK + latest * self._stride) - 1) if latest >= 0 else 0
+        print(f"[ingest] attached to frame ring '{self.name}'")
+        return True
+
+    def _int(self, offset: int) -> int:
+        return _INT64.unpack_from(self.ring, offset)[0]
+
+    def ready(self, now: float) -> bool:
+        if not self._attach(now):
+            return False
+        latest = self._int(_LATEST_OFFSET)
+        if latest == RING_CLOSED:
+            print(f"[ingest] frame ring '{self.name}' closed by its writer")
+            self.close()
+            return False
+        return latest >= 0 and self._int(RING_BLOCK + latest * self._stride) > self._generation
+
+    def take(self) -> Optional[Tuple[FrameHeader, np.ndarray]]:
+        ring = self.ring
+        slot = self._int(_LATEST_OFFSET)
+        base = RING_BLOCK + slot * self._stride
+        generation = self._int(base)
+        _INT64.pack_into(ring, _HELD_OFFSET, slot)
+        if generation <= self._generation or self._int(base) != generation:
+            # The writer got to the slot first; try again on the next poll.
+            _INT64.pack_into(ring, _HELD_OFFSET, -1)
+            return None
+        self.skipped += generation - self._generation - 1
+        self._generation = generation
+        self._held = (slot, generation)
+        header = FrameHeader.unpack(ring, base + 8)
+        return header, as_bgr(header, ring, base + SLOT_HEADER_BYTES)
+
+    def release(self) -> None:
+        if self._held is None or self.ring is None:
+            self._held = None
+            return
+        slot, generation = self._held
+        self._held = None
+        if self._int(RING_BLOCK + slot * self._stride) != generation:
+            self.torn += 1  # overwritten while in use
+        _INT64.pack_into(self.ring, _HELD_OFFSET, -1)
+
+    def close(self) -> None:
+        self.release()
+        self.ring = None  # unmapped once no frame views it
+
+
+class _SocketInput:
+    """One producer connection: a header, then the pixels into a buffer pool.
+
+    Three buffers are enough: the frame handed out, the newest complete
+    frame and the one being received.
+    """
+
+    def __init__(self, sock: socket.socket, address) -> None:
+        self.sock = sock
+        self.name = "%s:%s" % address[:2]
+        self._header = bytearray(FRAME_HEADER.size)
+        self._header_got = 0
+        self._receiving: Optional[FrameHeader] = None
+        self._pool = [bytearray() for _ in range(3)]
+        self._into = 0
+        self._got = 0
+        self._latest: Optional[Tuple[FrameHeader, int]] = None
+        self._in_use: Optional[int] = None
+        self.skipped = 0
+
+    def read(self) -> bool:
+        """Receive what has arrived; False once the producer is gone."""
+        while True:
+            try:
+                if self._receiving is None:
+                    view = memoryview(self._header)[self._header_got :]
+                else:
+                    view = memoryview(self._pool[self._into])[self._got : self._receiving.frame_bytes]
+                count = self.sock.recv_into(view)
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError:
+                return False
+            if not count:
+                return False
+            if self._receiving is None:
+                self._header_got += count
+                if self._header_got == len(self._header):
+                    self._header_got = 0
+                    self._receiving = FrameHeader.unpack(self._header)
+                    if len(self._pool[self._into]) < self._receiving.frame_bytes:
+                        self._pool[self._into] = bytearray(self._receiving.frame_bytes)
+                continue
+            self._got += count
+            if self._got == self._receiving.frame_bytes:
+                self._complete()
+
+    def _complete(self) -> None:
+        if self._latest is not None:
+            self.skipped += 1
+        self._latest = (self._receiving, self._into)
+        self._receiving = None
+        self._got = 0
+        self._into = next(
+            index for index in range(len(self._pool)) if index not in (self._in_use, self._into)
+        )
+
+    def ready(self, now: float) -> bool:
+        return self._latest is not None
+
+    def take(self) -> Optional[Tuple[FrameHeader, np.ndarray]]:
+        header, index = self._latest
+        self._latest = None
+        self._in_use = index
+        return header, as_bgr(header, self._pool[index])
+
+    def release(self) -> None:
+        self._in_use = None
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class FrameIngest:
+    """Source of frames pushed by other processes; see the module docs.
+
+    ``rings`` are the names of shared-memory rings to read; with
+    ``listen_port`` producers may also connect on ``listen_host``.
+    ``get_frame`` waits up to ``wait_s`` for a frame and returns None if
+    none came, which the pipeline counts as a dropped read.
+    """
+
+    def __init__(
+        self,
+        rings: Sequence[str] = (),
+        listen_host: str = "127.0.0.1",
+        listen_port: Optional[int] = None,
+        wait_s: float = 0.5,
+    ) -> None:
+        if not rings and listen_port is None:
+            raise ValueError("Frame ingestion needs rings or a listen_port")
+        self.wait_s = wait_s
+        self._rings = [_RingInput(name) for name in rings]
+        self._connections: List[_SocketInput] = []
+        self._turn = 0
+        self._selector = selectors.DefaultSelector()
+        self._released = False
+        self._server: Optional[socket.socket] = None
+        if listen_port is not None:
+            self._server = socket.create_server((listen_host, int(listen_port)))
+            self._server.setblocking(False)
+            self._selector.register(self._server, selectors.EVENT_READ)
+        self.last_header: Optional[FrameHeader] = None
+        # Running totals, read by the pipeline metrics.
+        self.frames_ingested = 0
+        self._closed_skipped = 0
+        self._closed_torn = 0
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        return None if self._server is None else self._server.getsockname()[:2]
+
+    @property
+    def producer_count(self) -> int:
+        return len(self._connections) + sum(ring.ring is not None for ring in self._rings)
+
+    @property
+    def frames_skipped(self) -> int:
+        """Frames replaced by a newer one from the same producer before being read."""
+        inputs = self._rings + self._connections
+        return self._closed_skipped + sum(source.skipped for source in inputs)
+
+    @property
+    def frames_torn(self) -> int:
+        """Ring frames the writer overwrote while the pipeline used them."""
+        return self._closed_torn + sum(ring.torn for ring in self._rings)
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """The next producer's newest frame, or None after ``wait_s`` without one."""
+        inputs = self._rings + self._connections
+        for source in inputs:
+            source.release()  # the pipeline is done with the previous frame
+        deadline = time.monotonic() + self.wait_s
+        while True:
+            now = time.monotonic()
+            taken = self._take_next(now)
+            if taken is not None:
+                self.last_header, frame = taken
+                self.frames_ingested += 1
+                return frame
+            if now >= deadline:
+                self.last_header = None
+                return None
+            timeout = deadline - now
+            if self._rings:
+                timeout = min(timeout, RING_POLL_S)
+            self._pump(timeout)
+
+    def _take_next(self, now: float) -> Optional[Tuple[FrameHeader, np.ndarray]]:
+        self._pump(0.0)
+        inputs = self._rings + self._connections
+        for step in range(len(inputs)):
+            index = (self._turn + step) % len(inputs)
+            source = inputs[index]
+            if not source.ready(now):
+                continue
+            taken = source.take()
+            if taken is not None:
+                self._turn = index + 1
+                return taken
+        return None
+
+    def _pump(self, timeout: float) -> None:
+        if not self._selector.get_map():
+            if timeout > 0:
+                time.sleep(timeout)
+            return
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self._server:
+                self._accept()
+            else:
+                self._read(key.data)
+
+    def _accept(self) -> None:
+        try:
+            sock, address = self._server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        connection = _SocketInput(sock, address)
+        self._connections.append(connection)
+        self._selector.register(sock, selectors.EVENT_READ, connection)
+        print(f"[ingest] frame producer connected from {connection.name}")
+
+    def _read(self, connection: _SocketInput) -> None:
+        try:
+            if connection.read():
+                return
+        except FrameFormatError as exc:
+            print(f"[ingest] frame producer {connection.name} sent a bad header: {exc}")
+        self._drop(connection)
+
+    def _drop(self, connection: _SocketInput) -> None:
+        self._selector.unregister(connection.sock)
+        connection.close()
+        self._connections.remove(connection)
+        self._closed_skipped += connection.skipped
+        print(f"[ingest] frame producer {connection.name} disconnected")
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        for connection in list(self._connections):
+            self._drop(connection)
+        for ring in self._rings:
+            self._closed_skipped += ring.skipped
+            self._closed_torn += ring.torn
+            ring.skipped = ring.torn = 0
+            ring.close()
+        if self._server is not None:
+            self._selector.unregister(self._server)
+            self._server.close()
+            self._server = None
+        self._selector.close()
+
+    def __del__(self) -> None:
+        if hasattr(self, "_released"):
+            self.release()
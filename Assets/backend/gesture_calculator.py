@@ -2,61 +2,85 @@
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from body_gesture_rules import DEFAULT_RULES_PATH, GestureRuleEngine
+from landmark_arrays import LandmarkGate, landmark_confidence, landmarks_to_array
 
 
 @dataclass
 class PoseMetrics:
     body_landmark_count: int
     hand_landmark_count: int
+    body_visible_count: int = 0
 
 
 class PoseCalculator:
-    """Computes simple metrics extracted from body and hand landmarks."""
+    """Computes simple metrics extracted from body and hand landmarks.
+
+    ``body_visible_count`` counts the body landmarks whose visibility is at
+    least ``min_visibility``.
+    """
+
+    def __init__(self, min_visibility: float = 0.5) -> None:
+        self.min_visibility = min_visibility
 
     def compute(self, body_result, hand_result) -> PoseMetrics:
         body_count = 0
+        visible_count = 0
         if body_result and body_result.landmarks:
             body_count = len(body_result.landmarks.landmark)
+            confidence = landmark_confidence(body_result.landmarks)
+            visible_count = int(np.count_nonzero(confidence >= self.min_visibility))
 
         hand_count = 0
         if hand_result and hand_result.normalized:
             hand_count = sum(len(hand.landmark) for hand in hand_result.normalized)
 
-        return PoseMetrics(body_landmark_count=body_count, hand_landmark_count=hand_count)
+        return PoseMetrics(
+            body_landmark_count=body_count,
+            hand_landmark_count=hand_count,
+            body_visible_count=visible_count,
+        )
 
 
 class BodyGestureRecognizer:
-    """Derives a simple body gesture label from pose landmarks."""
-
-    # MediaPipe pose landmark indices of interest
-    LEFT_WRIST = 15
-    RIGHT_WRIST = 16
-    LEFT_SHOULDER = 11
-    RIGHT_SHOULDER = 12
-
-    def get_body_gesture(self, body_result) -> str:
+    """Derives a body gesture label from pose landmarks.
+
+    Gestures come from a rule file (see ``body_gesture_rules``); the default
+    file defines ``both_hands_up``, ``left_hand_up`` and ``right_hand_up``.
+    Pass ``temporal=False`` to judge each call on its own, e.g. for images.
+    Landmarks below ``min_visibility`` hold their last good position for
+    ``hold_s`` seconds; after that, predicates that use them are false.
+    """
+
+    def __init__(
+        self,
+        rules_path: Optional[str] = None,
+        temporal: bool = True,
+        min_visibility: float = 0.5,
+        hold_s: float = 0.25,
+    ) -> None:
+        self._engine = GestureRuleEngine.from_file(
+            rules_path or DEFAULT_RULES_PATH, temporal=temporal
+        )
+        self._gate = LandmarkGate(min_visibility, hold_s if temporal else 0.0)
+
+    def get_body_gesture(self, body_result, timestamp_s: Optional[float] = None) -> str:
         if not body_result or not body_result.landmarks:
             return "no_body_detected"
 
-        landmarks = body_result.landmarks.landmark
-        try:
-            left_wrist = landmarks[self.LEFT_WRIST]
-            right_wrist = landmarks[self.RIGHT_WRIST]
-            left_shoulder = landmarks[self.LEFT_SHOULDER]
-            right_shoulder = landmarks[self.RIGHT_SHOULDER]
-        except IndexError:
+        points = landmarks_to_array(body_result.landmarks, dtype=np.float64)
+        if len(points) < self._engine.required_landmarks:
             return "insufficient_landmarks"
 
-        left_hand_up = left_wrist.y < left_shoulder.y
-        right_hand_up = right_wrist.y < right_shoulder.y
-
-        if left_hand_up and right_hand_up:
-            return "both_hands_up"
-        if left_hand_up:
-            return "left_hand_up"
-        if right_hand_up:
-            return "right_hand_up"
-
-        return "neutral"
-
+        if timestamp_s is None:
+            timestamp_s = time.monotonic()
+        points, _ = self._gate.update(
+            points, landmark_confidence(body_result.landmarks), timestamp_s
+        )
+        return self._engine.evaluate(points, timestamp_s)
@@ -0,0 +1,266 @@
+"""Record hand landmark sessions and train the gesture recognizers.
+
+    python gesture_training.py record --label thumb_up --output sessions/thumb_up.jsonl
+    python gesture_training.py train sessions/*.jsonl --output models/hand_gestures.npz
+    python gesture_training.py sequence --name wave_right --seconds 2
+
+Recording only stores landmarks and the frame's aspect ratio, one JSON
+object per detected hand, so sessions are small and can be re-used when
+the feature set changes.
+``sequence`` records one movement and adds it to the sequence templates.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from landmark_gesture_classifier import (
+    DEFAULT_MODEL_PATH,
+    LandmarkGestureClassifier,
+    hand_features,
+    load_sessions,
+    train_templates,
+)
+from landmark_arrays import landmarks_to_array
+from sequence_recognizer import (
+    DEFAULT_LIBRARY_PATH,
+    builtin_sequences,
+    load_templates,
+    save_templates,
+    sequence_features,
+    template_from_recording,
+)
+
+
+def record_session(
+    label: str,
+    output_path: str,
+    frames: int = 300,
+    camera_index: int = 0,
+    show_window: bool = True,
+) -> int:
+    """Append landmarks of every detected hand to ``output_path``.
+
+    Returns the number of samples written.
+    """
+    import cv2
+
+    from frame_provider import FrameProvider
+    from hand_pose_estimator import HandPoseEstimator
+
+    provider = FrameProvider(camera_index=camera_index)
+    estimator = HandPoseEstimator()
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    written = 0
+    try:
+        with open(output_path, "a", encoding="utf-8") as handle:
+            for _ in range(frames):
+                frame = provider.get_frame()
+                if frame is None:
+                    continue
+                result = estimator.get_hand_pose(frame)
+                aspect = round(frame.shape[1] / float(frame.shape[0]), 5)
+                for idx, hand in enumerate(result.normalized or []):
+                    handedness = (result.handedness or [])[idx : idx + 1] or [f"hand{idx}"]
+                    sample = {
+                        "label": label,
+                        "handedness": handedness[0],
+                        "landmarks": landmarks_to_array(hand).round(5).tolist(),
+                        "aspect": aspect,
+                    }
+                    handle.write(json.dumps(sample) + "\n")
+                    written += 1
+                if show_window:
+                    cv2.putText(
+                        frame, f"{label}: {written}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2,
+                    )
+                    cv2.imshow("Gesture recording", frame)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        break
+    finally:
+        estimator.close()
+        provider.release()
+        if show_window:
+            cv2.destroyAllWindows()
+    return written
+
+
+def train(
+    session_paths: Sequence[str],
+    output_path: str = DEFAULT_MODEL_PATH,
+    templates_per_label: int = 8,
+    holdout: float = 0.2,
+    seed: int = 0,
+) -> float:
+    """Train templates from sessions, report held-out accuracy and save.
+
+    The saved model is trained on all samples; the held-out split is only
+    used for the accuracy report. Returns the held-out accuracy.
+    """
+    landmarks, handedness, labels, aspects = load_sessions(session_paths)
+    if not labels:
+        raise ValueError("No samples found in the given sessions")
+    mirror = np.array([hand == "left" for hand in handedness])
+    features = hand_features(landmarks, mirror, aspects)
+    label_array = np.array(labels)
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(labels))
+    split = int(len(order) * (1.0 - holdout))
+    train_rows, test_rows = order[:split], order[split:]
+
+    accuracy = float("nan")
+    if len(test_rows) and holdout > 0:
+        model = train_templates(
+            features[train_rows], label_array[train_rows].tolist(), templates_per_label, seed=seed
+        )
+        classifier = LandmarkGestureClassifier(templates=model)
+        start = time.perf_counter()
+        predicted = [
+            result.gesture
+            for result in classifier.classify_arrays(
+                [handedness[row] for row in test_rows],
+                list(landmarks[test_rows]),
+                aspect=aspects[test_rows],
+            )
+        ]
+        elapsed_us = (time.perf_counter() - start) * 1e6 / len(test_rows)
+        accuracy = float(np.mean(np.array(predicted, dtype=object) == label_array[test_rows]))
+        for label in model.labels:
+            rows = label_array[test_rows] == label
+            if rows.any():
+                correct = np.mean(np.array(predicted, dtype=object)[rows] == label)
+                print(f"[train] {label:<16} {correct:6.1%} of {int(rows.sum())}")
+        print(f"[train] held-out accuracy {accuracy:.1%}, {elapsed_us:.1f} us per hand")
+
+    model = train_templates(features, labels, templates_per_label, seed=seed)
+    model.save(output_path)
+    print(
+        f"[train] saved {len(model.templates)} templates for {len(model.labels)} "
+        f"gestures to {output_path}"
+    )
+    return accuracy
+
+
+def record_sequence(
+    name: str,
+    library_path: str = DEFAULT_LIBRARY_PATH,
+    seconds: float = 2.0,
+    countdown: float = 3.0,
+    length: int = 24,
+    tolerance: float = 0.35,
+    camera_index: int = 0,
+) -> int:
+    """Record one movement and store it as sequence template ``name``.
+
+    A template with the same name is replaced. A new library starts from
+    the built-in templates. Returns the number of frames recorded.
+    """
+    import cv2
+
+    from body_pose_estimator import BodyPoseEstimator
+    from frame_provider import FrameProvider
+    from hand_pose_estimator import HandPoseEstimator
+
+    provider = FrameProvider(camera_index=camera_index)
+    body_estimator = BodyPoseEstimator()
+    hand_estimator = HandPoseEstimator()
+    features: List[np.ndarray] = []
+    try:
+        started = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= countdown + seconds:
+                break
+            frame = provider.get_frame()
+            if frame is None:
+                continue
+            recording = elapsed >= countdown
+            if recording:
+                body = body_estimator.get_body_pose(frame)
+                hands_result = hand_estimator.get_hand_pose(frame)
+                hands = {
+                    label: landmarks_to_array(hand)
+                    for label, hand in zip(hands_result.handedness or [], hands_result.normalized or [])
+                }
+                row = sequence_features(
+                    landmarks_to_array(body.landmarks) if body.landmarks else None,
+                    hands,
+                    aspect=frame.shape[1] / float(frame.shape[0]),
+                )
+                if row is not None:
+                    features.append(row)
+            text = f"{name}: recording" if recording else f"{name}: {countdown - elapsed:.1f}"
+            cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+            cv2.imshow("Sequence recording", frame)
+            cv2.waitKey(1)
+    finally:
+        body_estimator.close()
+        hand_estimator.close()
+        provider.release()
+        cv2.destroyAllWindows()
+
+    if len(features) < 2:
+        raise RuntimeError("No body detected while recording; nothing saved")
+    templates = load_templates(library_path) if os.path.exists(library_path) else builtin_sequences()
+    templates = [template for template in templates if template.name != name]
+    templates.append(template_from_recording(name, np.array(features), length, tolerance))
+    save_templates(library_path, templates)
+    print(f"[sequence] saved '{name}' from {len(features)} frames to {library_path}")
+    return len(features)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Record landmarks for one gesture.")
+    record.add_argument("--label", required=True)
+    record.add_argument("--output", required=True)
+    record.add_argument("--frames", type=int, default=300)
+    record.add_argument("--camera", type=int, default=0)
+    record.add_argument("--no-window", action="store_true")
+
+    fit = commands.add_parser("train", help="Train templates from recorded sessions.")
+    fit.add_argument("sessions", nargs="+")
+    fit.add_argument("--output", default=DEFAULT_MODEL_PATH)
+    fit.add_argument("--templates-per-label", type=int, default=8)
+    fit.add_argument("--holdout", type=float, default=0.2)
+
+    sequence = commands.add_parser("sequence", help="Record a movement template.")
+    sequence.add_argument("--name", required=True)
+    sequence.add_argument("--library", default=DEFAULT_LIBRARY_PATH)
+    sequence.add_argument("--seconds", type=float, default=2.0)
+    sequence.add_argument("--countdown", type=float, default=3.0)
+    sequence.add_argument("--length", type=int, default=24)
+    sequence.add_argument("--tolerance", type=float, default=0.35)
+    sequence.add_argument("--camera", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "sequence":
+        record_sequence(
+            args.name, args.library, args.seconds, args.countdown,
+            args.length, args.tolerance, args.camera,
+        )
+    elif args.command == "record":
+        count = record_session(
+            args.label, args.output, args.frames, args.camera, show_window=not args.no_window
+        )
+        print(f"[record] wrote {count} samples to {args.output}")
+    else:
+        train(args.sessions, args.output, args.templates_per_label, args.holdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""Result types shared by the hand gesture recognizers."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RecognizedHandGesture:
+    handedness: str
+    gesture: Optional[str]
+    score: float
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
 from typing import List, Optional
 
 import cv2
@@ -11,19 +10,14 @@ import mediapipe as mp
 from mediapipe.tasks import python as mp_python
 from mediapipe.tasks.python import vision
 
+from gesture_types import RecognizedHandGesture  # re-exported for callers
+from quality_governor import scale_frame
 
 DEFAULT_MODEL_PATH = os.path.join(
     os.path.dirname(__file__), "models", "gesture_recognizer.task"
 )
 
 
-@dataclass
-class RecognizedHandGesture:
-    handedness: str
-    gesture: Optional[str]
-    score: float
-
-
 class HandGestureRecognizer:
     """MediaPipe gesture recognizer backed by a task model."""
 
@@ -32,7 +26,9 @@ class HandGestureRecognizer:
         model_path: Optional[str] = None,
         min_detection_confidence: float = 0.5,
         min_tracking_confidence: float = 0.5,
+        input_scale: float = 1.0,
     ) -> None:
+        self.input_scale = input_scale
         self._model_path = model_path or DEFAULT_MODEL_PATH
         if not os.path.exists(self._model_path):
             raise FileNotFoundError(
@@ -62,7 +58,7 @@ class HandGestureRecognizer:
         else:
             self._last_timestamp_ms = timestamp_ms
 
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame = cv2.cvtColor(scale_frame(frame, self.input_scale), cv2.COLOR_BGR2RGB)
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
 
         result = self._recognizer.recognize_for_video(mp_image, timestamp_ms)
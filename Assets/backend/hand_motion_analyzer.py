@@ -2,17 +2,59 @@
 
 from __future__ import annotations
 
-from collections import deque
-from dataclasses import dataclass
-from statistics import mean
-from typing import Deque, Dict, Iterable, List, Optional, Tuple
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
 
-from hand_gesture_recognizer import RecognizedHandGesture
-from hand_pose_estimator import HandPoseResult
+import numpy as np
+
+from landmark_arrays import HAND_LANDMARK_COUNT, landmarks_to_array
+from subject_state import SubjectStateStore
+
+if TYPE_CHECKING:  # avoid pulling MediaPipe in just for annotations
+    from gesture_types import RecognizedHandGesture
+    from hand_pose_estimator import HandPoseResult
 
 
 HandPosition = Tuple[float, float]
 
+# Direction codes stored in the ring buffers.
+DIRECTIONS = ("none", "right", "left", "down", "up")
+_NONE, _RIGHT, _LEFT, _DOWN, _UP = range(len(DIRECTIONS))
+
+# Hand landmark indices used by the pointing test.
+_WRIST, _INDEX_MCP, _INDEX_PIP, _INDEX_TIP = 0, 5, 6, 8
+_OTHER_TIPS = (12, 16, 20)
+
+# Landmarks whose kinematics are tracked: the wrist, then every fingertip.
+TRACKED_POINTS = ("wrist", "thumb_tip", "index_tip", "middle_tip", "ring_tip", "pinky_tip")
+TRACKED_LANDMARKS = np.array([0, 4, 8, 12, 16, 20], dtype=np.intp)
+
+
+@dataclass
+class HandMotionEvent:
+    """A discrete motion event detected from the wrist trajectory."""
+
+    kind: str  # "swipe", "flick" or "hold"
+    direction: Optional[str]
+    onset: float  # capture time (seconds) at which the motion started
+    detected_at: float
+    peak_speed: float = 0.0  # frame widths per second
+
+
+@dataclass
+class HandKinematics:
+    """Timestamp-based derivatives for the points in TRACKED_POINTS.
+
+    Image values are in pixels per second (squared); world values are in
+    metres per second (squared). Rows are NaN until enough history exists.
+    """
+
+    velocity: np.ndarray  # (6, 2)
+    acceleration: np.ndarray  # (6, 2)
+    world_velocity: np.ndarray  # (6, 3)
+    world_acceleration: np.ndarray  # (6, 3)
+
 
 @dataclass
 class HandState:
@@ -23,10 +65,29 @@ class HandState:
     direction: str
     is_pointing: bool
     gesture: Optional[str] = None
+    velocity: Optional[HandPosition] = None
+    acceleration: Optional[HandPosition] = None
+    timestamp: Optional[float] = None
+    kinematics: Optional[HandKinematics] = None
+    events: List[HandMotionEvent] = field(default_factory=list)
+    score: Optional[float] = None  # handedness score from the hand detector
 
 
 class HandMotionAnalyzer:
-    """Tracks hand motion across frames and detects pointing gestures."""
+    """Tracks hand motion across frames and detects pointing gestures.
+
+    History lives in fixed-size NumPy ring buffers, one row per tracked
+    hand, so every hand in a frame is updated and analysed in one pass.
+    The rows come from a ``SubjectStateStore``: a hand unseen for
+    ``state_ttl_s`` seconds loses its history, so it starts afresh when it
+    comes back. At most ``max_hands`` hands are tracked per frame; further
+    hands are left out of the result.
+    Velocities use the capture timestamps, not the frame count, and motion
+    events are updated incrementally from the newest samples.
+
+    Event thresholds are in frame widths per second so they do not depend
+    on the camera resolution.
+    """
 
     def __init__(
         self,
@@ -35,147 +96,353 @@ class HandMotionAnalyzer:
         movement_threshold_px: float = 8.0,
         pointing_extension_threshold: float = 0.08,
         pointing_margin: float = 0.02,
+        max_hands: int = 4,
+        swipe_speed: float = 0.8,
+        swipe_min_frames: int = 1,
+        flick_speed: float = 1.5,
+        flick_max_duration: float = 0.25,
+        hold_speed: float = 0.05,
+        hold_duration: float = 0.6,
+        state_ttl_s: Optional[float] = 1.0,
     ) -> None:
         self._history_size = history_size
         self._consistency_window = consistency_window
         self._movement_threshold_px = movement_threshold_px
         self._pointing_extension_threshold = pointing_extension_threshold
         self._pointing_margin = pointing_margin
-
-        self._position_history: Dict[str, Deque[HandPosition]] = {}
-        self._direction_history: Dict[str, Deque[str]] = {}
+        self._swipe_speed = swipe_speed
+        self._swipe_min_frames = swipe_min_frames
+        self._flick_speed = flick_speed
+        self._flick_max_duration = flick_max_duration
+        self._hold_speed = hold_speed
+        self._hold_duration = hold_duration
+
+        points = len(TRACKED_POINTS)
+        # history_size must cover the three samples the derivatives need.
+        size = max(history_size, 3)
+        self._size = size
+        self._state = state = SubjectStateStore(max_hands, state_ttl_s)
+        self._points = state.add("points", (size, points, 2))
+        self._world = state.add("world", (size, points, 3), fill=np.nan)
+        self._times = state.add("times", (size,))
+        self._directions = state.add("directions", (size,), np.int8)
+        self._heads = state.add("heads", (), np.intp, fill=-1)
+        self._counts = state.add("counts", (), np.intp)
+
+        # Incremental event state, one entry per slot.
+        self._motion_onset = state.add("motion_onset", fill=np.nan)
+        self._motion_frames = state.add("motion_frames", (), np.intp)
+        self._motion_peak = state.add("motion_peak")
+        self._motion_peak_velocity = state.add("motion_peak_velocity", (2,))
+        self._swipe_emitted = state.add("swipe_emitted", (), bool, fill=False)
+        self._still_onset = state.add("still_onset", fill=np.nan)
+        self._hold_emitted = state.add("hold_emitted", (), bool, fill=False)
+
+    def reset(self) -> None:
+        """Forget all tracked hands."""
+        self._state.reset()
+
+    def release(self, label: str) -> bool:
+        """Drop the history of one hand, e.g. when its tracker lost it."""
+        return self._state.release(label.lower())
 
     def analyze(
         self,
         frame_shape,
         hand_result: Optional[HandPoseResult],
         recognized_gestures: Optional[List[RecognizedHandGesture]] = None,
+        timestamp_s: Optional[float] = None,
     ) -> List[HandState]:
         if not hand_result or not hand_result.normalized:
             return []
 
         height, width = frame_shape[:2]
         handedness_labels = hand_result.handedness or []
+        labels = [
+            (handedness_labels[idx] if idx < len(handedness_labels) else f"hand{idx}").lower()
+            for idx in range(len(hand_result.normalized))
+        ]
+        landmarks = [landmarks_to_array(hand) for hand in hand_result.normalized]
+        world_hands = getattr(hand_result, "world", None) or []
+        world = [
+            landmarks_to_array(world_hands[idx]) if idx < len(world_hands) else None
+            for idx in range(len(landmarks))
+        ]
+        return self.analyze_arrays(
+            labels,
+            landmarks,
+            (width, height),
+            recognized_gestures=recognized_gestures,
+            world_landmarks=world,
+            timestamp_s=timestamp_s,
+            scores=getattr(hand_result, "scores", None),
+        )
+
+    def analyze_arrays(
+        self,
+        labels: Sequence[str],
+        landmarks: Sequence[np.ndarray],
+        image_size: Tuple[int, int],
+        recognized_gestures: Optional[List[RecognizedHandGesture]] = None,
+        world_landmarks: Optional[Sequence[Optional[np.ndarray]]] = None,
+        timestamp_s: Optional[float] = None,
+        scores: Optional[Sequence[float]] = None,
+    ) -> List[HandState]:
+        """Analyse hands given as normalized ``(21, 3)`` landmark arrays.
+
+        ``labels`` must be unique per frame; they key the motion history, so
+        multi-person callers should use labels such as ``"p1_left"``.
+        ``world_landmarks`` are optional metric ``(21, 3)`` arrays,
+        ``timestamp_s`` is the capture time (defaults to now) and ``scores``
+        are the detector's handedness scores, passed through to the states.
+        """
+        if not labels:
+            return []
+
+        if timestamp_s is None:
+            timestamp_s = time.monotonic()
+        capacity = self._state.capacity
+        if len(labels) > capacity:
+            # More hands than rows (a crowded frame): keep the first ones.
+            labels, landmarks = labels[:capacity], landmarks[:capacity]
+            if world_landmarks:
+                world_landmarks = world_landmarks[:capacity]
+        width, height = image_size
+        slots = self._state.acquire(labels, timestamp_s)
+        points = np.stack([self._tracked(hand, 2) for hand in landmarks]) * (width, height)
+        world = np.stack(
+            [self._tracked(hand, 3) for hand in (world_landmarks or [None] * len(labels))]
+        )
+
+        self._push(slots, points, world, timestamp_s)
+        directions = self._compute_directions(slots)
+        velocity, acceleration = self._derivatives(slots, self._points)
+        world_velocity, world_acceleration = self._derivatives(slots, self._world)
+        events = self._update_events(slots, velocity[:, 0] / width, timestamp_s)
+        pointing = self._detect_pointing(landmarks)
+        positions = points[:, 0]
+
         gesture_lookup = {
             gesture.handedness: gesture for gesture in recognized_gestures or []
         }
-
         states: List[HandState] = []
-        for idx, landmarks in enumerate(hand_result.normalized):
-            label = handedness_labels[idx] if idx < len(handedness_labels) else f"hand{idx}"
-            label = label.lower()
-
-            wrist = landmarks.landmark[0]
-            position = (wrist.x * width, wrist.y * height)
-
-            direction = self._compute_direction(label, position)
+        for row, label in enumerate(labels):
             recognized_gesture = gesture_lookup.get(label)
             gesture_label: Optional[str] = None
             if recognized_gesture and recognized_gesture.gesture:
                 gesture_label = recognized_gesture.gesture
-
-            if recognized_gesture and recognized_gesture.gesture:
                 is_pointing = "point" in recognized_gesture.gesture
             else:
-                is_pointing = self._detect_pointing(landmarks)
+                is_pointing = bool(pointing[row])
 
             states.append(
                 HandState(
                     handedness=label,
-                    position=position,
-                    direction=direction,
+                    position=(float(positions[row, 0]), float(positions[row, 1])),
+                    direction=DIRECTIONS[directions[row]],
                     is_pointing=is_pointing,
                     gesture=gesture_label,
+                    velocity=_optional_pair(velocity[row, 0]),
+                    acceleration=_optional_pair(acceleration[row, 0]),
+                    timestamp=timestamp_s,
+                    kinematics=HandKinematics(
+                        velocity=velocity[row],
+                        acceleration=acceleration[row],
+                        world_velocity=world_velocity[row],
+                        world_acceleration=world_acceleration[row],
+                    ),
+                    events=events[row],
+                    score=float(scores[row]) if scores and row < len(scores) else None,
                 )
             )
 
         return states
 
-    def _compute_direction(self, label: str, position: HandPosition) -> str:
-        history = self._position_history.setdefault(label, deque(maxlen=self._history_size))
-        direction_memory = self._direction_history.setdefault(label, deque(maxlen=self._history_size))
-
-        history.append(position)
-
-        if len(history) < 2:
-            direction_memory.append("none")
-            return "none"
-
-        delta_x, delta_y = self._movement_vector(history)
-
-        magnitude_x = abs(delta_x)
-        magnitude_y = abs(delta_y)
-
-        if magnitude_x < self._movement_threshold_px and magnitude_y < self._movement_threshold_px:
-            direction_memory.append("none")
-            return "none"
-
-        if magnitude_x > magnitude_y:
-            direction = "right" if delta_x > 0 else "left"
-        else:
-            direction = "down" if delta_y > 0 else "up"
-
-        direction_memory.append(direction)
-        return self._consistent_direction(direction_memory)
-
-    def _movement_vector(self, history: Deque[HandPosition]) -> HandPosition:
-        current_x, current_y = history[-1]
-        if len(history) == 2:
-            prev_x, prev_y = history[-2]
-            return current_x - prev_x, current_y - prev_y
-
-        lookback = min(len(history) - 1, self._consistency_window + 1)
-        previous_samples = list(history)[-1 - lookback : -1]
-        prev_x = mean(point[0] for point in previous_samples)
-        prev_y = mean(point[1] for point in previous_samples)
-        return current_x - prev_x, current_y - prev_y
-
-    def _consistent_direction(self, history: Deque[str]) -> str:
-        window = list(history)[-self._consistency_window :]
-        if len(window) < self._consistency_window:
-            return window[-1] if window else "none"
-
-        first = window[0]
-        if first == "none":
-            return "none"
-        if all(entry == first for entry in window[1:]):
-            return first
-        return "none"
-
-    def _detect_pointing(self, landmarks) -> bool:
-        if not landmarks or len(landmarks.landmark) < 21:
-            return False
-
-        wrist = landmarks.landmark[0]
-        index_mcp = landmarks.landmark[5]
-        index_pip = landmarks.landmark[6]
-        index_tip = landmarks.landmark[8]
-        middle_tip = landmarks.landmark[12]
-        ring_tip = landmarks.landmark[16]
-        pinky_tip = landmarks.landmark[20]
-
-        index_extension = self._distance_2d(index_tip, wrist)
-        if index_extension < self._pointing_extension_threshold:
-            return False
-
-        other_extensions = self._max_distance_2d(
-            [middle_tip, ring_tip, pinky_tip], wrist
+    @staticmethod
+    def _tracked(hand: Optional[np.ndarray], dims: int) -> np.ndarray:
+        if hand is None or len(hand) < HAND_LANDMARK_COUNT:
+            if hand is not None and dims == 2 and len(hand):
+                # Incomplete hand: track the wrist only.
+                tracked = np.full((len(TRACKED_POINTS), 2), np.nan)
+                tracked[0] = hand[_WRIST, :2]
+                return tracked
+            return np.full((len(TRACKED_POINTS), dims), np.nan)
+        return np.asarray(hand[TRACKED_LANDMARKS, :dims], dtype=np.float64)
+
+    def _push(
+        self, slots: np.ndarray, points: np.ndarray, world: np.ndarray, timestamp: float
+    ) -> None:
+        heads = (self._heads[slots] + 1) % self._size
+        self._heads[slots] = heads
+        self._points[slots, heads] = points
+        self._world[slots, heads] = world
+        self._times[slots, heads] = timestamp
+        self._counts[slots] = np.minimum(self._counts[slots] + 1, self._size)
+
+    def _ordered(self, buffer: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """Return history rows ordered newest first: ``[:, 0]`` is current."""
+        steps = np.arange(self._size)
+        indices = (self._heads[slots, None] - steps[None, :]) % self._size
+        return buffer[slots[:, None], indices]
+
+    def _compute_directions(self, slots: np.ndarray) -> np.ndarray:
+        # The direction history window is history_size, even when the
+        # buffers are longer for the derivatives.
+        counts = np.minimum(self._counts[slots], self._history_size)
+        history = self._ordered(self._points, slots)[:, : self._history_size, 0]
+
+        # Compare the current sample with the mean of up to
+        # consistency_window + 1 previous samples.
+        lookback = np.clip(counts - 1, 0, self._consistency_window + 1)
+        steps = np.arange(history.shape[1])
+        mask = (steps[None, :] >= 1) & (steps[None, :] <= lookback[:, None])
+        previous_sum = (history * mask[:, :, None]).sum(axis=1)
+        previous_mean = previous_sum / np.maximum(lookback, 1)[:, None]
+        delta = history[:, 0] - previous_mean
+
+        magnitude = np.abs(delta)
+        moving = (counts >= 2) & (magnitude.max(axis=1) >= self._movement_threshold_px)
+        horizontal = magnitude[:, 0] > magnitude[:, 1]
+        codes = np.where(
+            horizontal,
+            np.where(delta[:, 0] > 0, _RIGHT, _LEFT),
+            np.where(delta[:, 1] > 0, _DOWN, _UP),
+        )
+        codes = np.where(moving, codes, _NONE).astype(np.int8)
+
+        self._directions[slots, self._heads[slots]] = codes
+        return self._consistent_directions(slots, counts, codes)
+
+    def _consistent_directions(
+        self, slots: np.ndarray, counts: np.ndarray, codes: np.ndarray
+    ) -> np.ndarray:
+        window = self._consistency_window
+        recent = self._ordered(self._directions, slots)[:, :window]
+        agreed = (recent == recent[:, :1]).all(axis=1) & (recent[:, 0] != _NONE)
+        consistent = np.where(agreed, recent[:, 0], _NONE)
+        # Until the window fills up, report the latest raw direction.
+        return np.where(counts < window, codes, consistent)
+
+    def _derivatives(
+        self, slots: np.ndarray, buffer: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Velocity and acceleration per tracked point, using capture times.
+
+        Returns ``(H, P, D)`` arrays; entries are NaN when unknown.
+        """
+        counts = self._counts[slots]
+        samples = self._ordered(buffer, slots)[:, :3]
+        times = self._ordered(self._times, slots)[:, :3]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dt_now = np.where(counts >= 2, times[:, 0] - times[:, 1], np.nan)
+            dt_prev = np.where(counts >= 3, times[:, 1] - times[:, 2], np.nan)
+            dt_now[dt_now <= 0] = np.nan
+            dt_prev[dt_prev <= 0] = np.nan
+
+            velocity = (samples[:, 0] - samples[:, 1]) / dt_now[:, None, None]
+            previous_velocity = (samples[:, 1] - samples[:, 2]) / dt_prev[:, None, None]
+            span = (dt_now + dt_prev) * 0.5
+            acceleration = (velocity - previous_velocity) / span[:, None, None]
+        return velocity, acceleration
+
+    def _update_events(
+        self, slots: np.ndarray, wrist_velocity: np.ndarray, now: float
+    ) -> List[List[HandMotionEvent]]:
+        """Advance the swipe/flick/hold state machines by one sample.
+
+        ``wrist_velocity`` is in frame widths per second.
+        """
+        events: List[List[HandMotionEvent]] = [[] for _ in range(len(slots))]
+        known = ~np.isnan(wrist_velocity).any(axis=1)
+        speed = np.where(known, np.linalg.norm(np.nan_to_num(wrist_velocity), axis=1), 0.0)
+
+        onset = self._motion_onset[slots]
+        previous_peak = self._motion_peak[slots]
+        moving = known & (speed >= self._swipe_speed)
+        starting = moving & np.isnan(onset)
+        onset = np.where(starting, now, onset)
+        frames = np.where(moving, self._motion_frames[slots] + 1, 0)
+        faster = moving & (speed > np.where(starting, 0.0, previous_peak))
+        peak = np.where(faster, speed, np.where(moving, previous_peak, 0.0))
+        peak_velocity = np.where(
+            faster[:, None], wrist_velocity, self._motion_peak_velocity[slots]
+        )
+        swipe = moving & (frames >= self._swipe_min_frames) & ~self._swipe_emitted[slots]
+        ended = ~moving & ~np.isnan(onset)
+        flick = (
+            ended
+            & (now - np.nan_to_num(onset) <= self._flick_max_duration)
+            & (previous_peak >= self._flick_speed)
         )
-        if index_extension - other_extensions < self._pointing_margin:
-            return False
 
-        index_straightness = self._distance_2d(index_tip, index_pip)
-        base_distance = self._distance_2d(index_mcp, wrist)
+        for row in np.flatnonzero(swipe):
+            direction = _direction_name(wrist_velocity[row])
+            events[row].append(
+                HandMotionEvent("swipe", direction, float(onset[row]), now, float(speed[row]))
+            )
+        for row in np.flatnonzero(flick):
+            direction = _direction_name(peak_velocity[row])
+            events[row].append(
+                HandMotionEvent("flick", direction, float(onset[row]), now, float(previous_peak[row]))
+            )
 
-        return index_straightness > base_distance * 0.6
+        self._motion_onset[slots] = np.where(moving, onset, np.nan)
+        self._motion_frames[slots] = frames
+        self._motion_peak[slots] = peak
+        self._motion_peak_velocity[slots] = peak_velocity
+        self._swipe_emitted[slots] = moving & (self._swipe_emitted[slots] | swipe)
+
+        still_onset = self._still_onset[slots]
+        still = known & (speed < self._hold_speed)
+        still_onset = np.where(still, np.where(np.isnan(still_onset), now, still_onset), np.nan)
+        hold = (
+            still
+            & (now - np.nan_to_num(still_onset) >= self._hold_duration)
+            & ~self._hold_emitted[slots]
+        )
+        for row in np.flatnonzero(hold):
+            events[row].append(HandMotionEvent("hold", None, float(still_onset[row]), now))
+        self._still_onset[slots] = still_onset
+        self._hold_emitted[slots] = still & (self._hold_emitted[slots] | hold)
+        return events
+
+    def _detect_pointing(self, landmarks: Sequence[np.ndarray]) -> np.ndarray:
+        """Vectorized finger-extension test over all hands at once."""
+        result = np.zeros(len(landmarks), dtype=bool)
+        complete = [
+            row for row, hand in enumerate(landmarks)
+            if hand is not None and len(hand) >= HAND_LANDMARK_COUNT
+        ]
+        if not complete:
+            return result
+
+        hands = np.stack([landmarks[row][:HAND_LANDMARK_COUNT, :2] for row in complete])
+        wrist = hands[:, _WRIST]
+        index_extension = np.linalg.norm(hands[:, _INDEX_TIP] - wrist, axis=1)
+        other_extensions = np.linalg.norm(
+            hands[:, _OTHER_TIPS] - wrist[:, None], axis=2
+        ).max(axis=1)
+        index_straightness = np.linalg.norm(hands[:, _INDEX_TIP] - hands[:, _INDEX_PIP], axis=1)
+        base_distance = np.linalg.norm(hands[:, _INDEX_MCP] - wrist, axis=1)
+
+        pointing = (
+            (index_extension >= self._pointing_extension_threshold)
+            & (index_extension - other_extensions >= self._pointing_margin)
+            & (index_straightness > base_distance * 0.6)
+        )
+        result[complete] = pointing
+        return result
 
-    @staticmethod
-    def _distance_2d(a, b) -> float:
-        dx = a.x - b.x
-        dy = a.y - b.y
-        return (dx * dx + dy * dy) ** 0.5
 
-    def _max_distance_2d(self, points: Iterable, origin) -> float:
-        return max((self._distance_2d(point, origin) for point in points), default=0.0)
+def _direction_name(vector: np.ndarray) -> str:
+    x, y = float(vector[0]), float(vector[1])
+    if abs(x) > abs(y):
+        return "right" if x > 0 else "left"
+    return "down" if y > 0 else "up"
 
 
+def _optional_pair(values: np.ndarray) -> Optional[HandPosition]:
+    if np.isnan(values).any():
+        return None
+    return float(values[0]), float(values[1])
@@ -8,6 +8,8 @@ from typing import Any, List, Optional
 import cv2
 import mediapipe as mp
 
+from quality_governor import scale_frame
+
 
 @dataclass
 class HandPoseResult:
@@ -16,18 +18,27 @@ class HandPoseResult:
     normalized: Optional[List[Any]]
     world: Optional[List[Any]]
     handedness: Optional[List[str]]
+    # Handedness classifier score per hand, in [0, 1].
+    scores: Optional[List[float]] = None
 
 
 class HandPoseEstimator:
-    """Thin wrapper around MediaPipe Hands."""
+    """Thin wrapper around MediaPipe Hands.
+
+    Frames are downscaled by ``input_scale`` before inference.
+    """
 
     def __init__(
         self,
         max_num_hands: int = 2,
         min_detection_confidence: float = 0.5,
         min_tracking_confidence: float = 0.5,
+        input_scale: float = 1.0,
+        static_image_mode: bool = False,
     ) -> None:
+        self.input_scale = input_scale
         self._hands = mp.solutions.hands.Hands(
+            static_image_mode=static_image_mode,
             max_num_hands=max_num_hands,
             min_detection_confidence=min_detection_confidence,
             min_tracking_confidence=min_tracking_confidence,
@@ -37,21 +48,25 @@ class HandPoseEstimator:
         if frame is None:
             return HandPoseResult(None, None, None)
 
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image_rgb = cv2.cvtColor(scale_frame(frame, self.input_scale), cv2.COLOR_BGR2RGB)
         image_rgb.flags.writeable = False
         results = self._hands.process(image_rgb)
         handedness = None
+        scores = None
         if results and results.multi_handedness:
-            handedness = [
-                classification.classification[0].label.lower()
+            best = [
+                classification.classification[0]
                 for classification in results.multi_handedness
                 if classification.classification
             ]
+            handedness = [category.label.lower() for category in best]
+            scores = [float(category.score) for category in best]
 
         return HandPoseResult(
             normalized=results.multi_hand_landmarks,
             world=results.multi_hand_world_landmarks,
             handedness=handedness,
+            scores=scores,
         )
 
     def close(self) -> None:
@@ -0,0 +1,222 @@
+"""Conversions from MediaPipe landmark messages to NumPy arrays."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+POSE_LANDMARK_COUNT = 33
+HAND_LANDMARK_COUNT = 21
+
+# MediaPipe pose landmark names, in index order.
+POSE_LANDMARK_NAMES = (
+    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner",
+    "right_eye", "right_eye_outer", "left_ear", "right_ear", "mouth_left",
+    "mouth_right", "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_pinky", "right_pinky", "left_index",
+    "right_index", "left_thumb", "right_thumb", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle", "left_heel",
+    "right_heel", "left_foot_index", "right_foot_index",
+)
+
+# Same topology as mp.solutions.pose.POSE_CONNECTIONS and
+# mp.solutions.hands.HAND_CONNECTIONS, kept here so drawing and analysis
+# code does not need to import MediaPipe.
+POSE_CONNECTIONS = np.array(
+    [
+        (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8),
+        (9, 10), (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21),
+        (17, 19), (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+        (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+        (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+    ],
+    dtype=np.intp,
+)
+
+HAND_CONNECTIONS = np.array(
+    [
+        (0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8),
+        (5, 9), (9, 10), (10, 11), (11, 12), (9, 13), (13, 14), (14, 15),
+        (15, 16), (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+    ],
+    dtype=np.intp,
+)
+
+
+def landmarks_to_array(landmarks: Any, dtype=np.float32) -> Optional[np.ndarray]:
+    """Return an ``(N, 3)`` array of x, y, z for a landmark list.
+
+    Accepts a MediaPipe ``LandmarkList``/``NormalizedLandmarkList`` or any
+    sequence of objects with ``x``, ``y`` and ``z`` attributes.
+    """
+    if landmarks is None:
+        return None
+    points = getattr(landmarks, "landmark", landmarks)
+    count = len(points)
+    array = np.empty((count, 3), dtype=dtype)
+    for idx, point in enumerate(points):
+        array[idx, 0] = point.x
+        array[idx, 1] = point.y
+        array[idx, 2] = point.z
+    return array
+
+
+def landmark_confidence(landmarks: Any) -> Optional[np.ndarray]:
+    """Return an ``(N,)`` array of per-landmark confidence in [0, 1].
+
+    The confidence is the lower of MediaPipe's ``visibility`` and
+    ``presence``. Landmarks that carry neither (e.g. hand landmarks from
+    ``mp.solutions.hands``) are fully trusted.
+    """
+    if landmarks is None:
+        return None
+    points = getattr(landmarks, "landmark", landmarks)
+    confidence = np.ones(len(points), dtype=np.float32)
+    for idx, point in enumerate(points):
+        for name in ("visibility", "presence"):
+            value = _optional_field(point, name)
+            if value is not None and value < confidence[idx]:
+                confidence[idx] = value
+    return confidence
+
+
+def _optional_field(point: Any, name: str) -> Optional[float]:
+    # Unset protobuf fields read as 0.0, so ask the message when we can.
+    has_field = getattr(point, "HasField", None)
+    if has_field is not None:
+        return getattr(point, name) if has_field(name) else None
+    return getattr(point, name, None)
+
+
+class LandmarkGate:
+    """Drops low-confidence landmarks, holding the last good position.
+
+    A landmark below ``min_confidence`` keeps its last confident position for
+    up to ``hold_s`` seconds and is reported as NaN after that, so a brief
+    occlusion does not make the rig jump.
+    """
+
+    def __init__(self, min_confidence: float = 0.5, hold_s: float = 0.25) -> None:
+        self.min_confidence = float(min_confidence)
+        self.hold_s = float(hold_s)
+        self._last_good: Optional[np.ndarray] = None
+        self._last_time: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        self._last_good = None
+        self._last_time = None
+
+    def update(
+        self,
+        points: np.ndarray,
+        confidence: Optional[np.ndarray],
+        timestamp_s: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the gated ``(N, 3)`` points and the ``(N,)`` valid mask."""
+        points = np.asarray(points, dtype=np.float64)
+        if confidence is None:
+            good = np.ones(len(points), dtype=bool)
+        else:
+            good = np.asarray(confidence) >= self.min_confidence
+        if self._last_good is None or self._last_good.shape != points.shape:
+            self._last_good = np.full(points.shape, np.nan)
+            self._last_time = np.full(len(points), -np.inf)
+
+        self._last_good[good] = points[good]
+        self._last_time[good] = timestamp_s
+        valid = good | (timestamp_s - self._last_time <= self.hold_s)
+        gated = np.where(good[:, None], points, self._last_good)
+        gated[~valid] = np.nan
+        return gated, valid
+
+
+def hands_to_arrays(hand_landmarks: Optional[List[Any]]) -> List[np.ndarray]:
+    """Convert every hand in a MediaPipe multi-hand result."""
+    if not hand_landmarks:
+        return []
+    return [landmarks_to_array(hand) for hand in hand_landmarks]
+
+
+# Arrays for one frame of estimator output, with the shape of each. Rows
+# are what the landmark cache stores and what batch_landmarks writes.
+MAX_HANDS = 2
+RESULT_COLUMNS = {
+    "body": (POSE_LANDMARK_COUNT, 3),
+    "body_world": (POSE_LANDMARK_COUNT, 3),
+    "body_confidence": (POSE_LANDMARK_COUNT,),
+    "hands": (MAX_HANDS, HAND_LANDMARK_COUNT, 3),
+    "hands_world": (MAX_HANDS, HAND_LANDMARK_COUNT, 3),
+    "hand_scores": (MAX_HANDS,),
+}
+
+
+def results_to_row(body_result: Any, hand_result: Any) -> Dict[str, np.ndarray]:
+    """Body and hand results as ``RESULT_COLUMNS`` arrays plus ``handedness``.
+
+    Anything not detected is NaN (an empty string for handedness).
+    """
+    row = {
+        name: np.full(shape, np.nan, dtype=np.float32) for name, shape in RESULT_COLUMNS.items()
+    }
+    row["handedness"] = np.full(MAX_HANDS, "", dtype="<U8")
+    if body_result is not None and body_result.landmarks:
+        row["body"][:] = landmarks_to_array(body_result.landmarks)
+        row["body_confidence"][:] = landmark_confidence(body_result.landmarks)
+        if body_result.world_landmarks:
+            row["body_world"][:] = landmarks_to_array(body_result.world_landmarks)
+    if hand_result is not None:
+        world = hand_result.world or []
+        handedness = hand_result.handedness or []
+        scores = hand_result.scores or []
+        for slot, hand in enumerate((hand_result.normalized or [])[:MAX_HANDS]):
+            row["hands"][slot] = landmarks_to_array(hand)
+            if slot < len(world):
+                row["hands_world"][slot] = landmarks_to_array(world[slot])
+            if slot < len(handedness):
+                row["handedness"][slot] = handedness[slot]
+            if slot < len(scores):
+                row["hand_scores"][slot] = scores[slot]
+    return row
+
+
+def _landmark_list(points: np.ndarray, confidence: Optional[np.ndarray] = None, world: bool = False):
+    from mediapipe.framework.formats import landmark_pb2
+
+    message = landmark_pb2.LandmarkList() if world else landmark_pb2.NormalizedLandmarkList()
+    for idx, (x, y, z) in enumerate(points.tolist()):
+        landmark = message.landmark.add(x=x, y=y, z=z)
+        if confidence is not None:
+            landmark.visibility = landmark.presence = float(confidence[idx])
+    return message
+
+
+def row_to_results(row: Dict[str, np.ndarray]) -> Tuple[Any, Any]:
+    """Rebuild ``(BodyPoseResult, HandPoseResult)`` from ``results_to_row``.
+
+    The landmarks are MediaPipe messages again, so drawing and analysis code
+    cannot tell them from fresh results, except that visibility and
+    presence both hold the stored confidence.
+    """
+    from body_pose_estimator import BodyPoseResult
+    from hand_pose_estimator import HandPoseResult
+
+    body = BodyPoseResult(None, None)
+    if not np.isnan(row["body"]).all():
+        body = BodyPoseResult(
+            landmarks=_landmark_list(row["body"], row["body_confidence"]),
+            world_landmarks=None
+            if np.isnan(row["body_world"]).all()
+            else _landmark_list(row["body_world"], row["body_confidence"], world=True),
+        )
+
+    slots = [slot for slot in range(MAX_HANDS) if not np.isnan(row["hands"][slot]).all()]
+    hands = HandPoseResult(None, None, None)
+    if slots:
+        hands = HandPoseResult(
+            normalized=[_landmark_list(row["hands"][slot]) for slot in slots],
+            world=[_landmark_list(row["hands_world"][slot], world=True) for slot in slots],
+            handedness=[str(row["handedness"][slot]) for slot in slots],
+            scores=[float(row["hand_scores"][slot]) for slot in slots],
+        )
+    return body, hands
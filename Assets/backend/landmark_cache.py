@@ -0,0 +1,150 @@
+"""On-disk cache of landmark results for offline runs.
+
+Entries are keyed by the SHA-256 of the encoded image file together with a
+fingerprint of the models and their settings, so editing analysis or
+formatting code reuses every result while a MediaPipe upgrade or another
+model complexity does not. Each entry is one small ``.npz`` holding the
+``landmark_arrays.results_to_row`` arrays.
+
+The cache is bounded by ``max_bytes``: reads refresh an entry's mtime and
+the least recently used entries are deleted first. Several processes may
+share one directory; writes are atomic and eviction tolerates entries
+that another process removed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Bump when the stored arrays change meaning.
+CACHE_FORMAT = 1
+
+
+def fingerprint(**settings: Any) -> str:
+    """Short hash of ``settings`` and the installed MediaPipe version.
+
+    Pass everything that changes the landmarks: the estimator factory,
+    static image mode, model complexity and so on.
+    """
+    try:
+        import mediapipe
+
+        version = getattr(mediapipe, "__version__", "unknown")
+    except ImportError:
+        version = None
+    text = json.dumps(
+        dict(settings, format=CACHE_FORMAT, mediapipe=version), sort_keys=True, default=str
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class LandmarkCache:
+    """Size-bounded LRU store of landmark rows, one file per entry."""
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30, fingerprint: str = "") -> None:
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes stored, as last counted by this process."""
+        return self._size
+
+    def key(self, data: bytes) -> str:
+        """Key of an encoded image (the file's bytes)."""
+        digest = hashlib.sha256(self.fingerprint.encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def key_for_file(self, path: str) -> Tuple[str, bytes]:
+        """Key of the image at ``path``, with the bytes read for it."""
+        with open(path, "rb") as handle:
+            data = handle.read()
+        return self.key(data), data
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".npz")
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                row = {name: data[name] for name in data.files}
+            os.utime(path)  # most recently used
+        except (OSError, ValueError):  # missing, evicted meanwhile, or truncated
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row
+
+    def put(self, key: str, row: Dict[str, np.ndarray]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                np.savez(stream, **row)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """Delete least recently used entries down to ``target_bytes``.
+
+        Defaults to 90% of ``max_bytes``, so a full cache does not evict on
+        every write. Returns the number of entries deleted.
+        """
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+        for path, entry_size, _ in entries:
+            if size <= target_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # another process evicted it
+            size -= entry_size
+        self._size = size
+        return removed
+
+    def clear(self) -> None:
+        self.evict(0)
+
+    def summary(self) -> str:
+        return (
+            f"[cache] {self.hits} hits, {self.misses} misses, "
+            f"{self._size / 1e6:.1f} of {self.max_bytes / 1e6:.0f} MB in {self.directory}"
+        )
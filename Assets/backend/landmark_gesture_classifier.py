@@ -0,0 +1,384 @@
+"""Hand gesture classification from the 21-point hand landmarks.
+
+Each hand becomes a small feature vector: its 2D shape relative to the
+wrist, scaled by palm size, plus the bend of every finger joint. Gestures
+are recognised by the nearest stored template, so classifying a frame is
+a single matrix product instead of a second network pass.
+
+Templates come from a trained model file (see ``gesture_training.py``) or,
+when none exists, from a built-in set of synthetic hand poses.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from gesture_types import RecognizedHandGesture
+from landmark_arrays import HAND_LANDMARK_COUNT, landmarks_to_array
+
+if TYPE_CHECKING:
+    from hand_pose_estimator import HandPoseResult
+
+
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(__file__), "models", "hand_gestures.npz"
+)
+FEATURE_VERSION = 1
+
+# Landmark chains from the wrist to each fingertip.
+_FINGERS = (
+    (0, 1, 2, 3, 4),
+    (0, 5, 6, 7, 8),
+    (0, 9, 10, 11, 12),
+    (0, 13, 14, 15, 16),
+    (0, 17, 18, 19, 20),
+)
+# (previous, joint, next) for the three bending joints of every finger.
+_JOINTS = np.array(
+    [(finger[k - 1], finger[k], finger[k + 1]) for finger in _FINGERS for k in (1, 2, 3)],
+    dtype=np.intp,
+)
+_MIDDLE_MCP = 9
+
+
+def hand_features(
+    hands: np.ndarray,
+    mirror: Optional[np.ndarray] = None,
+    aspect: Union[float, np.ndarray] = 1.0,
+    angle_weight: float = 2.0,
+) -> np.ndarray:
+    """Return ``(H, 55)`` features for ``(H, 21, 3)`` normalized landmarks.
+
+    ``mirror`` flags hands to flip horizontally (left hands), so one
+    template covers both hands. ``aspect`` is the image width / height, one
+    for all hands or one per hand, and keeps shapes undistorted on
+    non-square frames.
+    """
+    points = np.array(hands, dtype=np.float64, copy=True)
+    points[..., 0] *= np.reshape(np.asarray(aspect, dtype=np.float64), (-1, 1))
+    points -= points[:, :1]
+    if mirror is not None:
+        points[np.asarray(mirror, dtype=bool), :, 0] *= -1.0
+
+    scale = np.linalg.norm(points[:, _MIDDLE_MCP, :2], axis=1)
+    scale = np.maximum(scale, 1e-6)
+    shape = points[:, 1:, :2] / scale[:, None, None]
+
+    incoming = points[:, _JOINTS[:, 1]] - points[:, _JOINTS[:, 0]]
+    outgoing = points[:, _JOINTS[:, 2]] - points[:, _JOINTS[:, 1]]
+    norms = np.linalg.norm(incoming, axis=2) * np.linalg.norm(outgoing, axis=2)
+    bend = np.einsum("hjd,hjd->hj", incoming, outgoing) / np.maximum(norms, 1e-9)
+
+    return np.concatenate(
+        [shape.reshape(len(points), -1), angle_weight * bend], axis=1
+    )
+
+
+@dataclass
+class GestureTemplates:
+    """A template set: ``templates[i]`` is an example of ``labels[template_labels[i]]``."""
+
+    labels: Tuple[str, ...]
+    templates: np.ndarray  # (M, F)
+    template_labels: np.ndarray  # (M,)
+    max_distance: float
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            version=FEATURE_VERSION,
+            labels=np.array(self.labels),
+            templates=self.templates,
+            template_labels=self.template_labels,
+            max_distance=self.max_distance,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> GestureTemplates:
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version != FEATURE_VERSION:
+                raise ValueError(
+                    f"{path} uses feature version {version}, expected {FEATURE_VERSION}; "
+                    "retrain it with gesture_training.py"
+                )
+            return cls(
+                labels=tuple(str(label) for label in data["labels"]),
+                templates=data["templates"].astype(np.float32),
+                template_labels=data["template_labels"].astype(np.intp),
+                max_distance=float(data["max_distance"]),
+            )
+
+
+class LandmarkGestureClassifier:
+    """Nearest-template gesture classifier over hand landmark features.
+
+    Hands further than the model's ``max_distance`` from every template are
+    reported with ``gesture=None``.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        min_score: float = 0.0,
+        templates: Optional[GestureTemplates] = None,
+        min_hand_score: float = 0.5,
+    ) -> None:
+        if model_path is not None and not os.path.exists(model_path):
+            raise FileNotFoundError(
+                "Gesture templates not found at %s. "
+                "Create them with gesture_training.py." % model_path
+            )
+        path = model_path or DEFAULT_MODEL_PATH
+        if templates is not None:
+            self.model = templates
+        elif os.path.exists(path):
+            self.model = GestureTemplates.load(path)
+        else:
+            self.model = builtin_templates()
+        self._min_score = min_score
+        self._min_hand_score = min_hand_score
+        self._template_norms = np.einsum("mf,mf->m", self.model.templates, self.model.templates)
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return self.model.labels
+
+    def recognize(
+        self, hand_result: Optional[HandPoseResult], frame_shape=None
+    ) -> List[RecognizedHandGesture]:
+        """Classify every hand in a ``HandPoseResult``.
+
+        Hands whose handedness score is below ``min_hand_score`` are likely
+        misdetections; they are skipped and reported without a gesture.
+        """
+        if not hand_result or not hand_result.normalized:
+            return []
+        handedness = hand_result.handedness or []
+        labels = [
+            (handedness[idx] if idx < len(handedness) else f"hand{idx}").lower()
+            for idx in range(len(hand_result.normalized))
+        ]
+        aspect = 1.0
+        if frame_shape is not None:
+            aspect = frame_shape[1] / float(frame_shape[0])
+        scores = getattr(hand_result, "scores", None) or []
+        landmarks = [
+            None if idx < len(scores) and scores[idx] < self._min_hand_score
+            else landmarks_to_array(hand)
+            for idx, hand in enumerate(hand_result.normalized)
+        ]
+        return self.classify_arrays(labels, landmarks, aspect=aspect)
+
+    def classify_arrays(
+        self,
+        handedness: Sequence[str],
+        landmarks: Sequence[np.ndarray],
+        aspect: Union[float, Sequence[float]] = 1.0,
+    ) -> List[RecognizedHandGesture]:
+        """Classify hands given as normalized ``(21, 3)`` arrays.
+
+        ``aspect`` is the frame width / height, or one per hand.
+        """
+        complete = [
+            idx for idx, hand in enumerate(landmarks)
+            if hand is not None and len(hand) >= HAND_LANDMARK_COUNT
+        ]
+        results = [RecognizedHandGesture(label, None, 0.0) for label in handedness]
+        if not complete:
+            return results
+
+        hands = np.stack([landmarks[idx][:HAND_LANDMARK_COUNT] for idx in complete])
+        mirror = np.array([handedness[idx] == "left" for idx in complete])
+        if np.ndim(aspect):
+            aspect = np.asarray(aspect, dtype=np.float64)[complete]
+        label_ids, distances = self._nearest(hand_features(hands, mirror, aspect))
+
+        scores = np.clip(1.0 - distances / self.model.max_distance, 0.0, 1.0)
+        for row, idx in enumerate(complete):
+            score = float(scores[row])
+            if distances[row] <= self.model.max_distance and score >= self._min_score:
+                results[idx].gesture = self.model.labels[label_ids[row]]
+                results[idx].score = score
+        return results
+
+    def _nearest(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        features = features.astype(np.float32)
+        squared = (
+            np.einsum("hf,hf->h", features, features)[:, None]
+            + self._template_norms[None, :]
+            - 2.0 * features @ self.model.templates.T
+        )
+        nearest = np.argmin(squared, axis=1)
+        distances = np.sqrt(np.maximum(squared[np.arange(len(features)), nearest], 0.0))
+        return self.model.template_labels[nearest], distances
+
+
+def train_templates(
+    features: np.ndarray,
+    labels: Sequence[str],
+    templates_per_label: int = 8,
+    iterations: int = 25,
+    distance_margin: float = 1.5,
+    seed: int = 0,
+) -> GestureTemplates:
+    """Learn templates by k-means clustering each label's feature vectors.
+
+    ``max_distance`` is set from the training data: ``distance_margin``
+    times the 95th percentile of each sample's distance to its own label's
+    nearest template.
+    """
+    names = tuple(sorted(set(labels)))
+    label_array = np.array([names.index(label) for label in labels], dtype=np.intp)
+    rng = np.random.default_rng(seed)
+
+    templates: List[np.ndarray] = []
+    template_labels: List[np.ndarray] = []
+    own_distances: List[np.ndarray] = []
+    for label_id in range(len(names)):
+        samples = features[label_array == label_id]
+        centers = _kmeans(samples, min(templates_per_label, len(samples)), iterations, rng)
+        distances = np.linalg.norm(samples[:, None, :] - centers[None, :, :], axis=2)
+        own_distances.append(distances.min(axis=1))
+        templates.append(centers)
+        template_labels.append(np.full(len(centers), label_id, dtype=np.intp))
+
+    spread = float(np.percentile(np.concatenate(own_distances), 95))
+    return GestureTemplates(
+        labels=names,
+        templates=np.concatenate(templates).astype(np.float32),
+        template_labels=np.concatenate(template_labels),
+        max_distance=max(distance_margin * spread, 1e-3),
+    )
+
+
+def _kmeans(samples: np.ndarray, count: int, iterations: int, rng) -> np.ndarray:
+    centers = samples[rng.choice(len(samples), size=count, replace=False)].copy()
+    for _ in range(iterations):
+        distances = np.linalg.norm(samples[:, None, :] - centers[None, :, :], axis=2)
+        assignment = distances.argmin(axis=1)
+        for idx in range(count):
+            members = samples[assignment == idx]
+            if len(members):
+                centers[idx] = members.mean(axis=0)
+    return centers
+
+
+def load_sessions(
+    paths: Iterable[str],
+) -> Tuple[np.ndarray, List[str], List[str], np.ndarray]:
+    """Read recorded JSON-lines sessions.
+
+    Each line is ``{"label": ..., "handedness": ..., "landmarks": [[x, y, z], ...],
+    "aspect": ...}`` with normalized coordinates and the frame width / height;
+    sessions recorded without ``aspect`` count as square frames. Returns
+    ``(landmarks, handedness, labels, aspects)``.
+    """
+    hands: List[List[List[float]]] = []
+    handedness: List[str] = []
+    labels: List[str] = []
+    aspects: List[float] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                sample = json.loads(line)
+                if len(sample["landmarks"]) < HAND_LANDMARK_COUNT:
+                    continue
+                hands.append(sample["landmarks"][:HAND_LANDMARK_COUNT])
+                handedness.append(str(sample.get("handedness", "right")).lower())
+                labels.append(str(sample["label"]))
+                aspects.append(float(sample.get("aspect", 1.0)))
+    landmarks = np.array(hands, dtype=np.float64).reshape(-1, HAND_LANDMARK_COUNT, 3)
+    return landmarks, handedness, labels, np.array(aspects, dtype=np.float64)
+
+
+# Built-in templates -------------------------------------------------------
+
+# Finger base positions and spread for a canonical right hand, fingers up,
+# in palm-size units with image-style y (down is positive).
+_FINGER_BASES = ((-0.35, -0.3), (-0.3, -1.0), (0.0, -1.05), (0.25, -1.0), (0.47, -0.88))
+_FINGER_SPREAD = (-1.2, -0.2, 0.0, 0.15, 0.35)
+_SEGMENTS = ((0.35, 0.3, 0.25), (0.45, 0.28, 0.22), (0.5, 0.3, 0.24), (0.46, 0.28, 0.22), (0.36, 0.22, 0.2))
+
+_BUILTIN_POSES: Dict[str, Tuple[Tuple[bool, ...], float]] = {
+    # label: (thumb, index, middle, ring, pinky extended), hand rotation in degrees
+    "open_palm": ((True, True, True, True, True), 0.0),
+    "closed_fist": ((False, False, False, False, False), 0.0),
+    "pointing_up": ((False, True, False, False, False), 0.0),
+    "victory": ((False, True, True, False, False), 0.0),
+    "iloveyou": ((True, True, False, False, True), 0.0),
+    "thumb_up": ((True, False, False, False, False), 55.0),
+    "thumb_down": ((True, False, False, False, False), 235.0),
+}
+
+
+def synthetic_hand(
+    extended: Sequence[bool], rotation_deg: float = 0.0, curl_deg: float = 80.0
+) -> np.ndarray:
+    """Return a ``(21, 3)`` canonical right hand with the given fingers extended."""
+    hand = np.zeros((HAND_LANDMARK_COUNT, 3))
+    for finger, (chain, base, spread, lengths, straight) in enumerate(
+        zip(_FINGERS, _FINGER_BASES, _FINGER_SPREAD, _SEGMENTS, extended)
+    ):
+        hand[chain[1], :2] = base
+        point = np.array([base[0], base[1], 0.0])
+        bend = 0.0 if straight else np.radians(curl_deg)
+        if finger == 0 and not straight:
+            spread = 0.9  # a curled thumb folds across the palm
+            bend *= 0.4
+        for k, length in enumerate(lengths, start=1):
+            angle = bend * k
+            direction = np.array([spread * np.cos(angle), -np.cos(angle), -np.sin(angle)])
+            point = point + length * direction / np.linalg.norm(direction)
+            hand[chain[k + 1]] = point
+
+    theta = np.radians(rotation_deg)
+    rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    hand[:, :2] = hand[:, :2] @ rotation.T
+    # Place it in normalized image coordinates at a typical size.
+    hand[:, :2] = hand[:, :2] * 0.12 + 0.5
+    hand[:, 2] *= 0.12
+    return hand
+
+
+def builtin_templates(jitter_deg: Sequence[float] = (-20.0, 0.0, 20.0)) -> GestureTemplates:
+    """Templates for common gestures, built from synthetic hand poses.
+
+    These are a starting point; a model trained on recorded sessions from
+    the actual camera setup is far more accurate.
+    """
+    features: List[np.ndarray] = []
+    labels: List[str] = []
+    for label, (extended, rotation) in _BUILTIN_POSES.items():
+        for jitter in jitter_deg:
+            for curl in (70.0, 90.0):
+                hand = synthetic_hand(extended, rotation + jitter, curl)
+                features.append(hand_features(hand[None])[0])
+                labels.append(label)
+    return _fixed_templates(np.array(features), labels)
+
+
+def _fixed_templates(features: np.ndarray, labels: Sequence[str]) -> GestureTemplates:
+    names = tuple(dict.fromkeys(labels))
+    label_ids = np.array([names.index(label) for label in labels], dtype=np.intp)
+    # Accept a hand up to the distance between the closest templates of two
+    # different gestures.
+    distances = np.linalg.norm(features[:, None] - features[None, :], axis=2)
+    different = label_ids[:, None] != label_ids[None, :]
+    return GestureTemplates(
+        labels=names,
+        templates=features.astype(np.float32),
+        template_labels=label_ids,
+        max_distance=float(distances[different].min()),
+    )
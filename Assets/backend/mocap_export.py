@@ -0,0 +1,538 @@
+"""Export recorded performances to BVH and CSV animation files.
+
+    python mocap_export.py take1.mp4 take2.mp4 --output-dir anim/ --workers 8
+
+A video is split into chunks of ``chunk_frames`` that run on worker
+processes at full speed, not in real time. Each chunk starts ``overlap``
+frames early so MediaPipe's tracking and landmark smoothing have settled
+by its first kept frame; the warm-up frames are dropped.
+
+The joint rotations are then solved for the whole clip at once with
+batched NumPy: missing and low-confidence joints are interpolated, bone
+lengths are the clip's medians, the hips, chest and head get full
+orientations from their landmark triads, and every limb bone gets the
+shortest rotation that points it at its child. Twist along a limb is not
+observable from MediaPipe's points and is left at zero.
+
+The BVH skeleton faces +Z with +Y up, in centimetres; the CSV holds the
+same channels, one row per frame.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from landmark_arrays import POSE_LANDMARK_COUNT, landmark_confidence, landmarks_to_array
+from skeleton_calibration import robust_lengths
+
+# MediaPipe world landmarks are y down and z away from the camera; BVH is
+# y up and the performer faces +z.
+TO_BVH_AXES = np.array([1.0, -1.0, -1.0])
+
+
+@dataclass(frozen=True)
+class BvhJoint:
+    """One joint: its position is the mean of ``landmarks``."""
+
+    name: str
+    parent: Optional[str]
+    landmarks: Tuple[int, ...]
+    rest_direction: Tuple[float, float, float]  # from the parent, in the rest pose
+
+
+SKELETON: Tuple[BvhJoint, ...] = (
+    BvhJoint("Hips", None, (23, 24), (0.0, 0.0, 0.0)),
+    BvhJoint("Chest", "Hips", (11, 12), (0.0, 1.0, 0.0)),
+    BvhJoint("Head", "Chest", (7, 8), (0.0, 1.0, 0.0)),
+    BvhJoint("LeftArm", "Chest", (11,), (1.0, 0.0, 0.0)),
+    BvhJoint("LeftForeArm", "LeftArm", (13,), (1.0, 0.0, 0.0)),
+    BvhJoint("LeftHand", "LeftForeArm", (15,), (1.0, 0.0, 0.0)),
+    BvhJoint("RightArm", "Chest", (12,), (-1.0, 0.0, 0.0)),
+    BvhJoint("RightForeArm", "RightArm", (14,), (-1.0, 0.0, 0.0)),
+    BvhJoint("RightHand", "RightForeArm", (16,), (-1.0, 0.0, 0.0)),
+    BvhJoint("LeftUpLeg", "Hips", (23,), (1.0, 0.0, 0.0)),
+    BvhJoint("LeftLeg", "LeftUpLeg", (25,), (0.0, -1.0, 0.0)),
+    BvhJoint("LeftFoot", "LeftLeg", (27,), (0.0, -1.0, 0.0)),
+    BvhJoint("RightUpLeg", "Hips", (24,), (-1.0, 0.0, 0.0)),
+    BvhJoint("RightLeg", "RightUpLeg", (26,), (0.0, -1.0, 0.0)),
+    BvhJoint("RightFoot", "RightLeg", (28,), (0.0, -1.0, 0.0)),
+)
+
+# Leaf joint -> (landmarks of its end site, rest direction).
+END_SITES: Dict[str, Tuple[Tuple[int, ...], Tuple[float, float, float]]] = {
+    "Head": ((0,), (0.0, 0.0, 1.0)),
+    "LeftHand": ((17, 19), (1.0, 0.0, 0.0)),
+    "RightHand": ((18, 20), (-1.0, 0.0, 0.0)),
+    "LeftFoot": ((31,), (0.0, 0.0, 1.0)),
+    "RightFoot": ((32,), (0.0, 0.0, 1.0)),
+}
+
+# Leaf joints that are aimed at their end site; the head is oriented by
+# its ears and nose instead.
+_AIMED_AT_END = ("LeftHand", "RightHand", "LeftFoot", "RightFoot")
+
+
+@dataclass
+class MotionClip:
+    """Solved animation: one root position and one local rotation per joint per frame."""
+
+    joints: Tuple[BvhJoint, ...]
+    offsets: np.ndarray  # (joints, 3) from the parent, metres
+    end_sites: Dict[str, np.ndarray]  # joint name -> (3,) offset, metres
+    root_positions: np.ndarray  # (frames, 3) metres
+    rotations: np.ndarray  # (frames, joints, 3) Z, X, Y Euler angles in degrees
+    fps: float
+
+    @property
+    def frames(self) -> int:
+        return len(self.root_positions)
+
+
+# --- Solving ---------------------------------------------------------------
+
+
+def fill_gaps(
+    points: np.ndarray, confidence: Optional[np.ndarray] = None, min_confidence: float = 0.5
+) -> np.ndarray:
+    """Interpolate missing (NaN) and low-confidence joints over time.
+
+    ``points`` is ``(frames, joints, 3)``. A joint that is never confident
+    keeps its measured values; the ends of the clip hold the nearest good
+    frame.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    found = np.isfinite(points).all(axis=-1)
+    if not found.any():
+        raise ValueError("No body was found in any frame")
+    trusted = found if confidence is None else found & (np.nan_to_num(confidence) >= min_confidence)
+    result = points.copy()
+    frames = np.arange(len(points))
+    for joint in range(points.shape[1]):
+        valid = trusted[:, joint] if trusted[:, joint].any() else found[:, joint]
+        if valid.all() or not valid.any():
+            continue
+        for axis in range(3):
+            result[:, joint, axis] = np.interp(frames, frames[valid], points[valid, joint, axis])
+    return result
+
+
+def smooth(points: np.ndarray, window: int) -> np.ndarray:
+    """Centred moving average over ``window`` frames; no lag, ends padded."""
+    if window <= 1 or len(points) < 2:
+        return points
+    before = (window - 1) // 2
+    padded = np.pad(points, [(before, window - 1 - before)] + [(0, 0)] * (points.ndim - 1), mode="edge")
+    sums = np.cumsum(padded, axis=0)
+    sums = np.concatenate([np.zeros_like(sums[:1]), sums])
+    return (sums[window:] - sums[:-window]) / window
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-9)
+
+
+def _frame(first: np.ndarray, second: np.ndarray, axes: str) -> np.ndarray:
+    """Rotations whose ``axes[0]`` axis is ``first`` and ``axes[1]`` axis leans to ``second``."""
+    a = _unit(first)
+    b = _unit(second - a * (second * a).sum(axis=-1, keepdims=True))
+    i, j = "xyz".index(axes[0]), "xyz".index(axes[1])
+    c = np.cross(a, b) if (j - i) % 3 == 1 else np.cross(b, a)
+    frame = np.empty(a.shape[:-1] + (3, 3))
+    frame[..., :, i] = a
+    frame[..., :, j] = b
+    frame[..., :, 3 - i - j] = c
+    return frame
+
+
+def _align(rest: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Shortest rotations taking unit ``rest`` (3,) onto each of ``target`` (n, 3)."""
+    target = _unit(target)
+    v = np.cross(rest, target)
+    c = target @ rest
+    skew = np.zeros(target.shape[:-1] + (3, 3))
+    skew[..., 0, 1], skew[..., 0, 2] = -v[..., 2], v[..., 1]
+    skew[..., 1, 0], skew[..., 1, 2] = v[..., 2], -v[..., 0]
+    skew[..., 2, 0], skew[..., 2, 1] = -v[..., 1], v[..., 0]
+    opposite = c < -1.0 + 1e-9
+    scale = 1.0 / np.where(opposite, 1.0, 1.0 + c)
+    rotation = np.eye(3) + skew + (skew @ skew) * scale[..., None, None]
+    if opposite.any():
+        # Half turn about any axis perpendicular to ``rest``.
+        axis = _unit(np.cross(rest, np.eye(3)[np.argmin(np.abs(rest))]))
+        rotation[opposite] = 2.0 * np.outer(axis, axis) - np.eye(3)
+    return rotation
+
+
+def euler_zxy(rotations: np.ndarray) -> np.ndarray:
+    """Z, X, Y angles in radians of ``Rz @ Rx @ Ry`` matrices ``(..., 3, 3)``."""
+    x = np.arcsin(np.clip(rotations[..., 2, 1], -1.0, 1.0))
+    z = np.arctan2(-rotations[..., 0, 1], rotations[..., 1, 1])
+    y = np.arctan2(-rotations[..., 2, 0], rotations[..., 2, 2])
+    return np.stack([z, x, y], axis=-1)
+
+
+def euler_zxy_matrix(angles: np.ndarray) -> np.ndarray:
+    """Inverse of ``euler_zxy``."""
+    z, x, y = np.moveaxis(np.asarray(angles, dtype=np.float64), -1, 0)
+    cz, sz, cx, sx, cy, sy = np.cos(z), np.sin(z), np.cos(x), np.sin(x), np.cos(y), np.sin(y)
+    return np.stack(
+        [
+            np.stack([cz * cy - sz * sx * sy, -sz * cx, cz * sy + sz * sx * cy], axis=-1),
+            np.stack([sz * cy + cz * sx * sy, cz * cx, sz * sy - cz * sx * cy], axis=-1),
+            np.stack([-cx * sy, sx, cx * cy], axis=-1),
+        ],
+        axis=-2,
+    )
+
+
+def _mean(points: np.ndarray, landmarks: Sequence[int]) -> np.ndarray:
+    return points[:, list(landmarks), :].mean(axis=1)
+
+
+def solve_motion(
+    points: np.ndarray,
+    fps: float,
+    confidence: Optional[np.ndarray] = None,
+    min_confidence: float = 0.5,
+    smooth_frames: int = 1,
+) -> MotionClip:
+    """Solve ``SKELETON`` rotations for ``(frames, 33, 3)`` world landmarks.
+
+    Every step works on the whole clip at once; the only Python loop is
+    over the 15 joints.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 3 or points.shape[1:] != (POSE_LANDMARK_COUNT, 3):
+        raise ValueError(f"Expected (frames, {POSE_LANDMARK_COUNT}, 3) landmarks, got {points.shape}")
+    points = smooth(fill_gaps(points, confidence, min_confidence), smooth_frames) * TO_BVH_AXES
+
+    positions = {joint.name: _mean(points, joint.landmarks) for joint in SKELETON}
+    ends = {name: _mean(points, landmarks) for name, (landmarks, _) in END_SITES.items()}
+    children: Dict[str, List[BvhJoint]] = {}
+    for joint in SKELETON:
+        children.setdefault(joint.parent, []).append(joint)
+
+    def median_length(start: np.ndarray, end: np.ndarray) -> float:
+        return float(robust_lengths(np.linalg.norm(end - start, axis=-1)[:, None])[0])
+
+    offsets = np.zeros((len(SKELETON), 3))
+    for row, joint in enumerate(SKELETON):
+        if joint.parent is not None:
+            length = median_length(positions[joint.parent], positions[joint.name])
+            offsets[row] = np.array(joint.rest_direction) * length
+    end_sites = {
+        name: np.array(direction) * median_length(positions[name], ends[name])
+        for name, (_, direction) in END_SITES.items()
+    }
+
+    head = positions["Head"]
+    orientations = {
+        "Hips": _frame(
+            positions["Chest"] - positions["Hips"],
+            positions["LeftUpLeg"] - positions["RightUpLeg"],
+            "yx",
+        ),
+        "Chest": _frame(positions["LeftArm"] - positions["RightArm"], head - positions["Chest"], "xy"),
+        "Head": _frame(points[:, 7] - points[:, 8], ends["Head"] - head, "xz"),
+    }
+    local = np.empty((len(points), len(SKELETON), 3, 3))
+    for row, joint in enumerate(SKELETON):
+        parent = orientations.get(joint.parent)
+        if joint.name not in orientations:
+            if joint.name in _AIMED_AT_END:
+                aim, rest = ends[joint.name], END_SITES[joint.name][1]
+            else:
+                # Limb joints have exactly one child.
+                (child,) = children[joint.name]
+                aim, rest = positions[child.name], child.rest_direction
+            target = np.einsum("fji,fj->fi", parent, aim - positions[joint.name])
+            orientations[joint.name] = parent @ _align(np.array(rest), target)
+        orientation = orientations[joint.name]
+        local[:, row] = orientation if parent is None else np.swapaxes(parent, -1, -2) @ orientation
+
+    # Unwrapping keeps every channel continuous; a full turn is the same rotation.
+    angles = np.degrees(np.unwrap(euler_zxy(local), axis=0))
+    return MotionClip(SKELETON, offsets, end_sites, positions["Hips"], angles, float(fps))
+
+
+def forward_kinematics(clip: MotionClip) -> Dict[str, np.ndarray]:
+    """``(frames, 3)`` joint positions in metres, BVH axes; for checking a solve."""
+    rotations = euler_zxy_matrix(np.radians(clip.rotations))
+    globals_: Dict[str, np.ndarray] = {}
+    positions: Dict[str, np.ndarray] = {}
+    for row, joint in enumerate(clip.joints):
+        if joint.parent is None:
+            globals_[joint.name] = rotations[:, row]
+            positions[joint.name] = clip.root_positions
+            continue
+        parent = globals_[joint.parent]
+        globals_[joint.name] = parent @ rotations[:, row]
+        positions[joint.name] = positions[joint.parent] + parent @ clip.offsets[row]
+    for name, offset in clip.end_sites.items():
+        positions[f"{name}_end"] = positions[name] + globals_[name] @ offset
+    return positions
+
+
+# --- Writing ---------------------------------------------------------------
+
+
+def write_bvh(clip: MotionClip, path: str, scale: float = 100.0) -> None:
+    """Write ``clip`` as BVH; ``scale`` converts metres (to centimetres by default)."""
+    lines = ["HIERARCHY"]
+
+    def joint_lines(row: int, depth: int) -> None:
+        joint = clip.joints[row]
+        indent = "\t" * depth
+        offset = " ".join(f"{value:.6f}" for value in clip.offsets[row] * scale)
+        if joint.parent is None:
+            lines.append(f"{indent}ROOT {joint.name}")
+            channels = "CHANNELS 6 Xposition Yposition Zposition Zrotation Xrotation Yrotation"
+        else:
+            lines.append(f"{indent}JOINT {joint.name}")
+            channels = "CHANNELS 3 Zrotation Xrotation Yrotation"
+        lines.extend([f"{indent}{{", f"{indent}\tOFFSET {offset}", f"{indent}\t{channels}"])
+        for child, other in enumerate(clip.joints):
+            if other.parent == joint.name:
+                joint_lines(child, depth + 1)
+        if joint.name in clip.end_sites:
+            end = " ".join(f"{value:.6f}" for value in clip.end_sites[joint.name] * scale)
+            lines.extend(
+                [f"{indent}\tEnd Site", f"{indent}\t{{", f"{indent}\t\tOFFSET {end}", f"{indent}\t}}"]
+            )
+        lines.append(f"{indent}}}")
+
+    joint_lines(0, 0)
+    lines.extend(["MOTION", f"Frames: {clip.frames}", f"Frame Time: {1.0 / clip.fps:.6f}"])
+    # Channels are written in hierarchy order, which is ``SKELETON`` order
+    # only when children follow their parents depth first.
+    order = _hierarchy_order(clip.joints)
+    values = np.concatenate(
+        [clip.root_positions[:, None, :] * scale, clip.rotations[:, order]], axis=1
+    ).reshape(clip.frames, -1)
+    _write_text(path, "\n".join(lines) + "\n", values, delimiter=" ")
+
+
+def _hierarchy_order(joints: Sequence[BvhJoint]) -> List[int]:
+    order: List[int] = []
+
+    def visit(row: int) -> None:
+        order.append(row)
+        for child, joint in enumerate(joints):
+            if joint.parent == joints[row].name:
+                visit(child)
+
+    visit(0)
+    return order
+
+
+def write_csv(clip: MotionClip, path: str, scale: float = 100.0) -> None:
+    """Write the BVH channels as CSV: frame, time, root position, then Z/X/Y per joint."""
+    names = ["frame", "time", "Hips_x", "Hips_y", "Hips_z"]
+    for joint in clip.joints:
+        names.extend(f"{joint.name}_{axis}rot" for axis in "zxy")
+    frames = np.arange(clip.frames)
+    values = np.column_stack(
+        [frames, frames / clip.fps, clip.root_positions * scale, clip.rotations.reshape(clip.frames, -1)]
+    )
+    _write_text(path, ",".join(names) + "\n", values, delimiter=",")
+
+
+def _write_text(path: str, header: str, values: np.ndarray, delimiter: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as handle:
+        handle.write(header)
+        np.savetxt(handle, values, fmt="%.4f", delimiter=delimiter)
+
+
+# --- Extraction ------------------------------------------------------------
+
+
+def default_body_estimator(model_complexity: int):
+    """Tracking body estimator for one chunk."""
+    from body_pose_estimator import BodyPoseEstimator
+
+    return BodyPoseEstimator(model_complexity=model_complexity)
+
+
+@dataclass
+class ExtractOptions:
+    """How videos are split across workers. Must be picklable."""
+
+    chunk_frames: int = 300
+    overlap: int = 30
+    model_complexity: int = 1
+    estimator: Callable[[int], Any] = default_body_estimator
+
+
+# (first frame read, first frame kept, end or None for the end of the video)
+Chunk = Tuple[int, int, Optional[int]]
+
+
+def plan_chunks(frame_count: int, chunk_frames: int, overlap: int) -> List[Chunk]:
+    """Split ``frame_count`` frames; the last chunk reads to the end of the video.
+
+    Container frame counts are estimates, so an unknown or short count
+    still reads every frame.
+    """
+    chunk_frames = max(1, int(chunk_frames))
+    if frame_count <= chunk_frames:
+        return [(0, 0, None)]
+    chunks: List[Chunk] = []
+    for start in range(0, frame_count, chunk_frames):
+        stop: Optional[int] = start + chunk_frames
+        if stop >= frame_count:
+            stop = None
+        chunks.append((max(0, start - max(0, overlap)), start, stop))
+    return chunks
+
+
+def _extract_chunk(
+    path: str, chunk: Chunk, options: ExtractOptions
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """``(start, points, confidence)`` of the kept frames of one chunk."""
+    import cv2
+
+    first, start, stop = chunk
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"{path} is not a readable video")
+    if first:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+    body = options.estimator(options.model_complexity)  # fresh tracking per chunk
+    missing = np.full((POSE_LANDMARK_COUNT, 3), np.nan, dtype=np.float32)
+    points: List[np.ndarray] = []
+    confidence: List[np.ndarray] = []
+    index = first
+    try:
+        while stop is None or index < stop:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            result = body.get_body_pose(frame)
+            if index >= start:
+                world = result.world_landmarks if result else None
+                array = landmarks_to_array(world) if world else None
+                scores = landmark_confidence(world) if world else None
+                points.append(missing if array is None else array)
+                confidence.append(
+                    np.ones(POSE_LANDMARK_COUNT, np.float32) if scores is None else scores
+                )
+            index += 1
+    finally:
+        capture.release()
+        body.close()
+    if not points:
+        return start, np.empty((0, POSE_LANDMARK_COUNT, 3), np.float32), np.empty(
+            (0, POSE_LANDMARK_COUNT), np.float32
+        )
+    return start, np.stack(points), np.stack(confidence)
+
+
+def extract_video(
+    path: str, workers: Optional[int] = None, options: Optional[ExtractOptions] = None
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """``(points, confidence, fps)`` of the world landmarks in every frame of ``path``.
+
+    Frames without a body are NaN. ``workers=0`` runs in this process.
+    """
+    import cv2
+
+    options = options or ExtractOptions()
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"{path} is not a readable video")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    chunks = plan_chunks(frame_count, options.chunk_frames, options.overlap)
+
+    if workers == 0 or len(chunks) == 1:
+        parts = [_extract_chunk(path, chunk, options) for chunk in chunks]
+    else:
+        import multiprocessing
+
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        # MediaPipe starts threads of its own; spawn rather than fork them.
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [executor.submit(_extract_chunk, path, chunk, options) for chunk in chunks]
+            parts = [future.result() for future in futures]
+
+    parts.sort(key=lambda part: part[0])
+    points = np.concatenate([part[1] for part in parts])
+    confidence = np.concatenate([part[2] for part in parts])
+    return points, confidence, float(fps)
+
+
+def export_video(
+    path: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    options: Optional[ExtractOptions] = None,
+    smooth_frames: int = 1,
+    min_confidence: float = 0.5,
+    scale: float = 100.0,
+    csv: bool = True,
+) -> MotionClip:
+    """Extract, solve and write ``<output_dir>/<video stem>.bvh`` (and ``.csv``)."""
+    started = time.perf_counter()
+    points, confidence, fps = extract_video(path, workers, options)
+    extracted = time.perf_counter()
+    clip = solve_motion(points, fps, confidence, min_confidence, smooth_frames)
+    stem = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    write_bvh(clip, stem + ".bvh", scale)
+    if csv:
+        write_csv(clip, stem + ".csv", scale)
+    finished = time.perf_counter()
+    print(
+        f"[mocap] {path}: {clip.frames} frames in {extracted - started:.1f} s "
+        f"({clip.frames / max(extracted - started, 1e-9):.1f} frames/s), "
+        f"solved in {finished - extracted:.2f} s -> {stem}.bvh"
+    )
+    return clip
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("videos", nargs="+", help="Video files to export.")
+    parser.add_argument("--output-dir", required=True, help="Folder for the .bvh and .csv files.")
+    parser.add_argument(
+        "--workers", type=int, help="Worker processes; defaults to the CPU count, 0 runs in-process."
+    )
+    parser.add_argument("--chunk-frames", type=int, default=300, help="Frames per work item.")
+    parser.add_argument(
+        "--overlap", type=int, default=30, help="Warm-up frames read before each chunk and dropped."
+    )
+    parser.add_argument("--model-complexity", type=int, default=1, choices=(0, 1, 2))
+    parser.add_argument("--smooth", type=int, default=1, help="Centred moving average, in frames.")
+    parser.add_argument("--min-confidence", type=float, default=0.5)
+    parser.add_argument("--scale", type=float, default=100.0, help="Units per metre (100 = cm).")
+    parser.add_argument("--no-csv", action="store_true", help="Only write BVH files.")
+    args = parser.parse_args(argv)
+    options = ExtractOptions(args.chunk_frames, args.overlap, args.model_complexity)
+    for video in args.videos:
+        export_video(
+            video,
+            args.output_dir,
+            args.workers,
+            options,
+            smooth_frames=args.smooth,
+            min_confidence=args.min_confidence,
+            scale=args.scale,
+            csv=not args.no_csv,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""asyncio runtime for the network side of the backend.
+
+One event loop runs in a dedicated daemon thread (``get_runtime``) and owns
+every socket: outbound pose streams, subscriber connections and the
+control channel. The frame loop hands payloads over with ``publish``,
+which only schedules a callback on the loop and never waits for a peer.
+
+Each peer keeps only the newest payload. A peer that is slower than the
+camera skips frames, and one whose socket stops draining for
+``stall_timeout`` seconds is disconnected. Frame processing never waits
+on the network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from payload_schema import accepted_version, check_version, encode_payload, hello_message
+
+# Written bytes a peer may have in flight before writes wait for it to drain.
+WRITE_BUFFER_HIGH = 64 * 1024
+
+_Item = Tuple[Optional[Dict[str, Any]], Dict[Optional[int], bytes]]
+
+
+class NetworkRuntime:
+    """An event loop running in its own thread."""
+
+    def __init__(self, name: str = "pose-network") -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def run(self, coroutine: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run ``coroutine`` on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Schedule ``callback`` on the loop; safe from any thread."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def close(self) -> None:
+        if not self.is_running:
+            return
+
+        async def cancel_all() -> None:
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.run(cancel_all(), timeout=5.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5.0)
+        self.loop.close()
+
+
+_runtime: Optional[NetworkRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> NetworkRuntime:
+    """The process-wide runtime, started on first use."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or not _runtime.is_running:
+            _runtime = NetworkRuntime()
+        return _runtime
+
+
+class _Peer:
+    """One connection that receives the stream. Lives on the loop."""
+
+    def __init__(self, writer: asyncio.StreamWriter, version: int) -> None:
+        self.writer = writer
+        self.version = version
+        self.item: Optional[_Item] = None
+        self.wake = asyncio.Event()
+
+
+class AsyncPoseSender:
+    """Streams pose payloads from the network thread.
+
+    With ``connect`` the sender keeps a connection to the Unity listener
+    at ``host``:``port`` and reconnects with backoff. With
+    ``subscriber_port`` it also accepts any number of subscribers. Every
+    connection gets the same ``hello`` handshake, greeting and payloads as
+    ``PoseSender``, encoded for the schema version that peer agreed to.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 25001,
+        connect: bool = True,
+        subscriber_host: str = "127.0.0.1",
+        subscriber_port: Optional[int] = None,
+        greeting: Optional[str] = None,
+        schema_version: Optional[int] = None,
+        connect_timeout: float = 2.0,
+        handshake_timeout: float = 0.5,
+        stall_timeout: float = 1.0,
+        runtime: Optional[NetworkRuntime] = None,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._greeting = greeting
+        self._fixed_version = None if schema_version is None else check_version(schema_version)
+        self._connect_timeout = connect_timeout
+        self._handshake_timeout = handshake_timeout
+        self._stall_timeout = stall_timeout
+        self._runtime = runtime or get_runtime()
+        self._peers: Set[_Peer] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._closed = False
+        # Running totals, read by the pipeline metrics.
+        self.bytes_sent = 0
+        self.payloads_sent = 0
+        self.connections = 0
+        self.subscriber_address: Optional[Tuple[str, int]] = self._runtime.run(
+            self._start(connect, subscriber_host, subscriber_port), timeout=5.0
+        )
+
+    @property
+    def peer_count(self) -> int:
+        return len(self._peers)
+
+    def publish(
+        self,
+        frame: Optional[Dict[str, Any]],
+        payload: str,
+        version: Optional[int] = None,
+    ) -> None:
+        """Hand a payload to every peer; returns at once.
+
+        ``frame`` is the dict ``payload`` was encoded from with ``version``;
+        it is re-encoded for peers that agreed to another version.
+        """
+        if self._closed or not payload:
+            return
+        self._runtime.call_soon(self._deliver, (frame, {version: payload.encode("utf-8")}))
+
+    def send(self, payload: str) -> None:
+        """Send a payload as is, like ``PoseSender.send``."""
+        self.publish(None, payload)
+
+    def set_greeting(self, greeting: Optional[str]) -> None:
+        """Set a message sent first on every new connection, and to open ones now."""
+        self._greeting = greeting
+        if greeting and not self._closed:
+            self._runtime.call_soon(self._greet_open_peers, greeting)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._runtime.is_running:
+            self._runtime.run(self._stop(), timeout=5.0)
+
+    # Everything below runs on the loop.
+
+    async def _start(
+        self, connect: bool, subscriber_host: str, subscriber_port: Optional[int]
+    ) -> Optional[Tuple[str, int]]:
+        if connect:
+            self._spawn(self._connect_loop())
+        if subscriber_port is None:
+            return None
+        self._server = await asyncio.start_server(
+            self._accept, subscriber_host, subscriber_port
+        )
+        return self._server.sockets[0].getsockname()[:2]
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        # Python < 3.12 ``wait_for`` can swallow a cancellation that races
+        # with the drain it wraps, so also wake every peer and let the loops
+        # see ``_closed``.
+        for peer in list(self._peers):
+            peer.writer.transport.abort()
+            peer.wake.set()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def _deliver(self, item: _Item) -> None:
+        for peer in self._peers:
+            peer.item = item  # replaces a payload the peer has not sent yet
+            peer.wake.set()
+
+    def _greet_open_peers(self, greeting: str) -> None:
+        for peer in self._peers:
+            peer.writer.write(greeting.encode("utf-8"))
+
+    def _encoded(self, item: _Item, version: int) -> bytes:
+        frame, encoded = item
+        data = encoded.get(version)
+        if data is None:
+            if frame is None:
+                data = next(iter(encoded.values()))
+            else:
+                data = encoded[version] = encode_payload(frame, version).encode("utf-8")
+        return data
+
+    async def _connect_loop(self) -> None:
+        delay = 0.25
+        while not self._closed:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._host, self._port), self._connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2.0, 2.0)
+                continue
+            delay = 0.25
+            await self._serve(reader, writer)
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._spawn(self._serve(reader, writer))
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = None
+        try:
+            writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+            peer = _Peer(writer, await self._negotiate(reader, writer))
+            if self._closed:
+                return
+            if self._greeting:
+                writer.write(self._greeting.encode("utf-8"))
+            self._peers.add(peer)
+            self.connections += 1
+            while True:
+                await peer.wake.wait()
+                peer.wake.clear()
+                item, peer.item = peer.item, None
+                if self._closed:
+                    return
+                data = self._encoded(item, peer.version)
+                writer.write(data)
+                await asyncio.wait_for(writer.drain(), self._stall_timeout)
+                self.bytes_sent += len(data)
+                self.payloads_sent += 1
+        except (OSError, asyncio.TimeoutError):
+            pass  # closed or stalled peer; the connect loop retries
+        finally:
+            if peer is not None:
+                self._peers.discard(peer)
+            writer.close()
+
+    async def _negotiate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> int:
+        if self._fixed_version is not None:
+            return self._fixed_version
+        writer.write(hello_message().encode("utf-8"))
+        await writer.drain()
+        try:
+            reply = await asyncio.wait_for(reader.read(256), self._handshake_timeout)
+        except asyncio.TimeoutError:
+            reply = b""
+        return accepted_version(reply.decode("utf-8", "replace"))
+
+
+class AsyncControlServer:
+    """Line-oriented control channel served from the runtime.
+
+    ``handle_line`` turns one request line into one reply line. It runs in
+    the loop's default executor, so a slow command (``switch`` opening
+    models) does not hold up other connections. After each reply the
+    connection is closed if ``should_close()`` is true.
+    """
+
+    def __init__(
+        self,
+        handle_line: Callable[[bytes], bytes],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        should_close: Optional[Callable[[], bool]] = None,
+        runtime: Optional[NetworkRuntime] = None,
+    ) -> None:
+        self._handle_line = handle_line
+        self._should_close = should_close or (lambda: False)
+        self._runtime = runtime or get_runtime()
+        self._connections: Set[asyncio.Task] = set()
+        self._server: asyncio.AbstractServer = self._runtime.run(
+            asyncio.start_server(self._accept, host, port), timeout=5.0
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.sockets[0].getsockname()[:2]
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.ensure_future(self._serve(reader, writer))
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if not line.strip():
+                    continue
+                reply = await loop.run_in_executor(None, self._handle_line, line)
+                writer.write(reply)
+                await writer.drain()
+                if self._should_close():
+                    return
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        if not self._runtime.is_running:
+            return
+
+        async def stop() -> None:
+            self._server.close()
+            tasks = list(self._connections)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._server.wait_closed()
+
+        self._runtime.run(stop(), timeout=5.0)
@@ -0,0 +1,68 @@
+"""Encode/decode throughput of the pose payload, per schema version.
+
+Usage:
+    python payload_benchmark.py [--frames 2000]
+
+The frame resembles the ``full`` preset: a world body with visibility, two
+hands, two hand states with kinematics, arm segments and a sequence match.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from payload_schema import MIN_SCHEMA_VERSION, SCHEMA_VERSION, decode_payload, encode_payload
+
+
+def sample_frame(seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    state = {
+        "x": 320.5, "y": 240.5, "dir": "left", "pointing": False, "gesture": "open_palm",
+        "score": 0.97, "ts": 12.3456, "vx": -812.4, "vy": 31.9, "ax": 90.1, "ay": -4.2,
+        "wvx": -0.41, "wvy": 0.02, "wvz": 0.01, "wax": 0.5, "way": 0.1, "waz": 0.0,
+        "events": [("swipe", "left", 12.3)],
+    }
+    return {
+        "body_world": np.column_stack([rng.normal(0, 0.4, (33, 3)), rng.integers(40, 101, 33)]),
+        "hands": [(f"hand{idx}", rng.uniform(0, 640, (21, 3))) for idx in range(2)],
+        "hand_states": [("left", state), ("right", dict(state, gesture="victory"))],
+        "metrics": {"body": 33, "hands": 42, "visible": 29},
+        "gesture": "left_hand_up",
+        "arm_segments": [
+            (name, {"dir": rng.normal(size=3)})
+            for name in (
+                "left_upper_arm", "left_lower_arm", "left_hand",
+                "right_upper_arm", "right_lower_arm", "right_hand", "head",
+            )
+        ],
+        "sequences": [("wave_right", {"conf": 0.62, "start": 11.2, "end": 12.1})],
+    }
+
+
+def _rate(function: Callable[[], Any], frames: int) -> float:
+    start = time.perf_counter()
+    for _ in range(frames):
+        function()
+    return frames / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    frame = sample_frame()
+    print(f"{'schema':>6} {'bytes':>6} {'encode/s':>10} {'decode/s':>10}")
+    for version in range(MIN_SCHEMA_VERSION, SCHEMA_VERSION + 1):
+        payload = encode_payload(frame, version)
+        encode_rate = _rate(lambda: encode_payload(frame, version), args.frames)
+        decode_rate = _rate(lambda: decode_payload(payload), args.frames)
+        print(f"{version:>6} {len(payload):>6} {encode_rate:>10.0f} {decode_rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Schema of the pose payload sent to Unity.
+
+A payload is one string of ``|``-separated sections, each starting with a
+``name:`` header. ``SECTIONS`` describes every section: its layout, field
+types and decimal precision. The encoders are generated from it (Python
+source compiled once at import, one function per schema version), and
+``decode_payload`` is the reference decoder that ``MyListener.cs``
+mirrors. Change the format here, not in the formatter or the listener.
+
+Layouts:
+
+- ``text``: ``gesture:both_hands_up``.
+- ``properties``: ``key=value`` pairs joined by ``,``. Optional fields are
+  left out when unknown; decoders ignore keys they do not know.
+- ``points``: one row per landmark, rows joined by ``;``, values by ``,``.
+  Trailing optional columns (e.g. visibility) may be missing.
+- ``groups``: ``key:entry`` items joined by ``|``, each entry laid out as
+  ``entries``; the group runs until the next known section header.
+
+Versions:
+
+1. Landmark rows carry their index (``3:0.1,0.2,0.3``), as the payload did
+   before the schema existed.
+2. Landmark rows are positional (``0.1,0.2,0.3``), about 3 bytes less per
+   landmark.
+
+A version only fixes the row layout. Columns, keys and sections added
+since (landmark visibility, ``visible=`` in ``metrics``, hand-state
+kinematics and events, ``sequences``) are sent in every version, so
+version 1 is not the original payload byte for byte; listeners must skip
+what they do not know.
+
+On connect the sender offers ``hello:schema=<newest>,min=<oldest>`` and a
+listener answers ``hello:schema=<chosen>``. A listener that does not answer
+predates the handshake and gets version 1.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+SCHEMA_VERSION = 2
+MIN_SCHEMA_VERSION = 1
+# First version whose landmark rows are positional.
+POSITIONAL_POINTS_SINCE = 2
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str
+    kind: str  # "int", "float", "str", "flag", "vec" or "events"
+    precision: int = 0
+    optional: bool = False
+    size: int = 1  # components of a "vec"
+    separator: str = ","  # between "vec" components
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    layout: str  # "text", "properties", "points" or "groups"
+    fields: Tuple[Field, ...] = ()
+    entries: str = ""  # layout of each group entry
+
+
+def _xyz(precisions: Sequence[int]) -> Tuple[Field, ...]:
+    return tuple(Field(axis, "float", precision) for axis, precision in zip("xyz", precisions))
+
+
+_CONFIDENCE = Field("confidence", "int", optional=True)  # visibility in whole percent
+
+
+def _optional(names: str, precision: int) -> Tuple[Field, ...]:
+    return tuple(Field(name, "float", precision, optional=True) for name in names.split())
+
+
+# Sections in payload order.
+SECTIONS: Tuple[Section, ...] = (
+    Section("hello", "properties", (Field("schema", "int"), Field("min", "int", optional=True))),
+    Section("status", "text"),
+    Section("body_world", "points", _xyz((5, 5, 5)) + (_CONFIDENCE,)),
+    Section("body_image", "points", _xyz((1, 1, 1)) + (_CONFIDENCE,)),
+    Section("hands", "groups", _xyz((1, 1, 5)), entries="points"),
+    Section(
+        "hand_states",
+        "groups",
+        (
+            Field("x", "float", 1),
+            Field("y", "float", 1),
+            Field("dir", "str"),
+            Field("pointing", "flag"),
+            Field("gesture", "str"),
+            Field("score", "float", 2, optional=True),
+            Field("ts", "float", 4, optional=True),
+        )
+        + _optional("vx vy ax ay", 1)
+        + _optional("wvx wvy wvz wax way waz", 4)
+        + tuple(
+            Field(f"t{tip}v", "vec", 1, optional=True, size=2, separator=";")
+            for tip in (4, 8, 12, 16, 20)
+        )
+        + (Field("events", "events", 4, optional=True),),
+        entries="properties",
+    ),
+    Section(
+        "metrics",
+        "properties",
+        (Field("body", "int"), Field("hands", "int"), Field("visible", "int", optional=True)),
+    ),
+    Section("gesture", "text"),
+    Section("arm_segments", "groups", (Field("dir", "vec", 5, size=3),), entries="properties"),
+    Section(
+        "sequences",
+        "groups",
+        (Field("conf", "float", 3), Field("start", "float", 4), Field("end", "float", 4)),
+        entries="properties",
+    ),
+)
+SECTIONS_BY_NAME: Dict[str, Section] = {section.name: section for section in SECTIONS}
+
+
+class PayloadSchemaError(ValueError):
+    """Raised for an unsupported schema version."""
+
+
+def check_version(version: int) -> int:
+    if not MIN_SCHEMA_VERSION <= version <= SCHEMA_VERSION:
+        raise PayloadSchemaError(
+            f"Payload schema version {version} is not supported "
+            f"(expected {MIN_SCHEMA_VERSION}..{SCHEMA_VERSION})"
+        )
+    return version
+
+
+# --- Encoder generation -----------------------------------------------------
+
+
+def _conversion(field: Field) -> str:
+    if field.kind == "int":
+        return "%d"
+    if field.kind == "float":
+        return f"%.{field.precision}f"
+    return "%s"
+
+
+def _value_expression(field: Field, value: str) -> str:
+    key = field.name
+    if field.kind == "flag":
+        return f"({key + '=1'!r} if {value} else {key + '=0'!r})"
+    if field.kind == "vec":
+        template = field.separator.join([f"%.{field.precision}f"] * field.size)
+        return f"{key + '=' + template!r} % tuple({value})"
+    if field.kind == "events":
+        return f"{key + '='!r} + _events({value}, {field.precision})"
+    if field.kind == "str":
+        return f"{key + '='!r} + str({value})"
+    return f"{key + '=' + _conversion(field)!r} % {value}"
+
+
+_PRESENT = {
+    "float": "value is not None and _finite(value)",
+    "vec": "value is not None and _all_finite(value)",
+    "events": "value",
+}
+
+
+def _properties_source(name: str, fields: Sequence[Field]) -> List[str]:
+    lines = [f"def {name}(v):", "    parts = []"]
+    for field in fields:
+        if field.optional:
+            lines.append(f"    value = v.get({field.name!r})")
+            lines.append(f"    if {_PRESENT.get(field.kind, 'value is not None')}:")
+            lines.append(f"        parts.append({_value_expression(field, 'value')})")
+        else:
+            lines.append(f"    parts.append({_value_expression(field, f'v[{field.name!r}]')})")
+    lines.append("    return ','.join(parts)")
+    return lines
+
+
+def _points_source(name: str, fields: Sequence[Field], version: int) -> List[str]:
+    required = sum(1 for field in fields if not field.optional)
+    templates = [
+        ",".join(_conversion(field) for field in fields[:width])
+        for width in range(required, len(fields) + 1)
+    ]
+    lines = [
+        f"def {name}(rows):",
+        "    rows = _rows(rows)",
+        "    if not rows:",
+        "        return ''",
+        f"    template = {templates!r}[len(rows[0]) - {required}]",
+    ]
+    if version >= POSITIONAL_POINTS_SINCE:
+        lines.append("    return ';'.join([template % tuple(row) for row in rows])")
+    else:
+        lines.append("    template = '%d:' + template")
+        lines.append(
+            "    return ';'.join([template % ((idx,) + tuple(row)) for idx, row in enumerate(rows)])"
+        )
+    return lines
+
+
+def _encoder_source(version: int) -> str:
+    lines: List[str] = []
+    calls: List[Tuple[Section, str]] = []
+    for section in SECTIONS:
+        name = f"_{section.name}_v{version}"
+        if section.layout == "properties":
+            lines += _properties_source(name, section.fields)
+        elif section.layout == "points":
+            lines += _points_source(name, section.fields, version)
+        elif section.layout == "groups":
+            entry = f"_{section.name}_entry_v{version}"
+            if section.entries == "points":
+                lines += _points_source(entry, section.fields, version)
+            else:
+                lines += _properties_source(entry, section.fields)
+            lines += [
+                f"def {name}(groups):",
+                f"    return '|'.join([str(key) + ':' + {entry}(value) for key, value in _items(groups)])",
+            ]
+        calls.append((section, name))
+
+    lines += [f"def encode_v{version}(frame):", "    out = []"]
+    for section, name in calls:
+        lines.append(f"    value = frame.get({section.name!r})")
+        if section.layout == "text":
+            lines.append("    if value is not None and value != '':")
+            lines.append(f"        out.append({section.name + ':'!r} + str(value))")
+        else:
+            check = "len(value)" if section.layout == "points" else "value"
+            lines.append(f"    if value is not None and {check}:")
+            lines.append(f"        out.append({section.name + ':'!r} + {name}(value))")
+    lines.append("    return '|'.join(out)")
+    return "\n".join(lines) + "\n"
+
+
+def _finite(value: float) -> bool:
+    return math.isfinite(value)
+
+
+def _all_finite(values: Sequence[float]) -> bool:
+    return all(math.isfinite(value) for value in values)
+
+
+def _rows(rows: Any) -> List[Sequence[Any]]:
+    tolist = getattr(rows, "tolist", None)
+    return tolist() if tolist is not None else list(rows)
+
+
+def _items(groups: Any):
+    return groups.items() if isinstance(groups, dict) else groups
+
+
+def _events(events: Sequence[Tuple[str, Optional[str], float]], precision: int) -> str:
+    return "+".join(
+        f"{kind}{'_' + direction if direction else ''}@{onset:.{precision}f}"
+        for kind, direction, onset in events
+    )
+
+
+def _compile_encoders() -> Dict[int, Callable[[Dict[str, Any]], str]]:
+    namespace: Dict[str, Any] = {
+        "_finite": _finite,
+        "_all_finite": _all_finite,
+        "_rows": _rows,
+        "_items": _items,
+        "_events": _events,
+    }
+    encoders = {}
+    for version in range(MIN_SCHEMA_VERSION, SCHEMA_VERSION + 1):
+        exec(compile(_encoder_source(version), f"<payload schema v{version}>", "exec"), namespace)
+        encoders[version] = namespace[f"encode_v{version}"]
+    return encoders
+
+
+ENCODERS = _compile_encoders()
+
+
+def encode_payload(frame: Dict[str, Any], version: int = SCHEMA_VERSION) -> str:
+    """Encode a frame: a dict of section name -> value (see ``SECTIONS``).
+
+    Values are a string for ``text`` sections, a dict for ``properties``,
+    an ``(N, columns)`` array or row list for ``points``, and a dict or
+    list of ``(key, entry)`` pairs for ``groups``. Missing, None and empty
+    sections are left out.
+    """
+    return ENCODERS[check_version(version)](frame)
+
+
+# --- Reference decoder ------------------------------------------------------
+
+
+def _header(token: str) -> Optional[Section]:
+    name, colon, _ = token.partition(":")
+    return SECTIONS_BY_NAME.get(name) if colon else None
+
+
+def _parse_value(field: Field, text: str) -> Any:
+    if field.kind == "int":
+        return int(float(text))
+    if field.kind == "float":
+        return float(text)
+    if field.kind == "flag":
+        return text == "1" or text.lower() == "true"
+    if field.kind == "vec":
+        return tuple(float(part) for part in text.split(field.separator))
+    if field.kind == "events":
+        events = []
+        for item in text.split("+"):
+            label, _, onset = item.partition("@")
+            kind, _, direction = label.partition("_")
+            events.append((kind, direction or None, float(onset)))
+        return events
+    return text
+
+
+def _decode_properties(text: str, fields: Sequence[Field]) -> Dict[str, Any]:
+    # Values such as "dir=1,2,3" contain the pair separator, so tokens
+    # without "=" belong to the previous value.
+    pairs: List[List[str]] = []
+    for token in text.split(","):
+        key, equals, value = token.partition("=")
+        if equals:
+            pairs.append([key, value])
+        elif pairs:
+            pairs[-1][1] += "," + token
+    known = {field.name: field for field in fields}
+    return {key: _parse_value(known[key], value) for key, value in pairs if key in known}
+
+
+def _decode_points(text: str, fields: Sequence[Field]) -> List[Tuple[Any, ...]]:
+    rows: Dict[int, Tuple[Any, ...]] = {}
+    for position, entry in enumerate(filter(None, text.split(";"))):
+        index, colon, values = entry.partition(":")
+        if not colon:
+            index, values = str(position), entry
+        parts = values.split(",")
+        rows[int(index)] = tuple(_parse_value(field, part) for field, part in zip(fields, parts))
+    return [rows[index] for index in sorted(rows)]
+
+
+def decode_payload(text: str) -> Dict[str, Any]:
+    """Decode a payload of any supported version into the ``encode_payload`` form.
+
+    Group sections decode to lists of ``(key, entry)`` pairs and points to
+    lists of row tuples. Unknown sections and keys are skipped.
+    """
+    frame: Dict[str, Any] = {}
+    tokens = text.strip().split("|")
+    index = 0
+    while index < len(tokens):
+        token = tokens[index].strip()
+        index += 1
+        section = _header(token)
+        if section is None:
+            continue
+        body = token[len(section.name) + 1 :]
+        if section.layout == "text":
+            frame[section.name] = body
+        elif section.layout == "properties":
+            frame[section.name] = _decode_properties(body, section.fields)
+        elif section.layout == "points":
+            frame[section.name] = _decode_points(body, section.fields)
+        else:
+            items = [body] if body else []
+            while index < len(tokens) and _header(tokens[index].strip()) is None:
+                if tokens[index].strip():
+                    items.append(tokens[index].strip())
+                index += 1
+            entries = []
+            for item in items:
+                key, _, entry = item.partition(":")
+                if section.entries == "points":
+                    entries.append((key, _decode_points(entry, section.fields)))
+                else:
+                    entries.append((key, _decode_properties(entry, section.fields)))
+            frame[section.name] = entries
+    return frame
+
+
+# --- Handshake --------------------------------------------------------------
+
+
+def hello_message() -> str:
+    """The offer a sender makes on connect."""
+    return encode_payload(
+        {"hello": {"schema": SCHEMA_VERSION, "min": MIN_SCHEMA_VERSION}}
+    ) + "|"
+
+
+def accepted_version(reply: str) -> int:
+    """The version to use given the listener's reply ("" when it sent none)."""
+    hello = decode_payload(reply).get("hello") if reply else None
+    if not hello or "schema" not in hello:
+        return MIN_SCHEMA_VERSION
+    return min(max(hello["schema"], MIN_SCHEMA_VERSION), SCHEMA_VERSION)
@@ -0,0 +1,668 @@
+"""Build and run a pose pipeline from a declarative definition."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from pipeline_metrics import PipelineMetrics
+from pipeline_profiler import FrameProfiler, install_signal_handlers
+from pipeline_stages import STAGE_TYPES, FrameContext, PipelineConfigError, Stage
+from presence_gate import PresenceMonitor
+from quality_governor import QualityGovernor
+
+# Sections in execution order, with the stage kind each one accepts and
+# whether the section holds a single stage or a list of stages.
+SECTIONS = (
+    ("source", "source", False),
+    ("estimators", "estimator", True),
+    ("analyzers", "analyzer", True),
+    ("formatter", "formatter", False),
+    ("sinks", "sink", True),
+)
+
+# Optional top-level sections that configure the runner rather than stages.
+RUNNER_SECTIONS = ("startup", "metrics", "profiling", "quality", "presence")
+
+DEFAULT_STARTUP: Dict[str, Any] = {
+    "parallel": True,
+    "warm_up": True,
+    "warm_up_shape": (480, 640),
+    "report": True,
+}
+
+# See pipeline_metrics. Without a port or a JSON lines path the metrics
+# are only kept in memory, for the backend service's ``stats`` command.
+DEFAULT_METRICS: Dict[str, Any] = {
+    "enabled": True,
+    "host": "127.0.0.1",
+    "port": None,
+    "jsonl_path": None,
+    "jsonl_every": 1,
+}
+
+# See pipeline_profiler. ``timing`` starts with stage timing on; ``signals``
+# lets ``run`` install the SIGUSR1/SIGUSR2 toggles.
+DEFAULT_PROFILING: Dict[str, Any] = {
+    "timing": False,
+    "signals": True,
+    "output_dir": "profiles",
+    "mode": "sample",
+    "capture_seconds": 10.0,
+    "interval_ms": 5.0,
+}
+
+# See quality_governor. ``levels`` is a list of [input_scale,
+# model_complexity] pairs from best to cheapest; None uses DEFAULT_LEVELS.
+DEFAULT_QUALITY: Dict[str, Any] = {
+    "enabled": False,
+    "target_fps": 30.0,
+    "levels": None,
+    "start_level": 1,
+    "upgrade_below": 0.7,
+    "min_frames": 30,
+}
+
+# See presence_gate. After ``idle_after_s`` without a body the runner reads
+# ``idle_fps`` frames a second and only runs a downscaled body check on
+# frames that moved (or every ``heartbeat_s``). ``idle_fps`` None does not
+# throttle the source.
+DEFAULT_PRESENCE: Dict[str, Any] = {
+    "enabled": False,
+    "idle_after_s": 5.0,
+    "idle_fps": 5.0,
+    "heartbeat_s": 2.0,
+    "check_scale": 0.5,
+    "check_complexity": 0,
+    "motion_threshold": 0.01,
+}
+
+PipelineConfig = Mapping[str, Any]
+
+
+def load_pipeline_config(path: str) -> Dict[str, Any]:
+    """Load a pipeline definition from a JSON or TOML file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError as exc:  # Python < 3.11
+            raise PipelineConfigError(
+                "TOML pipeline files require Python 3.11+; use JSON instead"
+            ) from exc
+        with open(path, "rb") as handle:
+            return tomllib.load(handle)
+    raise PipelineConfigError(f"Unsupported pipeline file type: {path}")
+
+
+def build_stages(config: PipelineConfig) -> List[Stage]:
+    """Instantiate (but do not open) the stages described by ``config``."""
+    known_sections = {name for name, _, _ in SECTIONS} | set(RUNNER_SECTIONS)
+    unknown_sections = set(config) - known_sections
+    if unknown_sections:
+        raise PipelineConfigError(
+            f"Unknown pipeline sections: {', '.join(sorted(unknown_sections))}"
+        )
+
+    stages: List[Stage] = []
+    for section, kind, is_list in SECTIONS:
+        entries = config.get(section)
+        if entries is None:
+            continue
+        if is_list != isinstance(entries, (list, tuple)):
+            shape = "a list of stages" if is_list else "a single stage"
+            raise PipelineConfigError(f"Section '{section}' must be {shape}")
+        for index, entry in enumerate(entries if is_list else [entries]):
+            stages.append(_build_stage(section, kind, index, entry))
+
+    validate_stages(stages)
+    return stages
+
+
+def _build_stage(section: str, kind: str, index: int, entry: Any) -> Stage:
+    if isinstance(entry, str):
+        entry = {"type": entry}
+    if not isinstance(entry, Mapping) or "type" not in entry:
+        raise PipelineConfigError(
+            f"Stage {index} in '{section}' must be a type name or a mapping with 'type'"
+        )
+
+    stage_type = entry["type"]
+    if not isinstance(stage_type, str):
+        raise PipelineConfigError(
+            f"Stage {index} in '{section}' has a non-string type: {stage_type!r}"
+        )
+    stage_class = STAGE_TYPES.get(stage_type)
+    if stage_class is None:
+        raise PipelineConfigError(
+            f"Unknown stage type '{stage_type}' in '{section}'. "
+            f"Known types: {', '.join(sorted(STAGE_TYPES))}"
+        )
+    if stage_class.kind != kind:
+        raise PipelineConfigError(
+            f"Stage type '{stage_type}' is a {stage_class.kind}, not a {kind}"
+        )
+
+    params = entry.get("params") or {}
+    if not isinstance(params, Mapping):
+        raise PipelineConfigError(f"Parameters for '{stage_type}' must be a mapping")
+
+    name = entry.get("name") or stage_type
+    return stage_class(name, params)
+
+
+def validate_stages(stages: List[Stage]) -> None:
+    """Check that the graph has a source and every input is produced upstream."""
+    if not stages or stages[0].kind != "source":
+        raise PipelineConfigError("A pipeline needs exactly one 'source' stage")
+
+    names = set()
+    available = set()
+    for stage in stages:
+        if stage.name in names:
+            raise PipelineConfigError(f"Duplicate stage name '{stage.name}'")
+        names.add(stage.name)
+
+        missing = [name for name in stage.required_fields() if name not in available]
+        if missing:
+            raise PipelineConfigError(
+                f"Stage '{stage.name}' needs {', '.join(missing)} "
+                "but no earlier stage provides it"
+            )
+        available.update(stage.provides)
+
+
+@dataclass
+class StartupReport:
+    """Wall-clock breakdown of pipeline startup, in milliseconds."""
+
+    steps: List[Tuple[str, float]] = field(default_factory=list)
+    total_ms: float = 0.0
+    first_frame_ms: Optional[float] = None
+    first_pose_ms: Optional[float] = None
+
+    def add(self, step: str, elapsed_ms: float) -> None:
+        self.steps.append((step, elapsed_ms))
+
+    def format(self) -> str:
+        lines = ["[startup] breakdown:"]
+        lines.extend(f"  {step:<32} {elapsed:8.1f} ms" for step, elapsed in self.steps)
+        lines.append(f"  {'ready':<32} {self.total_ms:8.1f} ms")
+        if self.first_frame_ms is not None:
+            lines.append(f"  {'first frame':<32} {self.first_frame_ms:8.1f} ms")
+        if self.first_pose_ms is not None:
+            lines.append(f"  {'first pose':<32} {self.first_pose_ms:8.1f} ms")
+        return "\n".join(lines)
+
+
+def _runner_options(
+    config: PipelineConfig, section: str, defaults: Dict[str, Any]
+) -> Dict[str, Any]:
+    options = config.get(section) or {}
+    if not isinstance(options, Mapping):
+        raise PipelineConfigError(f"Section '{section}' must be a mapping")
+    unknown_options = set(options) - set(defaults)
+    if unknown_options:
+        raise PipelineConfigError(
+            f"Unknown {section} options: {', '.join(sorted(unknown_options))}"
+        )
+    return dict(defaults, **options)
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000.0
+
+
+class PipelineRunner:
+    """Owns the stages of one pipeline and drives the frame loop."""
+
+    def __init__(self, config: PipelineConfig) -> None:
+        self._stages = build_stages(config)
+        self._startup = _runner_options(config, "startup", DEFAULT_STARTUP)
+        self._metrics_options = _runner_options(config, "metrics", DEFAULT_METRICS)
+        self.metrics: Optional[PipelineMetrics] = None
+        if self._metrics_options["enabled"]:
+            options = dict(self._metrics_options)
+            del options["enabled"]
+            self.metrics = PipelineMetrics(self._stages, **options)
+        self._profiling = _runner_options(config, "profiling", DEFAULT_PROFILING)
+        self.profiler = FrameProfiler(
+            **{
+                name: value
+                for name, value in self._profiling.items()
+                if name not in ("timing", "signals")
+            }
+        )
+        if self._profiling["timing"]:
+            self.profiler.start_timing()
+        self._quality = _runner_options(config, "quality", DEFAULT_QUALITY)
+        self.governor = self._build_governor(dict(self._quality))
+        self._presence = _runner_options(config, "presence", DEFAULT_PRESENCE)
+        self.presence, self._presence_stage = self._build_presence(dict(self._presence))
+        self._frame_index = 0
+        # Counts every context the stages have seen, warm-up included, so
+        # video-mode models always receive increasing timestamps.
+        self._tick = 0
+        self._started_at: Optional[float] = None
+        self.startup_report = StartupReport()
+        # What adopt() took from the previous runner, for give_back().
+        self._adopted: List[Tuple[Stage, Stage]] = []
+        self._adopted_metrics: Optional[PipelineMetrics] = None
+        self._adopted_profiler = False
+
+    @staticmethod
+    def _build_governor(options: Dict[str, Any]) -> Optional[QualityGovernor]:
+        if not options.pop("enabled"):
+            return None
+        if options["levels"] is None:
+            del options["levels"]
+        try:
+            return QualityGovernor(**options)
+        except (TypeError, ValueError) as exc:
+            raise PipelineConfigError(f"Invalid quality options: {exc}") from exc
+
+    def _build_presence(
+        self, options: Dict[str, Any]
+    ) -> Tuple[Optional[PresenceMonitor], Optional[Stage]]:
+        if not options.pop("enabled"):
+            return None, None
+        stage = next((stage for stage in self._stages if "body_result" in stage.provides), None)
+        if stage is None:
+            raise PipelineConfigError("The presence section needs a stage that provides body_result")
+        try:
+            return PresenceMonitor(**options), stage
+        except (TypeError, ValueError) as exc:
+            raise PipelineConfigError(f"Invalid presence options: {exc}") from exc
+
+    @property
+    def stages(self) -> List[Stage]:
+        return list(self._stages)
+
+    @property
+    def frame_index(self) -> int:
+        return self._frame_index
+
+    def adopt(self, previous: "PipelineRunner") -> List[str]:
+        """Take over already-open components from ``previous``.
+
+        A stage is reused when ``previous`` has an open stage with the same
+        name, type and params, so switching configs keeps shared models warm.
+        Call before :meth:`open`, and :meth:`give_back` if opening fails.
+        Returns the names of the reused stages.
+        """
+        candidates = {stage.name: stage for stage in previous._stages}
+        reused: List[str] = []
+        self._adopted = []
+        for stage in self._stages:
+            old = candidates.get(stage.name)
+            if (
+                old is None
+                or old.component is None
+                or type(old) is not type(stage)
+                or old.params != stage.params
+            ):
+                continue
+            stage.component, old.component = old.component, None
+            self._adopted.append((stage, old))
+            reused.append(stage.name)
+        self._adopt_metrics(previous)
+        self._adopted_profiler = self._profiling == previous._profiling
+        if self._adopted_profiler:
+            # A capture or stage timing that is running carries on.
+            self.profiler, previous.profiler = previous.profiler, self.profiler
+        if self._quality == previous._quality:
+            # Keep the level the old pipeline settled on.
+            self.governor = previous.governor
+        if self._presence == previous._presence:
+            self.presence = previous.presence
+        # Video-mode models reject timestamps that go backwards.
+        self._tick = max(self._tick, previous._tick)
+        return reused
+
+    def _adopt_metrics(self, previous: "PipelineRunner") -> None:
+        # The previous runner is closed only after this one opens, so take
+        # over its exports (and counts) rather than bind the same port twice.
+        old = self._adopted_metrics = previous.metrics
+        previous.metrics = None
+        if old is None:
+            return
+        if self.metrics is not None and self._metrics_options == previous._metrics_options:
+            old.set_stages(self._stages)
+            self.metrics = old
+        else:
+            old.close()
+
+    def give_back(self, previous: "PipelineRunner") -> None:
+        """Undo :meth:`adopt` so ``previous`` can keep running.
+
+        For a switch whose :meth:`open` failed: the reused components, the
+        metrics and the profiler return to ``previous``; call :meth:`close`
+        afterwards to release what this runner opened itself.
+        """
+        for stage, old in self._adopted:
+            old.component, stage.component = stage.component, None
+        self._adopted = []
+        old_metrics, self._adopted_metrics = self._adopted_metrics, None
+        if old_metrics is not None:
+            if self.metrics is old_metrics:
+                self.metrics = None
+            elif self.metrics is not None:
+                # Free the port before the old exports bind it again.
+                self.metrics.close()
+            old_metrics.set_stages(previous._stages)
+            old_metrics.open()
+            previous.metrics = old_metrics
+        if self._adopted_profiler:
+            self.profiler, previous.profiler = previous.profiler, self.profiler
+            self._adopted_profiler = False
+
+    def check_params(self) -> None:
+        """Check every stage's params without opening anything.
+
+        Raises ``PipelineConfigError`` for the first stage whose params do
+        not fit; cheap enough to call before :meth:`adopt`.
+        """
+        self._map(self._check_stage)
+
+    def open(self) -> None:
+        """Import, construct and warm up every stage, then signal readiness.
+
+        Imports happen here, inside the workers that check and build each
+        stage, so modules of stages missing from the config are never loaded.
+        Every stage is checked before any is constructed, so a typo in a
+        sink's params fails before the camera and models are opened.
+        """
+        self._started_at = time.perf_counter()
+        report = self.startup_report = StartupReport()
+
+        for stage, elapsed in zip(self._stages, self._map(self._check_stage)):
+            report.add(f"import {stage.name}", elapsed)
+        for stage, elapsed in zip(self._stages, self._map(self._open_stage)):
+            report.add(f"construct {stage.name}", elapsed)
+        if self.governor is not None:
+            # Build every graph on the ladder now so the warm-up covers them.
+            for stage in self._stages:
+                stage.prepare_quality(self.governor.model_complexities())
+            self._apply_quality()
+        if self.presence is not None:
+            self._presence_stage.prepare_quality([self.presence.check_level.model_complexity])
+
+        if self._startup["warm_up"]:
+            self._warm_up(report)
+
+        for stage in self._stages:
+            stage.signal_ready()
+        if self.metrics is not None:
+            self.metrics.open()
+        report.total_ms = _elapsed_ms(self._started_at)
+
+    def _map(self, function) -> List[float]:
+        if self._startup["parallel"] and len(self._stages) > 1:
+            with ThreadPoolExecutor(max_workers=len(self._stages)) as executor:
+                return list(executor.map(function, self._stages))
+        return [function(stage) for stage in self._stages]
+
+    @staticmethod
+    def _check_stage(stage: Stage) -> float:
+        start = time.perf_counter()
+        stage.check_params()
+        return _elapsed_ms(start)
+
+    @staticmethod
+    def _open_stage(stage: Stage) -> float:
+        start = time.perf_counter()
+        stage.open()
+        return _elapsed_ms(start)
+
+    def _warm_up(self, report: StartupReport) -> None:
+        import numpy as np
+
+        height, width = self._startup["warm_up_shape"]
+        context = self._new_context()
+        context.frame = np.zeros((int(height), int(width), 3), dtype=np.uint8)
+        for stage in self._stages:
+            if not stage.warms_up:
+                continue
+            start = time.perf_counter()
+            stage.warm_up(context)
+            report.add(f"warm up {stage.name}", _elapsed_ms(start))
+
+    def _apply_quality(self) -> None:
+        level = self.governor.level
+        for stage in self._stages:
+            stage.set_quality(level)
+        if self.metrics is not None:
+            self.metrics.quality_level.set(self.governor.index)
+
+    def _update_quality(self, latency_ms: float) -> None:
+        smoothed = self.governor.latency_ms or latency_ms
+        if not self.governor.update(latency_ms):
+            return
+        self._apply_quality()
+        print(
+            f"[quality] level {self.governor.index} ({self.governor.level.describe()}) "
+            f"at {smoothed:.1f} ms per frame, budget {self.governor.budget_ms:.1f} ms"
+        )
+
+    def _check_presence(self, context: FrameContext) -> bool:
+        """While idle: run the cheap body check if the gate lets ``context`` through."""
+        now = time.monotonic()
+        if not self.presence.should_check(context.frame, now):
+            return False
+        stage = self._presence_stage
+        start = time.perf_counter_ns()
+        found = stage.detect_presence(context, self.presence.check_level)
+        if self.metrics is not None:
+            self.metrics.record_stage(stage, (time.perf_counter_ns() - start) / 1e9)
+        if not found:
+            return False
+        self.presence.wake(now)
+        if self.metrics is not None:
+            self.metrics.presence_idle.set(0)
+        print("[presence] body detected; tracking at full rate")
+        return True
+
+    def _idle_frame(self, context: FrameContext) -> FrameContext:
+        if self.metrics is not None:
+            self.metrics.record_idle(context)
+        self.presence.throttle()
+        return context
+
+    def _observe_presence(self, context: FrameContext) -> None:
+        present = bool(getattr(context.body_result, "landmarks", None))
+        if not self.presence.observe(present, time.monotonic()):
+            return
+        if self.metrics is not None:
+            self.metrics.presence_idle.set(1)
+        rate = f"{self.presence.idle_fps:g} fps" if self.presence.idle_fps else "source rate"
+        print(
+            f"[presence] no body for {self.presence.idle_after_s:g} s; "
+            f"idling at {rate} with a motion gate"
+        )
+
+    def _new_context(self) -> FrameContext:
+        context = FrameContext(
+            frame_index=self._frame_index,
+            timestamp_ms=self._tick * 33,
+        )
+        self._tick += 1
+        return context
+
+    def step(self) -> Optional[FrameContext]:
+        """Process one frame.
+
+        Returns the frame context, or None when a sink asked to stop.
+        """
+        profiler = self.profiler
+        if not profiler.active:
+            return self._step()
+        profiler.frame_started()
+        start = time.perf_counter_ns()
+        try:
+            return self._step()
+        finally:
+            profiler.frame_finished(time.perf_counter_ns() - start)
+
+    def _step(self) -> Optional[FrameContext]:
+        context = self._new_context()
+        metrics = self.metrics
+        profiler = self.profiler if self.profiler.timing else None
+        timed = metrics is not None or profiler is not None
+        processing_start = 0  # after the source; that is what the governor budgets
+        skip: Optional[Stage] = None
+        for stage in self._stages:
+            if stage is skip:
+                continue
+            if not timed:
+                keep_going = stage.process(context)
+            else:
+                start = time.perf_counter_ns()
+                keep_going = stage.process(context)
+                elapsed_ns = time.perf_counter_ns() - start
+                if metrics is not None:
+                    metrics.record_stage(stage, elapsed_ns / 1e9)
+                if profiler is not None:
+                    profiler.record_stage(stage.name, elapsed_ns)
+            if not keep_going:
+                return None
+            if context.frame is None:
+                # The source had nothing this time.
+                if metrics is not None:
+                    metrics.record_drop()
+                return context
+            if not processing_start:
+                processing_start = time.perf_counter_ns()
+                if self.presence is not None and self.presence.idle:
+                    if not self._check_presence(context):
+                        return self._idle_frame(context)
+                    skip = self._presence_stage  # the check already ran it
+
+        if self.presence is not None:
+            self._observe_presence(context)
+        if self.governor is not None:
+            self._update_quality((time.perf_counter_ns() - processing_start) / 1e6)
+        if metrics is not None:
+            metrics.record_frame(context)
+        self._frame_index += 1
+        self._record_first_frame(context)
+        return context
+
+    def _record_first_frame(self, context: FrameContext) -> None:
+        report = self.startup_report
+        if self._started_at is None or report.first_pose_ms is not None:
+            return
+        if report.first_frame_ms is None:
+            report.first_frame_ms = _elapsed_ms(self._started_at)
+        body_result = context.body_result
+        if body_result is not None and getattr(body_result, "landmarks", None):
+            report.first_pose_ms = _elapsed_ms(self._started_at)
+            if self._startup["report"]:
+                print(f"[startup] first pose after {report.first_pose_ms:.1f} ms")
+
+    def run(self) -> None:
+        if self._profiling["signals"]:
+            install_signal_handlers(lambda: self.profiler)
+        try:
+            self.open()
+            if self._startup["report"]:
+                print(self.startup_report.format())
+            while self.step() is not None:
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for stage in reversed(self._stages):
+            stage.close()
+        if self.metrics is not None:
+            self.metrics.close()
+        self.profiler.close()
+
+
+def resolve_config(config: Union[str, PipelineConfig]) -> PipelineConfig:
+    """Accept a preset name, a file path or an already-built mapping."""
+    if not isinstance(config, str):
+        return config
+
+    from pipeline_presets import PRESETS
+
+    if config in PRESETS:
+        return PRESETS[config]
+    if os.path.exists(config):
+        return load_pipeline_config(config)
+    raise PipelineConfigError(
+        f"'{config}' is neither a preset ({', '.join(sorted(PRESETS))}) nor a file"
+    )
+
+
+def with_metrics(config: PipelineConfig, **options: Any) -> Dict[str, Any]:
+    """Copy ``config`` with ``options`` merged into its ``metrics`` section."""
+    updated = dict(config)
+    updated["metrics"] = dict(config.get("metrics") or {}, **options)
+    return updated
+
+
+def add_runtime_arguments(parser) -> None:
+    """Command-line options shared by the pipeline entry points."""
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this port (/metrics, /metrics.json).",
+    )
+    parser.add_argument(
+        "--metrics-jsonl",
+        help="Append per-frame stats as JSON lines to this file ('-' for stdout).",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="warning",
+        choices=("debug", "info", "warning", "error"),
+        help="'debug' shows the sampled output of 'console' sinks.",
+    )
+
+
+def apply_runtime_arguments(
+    config: Union[str, PipelineConfig], args
+) -> Union[str, PipelineConfig]:
+    """Configure logging and fold the metrics options into ``config``."""
+    import logging
+
+    logging.basicConfig(
+        level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+    options = {"port": args.metrics_port, "jsonl_path": args.metrics_jsonl}
+    options = {name: value for name, value in options.items() if value is not None}
+    if not options:
+        return config  # keeps the preset name for the service's health reply
+    return with_metrics(resolve_config(config), **options)
+
+
+def run_pipeline(config: Union[str, PipelineConfig]) -> None:
+    PipelineRunner(resolve_config(config)).run()
+
+
+def main(argv: Optional[List[str]] = None, default: str = "full") -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a pose pipeline.")
+    parser.add_argument(
+        "--config",
+        default=default,
+        help="Preset name or path to a JSON/TOML pipeline definition.",
+    )
+    add_runtime_arguments(parser)
+    args = parser.parse_args(argv)
+    run_pipeline(apply_runtime_arguments(args.config, args))
+
+
+if __name__ == "__main__":
+    main()
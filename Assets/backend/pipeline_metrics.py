@@ -0,0 +1,432 @@
+"""Runtime metrics for the frame loop.
+
+``PipelineMetrics`` keeps counters, gauges and histograms for one pipeline:
+capture FPS, time spent in every stage (estimator inference and formatting
+included), detections, dropped frames and what the sinks sent. They can be
+read in three ways:
+
+- ``http://<host>:<port>/metrics`` in the Prometheus text format, and
+  ``/metrics.json`` as one JSON object;
+- one JSON line per frame (or every ``jsonl_every`` frames) written to
+  ``jsonl_path``, with that frame's stage timings; ``-`` means stdout;
+- the backend service ``stats`` command.
+
+Nothing is printed per frame.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from pipeline_stages import FrameContext, Stage
+
+# Upper bounds, in seconds, of the stage duration buckets. A 30 FPS frame
+# budget is 33 ms.
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 1.0)
+
+# Counters that stages report through ``Stage.counters()``. They are copied
+# into the registry whenever it is read.
+STAGE_COUNTERS = {
+    "sent_bytes": "Payload bytes written to the socket.",
+    "sent_payloads": "Payloads written to the socket.",
+    "reconnects": "Connections opened after the first one.",
+    "ingested_frames": "Frames taken from external producers.",
+    "skipped_frames": "Producer frames replaced by a newer one before the pipeline read them.",
+    "torn_frames": "Shared-memory frames their writer overwrote while the pipeline used them.",
+}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric '{self.name}' takes labels ({', '.join(self.label_names)}), "
+                f"got ({', '.join(sorted(labels))})"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _label_text(self, key: LabelValues, extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _items(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._label_text(key)} {_format_value(value)}"
+            for key, value in self._items()
+        ]
+
+    def snapshot(self) -> Any:
+        """The value, or a dict keyed by comma-joined label values."""
+        items = self._items()
+        if not self.label_names:
+            return self._snapshot_value(items[0][1]) if items else 0
+        return {",".join(key): self._snapshot_value(value) for key, value in items}
+
+    @staticmethod
+    def _snapshot_value(value: Any) -> Any:
+        return value
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Mirror a total that is counted elsewhere."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+
+    type = "gauge"
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * (buckets + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative ``le`` buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = _HistogramValue(len(self.buckets))
+            entry.counts[index] += 1
+            entry.sum += value
+
+    def _items(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return sorted(
+                (key, (list(entry.counts), entry.sum)) for key, entry in self._values.items()
+            )
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, (counts, total) in self._items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{self._label_text(key, [('le', bound)])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+    @staticmethod
+    def _snapshot_value(value: Any) -> Any:
+        counts, total = value
+        return {"count": sum(counts), "sum": total}
+
+
+class MetricsRegistry:
+    """A named set of metrics plus collectors that refresh them on read."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric '{metric.name}' is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Call ``collector`` before every read, to copy in outside values."""
+        self._collectors.append(collector)
+
+    def _collect(self) -> List[_Metric]:
+        for collector in list(self._collectors):
+            collector()
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._collect():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {metric.name: metric.snapshot() for metric in self._collect()}
+
+
+class MetricsServer:
+    """Serves a registry over HTTP: ``/metrics`` and ``/metrics.json``."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464) -> None:
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler(registry))
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="metrics-http", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    @staticmethod
+    def _make_handler(registry: MetricsRegistry):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:  # noqa: A002
+                pass
+
+            def do_GET(self) -> None:
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = PROMETHEUS_CONTENT_TYPE
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join(timeout=1.0)
+
+
+class PipelineMetrics:
+    """The metrics of one pipeline runner and the places they are exported to.
+
+    The runner calls ``record_stage`` after every stage, then
+    ``record_frame`` or ``record_drop`` once per frame.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        jsonl_path: Optional[str] = None,
+        jsonl_every: int = 1,
+        fps_smoothing: float = 0.1,
+    ) -> None:
+        self._stages = list(stages)
+        self._host = host
+        self._port = port
+        self._jsonl_path = jsonl_path
+        self._jsonl_every = max(1, int(jsonl_every))
+        self._fps_smoothing = fps_smoothing
+        self._server: Optional[MetricsServer] = None
+        self._jsonl = None
+        self._timings: List[Tuple[str, float]] = []
+        self._last_capture_s: Optional[float] = None
+
+        self.registry = registry = MetricsRegistry()
+        self.frames = registry.counter("pose_frames_total", "Frames that went through every stage.")
+        self.dropped = registry.counter(
+            "pose_frames_dropped_total", "Reads that returned no frame from the source."
+        )
+        self.capture_fps = registry.gauge(
+            "pose_capture_fps", "Capture rate, smoothed over recent frames."
+        )
+        self.stage_seconds = registry.histogram(
+            "pose_stage_seconds", "Time spent in each stage per frame.", ("stage", "kind")
+        )
+        self.detections = registry.counter(
+            "pose_detections_total", "Frames with a body, and hands found.", ("kind",)
+        )
+        self.quality_level = registry.gauge(
+            "pose_quality_level", "Quality governor level; 0 is the best quality."
+        )
+        self.idle_frames = registry.counter(
+            "pose_idle_frames_total", "Frames read while idle that no full pipeline pass ran on."
+        )
+        self.presence_idle = registry.gauge(
+            "pose_presence_idle", "1 while the pipeline idles because nobody is in frame."
+        )
+        self._stage_counters = {
+            key: registry.counter(f"pose_{key}_total", documentation, ("stage",))
+            for key, documentation in STAGE_COUNTERS.items()
+        }
+        registry.add_collector(self._collect_stage_counters)
+
+    @property
+    def server_address(self) -> Optional[Tuple[str, int]]:
+        return None if self._server is None else self._server.address
+
+    def open(self) -> None:
+        if self._port is not None and self._server is None:
+            self._server = MetricsServer(self.registry, self._host, int(self._port))
+        if self._jsonl_path and self._jsonl is None:
+            if self._jsonl_path == "-":
+                self._jsonl = sys.stdout
+            else:
+                self._jsonl = open(self._jsonl_path, "a", encoding="utf-8", buffering=1)
+
+    def record_stage(self, stage: Stage, seconds: float) -> None:
+        self.stage_seconds.observe(seconds, stage=stage.name, kind=stage.kind)
+        self._timings.append((stage.name, seconds))
+
+    def record_drop(self) -> None:
+        self.dropped.inc()
+        self._timings.clear()
+
+    def record_idle(self, context: FrameContext) -> None:
+        self.idle_frames.inc()
+        self._update_fps(context.capture_time_s)
+        self._timings.clear()
+
+    def record_frame(self, context: FrameContext) -> None:
+        self.frames.inc()
+        body_result = context.body_result
+        body_found = body_result is not None and bool(getattr(body_result, "landmarks", None))
+        hands_found = len(getattr(context.hand_result, "normalized", None) or [])
+        if body_found:
+            self.detections.inc(kind="body")
+        if hands_found:
+            self.detections.inc(hands_found, kind="hand")
+        self._update_fps(context.capture_time_s)
+
+        if self._jsonl is not None and context.frame_index % self._jsonl_every == 0:
+            record = {
+                "frame": context.frame_index,
+                "capture_s": context.capture_time_s,
+                "stages_ms": {name: round(seconds * 1000.0, 3) for name, seconds in self._timings},
+                "body": body_found,
+                "hands": hands_found,
+                "payload_bytes": len(context.payload) if context.payload else 0,
+            }
+            self._jsonl.write(json.dumps(record) + "\n")
+        self._timings.clear()
+
+    def _update_fps(self, capture_s: Optional[float]) -> None:
+        if capture_s is None:
+            return
+        previous, self._last_capture_s = self._last_capture_s, capture_s
+        if previous is None or capture_s <= previous:
+            return
+        fps = 1.0 / (capture_s - previous)
+        current = self.capture_fps.value()
+        if current:
+            fps = current + self._fps_smoothing * (fps - current)
+        self.capture_fps.set(fps)
+
+    def set_stages(self, stages: Sequence[Stage]) -> None:
+        self._stages = list(stages)
+
+    def _collect_stage_counters(self) -> None:
+        for stage in self._stages:
+            for key, value in stage.counters().items():
+                counter = self._stage_counters.get(key)
+                if counter is not None:
+                    counter.set(value, stage=stage.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.registry.snapshot()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if self._jsonl is not None:
+            if self._jsonl is not sys.stdout:
+                self._jsonl.close()
+            self._jsonl = None
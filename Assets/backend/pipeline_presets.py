@@ -0,0 +1,59 @@
+"""Built-in pipeline definitions.
+
+Each preset uses the same shape as a JSON/TOML pipeline file, so any of
+them can be copied into a file and edited instead of changing code.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+FULL_PIPELINE: Dict[str, Any] = {
+    "source": {"type": "camera", "params": {"camera_index": 0}},
+    "estimators": ["body_pose", "hand_pose"],
+    "analyzers": [
+        "skeleton",
+        "pose_metrics",
+        "body_gesture",
+        "arm_rotation",
+        "landmark_gesture",
+        "hand_motion",
+        "sequence_gesture",
+    ],
+    "formatter": "pose_formatter",
+    "sinks": [
+        {"type": "async_sender", "params": {"host": "127.0.0.1", "port": 25001}},
+        {"type": "preview", "params": {"preview_hz": 10.0, "scale": 0.5}},
+    ],
+    "quality": {"enabled": True, "target_fps": 30.0},
+    "presence": {"enabled": True},
+}
+
+SIMPLE_PIPELINE: Dict[str, Any] = {
+    "source": {"type": "camera", "params": {"camera_index": 0}},
+    "estimators": ["body_pose", "hand_pose"],
+    "analyzers": ["pose_metrics", "body_gesture"],
+    "formatter": "pose_formatter",
+    "sinks": [
+        {"type": "async_sender", "params": {"host": "127.0.0.1", "port": 25001}},
+        {"type": "preview", "params": {"preview_hz": 10.0, "scale": 0.5}},
+    ],
+}
+
+HEADLESS_PIPELINE: Dict[str, Any] = {
+    "source": {"type": "camera", "params": {"camera_index": 0}},
+    "estimators": ["body_pose", "hand_pose"],
+    "analyzers": ["pose_metrics", "body_gesture", "arm_rotation", "hand_motion"],
+    "formatter": "pose_formatter",
+    "sinks": [
+        {"type": "async_sender", "params": {"host": "127.0.0.1", "port": 25001}},
+    ],
+    "quality": {"enabled": True, "target_fps": 30.0},
+    "presence": {"enabled": True},
+}
+
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "full": FULL_PIPELINE,
+    "simple": SIMPLE_PIPELINE,
+    "headless": HEADLESS_PIPELINE,
+}
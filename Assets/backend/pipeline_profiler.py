@@ -0,0 +1,286 @@
+"""Opt-in profiling of the frame loop.
+
+Both tools are off until asked for, and then cost one attribute check per
+frame:
+
+- stage timing: ``perf_counter_ns`` around every stage, summarized per
+  stage as calls, mean, p95, max and share of the frame time;
+- captures of ``seconds`` seconds of the frame thread. ``sample`` reads its
+  stack every ``interval_ms`` and writes collapsed stacks (``.folded``), the
+  input format of flamegraph.pl, speedscope and inferno. ``cprofile`` runs
+  cProfile on it and writes a pstats file (``.prof``) for snakeviz or
+  flameprof.
+
+Toggle them with SIGUSR1 (stage timing on/off from the next frame; the
+report is printed when it goes off) and SIGUSR2 (one capture), or with the
+backend service ``profile`` command.
+"""
+
+from __future__ import annotations
+
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+CAPTURE_MODES = ("sample", "cprofile")
+_EXTENSIONS = {"sample": ".folded", "cprofile": ".prof"}
+
+
+@dataclass
+class _Capture:
+    mode: str
+    seconds: float
+    path: str
+    deadline: Optional[float] = None  # set when the frame thread picks it up
+    profile: Optional[Any] = None
+    thread: Optional[threading.Thread] = None
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)  # Python 3.11+
+    return f"{os.path.basename(code.co_filename)}:{name}:{code.co_firstlineno}"
+
+
+def collapse_stack(frame) -> str:
+    """One stack as ``root;...;leaf``, the collapsed-stack format."""
+    names: List[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class FrameProfiler:
+    """Stage timing and on-demand captures for one frame thread."""
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        interval_ms: float = 5.0,
+        capture_seconds: float = 10.0,
+        mode: str = "sample",
+        window: int = 1000,
+    ) -> None:
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode {mode!r}; use one of {', '.join(CAPTURE_MODES)}")
+        self.output_dir = output_dir
+        self.interval_s = interval_ms / 1000.0
+        self.capture_seconds = capture_seconds
+        self.mode = mode
+        self.timing = False
+        self.last_capture: Optional[str] = None
+        self._window = window
+        self._lock = threading.Lock()
+        self._stage_ns: Dict[str, Deque[int]] = {}
+        self._frame_ns: Deque[int] = collections.deque(maxlen=window)
+        self._capture: Optional[_Capture] = None
+        self._toggle_requested = False
+
+    @property
+    def active(self) -> bool:
+        """Whether the runner has to call the frame hooks at all."""
+        return self.timing or self._capture is not None or self._toggle_requested
+
+    def request_toggle(self) -> None:
+        """Turn stage timing on or off when the next frame starts.
+
+        Safe in a signal handler: it takes no lock and prints nothing, so it
+        cannot deadlock against the frame thread it interrupted.
+        """
+        self._toggle_requested = True
+
+    def start_timing(self) -> None:
+        with self._lock:
+            self._stage_ns.clear()
+            self._frame_ns.clear()
+        self.timing = True
+
+    def stop_timing(self) -> Dict[str, Dict[str, float]]:
+        self.timing = False
+        return self.report()
+
+    def record_stage(self, stage_name: str, elapsed_ns: int) -> None:
+        with self._lock:
+            samples = self._stage_ns.get(stage_name)
+            if samples is None:
+                samples = self._stage_ns[stage_name] = collections.deque(maxlen=self._window)
+            samples.append(elapsed_ns)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage summary of the last ``window`` frames, in milliseconds."""
+        with self._lock:
+            stages = {name: sorted(samples) for name, samples in self._stage_ns.items()}
+            frames = sorted(self._frame_ns)
+        frame_total = sum(frames)
+        summary = {}
+        for name, samples in list(stages.items()) + [("frame", frames)]:
+            if not samples:
+                continue
+            total = sum(samples)
+            summary[name] = {
+                "calls": len(samples),
+                "mean_ms": total / len(samples) / 1e6,
+                "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))] / 1e6,
+                "max_ms": samples[-1] / 1e6,
+                "share": total / frame_total if frame_total else 0.0,
+            }
+        return summary
+
+    def format_report(self) -> str:
+        lines = [
+            f"[profile] {'stage':<24} {'calls':>6} {'mean ms':>8} {'p95 ms':>8} "
+            f"{'max ms':>8} {'share':>6}"
+        ]
+        for name, row in self.report().items():
+            lines.append(
+                f"[profile] {name:<24} {row['calls']:>6} {row['mean_ms']:>8.2f} "
+                f"{row['p95_ms']:>8.2f} {row['max_ms']:>8.2f} {row['share']:>6.1%}"
+            )
+        return "\n".join(lines)
+
+    def capture(
+        self,
+        seconds: Optional[float] = None,
+        mode: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> str:
+        """Schedule a capture; it starts with the next frame.
+
+        Returns the file it will be written to.
+        """
+        mode = mode or self.mode
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode {mode!r}; use one of {', '.join(CAPTURE_MODES)}")
+        if self._capture is not None:
+            raise RuntimeError(f"A capture is already running; it writes {self._capture.path}")
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(self.output_dir, f"profile-{stamp}{_EXTENSIONS[mode]}")
+        seconds = float(seconds if seconds is not None else self.capture_seconds)
+        self._capture = _Capture(mode, seconds, path)
+        return path
+
+    @property
+    def capturing(self) -> bool:
+        return self._capture is not None
+
+    def frame_started(self) -> None:
+        if self._toggle_requested:
+            self._toggle_requested = False
+            if self.timing:
+                self.stop_timing()
+                print(self.format_report())
+            else:
+                self.start_timing()
+                print("[profile] stage timing on; send SIGUSR1 again for the report")
+        capture = self._capture
+        if capture is None or capture.deadline is not None:
+            return
+        capture.deadline = time.monotonic() + capture.seconds
+        if capture.mode == "cprofile":
+            import cProfile
+
+            capture.profile = cProfile.Profile()
+            capture.profile.enable()  # profiles the calling thread only
+        else:
+            capture.thread = threading.Thread(
+                target=self._sample,
+                args=(capture, threading.get_ident()),
+                name="profile-sampler",
+                daemon=True,
+            )
+            capture.thread.start()
+
+    def frame_finished(self, elapsed_ns: int) -> None:
+        if self.timing:
+            with self._lock:
+                self._frame_ns.append(elapsed_ns)
+        capture = self._capture
+        if (
+            capture is not None
+            and capture.mode == "cprofile"
+            and capture.deadline is not None
+            and time.monotonic() >= capture.deadline
+        ):
+            capture.profile.disable()
+            self._write(capture, lambda: capture.profile.dump_stats(capture.path))
+
+    def _sample(self, capture: _Capture, thread_id: int) -> None:
+        counts: Dict[str, int] = collections.Counter()
+        while time.monotonic() < capture.deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:  # the frame thread is gone
+                break
+            counts[collapse_stack(frame)] += 1
+            del frame
+            time.sleep(self.interval_s)
+
+        def write() -> None:
+            with open(capture.path, "w", encoding="utf-8") as handle:
+                for stack, count in sorted(counts.items()):
+                    handle.write(f"{stack} {count}\n")
+
+        self._write(capture, write)
+
+    def _write(self, capture: _Capture, write) -> None:
+        directory = os.path.dirname(capture.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            write()
+            self.last_capture = capture.path
+            print(f"[profile] wrote {capture.mode} capture to {capture.path}")
+        finally:
+            self._capture = None
+
+    def close(self) -> None:
+        """Stop stage timing and finish a running capture early."""
+        self.timing = False
+        capture = self._capture
+        if capture is None:
+            return
+        if capture.mode == "cprofile":
+            if capture.profile is not None:
+                capture.profile.disable()
+                self._write(capture, lambda: capture.profile.dump_stats(capture.path))
+            else:
+                self._capture = None
+        elif capture.thread is not None:
+            capture.deadline = 0.0
+            capture.thread.join(timeout=1.0)
+        else:
+            self._capture = None
+
+
+def install_signal_handlers(get_profiler: Callable[[], FrameProfiler]) -> bool:
+    """SIGUSR1 toggles stage timing, SIGUSR2 starts a capture.
+
+    ``get_profiler`` is called on every signal, so the handlers follow a
+    runner that is replaced later. Returns False where signals cannot be
+    used: on Windows, or when not called from the main thread.
+    """
+    if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def toggle_timing(signum, frame) -> None:
+        # The frame thread may hold the profiler lock; let it do the work.
+        get_profiler().request_toggle()
+
+    def start_capture(signum, frame) -> None:
+        profiler = get_profiler()
+        try:
+            path = profiler.capture()
+        except RuntimeError as exc:
+            print(f"[profile] {exc}")
+        else:
+            print(f"[profile] capturing {profiler.capture_seconds:g} s to {path}")
+
+    signal.signal(signal.SIGUSR1, toggle_timing)
+    signal.signal(signal.SIGUSR2, start_capture)
+    return True
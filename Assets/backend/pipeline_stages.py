@@ -0,0 +1,517 @@
+"""Stage adapters that plug backend components into a pipeline graph."""
+
+from __future__ import annotations
+
+import importlib
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Sent after warm-up as the first message of every connection. The trailing
+# separator keeps the section apart from the payload that follows it.
+READY_PAYLOAD = "status:ready|"
+
+logger = logging.getLogger("pose.pipeline")
+
+
+class PipelineConfigError(ValueError):
+    """Raised when a pipeline definition cannot be built."""
+
+
+@dataclass
+class FrameContext:
+    """Per-frame data that flows from one stage to the next."""
+
+    frame_index: int
+    timestamp_ms: int
+    frame: Optional[Any] = None
+    capture_time_s: Optional[float] = None  # time.monotonic() when read
+    body_result: Optional[Any] = None
+    hand_result: Optional[Any] = None
+    gesture_recognitions: Optional[List[Any]] = None
+    metrics: Optional[Any] = None
+    body_gesture: Optional[str] = None
+    arm_segments: Optional[List[Any]] = None
+    hand_states: Optional[List[Any]] = None
+    sequence_matches: Optional[List[Any]] = None
+    pose_frame: Optional[Dict[str, Any]] = None  # payload before encoding
+    payload: Optional[str] = None
+    payload_version: Optional[int] = None
+    extras: Dict[str, Any] = field(default_factory=dict)
+
+
+class Stage:
+    """Base class for pipeline stages.
+
+    A stage owns one backend component. The component's module is only
+    imported when the stage is opened, so a pipeline never pays for modules
+    it does not use.
+    """
+
+    kind = ""
+    module = ""
+    factory = ""
+    requires: Tuple[str, ...] = ()
+    provides: Tuple[str, ...] = ()
+    warms_up = False
+
+    def __init__(self, name: str, params: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.params: Dict[str, Any] = dict(params or {})
+        self.component: Optional[Any] = None
+
+    def required_fields(self) -> Tuple[str, ...]:
+        """Context fields that an earlier stage must provide."""
+        return self.requires
+
+    def _factory(self):
+        return getattr(importlib.import_module(self.module), self.factory)
+
+    def check_params(self) -> None:
+        """Raise PipelineConfigError if the params do not fit the factory."""
+        try:
+            inspect.signature(self._factory()).bind(**self.params)
+        except TypeError as exc:
+            raise PipelineConfigError(
+                f"Invalid parameters for stage '{self.name}': {exc}"
+            ) from exc
+
+    def open(self) -> None:
+        if self.component is not None:
+            return
+        self.check_params()
+        self.component = self._factory()(**self.params)
+
+    def process(self, context: FrameContext) -> bool:
+        """Run the stage on ``context``; return False to stop the pipeline."""
+        raise NotImplementedError
+
+    def warm_up(self, context: FrameContext) -> None:
+        """Run one throwaway inference so the first real frame is not slow."""
+        if self.warms_up:
+            self.process(context)
+
+    def signal_ready(self) -> None:
+        """Tell the consumer that the pipeline is about to stream frames."""
+
+    def prepare_quality(self, model_complexities: List[int]) -> None:
+        """Get ready to switch between the quality governor's model complexities."""
+
+    def set_quality(self, level) -> None:
+        """Apply a ``quality_governor.QualityLevel``; only estimators use it."""
+
+    def detect_presence(self, context: FrameContext, level) -> bool:
+        """Look for a body in ``context`` while the pipeline idles; see presence_gate.
+
+        ``level`` is the cheap ``QualityLevel`` to check at. Only stages that
+        provide ``body_result`` are asked.
+        """
+        self.process(context)
+        return bool(getattr(context.body_result, "landmarks", None))
+
+    def counters(self) -> Dict[str, float]:
+        """Running totals for the metrics; see ``pipeline_metrics.STAGE_COUNTERS``."""
+        return {}
+
+    def close(self) -> None:
+        component, self.component = self.component, None
+        if component is None:
+            return
+        for method_name in ("close", "release"):
+            method = getattr(component, method_name, None)
+            if callable(method):
+                method()
+                return
+
+
+class CameraSource(Stage):
+    kind = "source"
+    module = "frame_provider"
+    factory = "FrameProvider"
+    provides = ("frame",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.frame = self.component.get_frame()
+        context.capture_time_s = time.monotonic()
+        return True
+
+
+class IngestSource(CameraSource):
+    """Frames pushed by other processes; see frame_ingest."""
+
+    module = "frame_ingest"
+    factory = "FrameIngest"
+
+    def process(self, context: FrameContext) -> bool:
+        ingest = self.component
+        context.frame = ingest.get_frame()
+        context.capture_time_s = time.monotonic()
+        if ingest.last_header is not None:
+            context.extras["frame_header"] = ingest.last_header
+        return True
+
+    def counters(self) -> Dict[str, float]:
+        ingest = self.component
+        if ingest is None:
+            return {}
+        return {
+            "ingested_frames": ingest.frames_ingested,
+            "skipped_frames": ingest.frames_skipped,
+            "torn_frames": ingest.frames_torn,
+        }
+
+
+class BodyPoseStage(Stage):
+    kind = "estimator"
+    warms_up = True
+    module = "body_pose_estimator"
+    factory = "BodyPoseEstimator"
+    requires = ("frame",)
+    provides = ("body_result",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.body_result = self.component.get_body_pose(context.frame)
+        return True
+
+    def warm_up(self, context: FrameContext) -> None:
+        self.component.warm_up(context.frame)
+
+    def prepare_quality(self, model_complexities: List[int]) -> None:
+        self.component.prepare(model_complexities)
+
+    def set_quality(self, level) -> None:
+        self.component.input_scale = level.input_scale
+        self.component.set_model_complexity(level.model_complexity)
+
+    def detect_presence(self, context: FrameContext, level) -> bool:
+        estimator = self.component
+        scale, complexity = estimator.input_scale, estimator.model_complexity
+        estimator.input_scale = level.input_scale
+        estimator.set_model_complexity(level.model_complexity)
+        try:
+            context.body_result = estimator.get_body_pose(context.frame)
+        finally:
+            estimator.input_scale = scale
+            estimator.set_model_complexity(complexity)
+        return bool(context.body_result and context.body_result.landmarks)
+
+
+class HandPoseStage(Stage):
+    kind = "estimator"
+    warms_up = True
+    module = "hand_pose_estimator"
+    factory = "HandPoseEstimator"
+    requires = ("frame",)
+    provides = ("hand_result",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.hand_result = self.component.get_hand_pose(context.frame)
+        return True
+
+    def set_quality(self, level) -> None:
+        self.component.input_scale = level.input_scale
+
+
+class HandGestureStage(Stage):
+    kind = "estimator"
+    warms_up = True
+    module = "hand_gesture_recognizer"
+    factory = "HandGestureRecognizer"
+    requires = ("frame",)
+    provides = ("gesture_recognitions",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.gesture_recognitions = self.component.recognize(
+            context.frame, timestamp_ms=context.timestamp_ms
+        )
+        return True
+
+    def set_quality(self, level) -> None:
+        self.component.input_scale = level.input_scale
+
+
+class LandmarkGestureStage(Stage):
+    """Gesture labels from hand landmarks; no second network pass."""
+
+    kind = "analyzer"
+    module = "landmark_gesture_classifier"
+    factory = "LandmarkGestureClassifier"
+    requires = ("frame", "hand_result")
+    provides = ("gesture_recognitions",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.gesture_recognitions = self.component.recognize(
+            context.hand_result, frame_shape=context.frame.shape
+        )
+        return True
+
+
+class SkeletonStage(Stage):
+    """Calibrates bone lengths, then normalizes the world landmarks in place.
+
+    List it before the other analyzers so they see the normalized skeleton.
+    """
+
+    kind = "analyzer"
+    module = "skeleton_calibration"
+    factory = "SkeletonCalibrator"
+    requires = ("body_result",)
+
+    def process(self, context: FrameContext) -> bool:
+        self.component.process(context.body_result)
+        return True
+
+
+class PoseMetricsStage(Stage):
+    kind = "analyzer"
+    module = "gesture_calculator"
+    factory = "PoseCalculator"
+    provides = ("metrics",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.metrics = self.component.compute(
+            context.body_result, context.hand_result
+        )
+        return True
+
+
+class BodyGestureStage(Stage):
+    kind = "analyzer"
+    module = "gesture_calculator"
+    factory = "BodyGestureRecognizer"
+    requires = ("body_result",)
+    provides = ("body_gesture",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.body_gesture = self.component.get_body_gesture(
+            context.body_result, timestamp_s=context.capture_time_s
+        )
+        return True
+
+
+class ArmRotationStage(Stage):
+    kind = "analyzer"
+    module = "arm_rotation_calculator"
+    factory = "ArmRotationCalculator"
+    requires = ("body_result",)
+    provides = ("arm_segments",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.arm_segments = self.component.compute(
+            context.body_result, timestamp_s=context.capture_time_s
+        )
+        return True
+
+
+class HandMotionStage(Stage):
+    kind = "analyzer"
+    module = "hand_motion_analyzer"
+    factory = "HandMotionAnalyzer"
+    requires = ("frame", "hand_result")
+    provides = ("hand_states",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.hand_states = self.component.analyze(
+            context.frame.shape,
+            context.hand_result,
+            recognized_gestures=context.gesture_recognitions,
+            timestamp_s=context.capture_time_s,
+        )
+        return True
+
+
+class SequenceGestureStage(Stage):
+    kind = "analyzer"
+    module = "sequence_recognizer"
+    factory = "SequenceRecognizer"
+    requires = ("frame", "body_result")
+    provides = ("sequence_matches",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.sequence_matches = self.component.recognize(
+            context.frame.shape,
+            context.body_result,
+            context.hand_result,
+            timestamp_s=context.capture_time_s,
+        )
+        return True
+
+
+class PoseFormatterStage(Stage):
+    kind = "formatter"
+    module = "pose_formatter"
+    factory = "PoseFormatter"
+    requires = ("frame", "metrics", "body_gesture")
+    provides = ("payload",)
+
+    def process(self, context: FrameContext) -> bool:
+        context.pose_frame = self.component.build_frame(
+            context.frame.shape,
+            context.body_result,
+            context.hand_result,
+            context.metrics,
+            context.body_gesture,
+            context.arm_segments,
+            hand_states=context.hand_states,
+            sequence_matches=context.sequence_matches,
+        )
+        context.payload = self.component.encode(context.pose_frame)
+        context.payload_version = self.component.schema_version
+        return True
+
+
+class TcpSenderSink(Stage):
+    kind = "sink"
+    module = "pose_sender"
+    factory = "PoseSender"
+    requires = ("payload",)
+
+    def process(self, context: FrameContext) -> bool:
+        version = self.component.connect()
+        if version is None:
+            return True
+        payload = context.payload
+        if version != context.payload_version and context.pose_frame is not None:
+            # The listener speaks an older schema than the formatter.
+            from payload_schema import encode_payload
+
+            payload = encode_payload(context.pose_frame, version)
+        self.component.send(payload)
+        return True
+
+    def signal_ready(self) -> None:
+        # Registered as the connection greeting, so it is also delivered
+        # after a reconnect or when Unity starts listening later.
+        self.component.set_greeting(READY_PAYLOAD)
+
+    def counters(self) -> Dict[str, float]:
+        sender = self.component
+        if sender is None:
+            return {}
+        return {
+            "sent_bytes": sender.bytes_sent,
+            "sent_payloads": sender.payloads_sent,
+            "reconnects": max(sender.connections - 1, 0),
+        }
+
+
+class AsyncSenderSink(TcpSenderSink):
+    """Hands payloads to the asyncio network runtime; see network_runtime.
+
+    ``process`` never waits on a socket. Each peer is sent the newest
+    payload, re-encoded on the network thread if it agreed to another
+    schema version.
+    """
+
+    module = "network_runtime"
+    factory = "AsyncPoseSender"
+
+    def process(self, context: FrameContext) -> bool:
+        self.component.publish(context.pose_frame, context.payload, context.payload_version)
+        return True
+
+
+class VisualizerSink(Stage):
+    kind = "sink"
+    module = "pose_visualizer"
+    factory = "PoseVisualizer"
+    requires = ("frame",)
+
+    def process(self, context: FrameContext) -> bool:
+        self.component.draw(context.frame, context.body_result, context.hand_result)
+        return self.component.show(context.frame)
+
+
+class PreviewSink(Stage):
+    """Decimated preview drawn on a worker thread; see pose_preview."""
+
+    kind = "sink"
+    module = "pose_preview"
+    factory = "PreviewWindow"
+    requires = ("frame",)
+
+    def process(self, context: FrameContext) -> bool:
+        return self.component.update(
+            context.frame,
+            context.body_result,
+            context.hand_result,
+            context.frame_index,
+        )
+
+
+class MjpegPreviewSink(PreviewSink):
+    """Annotated preview served over HTTP; see preview_server."""
+
+    module = "preview_server"
+    factory = "MjpegPreviewServer"
+
+
+class ConsoleSink(Stage):
+    """Logs one context field every ``every`` frames, at debug level.
+
+    Nothing is formatted unless the ``pose.pipeline`` logger is enabled for
+    debug output (``--log-level debug``).
+    """
+
+    kind = "sink"
+
+    def required_fields(self) -> Tuple[str, ...]:
+        field_name = self.params.get("field", "payload")
+        if field_name not in FrameContext.__dataclass_fields__:
+            raise PipelineConfigError(
+                f"Stage '{self.name}' prints unknown field '{field_name}'"
+            )
+        return (field_name,)
+
+    def check_params(self) -> None:
+        unknown = set(self.params) - {"field", "every"}
+        if unknown:
+            raise PipelineConfigError(
+                f"Invalid parameters for stage '{self.name}': {', '.join(sorted(unknown))}"
+            )
+        every = self.params.get("every", 30)
+        if not isinstance(every, int) or every < 1:
+            raise PipelineConfigError(
+                f"Stage '{self.name}' needs a positive integer 'every', got {every!r}"
+            )
+
+    def open(self) -> None:
+        self.check_params()
+        self.component = (self.required_fields()[0], self.params.get("every", 30))
+
+    def process(self, context: FrameContext) -> bool:
+        field_name, every = self.component
+        if context.frame_index % every == 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "frame %d %s: %s", context.frame_index, field_name, getattr(context, field_name)
+            )
+        return True
+
+    def close(self) -> None:
+        self.component = None
+
+
+STAGE_TYPES: Dict[str, type] = {
+    "camera": CameraSource,
+    "ingest": IngestSource,
+    "body_pose": BodyPoseStage,
+    "hand_pose": HandPoseStage,
+    "hand_gesture": HandGestureStage,
+    "landmark_gesture": LandmarkGestureStage,
+    "skeleton": SkeletonStage,
+    "pose_metrics": PoseMetricsStage,
+    "body_gesture": BodyGestureStage,
+    "arm_rotation": ArmRotationStage,
+    "hand_motion": HandMotionStage,
+    "sequence_gesture": SequenceGestureStage,
+    "pose_formatter": PoseFormatterStage,
+    "tcp_sender": TcpSenderSink,
+    "async_sender": AsyncSenderSink,
+    "visualizer": VisualizerSink,
+    "preview": PreviewSink,
+    "mjpeg_preview": MjpegPreviewSink,
+    "console": ConsoleSink,
+}
@@ -2,14 +2,40 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from arm_rotation_calculator import ArmSegmentRotation
-from hand_motion_analyzer import HandState
+import numpy as np
+
+from landmark_arrays import landmark_confidence, landmarks_to_array
+from payload_schema import SCHEMA_VERSION, check_version, encode_payload
+
+if TYPE_CHECKING:
+    from arm_rotation_calculator import ArmSegmentRotation
+    from hand_motion_analyzer import HandState
+    from sequence_recognizer import SequenceMatch
 
 
 class PoseFormatter:
-    """Formats pose data into a string payload."""
+    """Formats pose data into a string payload.
+
+    The pipeline results are first collected into a frame dict (see
+    ``payload_schema``), which is then encoded with ``schema_version``.
+
+    ``fingertip_kinematics`` adds per-fingertip image velocities to the
+    ``hand_states`` section; wrist kinematics and events are always sent.
+    With ``send_confidence`` each body landmark carries its visibility as a
+    fourth value, in whole percent (``0.1,0.2,0.3,97``).
+    """
+
+    def __init__(
+        self,
+        fingertip_kinematics: bool = False,
+        send_confidence: bool = True,
+        schema_version: int = SCHEMA_VERSION,
+    ) -> None:
+        self._fingertip_kinematics = fingertip_kinematics
+        self._send_confidence = send_confidence
+        self.schema_version = check_version(schema_version)
 
     def format(
         self,
@@ -20,97 +46,135 @@ class PoseFormatter:
         body_gesture: str,
         arm_segments: Optional[List[ArmSegmentRotation]] = None,
         hand_states: Optional[List[HandState]] = None,
+        sequence_matches: Optional[List[SequenceMatch]] = None,
     ) -> str:
-        body_section = self._format_body(frame_shape, body_result)
-        hand_section = self._format_hands(frame_shape, hand_result)
-        hand_state_section = self._format_hand_states(hand_states)
-        metrics_section = f"metrics:body={metrics.body_landmark_count},hands={metrics.hand_landmark_count}"
-        gesture_section = f"gesture:{body_gesture}"
-        arm_section = self._format_arm_segments(arm_segments)
-
-        sections = [
-            part
-            for part in [
-                body_section,
-                hand_section,
-                hand_state_section,
-                metrics_section,
-                gesture_section,
-                arm_section,
-            ]
-            if part
+        return self.encode(
+            self.build_frame(
+                frame_shape,
+                body_result,
+                hand_result,
+                metrics,
+                body_gesture,
+                arm_segments,
+                hand_states=hand_states,
+                sequence_matches=sequence_matches,
+            )
+        )
+
+    def encode(self, frame: Dict[str, Any]) -> str:
+        return encode_payload(frame, self.schema_version)
+
+    def build_frame(
+        self,
+        frame_shape,
+        body_result,
+        hand_result,
+        metrics,
+        body_gesture: str,
+        arm_segments: Optional[List[ArmSegmentRotation]] = None,
+        hand_states: Optional[List[HandState]] = None,
+        sequence_matches: Optional[List[SequenceMatch]] = None,
+    ) -> Dict[str, Any]:
+        """Collect the results into a frame dict ready for ``encode``."""
+        frame: Dict[str, Any] = {}
+        body = self._body_section(frame_shape, body_result)
+        if body is not None:
+            frame[body[0]] = body[1]
+        frame["hands"] = self._hand_entries(frame_shape, hand_result)
+        frame["hand_states"] = self._hand_state_entries(hand_states)
+        frame["metrics"] = {
+            "body": metrics.body_landmark_count,
+            "hands": metrics.hand_landmark_count,
+            "visible": getattr(metrics, "body_visible_count", 0),
+        }
+        frame["gesture"] = body_gesture
+        frame["arm_segments"] = [
+            (segment.config.name, {"dir": segment.direction}) for segment in arm_segments or []
         ]
-        return "|".join(sections)
+        frame["sequences"] = self._sequence_entries(sequence_matches)
+        return frame
 
-    def _format_body(self, frame_shape, body_result) -> str:
+    def _body_section(self, frame_shape, body_result) -> Optional[Tuple[str, np.ndarray]]:
         if not body_result:
-            return ""
+            return None
 
         height, width = frame_shape[:2]
 
         if body_result.world_landmarks:
-            serialized = ";".join(
-                f"{idx}:{landmark.x:.5f},{landmark.y:.5f},{landmark.z:.5f}"
-                for idx, landmark in enumerate(body_result.world_landmarks.landmark)
-            )
-            return f"body_world:{serialized}"
+            landmarks = body_result.world_landmarks
+            points = landmarks_to_array(landmarks, dtype=np.float64)
+            return "body_world", self._with_confidence(points, landmarks)
 
         if body_result.landmarks:
-            serialized = ";".join(
-                f"{idx}:{landmark.x * width:.1f},{landmark.y * height:.1f},{0.0:.1f}"
-                for idx, landmark in enumerate(body_result.landmarks.landmark)
-            )
-            return f"body_image:{serialized}"
+            landmarks = body_result.landmarks
+            points = landmarks_to_array(landmarks, dtype=np.float64) * (width, height, 1.0)
+            points[:, 2] = 0.0  # image landmarks carry no depth
+            return "body_image", self._with_confidence(points, landmarks)
 
-        return ""
+        return None
 
-    def _format_hands(self, frame_shape, hand_result) -> str:
+    def _with_confidence(self, points: np.ndarray, landmarks) -> np.ndarray:
+        if not self._send_confidence:
+            return points
+        percent = np.round(landmark_confidence(landmarks) * 100.0)
+        return np.column_stack([points, percent])
+
+    def _hand_entries(self, frame_shape, hand_result) -> List[Tuple[str, np.ndarray]]:
         if not hand_result or not hand_result.normalized:
-            return ""
+            return []
 
         height, width = frame_shape[:2]
-        hands_payload: List[str] = []
-        for hand_idx, hand_landmarks in enumerate(hand_result.normalized):
-            serialized = ";".join(
-                f"{idx}:{landmark.x * width:.1f},{landmark.y * height:.1f},{landmark.z:.5f}"
-                for idx, landmark in enumerate(hand_landmarks.landmark)
-            )
-            hands_payload.append(f"hand{hand_idx}:{serialized}")
-
-        if not hands_payload:
-            return ""
-
-        return "hands:" + "|".join(hands_payload)
-
-    def _format_hand_states(self, hand_states: Optional[List[HandState]]) -> str:
-        if not hand_states:
-            return ""
+        return [
+            (f"hand{hand_idx}", landmarks_to_array(hand_landmarks, dtype=np.float64) * (width, height, 1.0))
+            for hand_idx, hand_landmarks in enumerate(hand_result.normalized)
+        ]
 
-        payload: List[str] = []
-        for state in hand_states:
+    def _hand_state_entries(
+        self, hand_states: Optional[List[HandState]]
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        entries = []
+        for state in hand_states or []:
             x, y = state.position
-            pointing = 1 if state.is_pointing else 0
-            gesture = state.gesture or "none"
-            payload.append(
-                f"{state.handedness}:x={x:.1f},y={y:.1f},dir={state.direction},pointing={pointing},gesture={gesture}"
-            )
-
-        return "hand_states:" + "|".join(payload)
-
-    def _format_arm_segments(
-        self, arm_segments: Optional[List[ArmSegmentRotation]]
-    ) -> str:
-        if not arm_segments:
-            return ""
-
-        segments_payload: List[str] = []
-        for segment in arm_segments:
-            direction = segment.direction
-            segment_payload = (
-                f"{segment.config.name}:"
-                f"dir={direction[0]:.5f},{direction[1]:.5f},{direction[2]:.5f}"
-            )
-            segments_payload.append(segment_payload)
+            entry: Dict[str, Any] = {
+                "x": x,
+                "y": y,
+                "dir": state.direction,
+                "pointing": state.is_pointing,
+                "gesture": state.gesture or "none",
+                "score": state.score,
+                "ts": state.timestamp,
+            }
+            entry.update(self._kinematics_fields(state))
+            entries.append((state.handedness, entry))
+        return entries
+
+    def _kinematics_fields(self, state: HandState) -> Dict[str, Any]:
+        """Extra ``hand_states`` fields; NaN values are left out by the encoder."""
+        fields: Dict[str, Any] = {}
+        kinematics = state.kinematics
+        if kinematics is not None:
+            fields.update(zip(("vx", "vy"), kinematics.velocity[0]))
+            fields.update(zip(("ax", "ay"), kinematics.acceleration[0]))
+            fields.update(zip(("wvx", "wvy", "wvz"), kinematics.world_velocity[0]))
+            fields.update(zip(("wax", "way", "waz"), kinematics.world_acceleration[0]))
+            if self._fingertip_kinematics:
+                for tip, velocity in zip((4, 8, 12, 16, 20), kinematics.velocity[1:]):
+                    fields[f"t{tip}v"] = velocity
+        if state.events:
+            fields["events"] = [(event.kind, event.direction, event.onset) for event in state.events]
+        return fields
+
+    @staticmethod
+    def _sequence_entries(
+        matches: Optional[List[SequenceMatch]],
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        return [
+            (match.name, {"conf": match.confidence, "start": match.start, "end": match.end})
+            for match in matches or []
+        ]
 
-        return "arm_segments:" + "|".join(segments_payload)
+    def _format_hand_states(self, hand_states: Optional[List[HandState]]) -> str:
+        return self.encode({"hand_states": self._hand_state_entries(hand_states)})
 
+    def _format_sequences(self, matches: Optional[List[SequenceMatch]]) -> str:
+        return self.encode({"sequences": self._sequence_entries(matches)})
@@ -0,0 +1,229 @@
+"""Decimated pose preview rendered off the frame loop.
+
+The frame loop only hands over a downscaled copy of the frame plus the
+landmark arrays, at most ``preview_hz`` times per second. Drawing happens
+on a worker thread, so preview cost never delays sending poses.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+from landmark_arrays import (
+    HAND_CONNECTIONS,
+    POSE_CONNECTIONS,
+    hands_to_arrays,
+    landmarks_to_array,
+)
+
+BODY_COLOR = (0, 255, 0)
+BODY_JOINT_COLOR = (0, 0, 255)
+HAND_COLOR = (255, 255, 255)
+HAND_JOINT_COLOR = (0, 128, 255)
+
+PreviewConsumer = Callable[[np.ndarray, int], None]
+
+
+@dataclass
+class PreviewSnapshot:
+    """What the frame loop hands to the preview worker."""
+
+    frame: np.ndarray
+    frame_index: int
+    body: Optional[np.ndarray] = None
+    hands: List[np.ndarray] = field(default_factory=list)
+
+
+def make_snapshot(frame, body_result, hand_result, frame_index: int, scale: float) -> PreviewSnapshot:
+    """Copy the frame at ``scale`` and extract landmark arrays.
+
+    Landmarks are kept normalized; they are mapped to pixels when drawn.
+    """
+    if scale != 1.0:
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        small = frame.copy()
+
+    body = None
+    if body_result is not None and getattr(body_result, "landmarks", None):
+        body = landmarks_to_array(body_result.landmarks)
+    hands = hands_to_arrays(hand_result.normalized if hand_result is not None else None)
+    return PreviewSnapshot(frame=small, frame_index=frame_index, body=body, hands=hands)
+
+
+def _to_pixels(points: np.ndarray, width: int, height: int) -> np.ndarray:
+    return np.rint(points[:, :2] * (width, height)).astype(np.int32)
+
+
+def _draw_skeleton(image, pixels, connections, line_color, joint_color, radius) -> None:
+    valid = connections[(connections < len(pixels)).all(axis=1)]
+    if len(valid):
+        # One call draws every bone: each connection is a 2-point polyline.
+        cv2.polylines(image, list(pixels[valid]), False, line_color, 2, cv2.LINE_AA)
+    for x, y in pixels:
+        cv2.circle(image, (int(x), int(y)), radius, joint_color, -1, cv2.LINE_AA)
+
+
+def draw_overlay(image: np.ndarray, snapshot: PreviewSnapshot, labels: bool = False) -> np.ndarray:
+    """Draw the snapshot's skeletons onto ``image`` in place."""
+    height, width = image.shape[:2]
+    if snapshot.body is not None:
+        pixels = _to_pixels(snapshot.body, width, height)
+        _draw_skeleton(image, pixels, POSE_CONNECTIONS, BODY_COLOR, BODY_JOINT_COLOR, 3)
+        if labels:
+            for idx, (x, y) in enumerate(pixels):
+                cv2.putText(
+                    image, str(idx), (int(x), int(y) - 6),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.35, BODY_COLOR, 1,
+                )
+    for hand in snapshot.hands:
+        pixels = _to_pixels(hand, width, height)
+        _draw_skeleton(image, pixels, HAND_CONNECTIONS, HAND_COLOR, HAND_JOINT_COLOR, 2)
+    return image
+
+
+class PreviewWorker:
+    """Renders at most ``preview_hz`` snapshots per second on its own thread.
+
+    Only the newest snapshot is kept; if the worker is still drawing when a
+    new one arrives, the older pending snapshot is dropped. When nothing
+    consumes the output (no window and no consumers), ``submit`` returns
+    immediately and nothing is copied or drawn.
+    """
+
+    def __init__(
+        self,
+        preview_hz: float = 10.0,
+        scale: float = 0.5,
+        labels: bool = False,
+        keep_latest: bool = True,
+    ) -> None:
+        self._interval = 1.0 / preview_hz if preview_hz > 0 else 0.0
+        self._scale = float(scale)
+        self._labels = labels
+        self._keep_latest = keep_latest
+        self._next_due = 0.0
+
+        self._consumers: List[PreviewConsumer] = []
+        self._condition = threading.Condition()
+        self._pending: Optional[PreviewSnapshot] = None
+        self._latest: Optional[np.ndarray] = None
+        self._latest_index = -1
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="pose-preview", daemon=True)
+        self._thread.start()
+
+    @property
+    def active(self) -> bool:
+        return self._keep_latest or bool(self._consumers)
+
+    def set_rate(self, preview_hz: float) -> None:
+        """Change the maximum render rate; takes effect on the next submit."""
+        self._interval = 1.0 / preview_hz if preview_hz > 0 else 0.0
+        self._next_due = 0.0
+
+    def add_consumer(self, consumer: PreviewConsumer) -> None:
+        """Call ``consumer(image, frame_index)`` on the worker for each render.
+
+        The image is shared with other consumers and must not be modified.
+        """
+        with self._condition:
+            self._consumers.append(consumer)
+
+    def remove_consumer(self, consumer: PreviewConsumer) -> None:
+        with self._condition:
+            if consumer in self._consumers:
+                self._consumers.remove(consumer)
+
+    def submit(self, frame, body_result, hand_result, frame_index: int) -> bool:
+        """Offer a frame; returns True if it was taken for rendering."""
+        if frame is None or not self.active:
+            return False
+        now = time.perf_counter()
+        if now < self._next_due:
+            return False
+        self._next_due = now + self._interval
+
+        snapshot = make_snapshot(frame, body_result, hand_result, frame_index, self._scale)
+        with self._condition:
+            self._pending = snapshot
+            self._condition.notify()
+        return True
+
+    def latest(self):
+        """Return ``(image, frame_index)`` of the newest render, or ``(None, -1)``."""
+        with self._condition:
+            return self._latest, self._latest_index
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                snapshot, self._pending = self._pending, None
+                consumers = list(self._consumers)
+
+            image = draw_overlay(snapshot.frame, snapshot, labels=self._labels)
+            with self._condition:
+                if self._keep_latest:
+                    self._latest = image
+                    self._latest_index = snapshot.frame_index
+            for consumer in consumers:
+                consumer(image, snapshot.frame_index)
+
+    def close(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+
+
+class PreviewWindow:
+    """Pipeline-facing preview: a worker plus an optional HighGUI window.
+
+    HighGUI calls stay on the caller's thread, which must be the main thread
+    on macOS, but they only happen when a new render is ready, i.e. at the
+    preview rate rather than the camera rate. With ``show_window=False`` and
+    no consumers the preview is fully headless and renders nothing.
+    """
+
+    def __init__(
+        self,
+        window_name: str = "Pose Estimation",
+        preview_hz: float = 10.0,
+        scale: float = 0.5,
+        labels: bool = False,
+        show_window: bool = True,
+    ) -> None:
+        self._window_name = window_name
+        self._show_window = show_window
+        self._shown_index = -1
+        self.worker = PreviewWorker(
+            preview_hz=preview_hz, scale=scale, labels=labels, keep_latest=show_window
+        )
+
+    def update(self, frame, body_result, hand_result, frame_index: int) -> bool:
+        """Offer a frame; return False when the user asked to quit."""
+        self.worker.submit(frame, body_result, hand_result, frame_index)
+        if not self._show_window:
+            return True
+
+        image, index = self.worker.latest()
+        if image is None or index == self._shown_index:
+            return True
+        self._shown_index = index
+        cv2.imshow(self._window_name, image)
+        return cv2.waitKey(1) & 0xFF != ord("q")
+
+    def close(self) -> None:
+        self.worker.close()
+        if self._shown_index >= 0:
+            cv2.destroyWindow(self._window_name)
@@ -5,15 +5,60 @@ from __future__ import annotations
 import socket
 from typing import Optional
 
+from payload_schema import accepted_version, check_version, hello_message
+
 
 class PoseSender:
-    """Maintains a TCP socket connection and sends serialized pose strings."""
+    """Maintains a TCP socket connection and sends serialized pose strings.
+
+    On every new connection the sender offers the payload schema versions
+    it can encode and waits up to ``handshake_timeout`` seconds for the
+    listener to pick one (see ``payload_schema``). Listeners that do not
+    answer get version 1. Pass ``schema_version`` to skip the handshake and
+    assume that version.
+    """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 25001, timeout: float = 2.0) -> None:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 25001,
+        timeout: float = 2.0,
+        greeting: Optional[str] = None,
+        schema_version: Optional[int] = None,
+        handshake_timeout: float = 0.5,
+    ) -> None:
         self._host = host
         self._port = port
         self._timeout = timeout
+        self._greeting = greeting
+        self._fixed_version = None if schema_version is None else check_version(schema_version)
+        self._handshake_timeout = handshake_timeout
         self._socket: Optional[socket.socket] = None
+        self.schema_version: Optional[int] = None  # agreed version, None while offline
+        # Running totals, read by the pipeline metrics.
+        self.bytes_sent = 0
+        self.payloads_sent = 0
+        self.connections = 0
+
+    def set_greeting(self, greeting: Optional[str]) -> None:
+        """Set a message sent first on every new connection.
+
+        If a connection is already open the greeting is sent right away.
+        Otherwise it goes out once the listener accepts, so a consumer that
+        starts after the backend still receives it.
+        """
+        self._greeting = greeting
+        if greeting and self._socket is not None:
+            try:
+                self._socket.sendall(greeting.encode("utf-8"))
+            except OSError:
+                self._reset_socket()
+
+    def connect(self) -> Optional[int]:
+        """Connect if needed; return the agreed schema version, None if offline."""
+        if self._ensure_socket() is None:
+            return None
+        return self.schema_version
 
     def send(self, payload: str) -> None:
         if not payload:
@@ -23,28 +68,49 @@ class PoseSender:
         if sock is None:
             return
 
+        data = payload.encode("utf-8")
         try:
-            sock.sendall(payload.encode("utf-8"))
+            sock.sendall(data)
         except OSError:
             self._reset_socket()
             sock = self._ensure_socket()
-            if sock is not None:
-                try:
-                    sock.sendall(payload.encode("utf-8"))
-                except OSError:
-                    self._reset_socket()
+            if sock is None:
+                return
+            try:
+                sock.sendall(data)
+            except OSError:
+                self._reset_socket()
+                return
+        self.bytes_sent += len(data)
+        self.payloads_sent += 1
 
     def _ensure_socket(self) -> Optional[socket.socket]:
         if self._socket is None:
             try:
-                new_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                # Held in self._socket from the start so a failed connect or
+                # handshake closes it in _reset_socket.
+                new_socket = self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 new_socket.settimeout(self._timeout)
                 new_socket.connect((self._host, self._port))
-                self._socket = new_socket
+                self.schema_version = self._fixed_version or self._negotiate(new_socket)
+                if self._greeting:
+                    new_socket.sendall(self._greeting.encode("utf-8"))
+                self.connections += 1
             except OSError:
                 self._reset_socket()
         return self._socket
 
+    def _negotiate(self, sock: socket.socket) -> int:
+        sock.sendall(hello_message().encode("utf-8"))
+        sock.settimeout(self._handshake_timeout)
+        try:
+            reply = sock.recv(256).decode("utf-8", "replace")
+        except socket.timeout:
+            reply = ""
+        finally:
+            sock.settimeout(self._timeout)
+        return accepted_version(reply)
+
     def _reset_socket(self) -> None:
         if self._socket is not None:
             try:
@@ -52,6 +118,7 @@ class PoseSender:
             except OSError:
                 pass
         self._socket = None
+        self.schema_version = None
 
     def close(self) -> None:
         self._reset_socket()
@@ -0,0 +1,127 @@
+"""Idle the pipeline while nobody is in front of the camera.
+
+``PresenceMonitor`` switches the runner into an idle mode once no body
+has been seen for ``idle_after_s`` seconds. While idle, frames are read
+at ``idle_fps`` and pass through ``MotionGate``, a frame difference on a
+small grayscale thumbnail. Only a frame that moved, or one every
+``heartbeat_s`` seconds, gets a presence check: the body estimator alone,
+downscaled to ``check_scale`` and on the ``check_complexity`` model. No
+other stage runs and nothing is sent.
+
+When a check finds a body the monitor wakes up, and that same frame goes
+through the rest of the pipeline, so tracking resumes at full rate on the
+frame that detected the person.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import numpy as np
+
+from quality_governor import QualityLevel
+
+
+class MotionGate:
+    """Reports whether a frame differs from the previous one.
+
+    Frames are shrunk to ``width`` pixels wide and converted to grayscale,
+    which also removes most sensor noise. A pixel counts as changed when it
+    moved by more than ``pixel_delta`` grey levels; the frame moved when
+    more than ``min_changed`` of the pixels changed.
+    """
+
+    def __init__(self, width: int = 64, pixel_delta: int = 12, min_changed: float = 0.01) -> None:
+        self.width = max(8, int(width))
+        self.pixel_delta = pixel_delta
+        self.min_changed = min_changed
+        self._previous: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        self._previous = None
+
+    def _thumbnail(self, frame) -> np.ndarray:
+        import cv2
+
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def changed_fraction(self, frame) -> float:
+        """Fraction of changed pixels since the last frame; 1.0 for the first."""
+        import cv2
+
+        thumbnail = self._thumbnail(frame)
+        previous, self._previous = self._previous, thumbnail
+        if previous is None or previous.shape != thumbnail.shape:
+            return 1.0
+        return float(np.count_nonzero(cv2.absdiff(thumbnail, previous) > self.pixel_delta)) / thumbnail.size
+
+    def moved(self, frame) -> bool:
+        return self.changed_fraction(frame) > self.min_changed
+
+
+class PresenceMonitor:
+    """Decides when the pipeline idles and which idle frames get a check."""
+
+    def __init__(
+        self,
+        idle_after_s: float = 5.0,
+        idle_fps: Optional[float] = 5.0,
+        heartbeat_s: float = 2.0,
+        check_scale: float = 0.5,
+        check_complexity: int = 0,
+        motion_threshold: float = 0.01,
+    ) -> None:
+        if idle_after_s < 0 or heartbeat_s <= 0:
+            raise ValueError("idle_after_s and heartbeat_s must be positive")
+        if not 0.0 < check_scale <= 1.0 or check_complexity not in (0, 1, 2):
+            raise ValueError(f"Invalid presence check scale {check_scale} or complexity {check_complexity}")
+        self.idle_after_s = idle_after_s
+        self.idle_fps = idle_fps
+        self.heartbeat_s = heartbeat_s
+        self.check_level = QualityLevel(check_scale, check_complexity)
+        self.gate = MotionGate(min_changed=motion_threshold)
+        self.idle = False
+        self.checks = 0
+        self._last_seen: Optional[float] = None
+        self._last_check = 0.0
+        self._next_read = 0.0
+
+    def observe(self, present: bool, now: float) -> bool:
+        """Record a fully processed frame; return True when it starts idling."""
+        if present or self._last_seen is None:
+            self._last_seen = now
+            return False
+        if now - self._last_seen < self.idle_after_s:
+            return False
+        self.idle = True
+        self.gate.reset()
+        self._last_check = now
+        return True
+
+    def should_check(self, frame, now: float) -> bool:
+        """While idle: whether ``frame`` deserves a presence check."""
+        # The gate sees every frame so it always compares neighbours.
+        moved = self.gate.moved(frame)
+        if not moved and now - self._last_check < self.heartbeat_s:
+            return False
+        self._last_check = now
+        self.checks += 1
+        return True
+
+    def wake(self, now: float) -> None:
+        self.idle = False
+        self._last_seen = now
+
+    def throttle(self) -> None:
+        """Sleep so idle frames are read at ``idle_fps``."""
+        if not self.idle_fps:
+            return
+        now = time.monotonic()
+        self._next_read = max(self._next_read + 1.0 / self.idle_fps, now)
+        if self._next_read > now:
+            time.sleep(self._next_read - now)
@@ -0,0 +1,232 @@
+"""MJPEG preview endpoint for monitoring headless capture rigs.
+
+Open ``http://<host>:<port>/`` in a browser, or point any MJPEG client at
+``/stream.mjpg`` (``?fps=N`` asks for a specific rate). ``/snapshot.jpg``
+returns one JPEG.
+
+The server only subscribes to the preview worker while at least one
+viewer is connected. The render and encode rate follows the fastest
+rate any viewer asked for, capped at ``max_fps``. With zero viewers
+nothing is copied, drawn or encoded.
+"""
+
+from __future__ import annotations
+
+import math
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+
+from pose_preview import PreviewWorker
+
+BOUNDARY = "poseframe"
+INDEX_PAGE = (
+    b"<html><head><title>Pose preview</title></head>"
+    b"<body style='margin:0;background:#111'>"
+    b"<img src='/stream.mjpg' style='width:100%'></body></html>"
+)
+
+
+class MjpegPreviewServer:
+    """Encodes preview renders as JPEG and streams them over HTTP."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        max_fps: float = 10.0,
+        scale: float = 0.5,
+        quality: int = 70,
+        labels: bool = False,
+        queue_size: int = 2,
+    ) -> None:
+        self._max_fps = float(max_fps)
+        self._quality = int(quality)
+        self.worker = PreviewWorker(
+            preview_hz=max_fps, scale=scale, labels=labels, keep_latest=False
+        )
+
+        # Renders waiting to be encoded. Bounded, so a slow encoder drops
+        # frames instead of holding on to memory.
+        self._encode_queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=queue_size)
+        self._condition = threading.Condition()
+        self._jpeg: Optional[bytes] = None
+        self._sequence = 0
+        self._viewers: Dict[int, float] = {}
+        self._next_viewer = 0
+        self._subscribed = False
+        self._running = True
+        self.frames_encoded = 0
+
+        self._encoder = threading.Thread(target=self._encode_loop, name="mjpeg-encode", daemon=True)
+        self._encoder.start()
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._http_thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mjpeg-http", daemon=True
+        )
+        self._http_thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    @property
+    def viewer_count(self) -> int:
+        with self._condition:
+            return len(self._viewers)
+
+    def update(self, frame, body_result, hand_result, frame_index: int) -> bool:
+        """Offer a frame from the pipeline; always lets the pipeline continue."""
+        self.worker.submit(frame, body_result, hand_result, frame_index)
+        return True
+
+    def _on_render(self, image, frame_index: int) -> None:
+        try:
+            self._encode_queue.put_nowait((image, frame_index))
+        except queue.Full:
+            pass  # encoder is behind; this render is dropped
+
+    def _encode_loop(self) -> None:
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self._quality]
+        while True:
+            item = self._encode_queue.get()
+            if item is None:
+                return
+            image, _ = item
+            ok, encoded = cv2.imencode(".jpg", image, params)
+            if not ok:
+                continue
+            with self._condition:
+                self._jpeg = encoded.tobytes()
+                self._sequence += 1
+                self.frames_encoded += 1
+                self._condition.notify_all()
+
+    def _add_viewer(self, fps: float) -> int:
+        with self._condition:
+            viewer_id = self._next_viewer
+            self._next_viewer += 1
+            self._viewers[viewer_id] = min(max(fps, 0.1), self._max_fps)
+            self._update_subscription()
+            return viewer_id
+
+    def _remove_viewer(self, viewer_id: int) -> None:
+        with self._condition:
+            self._viewers.pop(viewer_id, None)
+            self._update_subscription()
+
+    def _update_subscription(self) -> None:
+        # Called with the condition held.
+        if self._viewers:
+            self.worker.set_rate(max(self._viewers.values()))
+            if not self._subscribed:
+                self.worker.add_consumer(self._on_render)
+                self._subscribed = True
+        elif self._subscribed:
+            self.worker.remove_consumer(self._on_render)
+            self._subscribed = False
+
+    def wait_for_jpeg(self, after: int, timeout: float = 1.0) -> Tuple[Optional[bytes], int]:
+        """Block until a JPEG newer than sequence ``after`` exists."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._sequence > after or not self._running, timeout=timeout
+            )
+            return self._jpeg if self._sequence > after else None, self._sequence
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:  # noqa: A002
+                pass
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                if url.path == "/":
+                    self._send_body(INDEX_PAGE, "text/html")
+                elif url.path == "/snapshot.jpg":
+                    self._snapshot()
+                elif url.path == "/stream.mjpg":
+                    fps = self._requested_fps(parse_qs(url.query))
+                    if fps is None:
+                        self.send_error(400, "fps must be a positive number")
+                    else:
+                        self._stream(fps)
+                else:
+                    self.send_error(404)
+
+            def _requested_fps(self, query: Dict[str, list]) -> Optional[float]:
+                """The ``fps`` query value clamped to ``max_fps``; None when invalid."""
+                try:
+                    fps = float(query.get("fps", [server._max_fps])[0])
+                except ValueError:
+                    return None
+                if not math.isfinite(fps) or fps <= 0.0:
+                    return None
+                return min(fps, server._max_fps)
+
+            def _send_body(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _snapshot(self) -> None:
+                viewer_id = server._add_viewer(server._max_fps)
+                try:
+                    jpeg, _ = server.wait_for_jpeg(0, timeout=2.0)
+                finally:
+                    server._remove_viewer(viewer_id)
+                if jpeg is None:
+                    self.send_error(503, "No preview frame available")
+                else:
+                    self._send_body(jpeg, "image/jpeg")
+
+            def _stream(self, fps: float) -> None:
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header(
+                    "Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+                )
+                self.end_headers()
+                viewer_id = server._add_viewer(fps)
+                sequence = 0
+                try:
+                    while server._running:
+                        jpeg, sequence = server.wait_for_jpeg(sequence)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii")
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server._remove_viewer(viewer_id)
+
+        return Handler
+
+    def close(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self.worker.close()
+        try:
+            self._encode_queue.put_nowait(None)
+        except queue.Full:
+            self._encode_queue.get_nowait()
+            self._encode_queue.put_nowait(None)
+        self._encoder.join(timeout=1.0)
@@ -0,0 +1,128 @@
+"""Trade estimator quality for frame rate at run time.
+
+``QualityGovernor`` watches how long each frame takes to process (every
+stage after the source) against a budget of ``1000 / target_fps`` ms. It
+moves along a ladder of ``QualityLevel`` s, from best to cheapest. Each
+level sets the input downscale of the estimators and the pose model
+complexity. The governor steps down as soon as the smoothed latency goes
+over budget, and steps back up only once it has been below
+``upgrade_below`` of the budget for ``min_frames`` frames. Each failed
+upgrade to a level doubles the wait before the next one.
+
+Estimators keep one graph per complexity on the ladder, all warmed up at
+startup, so a switch never stalls on loading a model.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    input_scale: float = 1.0
+    model_complexity: int = 1
+
+    def describe(self) -> str:
+        return f"scale {self.input_scale:g}, complexity {self.model_complexity}"
+
+
+DEFAULT_LEVELS = (
+    QualityLevel(1.0, 2),
+    QualityLevel(1.0, 1),
+    QualityLevel(0.75, 1),
+    QualityLevel(0.75, 0),
+    QualityLevel(0.5, 0),
+)
+
+
+def scale_frame(frame, scale: float):
+    """``frame`` resized by ``scale``; the frame itself when scale is 1."""
+    if frame is None or scale >= 1.0:
+        return frame
+    import cv2
+
+    return cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def parse_levels(levels: Sequence) -> List[QualityLevel]:
+    """Accept ``QualityLevel`` s or ``[input_scale, model_complexity]`` pairs."""
+    parsed = []
+    for level in levels:
+        if not isinstance(level, QualityLevel):
+            scale, complexity = level
+            level = QualityLevel(float(scale), int(complexity))
+        if not 0.0 < level.input_scale <= 1.0 or level.model_complexity not in (0, 1, 2):
+            raise ValueError(f"Invalid quality level {level}")
+        parsed.append(level)
+    if not parsed:
+        raise ValueError("The quality ladder needs at least one level")
+    return parsed
+
+
+class QualityGovernor:
+    """Picks a ``QualityLevel`` from measured frame latency."""
+
+    def __init__(
+        self,
+        target_fps: float = 30.0,
+        levels: Sequence = DEFAULT_LEVELS,
+        start_level: int = 1,
+        upgrade_below: float = 0.7,
+        min_frames: int = 30,
+        smoothing: float = 0.1,
+    ) -> None:
+        self.levels = parse_levels(levels)
+        if not 0 <= start_level < len(self.levels):
+            raise ValueError(f"start_level must be in [0, {len(self.levels) - 1}]")
+        self.budget_ms = 1000.0 / float(target_fps)
+        self.index = start_level
+        self._upgrade_below = upgrade_below
+        self._min_frames = min_frames
+        self._smoothing = smoothing
+        self._latency_ms: Optional[float] = None
+        self._frames_at_level = 0
+        self._upgraded_into = False
+        self._failed_upgrades: Dict[int, int] = {}
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    @property
+    def latency_ms(self) -> Optional[float]:
+        """Smoothed latency measured at the current level."""
+        return self._latency_ms
+
+    def model_complexities(self) -> List[int]:
+        """Complexities the pose estimator must keep graphs for, in ladder order."""
+        return list(dict.fromkeys(level.model_complexity for level in self.levels))
+
+    def update(self, latency_ms: float) -> bool:
+        """Record one frame; return True when the level changed."""
+        if self._latency_ms is None:
+            self._latency_ms = latency_ms
+        else:
+            self._latency_ms += self._smoothing * (latency_ms - self._latency_ms)
+        self._frames_at_level += 1
+        if self._frames_at_level < self._min_frames:
+            return False
+
+        if self._latency_ms > self.budget_ms and self.index < len(self.levels) - 1:
+            if self._upgraded_into:
+                self._failed_upgrades[self.index] = self._failed_upgrades.get(self.index, 0) + 1
+            self._move(self.index + 1, upgraded=False)
+            return True
+        if self._latency_ms < self._upgrade_below * self.budget_ms and self.index > 0:
+            wait = self._min_frames * 2 ** min(self._failed_upgrades.get(self.index - 1, 0), 4)
+            if self._frames_at_level >= wait:
+                self._move(self.index - 1, upgraded=True)
+                return True
+        return False
+
+    def _move(self, index: int, upgraded: bool) -> None:
+        self.index = index
+        self._upgraded_into = upgraded
+        self._frames_at_level = 0
+        self._latency_ms = None  # measure the new level from scratch
@@ -0,0 +1,325 @@
+"""Multi-frame gesture recognition with streaming subsequence DTW.
+
+Every frame is reduced to a small upper-body feature vector and fed to a
+SPRING-style matcher (Sakurai et al., "Stream Monitoring under the Time
+Warping Distance"). For every template it keeps only the last column of
+the DTW cost matrix and the start time of each partial path. A frame
+therefore costs O(total template length), whatever the length of the
+stream or of the movement being matched. All templates are updated
+together in one NumPy pass.
+
+A match is reported once no continuing path can beat it, usually a few
+frames after the movement ends. It carries its start and end capture
+times and a confidence in [0, 1].
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from landmark_arrays import landmarks_to_array
+
+if TYPE_CHECKING:
+    from body_pose_estimator import BodyPoseResult
+    from hand_pose_estimator import HandPoseResult
+
+
+DEFAULT_LIBRARY_PATH = os.path.join(
+    os.path.dirname(__file__), "models", "body_sequences.npz"
+)
+
+# Shoulders, elbows and wrists, in MediaPipe pose order.
+UPPER_BODY = (11, 12, 13, 14, 15, 16)
+_LEFT_SHOULDER, _RIGHT_SHOULDER = 11, 12
+_HAND_TIPS = (4, 8, 12, 16, 20)
+FEATURE_SIZE = 2 * len(UPPER_BODY) + 2
+
+
+def sequence_features(
+    body: Optional[np.ndarray],
+    hands: Optional[Dict[str, np.ndarray]] = None,
+    aspect: float = 1.0,
+) -> Optional[np.ndarray]:
+    """Return the ``(14,)`` feature vector for one frame, or None without a body.
+
+    The first 12 values are the shoulders, elbows and wrists relative to the
+    shoulder midpoint, in shoulder widths. The last two are the openness of
+    the left and right hand (fingertip spread over palm size), NaN when the
+    hand is not visible. NaN features are ignored when matching.
+    """
+    if body is None or len(body) <= max(UPPER_BODY):
+        return None
+    points = np.asarray(body, dtype=np.float64)[:, :2] * (aspect, 1.0)
+    center = (points[_LEFT_SHOULDER] + points[_RIGHT_SHOULDER]) * 0.5
+    width = max(float(np.linalg.norm(points[_LEFT_SHOULDER] - points[_RIGHT_SHOULDER])), 1e-6)
+
+    features = np.full(FEATURE_SIZE, np.nan)
+    features[:12] = ((points[list(UPPER_BODY)] - center) / width).ravel()
+    for offset, side in enumerate(("left", "right")):
+        hand = (hands or {}).get(side)
+        if hand is None or len(hand) < 21:
+            continue
+        hand = np.asarray(hand, dtype=np.float64)[:, :2] * (aspect, 1.0)
+        palm = max(float(np.linalg.norm(hand[9] - hand[0])), 1e-6)
+        spread = np.linalg.norm(hand[list(_HAND_TIPS)] - hand[0], axis=1).mean()
+        features[12 + offset] = spread / palm
+    return features
+
+
+@dataclass
+class SequenceTemplate:
+    """A recorded movement: ``frames`` is ``(length, 14)`` features."""
+
+    name: str
+    frames: np.ndarray
+    threshold: float
+
+
+@dataclass
+class SequenceMatch:
+    name: str
+    confidence: float
+    start: float  # capture time of the first matched frame, seconds
+    end: float  # capture time of the last matched frame, seconds
+    distance: float
+
+
+def save_templates(path: str, templates: Sequence[SequenceTemplate]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    length = max(len(template.frames) for template in templates)
+    frames = np.full((len(templates), length, FEATURE_SIZE), np.nan)
+    for idx, template in enumerate(templates):
+        frames[idx, : len(template.frames)] = template.frames
+    np.savez_compressed(
+        path,
+        names=np.array([template.name for template in templates]),
+        lengths=np.array([len(template.frames) for template in templates]),
+        thresholds=np.array([template.threshold for template in templates]),
+        frames=frames,
+    )
+
+
+def load_templates(path: str) -> List[SequenceTemplate]:
+    with np.load(path) as data:
+        return [
+            SequenceTemplate(str(name), data["frames"][idx, :length].copy(), float(threshold))
+            for idx, (name, length, threshold) in enumerate(
+                zip(data["names"], data["lengths"], data["thresholds"])
+            )
+        ]
+
+
+def template_from_recording(
+    name: str,
+    features: np.ndarray,
+    length: int = 24,
+    tolerance: float = 0.35,
+) -> SequenceTemplate:
+    """Resample a recorded ``(n, 14)`` feature sequence into a template.
+
+    ``tolerance`` is the accepted average distance per template frame.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    source = np.linspace(0.0, 1.0, len(features))
+    target = np.linspace(0.0, 1.0, length)
+    frames = np.stack(
+        [np.interp(target, source, features[:, column]) for column in range(features.shape[1])],
+        axis=1,
+    )
+    return SequenceTemplate(name, frames, tolerance * length)
+
+
+class SequenceRecognizer:
+    """Streams frames through every template with incremental DTW.
+
+    ``max_duration_s`` drops partial matches that started longer ago than
+    that, so a slow drift cannot be matched as a gesture. ``step_penalty``
+    is added whenever a path advances through the template without a new
+    frame, so a whole template cannot be matched by a couple of frames.
+    """
+
+    def __init__(
+        self,
+        library_path: Optional[str] = None,
+        max_duration_s: float = 4.0,
+        step_penalty: float = 0.2,
+        templates: Optional[Sequence[SequenceTemplate]] = None,
+    ) -> None:
+        if library_path is not None and not os.path.exists(library_path):
+            raise FileNotFoundError(
+                "Sequence templates not found at %s. "
+                "Record them with gesture_training.py sequence." % library_path
+            )
+        path = library_path or DEFAULT_LIBRARY_PATH
+        if templates is None:
+            templates = load_templates(path) if os.path.exists(path) else builtin_sequences()
+        self.templates = list(templates)
+        self._max_duration_s = max_duration_s
+        self._step_penalty = step_penalty
+
+        count = len(self.templates)
+        self._lengths = np.array([len(template.frames) for template in self.templates])
+        width = int(self._lengths.max()) if count else 0
+        self._frames = np.full((count, width, FEATURE_SIZE), np.nan)
+        for idx, template in enumerate(self.templates):
+            self._frames[idx, : len(template.frames)] = template.frames
+        self._thresholds = np.array([template.threshold for template in self.templates])
+        self._valid = np.arange(width)[None, :] < self._lengths[:, None]
+        self._rows = np.arange(count)
+        self._positions = np.broadcast_to(np.arange(width), (count, width))
+        self.reset()
+
+    def reset(self) -> None:
+        count, width = self._valid.shape
+        # Column 0 of the DTW matrix is the free start; 1..m hold the costs.
+        self._cost = np.full((count, width + 1), np.inf)
+        self._cost[:, 0] = 0.0
+        self._start = np.zeros((count, width + 1))
+        self._best = np.full(count, np.inf)
+        self._best_start = np.zeros(count)
+        self._best_end = np.zeros(count)
+
+    def recognize(
+        self,
+        frame_shape,
+        body_result: Optional[BodyPoseResult],
+        hand_result: Optional[HandPoseResult] = None,
+        timestamp_s: Optional[float] = None,
+    ) -> List[SequenceMatch]:
+        """Feed one pipeline frame; returns matches completed by it."""
+        if not body_result or not getattr(body_result, "landmarks", None):
+            return []
+        hands: Dict[str, np.ndarray] = {}
+        if hand_result is not None and hand_result.normalized:
+            labels = hand_result.handedness or []
+            for idx, hand in enumerate(hand_result.normalized):
+                if idx < len(labels):
+                    hands[labels[idx].lower()] = landmarks_to_array(hand)
+        aspect = frame_shape[1] / float(frame_shape[0])
+        features = sequence_features(landmarks_to_array(body_result.landmarks), hands, aspect)
+        if features is None:
+            return []
+        return self.update(features, time.monotonic() if timestamp_s is None else timestamp_s)
+
+    def update(self, features: np.ndarray, timestamp_s: float) -> List[SequenceMatch]:
+        """Advance every template by one frame of ``(14,)`` features."""
+        if not self.templates:
+            return []
+        now = float(timestamp_s)
+
+        # Local distances; NaN features (unseen hands) do not count.
+        difference = self._frames - features[None, None, :]
+        local = np.sqrt(np.nansum(difference * difference, axis=2))
+        local[~self._valid] = 0.0
+
+        # cost[i] = local[i] + min(cost[i-1] + p, prev[i], prev[i-1]).
+        # The in-frame dependency is a min-plus prefix scan, solved in closed
+        # form: cost[i] = C[i] + p*i + min_{k<=i}(entry[k] - C[k-1] - p*k)
+        # with C the running sum of local distances.
+        previous, previous_start = self._cost, self._start
+        previous_start[:, 0] = now
+        stay_better = previous[:, 1:] <= previous[:, :-1]
+        entry = np.where(stay_better, previous[:, 1:], previous[:, :-1])
+        entry_start = np.where(stay_better, previous_start[:, 1:], previous_start[:, :-1])
+
+        running = np.cumsum(local, axis=1) + self._step_penalty * self._positions
+        with np.errstate(invalid="ignore"):
+            offsets = entry - (running - local)
+        best_offsets = np.minimum.accumulate(offsets, axis=1)
+        chosen = np.maximum.accumulate(
+            np.where(offsets <= best_offsets, self._positions, 0), axis=1
+        )
+        cost = np.empty_like(previous)
+        start = np.empty_like(previous_start)
+        cost[:, 0] = 0.0
+        start[:, 0] = now
+        cost[:, 1:] = running + best_offsets
+        start[:, 1:] = np.take_along_axis(entry_start, chosen, axis=1)
+        cost[:, 1:][start[:, 1:] < now - self._max_duration_s] = np.inf
+
+        matches = self._report(cost, start, now)
+        end_cost = cost[self._rows, self._lengths]
+        improved = (end_cost <= self._thresholds) & (end_cost < self._best)
+        self._best = np.where(improved, end_cost, self._best)
+        self._best_start = np.where(improved, start[self._rows, self._lengths], self._best_start)
+        self._best_end = np.where(improved, now, self._best_end)
+
+        self._cost, self._start = cost, start
+        return matches
+
+    def _report(self, cost: np.ndarray, start: np.ndarray, now: float) -> List[SequenceMatch]:
+        """Emit held matches that no live path can improve any more."""
+        pending = np.isfinite(self._best)
+        if not pending.any():
+            return []
+        live = cost[:, 1:]
+        overlapping = start[:, 1:] <= self._best_end[:, None]
+        blocking = (live < self._best[:, None]) & overlapping & self._valid
+        done = pending & ~blocking.any(axis=1)
+
+        matches: List[SequenceMatch] = []
+        for row in np.flatnonzero(done):
+            template = self.templates[row]
+            distance = float(self._best[row])
+            matches.append(
+                SequenceMatch(
+                    name=template.name,
+                    confidence=float(max(0.0, 1.0 - distance / self._thresholds[row])),
+                    start=float(self._best_start[row]),
+                    end=float(self._best_end[row]),
+                    distance=distance,
+                )
+            )
+            # Paths that overlap the reported match may not report it again.
+            cost[row, 1:][overlapping[row]] = np.inf
+            self._best[row] = np.inf
+        return matches
+
+
+# Built-in templates -------------------------------------------------------
+
+_REST = np.array(
+    # shoulders, elbows, wrists (left then right), shoulder-width units
+    [[0.5, 0.0], [-0.5, 0.0], [0.6, 0.9], [-0.6, 0.9], [0.6, 1.7], [-0.6, 1.7]]
+)
+
+
+def _wave(side: int, length: int = 24, cycles: float = 2.0) -> np.ndarray:
+    """Raised forearm swinging sideways; side 0 is the left arm, 1 the right."""
+    sign = 1.0 if side == 0 else -1.0
+    phase = np.linspace(0.0, 2.0 * np.pi * cycles, length)
+    frames = np.repeat(_REST[None], length, axis=0)
+    frames[:, 2 + side] = (0.95 * sign, 0.05)
+    frames[:, 4 + side, 0] = 0.95 * sign + 0.35 * np.sin(phase)
+    frames[:, 4 + side, 1] = -0.75 + 0.1 * np.abs(np.sin(phase))
+    return frames
+
+
+def _clap(length: int = 24, claps: float = 2.0) -> np.ndarray:
+    closing = 0.5 - 0.5 * np.cos(np.linspace(0.0, 2.0 * np.pi * claps, length))
+    frames = np.repeat(_REST[None], length, axis=0)
+    for side, sign in ((0, 1.0), (1, -1.0)):
+        frames[:, 2 + side] = (0.75 * sign, 0.75)
+        frames[:, 4 + side, 0] = sign * (0.55 - 0.5 * closing)
+        frames[:, 4 + side, 1] = 0.55 - 0.15 * closing
+    return frames
+
+
+def builtin_sequences(tolerance: float = 0.35) -> List[SequenceTemplate]:
+    """Synthetic templates for waving with either arm and clapping.
+
+    Hand openness is left unspecified (NaN), so it does not affect them.
+    """
+    templates: List[SequenceTemplate] = []
+    for name, frames in (("wave_left", _wave(0)), ("wave_right", _wave(1)), ("clap", _clap())):
+        features = np.full((len(frames), FEATURE_SIZE), np.nan)
+        features[:, :12] = frames.reshape(len(frames), -1)
+        templates.append(SequenceTemplate(name, features, tolerance * len(frames)))
+    return templates
@@ -0,0 +1,227 @@
+"""Per-user skeleton calibration and bone length normalization.
+
+MediaPipe world landmarks are estimated independently every frame, so the
+length of a forearm can change by several centimetres between frames.
+``SkeletonCalibrator`` measures every limb bone over the first
+``calibration_frames`` confident frames, takes a robust median, and from
+then on moves each joint along its raw direction so that every bone has
+its calibrated length. Bones are processed one tree level at a time
+(shoulder -> elbow for all limbs, then elbow -> wrist, ...), so a frame
+costs a handful of NumPy operations. The torso landmarks are the roots
+and are left as measured.
+
+The calibrated profile is saved as JSON and loaded on the next start, so
+calibration only runs once per user.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import warnings
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from landmark_arrays import POSE_LANDMARK_NAMES, landmark_confidence, landmarks_to_array
+
+DEFAULT_PROFILE_PATH = os.path.join(
+    os.path.dirname(__file__), "models", "skeleton_profile.json"
+)
+PROFILE_VERSION = 1
+
+# (parent, child) pairs of the limb chains, in MediaPipe pose indices.
+LIMB_BONES: Tuple[Tuple[int, int], ...] = (
+    (11, 13), (13, 15), (15, 17), (15, 19), (15, 21),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22),
+    (23, 25), (25, 27), (27, 29), (27, 31),
+    (24, 26), (26, 28), (28, 30), (28, 32),
+)
+
+# Samples further than this many robust standard deviations from the
+# median are dropped before the final estimate.
+_OUTLIER_SIGMAS = 3.0
+
+
+@dataclass
+class SkeletonProfile:
+    """Calibrated bone lengths in metres; NaN where a bone was never seen."""
+
+    bones: Tuple[Tuple[int, int], ...]
+    lengths: np.ndarray
+    samples: int
+
+    def __post_init__(self) -> None:
+        self.levels = _levels(self.bones)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        bones = [
+            {
+                "parent": POSE_LANDMARK_NAMES[parent],
+                "child": POSE_LANDMARK_NAMES[child],
+                "length": None if np.isnan(length) else round(float(length), 5),
+            }
+            for (parent, child), length in zip(self.bones, self.lengths)
+        ]
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"version": PROFILE_VERSION, "samples": self.samples, "bones": bones},
+                handle,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "SkeletonProfile":
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data.get("version") != PROFILE_VERSION:
+            raise ValueError(
+                f"{path} has skeleton profile version {data.get('version')}, "
+                f"expected {PROFILE_VERSION}; delete it to recalibrate"
+            )
+        index = {name: idx for idx, name in enumerate(POSE_LANDMARK_NAMES)}
+        bones = tuple((index[bone["parent"]], index[bone["child"]]) for bone in data["bones"])
+        lengths = np.array(
+            [np.nan if bone["length"] is None else bone["length"] for bone in data["bones"]],
+            dtype=np.float64,
+        )
+        return cls(bones, lengths, int(data.get("samples", 0)))
+
+
+def robust_lengths(samples: np.ndarray) -> np.ndarray:
+    """Median bone lengths from ``(frames, bones)`` samples, NaN = missing.
+
+    Samples outside the median +- 3 MAD-based standard deviations are
+    dropped first, so a few bad detections do not skew the result.
+    """
+    with warnings.catch_warnings():
+        # All-NaN columns (bones never seen) are expected and stay NaN.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(samples, axis=0)
+        deviation = np.abs(samples - median)
+        sigma = 1.4826 * np.nanmedian(deviation, axis=0)
+        with np.errstate(invalid="ignore"):
+            outliers = deviation > _OUTLIER_SIGMAS * np.maximum(sigma, 1e-6)
+        return np.nanmedian(np.where(outliers, np.nan, samples), axis=0)
+
+
+def _levels(bones: Sequence[Tuple[int, int]]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Group bone indices by depth so each group only needs its parents done."""
+    parent_of = {child: parent for parent, child in bones}
+    depths = []
+    for _, child in bones:
+        depth, joint = 0, child
+        while joint in parent_of:
+            depth, joint = depth + 1, parent_of[joint]
+        depths.append(depth)
+    levels = []
+    for depth in sorted(set(depths)):
+        rows = np.array([row for row, value in enumerate(depths) if value == depth], dtype=np.intp)
+        parents = np.array([bones[row][0] for row in rows], dtype=np.intp)
+        children = np.array([bones[row][1] for row in rows], dtype=np.intp)
+        levels.append((rows, parents, children))
+    return levels
+
+
+def normalize_bones(points: np.ndarray, profile: SkeletonProfile) -> np.ndarray:
+    """Return ``points`` with every calibrated bone set to its profile length.
+
+    ``points`` is ``(..., 33, 3)``; leading dimensions (e.g. frames) are
+    processed together. Joints keep their measured direction from the
+    parent; bones without a calibrated length are left as measured.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    result = points.copy()
+    for rows, parents, children in profile.levels:
+        delta = points[..., children, :] - points[..., parents, :]
+        norms = np.linalg.norm(delta, axis=-1, keepdims=True)
+        lengths = profile.lengths[rows][:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scaled = delta * (lengths / norms)
+        keep = np.isnan(lengths) | (norms < 1e-9)
+        result[..., children, :] = result[..., parents, :] + np.where(keep, delta, scaled)
+    return result
+
+
+class SkeletonCalibrator:
+    """Calibrates the user's bone lengths, then enforces them every frame.
+
+    While calibrating, frames pass through unchanged. Only bones whose two
+    joints have at least ``min_visibility`` are sampled. Pass
+    ``recalibrate=True`` (or call ``recalibrate()``) to ignore a cached
+    profile, e.g. when someone else steps in front of the camera.
+    """
+
+    def __init__(
+        self,
+        profile_path: Optional[str] = None,
+        calibration_frames: int = 60,
+        min_visibility: float = 0.5,
+        recalibrate: bool = False,
+        save_profile: bool = True,
+    ) -> None:
+        self.profile_path = profile_path or DEFAULT_PROFILE_PATH
+        self.calibration_frames = max(int(calibration_frames), 1)
+        self.min_visibility = min_visibility
+        self.save_profile = save_profile
+        self._bones = np.array(LIMB_BONES, dtype=np.intp)
+        self.profile: Optional[SkeletonProfile] = None
+        if not recalibrate and os.path.exists(self.profile_path):
+            self.profile = SkeletonProfile.load(self.profile_path)
+        self._reset_samples()
+
+    @property
+    def calibrated(self) -> bool:
+        return self.profile is not None
+
+    def recalibrate(self) -> None:
+        """Drop the current profile and start collecting samples again."""
+        self.profile = None
+        self._reset_samples()
+
+    def _reset_samples(self) -> None:
+        self._samples = np.full((self.calibration_frames, len(self._bones)), np.nan)
+        self._sampled = 0
+
+    def update(self, points: np.ndarray, confidence: Optional[np.ndarray] = None) -> np.ndarray:
+        """Feed one ``(33, 3)`` world skeleton; returns it normalized once calibrated."""
+        if self.profile is not None:
+            return normalize_bones(points, self.profile)
+
+        lengths = np.linalg.norm(points[self._bones[:, 1]] - points[self._bones[:, 0]], axis=1)
+        if confidence is not None:
+            seen = confidence[self._bones].min(axis=1) >= self.min_visibility
+            lengths = np.where(seen, lengths, np.nan)
+        if not np.isnan(lengths).all():
+            self._samples[self._sampled] = lengths
+            self._sampled += 1
+        if self._sampled == self.calibration_frames:
+            self._finish()
+        return points
+
+    def process(self, body_result) -> bool:
+        """Normalize ``body_result.world_landmarks`` in place; True once calibrated."""
+        if not body_result or not body_result.world_landmarks:
+            return False
+        landmarks = body_result.world_landmarks
+        points = landmarks_to_array(landmarks, dtype=np.float64)
+        if len(points) <= self._bones.max():
+            return False
+        was_calibrated = self.calibrated
+        normalized = self.update(points, landmark_confidence(landmarks))
+        if not was_calibrated:
+            return False
+        for landmark, (x, y, z) in zip(getattr(landmarks, "landmark", landmarks), normalized.tolist()):
+            landmark.x, landmark.y, landmark.z = x, y, z
+        return True
+
+    def _finish(self) -> None:
+        lengths = robust_lengths(self._samples)
+        self.profile = SkeletonProfile(LIMB_BONES, lengths, self._sampled)
+        if self.save_profile:
+            self.profile.save(self.profile_path)
+            print(f"Skeleton calibrated from {self._sampled} frames; saved to {self.profile_path}")
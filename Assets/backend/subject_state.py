@@ -0,0 +1,132 @@
+"""Bounded per-subject state for analyzers that track things over time.
+
+Analyzers keep temporal state per hand, per person or per segment, keyed
+by labels such as ``"left"`` or ``"p2_right"``. ``SubjectStateStore``
+gives each label a row in arrays that are allocated once, for
+``capacity`` subjects. Every ``acquire`` stamps the rows it returns with
+the caller's timestamp. A row nobody acquired for ``ttl_s`` seconds is
+freed, and a row is reset to its fill values whenever it goes to a new
+label. A hand that comes back after being lost therefore starts with fresh
+history rather than the state it left behind. When every row is taken,
+the least recently seen subject gives up its row.
+
+    store = SubjectStateStore(capacity=4, ttl_s=1.0)
+    positions = store.add("positions", (8, 2), fill=np.nan)
+    slots = store.acquire(["left", "right"], timestamp_s)
+    positions[slots, 0] = ...
+
+Memory stays flat however long the session runs and however many labels
+come and go.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SubjectStateStore:
+    """Rows of preallocated state arrays, leased to labels with a TTL."""
+
+    def __init__(self, capacity: int, ttl_s: Optional[float] = 1.0) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.ttl_s = ttl_s
+        self.last_seen = np.full(self.capacity, np.nan)  # NaN marks a free row
+        self._labels: List[Optional[str]] = [None] * self.capacity
+        self._rows: Dict[str, int] = {}
+        self._fields: Dict[str, Tuple[np.ndarray, object]] = {}
+
+    def add(self, name: str, shape: Tuple[int, ...] = (), dtype=np.float64, fill=0) -> np.ndarray:
+        """Allocate a ``(capacity,) + shape`` field; rows start at ``fill``.
+
+        The returned array is never reallocated, so callers may keep it.
+        """
+        if name in self._fields:
+            raise ValueError(f"Field '{name}' already exists")
+        array = np.full((self.capacity,) + tuple(shape), fill, dtype=dtype)
+        self._fields[name] = (array, fill)
+        return array
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._fields[name][0]
+
+    def __contains__(self, label: str) -> bool:
+        return label in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def labels(self) -> List[str]:
+        """Labels that currently hold a row."""
+        return list(self._rows)
+
+    def acquire(self, labels: Sequence[str], now: float) -> np.ndarray:
+        """Rows for ``labels`` (unique), assigning and resetting rows for new ones."""
+        if len(labels) > self.capacity:
+            raise ValueError(f"{len(labels)} subjects do not fit in {self.capacity} rows")
+        self.expire(now)
+        slots = np.empty(len(labels), dtype=np.intp)
+        for position, label in enumerate(labels):
+            row = self._rows.get(label)
+            if row is None:
+                row = self._free_row(slots[:position])
+                self._assign(row, label)
+            slots[position] = row
+            self.last_seen[row] = now  # keeps this call's rows from being taken
+        return slots
+
+    def _free_row(self, taken: np.ndarray) -> int:
+        free = np.flatnonzero(np.isnan(self.last_seen))
+        if len(free):
+            return int(free[0])
+        # Every row is leased: take the least recently seen one that this
+        # call has not handed out already.
+        seen = self.last_seen.copy()
+        seen[taken] = np.inf
+        return int(np.argmin(seen))
+
+    def _assign(self, row: int, label: str) -> None:
+        old = self._labels[row]
+        if old is not None:
+            del self._rows[old]
+        self._labels[row] = label
+        self._rows[label] = row
+        self._reset_row(row)
+
+    def _reset_row(self, row: int) -> None:
+        for array, fill in self._fields.values():
+            array[row] = fill
+
+    def expire(self, now: float) -> List[str]:
+        """Free the rows of subjects unseen for longer than ``ttl_s``; returns their labels."""
+        if self.ttl_s is None:
+            return []
+        with np.errstate(invalid="ignore"):
+            stale = np.flatnonzero(now - self.last_seen > self.ttl_s)
+        return [self._free(row) for row in stale]
+
+    def release(self, label: str) -> bool:
+        """Forget ``label`` now, e.g. on tracking loss; False if it had no row."""
+        row = self._rows.get(label)
+        if row is None:
+            return False
+        self._free(row)
+        return True
+
+    def _free(self, row: int) -> str:
+        label = self._labels[row]
+        del self._rows[label]
+        self._labels[row] = None
+        self.last_seen[row] = np.nan
+        self._reset_row(row)
+        return label
+
+    def reset(self) -> None:
+        """Forget every subject."""
+        for row, label in enumerate(self._labels):
+            if label is not None:
+                self._free(row)
@@ -0,0 +1,211 @@
+"""Synthetic, animated body and hand landmarks for load testing.
+
+``SyntheticPoseGenerator`` stands in for the camera and MediaPipe:
+``results(t, person)`` returns a ``(body_result, hand_result)`` pair shaped
+like ``BodyPoseEstimator`` and ``HandPoseEstimator`` output, so the
+analyzers, ``PoseFormatter`` and the senders can be driven at any rate
+without a camera or a model. Each person stands in their own part of the
+image and waves both arms at their own tempo, sways, and opens and closes
+their hands. Landmarks carry a little jitter and the legs a lower
+visibility, as a tracked person would.
+
+    generator = SyntheticPoseGenerator(persons=2)
+    body, hands = generator.results(t=1.5, person=1)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from landmark_arrays import HAND_LANDMARK_COUNT, POSE_LANDMARK_COUNT
+
+# Rest pose in MediaPipe world axes (metres, hips at the origin, y down,
+# the person facing the camera along -z). Arms and hands are animated.
+_REST = {
+    0: (0.0, -0.62, -0.1),
+    1: (0.02, -0.65, -0.08), 2: (0.035, -0.65, -0.08), 3: (0.05, -0.65, -0.07),
+    4: (-0.02, -0.65, -0.08), 5: (-0.035, -0.65, -0.08), 6: (-0.05, -0.65, -0.07),
+    7: (0.075, -0.63, 0.0), 8: (-0.075, -0.63, 0.0),
+    9: (0.025, -0.58, -0.08), 10: (-0.025, -0.58, -0.08),
+    11: (0.18, -0.5, 0.0), 12: (-0.18, -0.5, 0.0),
+    23: (0.1, 0.0, 0.0), 24: (-0.1, 0.0, 0.0),
+    25: (0.1, 0.42, 0.0), 26: (-0.1, 0.42, 0.0),
+    27: (0.1, 0.82, 0.0), 28: (-0.1, 0.82, 0.0),
+    29: (0.1, 0.86, 0.05), 30: (-0.1, 0.86, 0.05),
+    31: (0.1, 0.86, -0.12), 32: (-0.1, 0.86, -0.12),
+}
+UPPER_ARM = 0.28
+FOREARM = 0.26
+LEG_VISIBILITY = 0.7
+# Normalized image units per metre, for a 4:3 frame.
+IMAGE_SCALE = 0.45
+ASPECT = 0.75
+
+# Hand skeleton: per finger, its offset across the palm (m), its base
+# distance from the wrist along the forearm (m) and its segment lengths.
+_FINGERS = (
+    (0.03, 0.025, (0.035, 0.03, 0.025, 0.02)),  # thumb: CMC, MCP, IP, tip
+    (0.022, 0.09, (0.0, 0.04, 0.025, 0.02)),  # index: MCP, PIP, DIP, tip
+    (0.0, 0.09, (0.0, 0.045, 0.028, 0.022)),
+    (-0.02, 0.085, (0.0, 0.04, 0.026, 0.02)),
+    (-0.038, 0.078, (0.0, 0.032, 0.02, 0.018)),
+)
+
+
+@dataclass
+class SyntheticLandmark:
+    x: float
+    y: float
+    z: float
+    visibility: float = 1.0
+
+
+@dataclass
+class SyntheticLandmarkList:
+    """Stands in for a MediaPipe ``LandmarkList``."""
+
+    landmark: List[SyntheticLandmark]
+
+
+@dataclass
+class SyntheticBodyResult:
+    """Same fields as ``BodyPoseResult``."""
+
+    landmarks: Optional[SyntheticLandmarkList]
+    world_landmarks: Optional[SyntheticLandmarkList]
+
+
+@dataclass
+class SyntheticHandResult:
+    """Same fields as ``HandPoseResult``."""
+
+    normalized: Optional[List[SyntheticLandmarkList]]
+    world: Optional[List[SyntheticLandmarkList]]
+    handedness: Optional[List[str]]
+    scores: Optional[List[float]] = None
+
+
+def _landmark_list(points: np.ndarray, visibility: Optional[np.ndarray] = None) -> SyntheticLandmarkList:
+    if visibility is None:
+        return SyntheticLandmarkList([SyntheticLandmark(x, y, z) for x, y, z in points.tolist()])
+    return SyntheticLandmarkList(
+        [SyntheticLandmark(x, y, z, v) for (x, y, z), v in zip(points.tolist(), visibility.tolist())]
+    )
+
+
+def _direction(angle: float, side: float) -> np.ndarray:
+    """Unit vector ``angle`` radians out from hanging down, in the frontal plane."""
+    return np.array([side * np.sin(angle), np.cos(angle), -0.25 * np.sin(angle)]) / np.sqrt(
+        1.0 + 0.0625 * np.sin(angle) ** 2
+    )
+
+
+def hand_points(wrist: np.ndarray, along: np.ndarray, side: float, curl: float) -> np.ndarray:
+    """``(21, 3)`` MediaPipe hand landmarks in world axes.
+
+    The hand continues the forearm direction ``along`` from ``wrist``, its
+    palm towards the camera; ``curl`` in [0, 1] closes the fingers.
+    """
+    across = np.cross(along, [0.0, 0.0, -1.0])
+    across *= side / max(np.linalg.norm(across), 1e-9)
+    palm = np.cross(across, along) * side  # towards the camera
+    points = np.empty((HAND_LANDMARK_COUNT, 3))
+    points[0] = wrist
+    for finger, (offset, base, lengths) in enumerate(_FINGERS):
+        spread = across * (1.4 if finger == 0 else 1.0)
+        joint = wrist + along * base + spread * offset
+        angle = 0.0
+        for segment, length in enumerate(lengths):
+            angle += curl * (0.3 if finger == 0 else 0.55) * (segment > 0)
+            joint = joint + length * (along * np.cos(angle) - palm * np.sin(angle))
+            points[1 + finger * 4 + segment] = joint
+    return points
+
+
+class SyntheticPoseGenerator:
+    """Animated landmark results for ``persons`` people.
+
+    ``hands`` adds both hands of every person; ``jitter`` is the landmark
+    noise in metres. The same ``seed`` gives the same people and noise.
+    """
+
+    def __init__(self, persons: int = 1, hands: bool = True, jitter: float = 0.002, seed: int = 0) -> None:
+        if persons < 1:
+            raise ValueError("persons must be at least 1")
+        self.persons = int(persons)
+        self.hands = hands
+        self.jitter = jitter
+        self._rng = np.random.default_rng(seed)
+        self._phase = self._rng.uniform(0.0, 2.0 * np.pi, self.persons)
+        self._tempo = self._rng.uniform(0.8, 1.25, self.persons)
+        self._rest = np.zeros((POSE_LANDMARK_COUNT, 3))
+        for index, point in _REST.items():
+            self._rest[index] = point
+        self._visibility = np.full(POSE_LANDMARK_COUNT, 0.98)
+        self._visibility[25:] = LEG_VISIBILITY
+        # People stand side by side, smaller the more there are.
+        self._image_scale = IMAGE_SCALE * min(1.0, 1.5 / self.persons)
+
+    def world_points(self, t: float, person: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """``(33, 3)`` world body landmarks and ``(2, 21, 3)`` world hands at ``t`` seconds."""
+        phase = self._phase[person]
+        tempo = self._tempo[person]
+        points = self._rest.copy()
+        hands = np.empty((2, HAND_LANDMARK_COUNT, 3))
+        for hand, (side, shoulder, rate) in enumerate(((1.0, 11, 0.5), (-1.0, 12, 0.35))):
+            lift = 1.2 + 0.9 * np.sin(2.0 * np.pi * rate * tempo * t + phase + hand)
+            bend = 0.5 + 0.45 * np.sin(2.0 * np.pi * 1.1 * tempo * t + phase)
+            elbow = points[shoulder] + UPPER_ARM * _direction(lift, side)
+            along = _direction(lift + bend, side)
+            wrist = elbow + FOREARM * along
+            curl = 0.5 + 0.5 * np.sin(2.0 * np.pi * 0.4 * tempo * t + phase + 2.0 * hand)
+            hands[hand] = hand_points(wrist, along, side, curl)
+            points[shoulder + 2] = elbow
+            # Wrist, pinky, index and thumb come from the hand.
+            points[[shoulder + 4, shoulder + 6, shoulder + 8, shoulder + 10]] = hands[hand, [0, 17, 5, 2]]
+        sway = 0.25 * np.sin(2.0 * np.pi * 0.15 * tempo * t + phase)
+        c, s = np.cos(sway), np.sin(sway)
+        turn = np.array([[c, 0.0, s], [0.0, 1.0, 0.0], [-s, 0.0, c]])
+        points = points @ turn.T
+        hands = hands @ turn.T
+        if self.jitter:
+            points += self._rng.normal(0.0, self.jitter, points.shape)
+            hands += self._rng.normal(0.0, self.jitter / 2.0, hands.shape)
+        return points, hands
+
+    def _to_image(self, world: np.ndarray, person: int) -> np.ndarray:
+        centre = (person + 0.5) / self.persons
+        scale = self._image_scale
+        image = world * (scale * ASPECT, scale, scale * ASPECT)
+        return image + (centre, 0.5, 0.0)
+
+    def results(self, t: float, person: int = 0) -> Tuple[SyntheticBodyResult, SyntheticHandResult]:
+        """The ``(body_result, hand_result)`` of ``person`` at ``t`` seconds."""
+        if not 0 <= person < self.persons:
+            raise IndexError(f"person {person} out of range for {self.persons} persons")
+        world, hands = self.world_points(t, person)
+        visibility = np.clip(self._visibility - self._rng.uniform(0.0, 0.05, POSE_LANDMARK_COUNT), 0.0, 1.0)
+        body = SyntheticBodyResult(
+            landmarks=_landmark_list(self._to_image(world, person), visibility),
+            world_landmarks=_landmark_list(world, visibility),
+        )
+        if not self.hands:
+            return body, SyntheticHandResult(None, None, None)
+        return body, SyntheticHandResult(
+            normalized=[_landmark_list(self._to_image(hand, person)) for hand in hands],
+            world=[_landmark_list(hand - hand.mean(axis=0)) for hand in hands],
+            handedness=["Left", "Right"],
+            scores=[0.97, 0.96],
+        )
+
+    def stream(
+        self, fps: float, frames: int
+    ) -> Iterator[Tuple[float, int, SyntheticBodyResult, SyntheticHandResult]]:
+        """``(t, person, body_result, hand_result)`` for ``frames`` frames at ``fps``."""
+        for frame in range(frames):
+            t = frame / fps
+            for person in range(self.persons):
+                yield (t, person) + self.results(t, person)
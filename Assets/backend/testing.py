@@ -1,18 +1,28 @@
+"""Debug pose estimation on a few images, one at a time.
+
+    python testing.py photo1.jpg photo2.jpg --output-dir out --show --world-plot
+
+Prints every intermediate result and writes annotated images and world
+landmark plots. With ``--cache DIR`` landmarks of images seen before come
+from a ``LandmarkCache``, so iterating on the analysis code skips
+inference. For datasets, use ``batch_landmarks.py``.
+"""
+
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Iterable, List, Optional
 
 import cv2
-import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
-from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
 
 from body_pose_estimator import BodyPoseEstimator
 from hand_pose_estimator import HandPoseEstimator
 from gesture_calculator import BodyGestureRecognizer, PoseCalculator
 from arm_rotation_calculator import ArmRotationCalculator
+from landmark_arrays import landmarks_to_array, results_to_row, row_to_results
+from landmark_cache import LandmarkCache, fingerprint
 from pose_visualizer import PoseVisualizer
+from world_plot import WorldPlotFigure
 
 
 def main(
@@ -21,13 +31,23 @@ def main(
     show_visualization: bool = False,
     output_dir: str | Path | None = None,
     show_world_plot: bool = False,
+    cache_dir: str | Path | None = None,
 ) -> None:
-    body_pose = BodyPoseEstimator()
-    hand_pose = HandPoseEstimator()
+    # Unrelated images: no tracking from one to the next.
+    body_pose = BodyPoseEstimator(static_image_mode=True)
+    hand_pose = HandPoseEstimator(static_image_mode=True)
+    cache = (
+        LandmarkCache(
+            str(cache_dir), fingerprint=fingerprint(estimators="testing", static_image_mode=True)
+        )
+        if cache_dir is not None
+        else None
+    )
     calculator = PoseCalculator()
-    body_gesture_recognizer = BodyGestureRecognizer()
+    body_gesture_recognizer = BodyGestureRecognizer(temporal=False)
     arm_rotation_calculator = ArmRotationCalculator()
     visualizer = PoseVisualizer()
+    world_figure = None if show_world_plot else WorldPlotFigure(dpi=200)
 
     output_directory = (
         Path(output_dir).expanduser().resolve()
@@ -46,8 +66,17 @@ def main(
             if frame is None:
                 raise ValueError(f"Failed to load image: {resolved_path}")
 
-            body_result = body_pose.get_body_pose(frame)
-            hand_result = hand_pose.get_hand_pose(frame)
+            row = None
+            if cache is not None:
+                key, _ = cache.key_for_file(str(resolved_path))
+                row = cache.get(key)
+            if row is not None:
+                body_result, hand_result = row_to_results(row)
+            else:
+                body_result = body_pose.get_body_pose(frame)
+                hand_result = hand_pose.get_hand_pose(frame)
+                if cache is not None:
+                    cache.put(key, results_to_row(body_result, hand_result))
 
             metrics = calculator.compute(body_result, hand_result)
             body_gesture = body_gesture_recognizer.get_body_gesture(body_result)
@@ -69,17 +98,15 @@ def main(
             print(f"[DEBUG] Saved annotated image to: {output_path}")
 
             if body_result.world_landmarks:
-                (
-                    world_plot_2d_path,
-                    world_plot_3d_path,
-                ) = _plot_world_landmarks(
+                plot_paths = plot_world_landmarks(
                     body_result.world_landmarks.landmark,
                     title=f"{resolved_path.name}",
                     output_dir=output_directory,
                     show=show_world_plot,
+                    figure=world_figure,
                 )
-                print(f"[DEBUG] Saved 2D world landmark plot to: {world_plot_2d_path}")
-                print(f"[DEBUG] Saved 3D world landmark plot to: {world_plot_3d_path}")
+                for plot_path in plot_paths:
+                    print(f"[DEBUG] Saved world landmark plot to: {plot_path}")
 
             if show_visualization:
                 window_name = resolved_path.name
@@ -91,6 +118,10 @@ def main(
         body_pose.close()
         hand_pose.close()
         visualizer.close()
+        if world_figure is not None:
+            world_figure.close()
+        if cache is not None:
+            print(cache.summary())
         if show_visualization:
             cv2.destroyAllWindows()
 
@@ -132,133 +163,53 @@ def _print_arm_segment_landmarks(body_result) -> None:
         )
 
 
-def _set_equal_3d_axes(ax, xs, ys, zs) -> None:
-    xs = xs if xs else [0.0]
-    ys = ys if ys else [0.0]
-    zs = zs if zs else [0.0]
-
-    max_range = max(
-        max(xs) - min(xs),
-        max(ys) - min(ys),
-        max(zs) - min(zs),
-    )
-    if max_range == 0:
-        max_range = 1.0
-
-    mid_x = (max(xs) + min(xs)) * 0.5
-    mid_y = (max(ys) + min(ys)) * 0.5
-    mid_z = (max(zs) + min(zs)) * 0.5
-
-    half_range = max_range * 0.5
-    ax.set_xlim(mid_x - half_range, mid_x + half_range)
-    ax.set_ylim(mid_y - half_range, mid_y + half_range)
-    ax.set_zlim(mid_z - half_range, mid_z + half_range)
-
-
-def _plot_world_landmarks(
+def plot_world_landmarks(
     world_landmarks,
     *,
     title: str,
     output_dir: Path,
-    show: bool,
-) -> Tuple[Path, Path]:
-    xs = [lm.x for lm in world_landmarks]
-    ys = [lm.y for lm in world_landmarks]
-    zs = [lm.z for lm in world_landmarks]
-
-    max_range = max(
-        max(xs) - min(xs) if xs else 0,
-        max(ys) - min(ys) if ys else 0,
-        max(zs) - min(zs) if zs else 0,
+    show: bool = False,
+    separate: bool = True,
+    figure: Optional[WorldPlotFigure] = None,
+) -> List[Path]:
+    """Plot world landmarks in 2D and 3D side by side; return the files written.
+
+    Pass the same ``figure`` for every image to reuse it. With ``separate``
+    the 2D and 3D views are also saved on their own.
+    """
+    if show or figure is None:
+        # A shown figure goes away with its window.
+        figure = WorldPlotFigure(interactive=show)
+    paths = figure.save(
+        landmarks_to_array(world_landmarks), output_dir, Path(title).stem, title, separate
     )
-    radius = max_range * 0.04 if max_range > 0 else 0.01
-
-    # Plot side by side: 2D projection and 3D scatter
-    fig = plt.figure(figsize=(12, 6))
-    ax2d = fig.add_subplot(1, 2, 1)
-    ax3d = fig.add_subplot(1, 2, 2, projection="3d")
-
-    # 2D subplot
-    ax2d.scatter(xs, ys, c="blue", s=15, alpha=0.7)
-    for idx, (x, y) in enumerate(zip(xs, ys)):
-        circle = Circle((x, y), radius=radius, fill=False, edgecolor="red", linewidth=1.2)
-        ax2d.add_patch(circle)
-        ax2d.text(x, y, str(idx), color="red", ha="center", va="center", fontsize=8)
-    ax2d.set_title(f"{title} (2D Projection)")
-    ax2d.set_xlabel("X (world)")
-    ax2d.set_ylabel("Y (world)")
-    ax2d.set_aspect("equal", adjustable="datalim")
-    ax2d.invert_yaxis()
-    ax2d.grid(True, linestyle="--", alpha=0.4)
-
-    # 3D subplot
-    ax3d.scatter(xs, ys, zs, c="blue", s=20, alpha=0.8)
-    for idx, (x, y, z) in enumerate(zip(xs, ys, zs)):
-        ax3d.text(x, y, z, str(idx), color="red", fontsize=8, ha="center", va="center")
-    ax3d.set_title(f"{title} (3D)")
-    ax3d.set_xlabel("X (world)")
-    ax3d.set_ylabel("Y (world)")
-    ax3d.set_zlabel("Z (world)")
-    _set_equal_3d_axes(ax3d, xs, ys, zs)
-
-    fig.tight_layout()
-
-    output_dir.mkdir(parents=True, exist_ok=True)
-    combined_path = output_dir / f"{Path(title).stem}_world_plot_combined.png"
-    fig.savefig(str(combined_path), bbox_inches="tight", dpi=200)
-
     if show:
+        import matplotlib.pyplot as plt
+
         plt.show()
-    else:
-        plt.close(fig)
-
-    # Additionally save separate 2D and 3D figures for convenience
-    fig2d, ax2d_only = plt.subplots(figsize=(6, 6))
-    ax2d_only.scatter(xs, ys, c="blue", s=15, alpha=0.7)
-    for idx, (x, y) in enumerate(zip(xs, ys)):
-        circle = Circle((x, y), radius=radius, fill=False, edgecolor="red", linewidth=1.2)
-        ax2d_only.add_patch(circle)
-        ax2d_only.text(x, y, str(idx), color="red", ha="center", va="center", fontsize=8)
-    ax2d_only.set_title(f"{title} (2D Projection)")
-    ax2d_only.set_xlabel("X (world)")
-    ax2d_only.set_ylabel("Y (world)")
-    ax2d_only.set_aspect("equal", adjustable="datalim")
-    ax2d_only.invert_yaxis()
-    ax2d_only.grid(True, linestyle="--", alpha=0.4)
-    plot_2d_path = output_dir / f"{Path(title).stem}_world_plot_2d.png"
-    fig2d.savefig(str(plot_2d_path), bbox_inches="tight", dpi=200)
-    if not show:
-        plt.close(fig2d)
-
-    fig3d = plt.figure(figsize=(6, 6))
-    ax3d_only = fig3d.add_subplot(111, projection="3d")
-    ax3d_only.scatter(xs, ys, zs, c="blue", s=20, alpha=0.8)
-    for idx, (x, y, z) in enumerate(zip(xs, ys, zs)):
-        ax3d_only.text(x, y, z, str(idx), color="red", fontsize=8, ha="center", va="center")
-    ax3d_only.set_title(f"{title} (3D)")
-    ax3d_only.set_xlabel("X (world)")
-    ax3d_only.set_ylabel("Y (world)")
-    ax3d_only.set_zlabel("Z (world)")
-    _set_equal_3d_axes(ax3d_only, xs, ys, zs)
-    plot_3d_path = output_dir / f"{Path(title).stem}_world_plot_3d.png"
-    fig3d.savefig(str(plot_3d_path), bbox_inches="tight", dpi=200)
-    if not show:
-        plt.close(fig3d)
-
-    return plot_2d_path, plot_3d_path
+    return paths
+
+
+def _parse_args(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Debug pose estimation on a few images.")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--output-dir", help="Defaults to Assets/backend/test/output.")
+    parser.add_argument("--show", action="store_true", help="Show each annotated image.")
+    parser.add_argument("--world-plot", action="store_true", help="Show the world landmark plots.")
+    parser.add_argument("--cache", help="Reuse landmarks stored in this folder.")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    IMAGE_PATHS = [
-        "/Users/dimitrisgkegkas/Work/Enneas/MediaPipeUnityPlugin/Test1/Assets/backend/test/IMG_7075.jpeg",
-        "/Users/dimitrisgkegkas/Work/Enneas/MediaPipeUnityPlugin/Test1/Assets/backend/test/IMG_7076.jpeg",
-        "/Users/dimitrisgkegkas/Work/Enneas/MediaPipeUnityPlugin/Test1/Assets/backend/test/IMG_7077.jpeg",
-    ]
+    args = _parse_args()
     main(
-        IMAGE_PATHS,
-        show_visualization=True,
-        output_dir="/Users/dimitrisgkegkas/Work/Enneas/MediaPipeUnityPlugin/Test1/Assets/backend/test/output",
-        show_world_plot=True,
+        args.images,
+        show_visualization=args.show,
+        output_dir=args.output_dir,
+        show_world_plot=args.world_plot,
+        cache_dir=args.cache,
     )
 
 
@@ -0,0 +1,62 @@
+"""Pipeline stages that run without a camera or MediaPipe."""
+
+import numpy as np
+
+from pipeline_stages import Stage
+
+
+class CountingSource(Stage):
+    """Source that yields blank frames; ``frames=-1`` never stops."""
+
+    kind = "source"
+    provides = ("frame",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        if self.component is None:
+            self.component = {"remaining": self.params.get("frames", 3)}
+
+    def process(self, context):
+        if self.component["remaining"] == 0:
+            return False
+        self.component["remaining"] -= 1
+        context.frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        return True
+
+
+class RecordingEstimator(Stage):
+    """Estimator that records the timestamps it was called with."""
+
+    kind = "estimator"
+    warms_up = True
+    requires = ("frame",)
+    provides = ("body_result",)
+    seen = []
+    opened = 0
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        if self.component is None:
+            RecordingEstimator.opened += 1
+            self.component = object()
+
+    def process(self, context):
+        RecordingEstimator.seen.append(context.timestamp_ms)
+        return True
+
+
+class BrokenEstimator(Stage):
+    """Estimator whose params check out but whose model fails to load."""
+
+    kind = "estimator"
+    requires = ("frame",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        raise RuntimeError("model file is missing")
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from backend_service import BackendService, reply_to_line
+from control_client import ControlClient
+from fake_stages import BrokenEstimator, CountingSource, RecordingEstimator
+from network_runtime import AsyncControlServer
+from pipeline_stages import STAGE_TYPES
+
+CONFIG = {
+    "source": {"type": "counting", "params": {"frames": -1}},
+    "estimators": ["recording"],
+    "startup": {"report": False},
+}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "counting", CountingSource)
+    monkeypatch.setitem(STAGE_TYPES, "recording", RecordingEstimator)
+    RecordingEstimator.seen = []
+    RecordingEstimator.opened = 0
+    service = BackendService(CONFIG)
+    service.open()
+    yield service
+    service.shutdown()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_idle_until_started(service):
+    time.sleep(0.05)
+    assert service.stats()["frames"] == 0
+    assert service.handle({"command": "health"})["streaming"] is False
+
+
+def test_start_and_stop_streaming(service):
+    assert service.handle({"command": "start"}) == {"streaming": True, "ok": True}
+    assert _wait_for(lambda: service.stats()["frames"] > 5)
+    service.handle({"command": "stop"})
+    time.sleep(0.05)
+    frames = service.stats()["frames"]
+    time.sleep(0.05)
+    assert service.stats()["frames"] == frames
+
+
+def test_switch_keeps_unchanged_stages_warm(service):
+    service.handle({"command": "start"})
+    assert _wait_for(lambda: service.stats()["frames"] > 2)
+    before = list(RecordingEstimator.seen)
+
+    reply = service.handle({"command": "switch", "config": dict(CONFIG)})
+    assert reply["ok"] is True
+    assert sorted(reply["reused"]) == ["counting", "recording"]
+    assert RecordingEstimator.opened == 1
+
+    assert _wait_for(lambda: len(RecordingEstimator.seen) > len(before) + 2)
+    timestamps = RecordingEstimator.seen
+    assert all(b > a for a, b in zip(timestamps, timestamps[1:]))
+
+
+def test_bad_commands_are_reported(service):
+    assert service.handle({"command": "bogus"})["ok"] is False
+    assert "needs a 'config'" in service.handle({"command": "switch"})["error"]
+    reply = service.handle({"command": "switch", "config": "no-such-preset"})
+    assert reply["ok"] is False
+    assert service.health()["config"] == "custom"
+
+
+def test_failed_switch_leaves_the_running_pipeline_untouched(service, monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "broken", BrokenEstimator)
+    service.handle({"command": "start"})
+    assert _wait_for(lambda: service.stats()["frames"] > 2)
+
+    bogus = dict(CONFIG, sinks=[{"type": "console", "params": {"field": "frame", "bogus": 1}}])
+    assert service.handle({"command": "switch", "config": bogus})["ok"] is False
+    broken = dict(CONFIG, estimators=["recording", "broken"])
+    reply = service.handle({"command": "switch", "config": broken})
+    assert reply["ok"] is False and "model file is missing" in reply["error"]
+
+    assert RecordingEstimator.opened == 1
+    seen = len(RecordingEstimator.seen)
+    assert _wait_for(lambda: len(RecordingEstimator.seen) > seen + 2)
+    assert service.health()["status"] == "ok"
+
+
+def test_control_client_round_trip(service):
+    server = AsyncControlServer(lambda line: reply_to_line(service, line), port=0)
+    try:
+        with ControlClient(port=server.address[1], timeout=2.0) as client:
+            assert client.health()["status"] == "ok"
+            assert client.start()["streaming"] is True
+            assert _wait_for(lambda: client.stats()["frames"] > 0)
+            assert client.request("bogus")["ok"] is False
+            assert client.stop()["ok"] is True
+    finally:
+        server.close()
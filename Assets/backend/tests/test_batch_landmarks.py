@@ -0,0 +1,116 @@
+import os
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from batch_landmarks import BatchOptions, collect_inputs, load_landmarks, run_batch
+
+
+def _points(count, value):
+    return SimpleNamespace(
+        landmark=[SimpleNamespace(x=value, y=value, z=0.0, visibility=0.9) for _ in range(count)]
+    )
+
+
+class FakeBody:
+    """Reports the frame's mean brightness as every landmark coordinate."""
+
+    calls = 0
+
+    def get_body_pose(self, frame):
+        FakeBody.calls += 1
+        value = float(frame.mean()) / 255.0
+        return SimpleNamespace(landmarks=_points(33, value), world_landmarks=_points(33, value))
+
+    def close(self):
+        pass
+
+
+class FakeHands:
+    """Finds one right hand in bright frames."""
+
+    def get_hand_pose(self, frame):
+        if frame.mean() < 128:
+            return SimpleNamespace(normalized=None, world=None, handedness=None, scores=None)
+        return SimpleNamespace(
+            normalized=[_points(21, 0.5)], world=[_points(21, 0.1)], handedness=["right"], scores=[0.8]
+        )
+
+    def close(self):
+        pass
+
+
+def fake_estimators(static_image_mode):
+    return FakeBody(), FakeHands()
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    images = (("a", "one.png", 50), ("a/nested", "two.png", 200), ("b", "one.png", 100))
+    for folder, name, level in images:
+        os.makedirs(tmp_path / folder, exist_ok=True)
+        cv2.imwrite(str(tmp_path / folder / name), np.full((24, 32, 3), level, np.uint8))
+    (tmp_path / "a" / "notes.txt").write_text("not an image")
+    (tmp_path / "b" / "broken.jpg").write_bytes(b"not a jpeg")
+    video = cv2.VideoWriter(str(tmp_path / "clip.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 10, (32, 24))
+    for _ in range(5):
+        video.write(np.full((24, 32, 3), 200, np.uint8))
+    video.release()
+    return tmp_path
+
+
+def test_collect_inputs(dataset):
+    patterns = [str(dataset / "a"), str(dataset / "b" / "*.png"), str(dataset / "a" / "one.png")]
+    paths = collect_inputs(patterns)
+    assert [os.path.relpath(path, dataset) for path in paths] == [
+        os.path.join("a", "nested", "two.png"),
+        os.path.join("a", "one.png"),
+        os.path.join("b", "one.png"),
+    ]
+    with pytest.raises(FileNotFoundError):
+        collect_inputs([str(dataset / "missing")])
+    with pytest.raises(FileNotFoundError, match="No images or videos"):
+        collect_inputs([str(dataset / "*.gif")])
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch_writes_one_columnar_file(dataset, tmp_path, workers, capsys):
+    output = str(tmp_path / "out" / "landmarks.npz")
+    options = BatchOptions(video_stride=2, estimators=fake_estimators)
+    inputs = [str(dataset / "a"), str(dataset / "b"), str(dataset / "clip.mp4")]
+    run_batch(inputs, output, workers=workers, chunk_size=2, options=options)
+
+    columns = load_landmarks(output)
+    sources = [os.path.relpath(source, dataset) for source in columns["source"]]
+    assert sources == [
+        os.path.join("a", "nested", "two.png"),
+        os.path.join("a", "one.png"),
+        os.path.join("b", "one.png"),
+        "clip.mp4",
+        "clip.mp4",
+        "clip.mp4",
+    ]
+    assert columns["frame"].tolist() == [0, 0, 0, 0, 2, 4]
+    assert columns["body"].shape == (6, 33, 3)
+    assert columns["body"][1, 0, 0] == pytest.approx(50 / 255.0, abs=1e-3)
+    assert columns["body_confidence"][0].tolist() == pytest.approx([0.9] * 33)
+    assert columns["hands"].shape == (6, 2, 21, 3)
+    assert columns["handedness"][0].tolist() == ["right", ""]
+    assert np.isnan(columns["hands"][0, 1]).all()
+    assert np.isnan(columns["hands"][1]).all()
+    assert columns["hand_scores"][0, 0] == pytest.approx(0.8)
+    assert "skipped" in capsys.readouterr().out
+
+
+def test_cached_images_skip_inference(dataset, tmp_path, capsys):
+    options = BatchOptions(estimators=fake_estimators, cache_dir=str(tmp_path / "cache"))
+    inputs = [str(dataset / "a")]
+    first = run_batch(inputs, str(tmp_path / "first.npz"), workers=0, options=options)
+    calls = FakeBody.calls
+    second = run_batch(inputs, str(tmp_path / "second.npz"), workers=0, options=options)
+    assert FakeBody.calls == calls
+    for name in first:
+        np.testing.assert_array_equal(first[name], second[name])
+    assert "2 of 2 inputs came from the cache" in capsys.readouterr().out
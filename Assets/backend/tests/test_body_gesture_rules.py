@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from body_gesture_rules import GestureRuleEngine, RuleError
+from gesture_calculator import BodyGestureRecognizer
+
+LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, RIGHT_WRIST = 11, 12, 13, 15, 16
+
+
+def _pose(left_wrist_y=0.7, right_wrist_y=0.7):
+    points = np.full((33, 3), 0.5)
+    points[LEFT_SHOULDER, :2] = (0.6, 0.4)
+    points[RIGHT_SHOULDER, :2] = (0.4, 0.4)
+    points[LEFT_ELBOW, :2] = (0.65, 0.55)
+    points[LEFT_WRIST, :2] = (0.65, left_wrist_y)
+    points[RIGHT_WRIST, :2] = (0.35, right_wrist_y)
+    return points
+
+
+def _body(points):
+    return SimpleNamespace(landmarks=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in points])
+
+
+def _engine(gestures, **settings):
+    return GestureRuleEngine(dict(settings, gestures=gestures))
+
+
+def _legacy_gesture(points):
+    """The hard-coded classifier the default rule file replaces."""
+    left_up = points[LEFT_WRIST, 1] < points[LEFT_SHOULDER, 1]
+    right_up = points[RIGHT_WRIST, 1] < points[RIGHT_SHOULDER, 1]
+    if left_up and right_up:
+        return "both_hands_up"
+    if left_up:
+        return "left_hand_up"
+    if right_up:
+        return "right_hand_up"
+    return "neutral"
+
+
+def test_default_rules_match_the_legacy_classifier():
+    recognizer = BodyGestureRecognizer(temporal=False)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        points = rng.uniform(0.0, 1.0, (33, 3))
+        assert recognizer.get_body_gesture(_body(points)) == _legacy_gesture(points)
+
+
+def test_missing_and_short_bodies():
+    recognizer = BodyGestureRecognizer()
+    assert recognizer.get_body_gesture(None) == "no_body_detected"
+    assert recognizer.get_body_gesture(_body(_pose()[:12])) == "insufficient_landmarks"
+
+
+def test_expressions_distances_and_angles():
+    engine = _engine(
+        [
+            {"name": "wide", "all": ["distance(left_wrist, right_wrist) > 1.2 * distance(11, 12)"]},
+            {"name": "bent", "all": ["angle(left_shoulder, left_elbow, left_wrist) < 170"]},
+            {"name": "low", "all": ["(left_wrist.y + right_wrist.y) * 0.5 - 0.1 > left_shoulder.y"]},
+        ],
+    )
+    assert engine.names == ("wide", "bent", "low")
+    active = engine.active(_pose(), 0.0)
+    assert active.tolist() == [True, True, True]
+
+    straight = _pose()
+    straight[LEFT_WRIST, :2] = (0.7, 0.7)  # shoulder, elbow and wrist in line
+    straight[RIGHT_WRIST, :2] = (0.55, 0.7)
+    assert _engine(
+        [{"name": "bent", "all": ["angle(left_shoulder, left_elbow, left_wrist) < 170"]},
+         {"name": "wide", "all": ["distance(left_wrist, right_wrist) > 1.2 * distance(11, 12)"]}],
+        angle_hysteresis=0,
+    ).active(straight, 0.0).tolist() == [False, False]
+
+
+def test_any_group():
+    engine = _engine(
+        [{"name": "a_hand_up", "any": ["left_wrist.y < left_shoulder.y", "right_wrist.y < right_shoulder.y"]}],
+        hysteresis=0,
+    )
+    assert engine.evaluate(_pose(right_wrist_y=0.2), 0.0) == "a_hand_up"
+    assert engine.evaluate(_pose(), 0.1) == "neutral"
+
+
+def test_hysteresis_stops_flicker_at_the_threshold():
+    engine = _engine([{"name": "up", "all": ["left_wrist.y < left_shoulder.y"]}], hysteresis=0.03)
+    # The wrist jitters +-1 cm around the shoulder line.
+    labels = [engine.evaluate(_pose(left_wrist_y=0.4 + offset), 0.0) for offset in (-0.01, 0.01) * 5]
+    assert set(labels) == {"neutral"}
+    assert engine.evaluate(_pose(left_wrist_y=0.35), 0.0) == "up"
+    labels = [engine.evaluate(_pose(left_wrist_y=0.4 + offset), 0.0) for offset in (-0.01, 0.01) * 5]
+    assert set(labels) == {"up"}
+    assert engine.evaluate(_pose(left_wrist_y=0.45), 0.0) == "neutral"
+
+
+def test_hold_and_release_times():
+    engine = _engine(
+        [{"name": "up", "all": ["left_wrist.y < left_shoulder.y"], "hold_ms": 100, "release_ms": 50}],
+        hysteresis=0,
+    )
+    raised, lowered = _pose(left_wrist_y=0.2), _pose()
+    assert [engine.evaluate(raised, t) for t in (0.0, 0.05, 0.1, 0.2)] == [
+        "neutral", "neutral", "up", "up",
+    ]
+    assert [engine.evaluate(lowered, t) for t in (0.22, 0.25, 0.28)] == ["up", "up", "neutral"]
+
+
+def test_first_active_gesture_wins():
+    recognizer = BodyGestureRecognizer(temporal=False)
+    assert recognizer.get_body_gesture(_body(_pose(0.2, 0.2))) == "both_hands_up"
+
+
+def test_many_rules_in_one_pass():
+    rng = np.random.default_rng(1)
+    thresholds = rng.uniform(0.0, 1.0, 300)
+    engine = _engine(
+        [{"name": f"rule{idx}", "all": [f"left_wrist.y < {value:.4f}", "right_wrist.x > 0.1"]}
+         for idx, value in enumerate(thresholds)],
+        hysteresis=0,
+    )
+    points = _pose(left_wrist_y=0.5)
+    expected = np.round(thresholds, 4) > 0.5
+    assert engine.active(points, 0.0).tolist() == expected.tolist()
+    assert engine._weights.shape == (600, 2)  # shared features are computed once
+
+
+@pytest.mark.parametrize(
+    "gesture, message",
+    [
+        ({"name": "x", "all": ["left_wrist.y"]}, "end of"),
+        ({"name": "x", "all": ["left_wirst.y < 0.5"]}, "Unknown landmark"),
+        ({"name": "x", "all": ["left_wrist.y * left_wrist.x < 0.5"]}, "constant"),
+        ({"name": "x", "all": ["1 < 2"]}, "does not use any landmark"),
+        ({"name": "x", "all": ["angle(left_wrist, left_elbow) < 2"]}, "takes 3 landmarks"),
+        ({"name": "x", "al": ["left_wrist.y < 0.5"]}, "Unknown keys"),
+        ({"name": "x"}, "no predicates"),
+        ({"all": ["left_wrist.y < 0.5"]}, "needs a 'name'"),
+    ],
+)
+def test_rule_errors(gesture, message):
+    with pytest.raises(RuleError, match=message):
+        _engine([gesture])
+
+
+def test_rules_from_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"default": "idle", "gestures": [{"name": "up", "all": ["left_wrist.y < 0.3"]}]}')
+    recognizer = BodyGestureRecognizer(rules_path=str(path), temporal=False)
+    assert recognizer.get_body_gesture(_body(_pose())) == "idle"
+    with pytest.raises(RuleError, match="Unsupported"):
+        GestureRuleEngine.from_file(str(tmp_path / "rules.yaml"))
@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pytest
+
+from frame_ingest import (
+    FRAME_HEADER,
+    FrameFormatError,
+    FrameHeader,
+    FrameIngest,
+    FrameRingWriter,
+    FrameSocketWriter,
+)
+from pipeline import PipelineRunner
+
+
+def _image(value, channels=3, height=6, width=8):
+    return np.full((height, width, channels), value, dtype=np.uint8)
+
+
+def _ring_name(tag):
+    return f"pose_test_{tag}_{os.getpid()}"
+
+
+def _get(ingest, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        frame = ingest.get_frame()
+        if frame is not None:
+            return frame
+    raise AssertionError("no frame arrived")
+
+
+def test_header_round_trip_and_validation():
+    header = FrameHeader.describe(_image(0, 4), "rgba8", producer=7, sequence=3, timestamp_ns=99)
+    assert len(header.pack()) == FRAME_HEADER.size == 36
+    assert FrameHeader.unpack(header.pack()) == header
+    with pytest.raises(FrameFormatError, match="not rgb8"):
+        FrameHeader.describe(_image(0, 4), "rgb8")
+    with pytest.raises(FrameFormatError, match="Unknown pixel layout"):
+        FrameHeader.describe(_image(0), "yuv")
+    broken = bytearray(header.pack())
+    broken[12:16] = (5).to_bytes(4, "little")  # width 5 no longer fits the byte count
+    with pytest.raises(FrameFormatError, match="do not fit"):
+        FrameHeader.unpack(broken)
+
+
+def test_socket_producers_take_turns_with_newest_frames():
+    ingest = FrameIngest(listen_port=0, wait_s=0.05)
+    first = second = None
+    try:
+        first = FrameSocketWriter(*ingest.address, producer=1)
+        second = FrameSocketWriter(*ingest.address, producer=2)
+        for value in (10, 11, 12):
+            first.write(_image(value))
+        rgb = _image(0)
+        rgb[..., 0] = 200  # red in RGB order
+        second.write(rgb, "rgb8")
+
+        frames = {}
+        for _ in range(2):
+            frame = _get(ingest)
+            frames[ingest.last_header.producer] = frame
+        assert frames[1][0, 0].tolist() == [12, 12, 12]  # only the newest
+        assert not frames[1].flags.owndata  # a view of the receive buffer
+        assert frames[2][0, 0].tolist() == [0, 0, 200]  # converted to BGR
+        assert ingest.frames_skipped == 2 and ingest.producer_count == 2
+
+        first.write(_image(13))
+        assert _get(ingest)[0, 0, 0] == 13
+        assert ingest.get_frame() is None  # nothing new within wait_s
+    finally:
+        for writer in (first, second):
+            if writer is not None:
+                writer.close()
+        ingest.release()
+
+
+def test_socket_producer_with_a_bad_header_is_dropped(capsys):
+    ingest = FrameIngest(listen_port=0, wait_s=0.05)
+    try:
+        writer = FrameSocketWriter(*ingest.address)
+        writer._socket.sendall(b"GARBAGE!" * 10)
+        for _ in range(5):
+            ingest.get_frame()
+        assert ingest.producer_count == 0
+        assert "sent a bad header" in capsys.readouterr().out
+        writer.close()
+    finally:
+        ingest.release()
+
+
+def test_ring_hands_out_views_and_never_overwrites_them():
+    name = _ring_name("views")
+    writer = FrameRingWriter(name, slot_bytes=6 * 8 * 3, slots=3)
+    ingest = FrameIngest(rings=[name], wait_s=0.05)
+    try:
+        assert ingest.get_frame() is None
+        for value in (1, 2, 3):
+            writer.write(_image(value))
+        frame = _get(ingest)
+        assert frame[0, 0, 0] == 3 and ingest.frames_skipped == 2
+        assert not frame.flags.owndata
+        assert ingest.last_header.sequence == 3
+
+        # The writer laps the ring while the pipeline holds a slot.
+        for value in range(4, 30):
+            writer.write(_image(value))
+        assert (frame == 3).all()
+        assert _get(ingest)[0, 0, 0] == 29 and ingest.frames_torn == 0
+
+        with pytest.raises(FrameFormatError, match="does not fit"):
+            writer.write(_image(0, height=60))
+        writer.close()
+        assert ingest.get_frame() is None and ingest.producer_count == 0
+    finally:
+        writer.close()
+        ingest.release()
+
+
+def _produce(name, done):
+    writer = FrameRingWriter(name, slot_bytes=6 * 8 * 3, producer=5)
+    value = 0
+    # Keep writing until the reader has what it needs; attaching can take
+    # a retry interval after the spawned process got going.
+    while not done.wait(0.01) and value < 1000:
+        value += 1
+        writer.write(_image(min(value, 255)))
+    writer.close()
+
+
+def test_ring_written_by_another_process():
+    name = _ring_name("process")
+    context = multiprocessing.get_context("spawn")
+    done = context.Event()
+    producer = context.Process(target=_produce, args=(name, done))
+    producer.start()
+    ingest = FrameIngest(rings=[name], wait_s=0.05)
+    try:
+        seen = [_get(ingest, timeout=10.0)[0, 0, 0] for _ in range(5)]
+        assert seen == sorted(seen) and ingest.last_header.producer == 5
+    finally:
+        done.set()
+        ingest.release()
+        producer.join(timeout=10.0)
+    assert producer.exitcode == 0
+
+
+def test_pipeline_reads_from_a_ring():
+    name = _ring_name("pipeline")
+    writer = FrameRingWriter(name, slot_bytes=6 * 8 * 3, producer=3)
+    runner = PipelineRunner(
+        {
+            "source": {"type": "ingest", "params": {"rings": [name], "wait_s": 0.05}},
+            "startup": {"report": False, "warm_up": False},
+        }
+    )
+    runner.open()
+    try:
+        writer.write(_image(9))
+        context = runner.step()
+        while context.frame is None:
+            context = runner.step()
+        assert context.extras["frame_header"].producer == 3
+        assert "pose_ingested_frames_total{stage=\"ingest\"} 1" in runner.metrics.registry.render_prometheus()
+    finally:
+        runner.close()
+        writer.close()
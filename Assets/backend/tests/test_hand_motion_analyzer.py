@@ -0,0 +1,199 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from hand_motion_analyzer import HandMotionAnalyzer
+from pose_formatter import PoseFormatter
+
+IMAGE_SIZE = (640, 480)
+FPS = 30.0
+
+
+def _hand(x, y, pointing=False):
+    """A 21-point hand with its wrist at (x, y), normalized coordinates."""
+    hand = np.zeros((21, 3), dtype=np.float32)
+    hand[:, 0] = x
+    hand[:, 1] = y
+    if pointing:
+        hand[5, 1] = y - 0.05   # index MCP
+        hand[6, 1] = y - 0.08   # index PIP
+        hand[8, 1] = y - 0.20   # index tip, far out
+        hand[[12, 16, 20], 1] = y - 0.06  # other fingers curled
+    return hand
+
+
+def _run(analyzer, track, fps=FPS):
+    states = []
+    for i, (x, y) in enumerate(track):
+        states.append(
+            analyzer.analyze_arrays(["left"], [_hand(x, y)], IMAGE_SIZE, timestamp_s=i / fps)[0]
+        )
+    return states
+
+
+def _events(states):
+    return [(event.kind, event.direction) for state in states for event in state.events]
+
+
+def test_steady_motion_reports_direction_after_window():
+    states = _run(HandMotionAnalyzer(), [(0.1 + 0.05 * i, 0.5) for i in range(6)])
+    assert states[0].direction == "none"
+    assert states[-1].direction == "right"
+
+
+def test_vertical_motion():
+    states = _run(HandMotionAnalyzer(), [(0.5, 0.9 - 0.05 * i) for i in range(6)])
+    assert states[-1].direction == "up"
+
+
+def test_stationary_hand_is_none():
+    states = _run(HandMotionAnalyzer(), [(0.5, 0.5)] * 6)
+    assert {state.direction for state in states} == {"none"}
+
+
+def test_velocity_and_acceleration_in_pixels_per_second():
+    states = _run(HandMotionAnalyzer(), [(0.1, 0.5), (0.2, 0.5), (0.4, 0.5)])
+    assert states[0].velocity is None
+    assert np.allclose(states[1].velocity, (64.0 * FPS, 0.0))
+    assert states[1].acceleration is None
+    assert np.allclose(states[2].acceleration, (64.0 * FPS * FPS, 0.0))
+
+
+def test_velocity_uses_timestamps_not_frame_count():
+    analyzer = HandMotionAnalyzer()
+    analyzer.analyze_arrays(["left"], [_hand(0.1, 0.5)], IMAGE_SIZE, timestamp_s=0.0)
+    # A dropped frame: twice the distance over twice the time.
+    state = analyzer.analyze_arrays(["left"], [_hand(0.3, 0.5)], IMAGE_SIZE, timestamp_s=0.1)[0]
+    assert np.allclose(state.velocity, (1280.0, 0.0))
+
+
+def test_fingertip_and_world_kinematics():
+    analyzer = HandMotionAnalyzer()
+    for i in range(3):
+        world = np.zeros((21, 3), dtype=np.float32)
+        world[:, 2] = 0.01 * i * i  # accelerating towards the camera
+        state = analyzer.analyze_arrays(
+            ["left"], [_hand(0.1 + 0.1 * i, 0.5)], IMAGE_SIZE,
+            world_landmarks=[world], timestamp_s=i * 0.1,
+        )[0]
+    kinematics = state.kinematics
+    assert kinematics.velocity.shape == (6, 2)
+    assert np.allclose(kinematics.velocity[:, 0], 640.0)  # every tip moves with the hand
+    assert np.allclose(kinematics.world_velocity[0], (0.0, 0.0, 0.3))
+    assert np.allclose(kinematics.world_acceleration[0], (0.0, 0.0, 2.0))
+
+
+def test_missing_world_landmarks_are_nan():
+    states = _run(HandMotionAnalyzer(), [(0.1, 0.5), (0.2, 0.5)])
+    assert np.isnan(states[-1].kinematics.world_velocity).all()
+
+
+def test_swipe_reported_while_motion_is_in_progress():
+    track = [(0.5, 0.5)] * 3 + [(0.5 + 0.05 * i, 0.5) for i in range(1, 8)]
+    states = _run(HandMotionAnalyzer(), track)
+    swipes = [(i, event) for i, state in enumerate(states) for event in state.events]
+    assert [(event.kind, event.direction) for _, event in swipes] == [("swipe", "right")]
+    frame, event = swipes[0]
+    assert frame == 3  # first fast sample, long before the motion ends
+    assert event.onset == 3 / FPS
+
+
+def test_flick_is_short_and_fast():
+    track = [(0.5, 0.8), (0.5, 0.8), (0.5, 0.7), (0.5, 0.6), (0.5, 0.6)]
+    assert _events(_run(HandMotionAnalyzer(), track)) == [("swipe", "up"), ("flick", "up")]
+
+    slow = [(0.1 + 0.04 * i, 0.5) for i in range(20)] + [(0.9, 0.5)] * 2
+    assert ("flick", "right") not in _events(_run(HandMotionAnalyzer(), slow))
+
+
+def test_hold_fires_once_after_duration():
+    states = _run(HandMotionAnalyzer(hold_duration=0.5), [(0.5, 0.5)] * 40)
+    holds = [(i, event) for i, state in enumerate(states) for event in state.events]
+    assert [event.kind for _, event in holds] == ["hold"]
+    frame, event = holds[0]
+    assert event.onset == 1 / FPS
+    assert frame / FPS - event.onset >= 0.5
+
+
+def test_formatter_sends_kinematics_and_events():
+    track = [(0.5, 0.8), (0.5, 0.8), (0.5, 0.7)]
+    states = _run(HandMotionAnalyzer(), track)
+    section = PoseFormatter(fingertip_kinematics=True)._format_hand_states(states[-1:])
+    pairs = dict(item.split("=") for item in section.split(":", 2)[-1].split(",")[1:])
+    assert pairs["vy"] == "-1440.0"
+    assert pairs["ts"] == "0.0667"
+    assert pairs["t8v"] == "0.0;-1440.0"
+    assert pairs["events"] == "swipe_up@0.0667"
+    assert "wvx" not in pairs  # unknown values are left out
+
+
+def test_pointing_kernel():
+    analyzer = HandMotionAnalyzer()
+    states = analyzer.analyze_arrays(
+        ["left", "right"],
+        [_hand(0.3, 0.6, pointing=True), _hand(0.7, 0.6)],
+        IMAGE_SIZE,
+    )
+    assert [state.is_pointing for state in states] == [True, False]
+
+
+def test_recognized_gesture_overrides_pointing():
+    gesture = SimpleNamespace(handedness="left", gesture="thumb_up", score=0.9)
+    state = HandMotionAnalyzer().analyze_arrays(
+        ["left"], [_hand(0.3, 0.6, pointing=True)], IMAGE_SIZE, recognized_gestures=[gesture]
+    )[0]
+    assert state.gesture == "thumb_up"
+    assert state.is_pointing is False
+
+
+def test_hands_keep_separate_history():
+    analyzer = HandMotionAnalyzer()
+    for i in range(6):
+        states = analyzer.analyze_arrays(
+            ["left", "right"],
+            [_hand(0.1 + 0.05 * i, 0.5), _hand(0.9 - 0.05 * i, 0.5)],
+            IMAGE_SIZE,
+        )
+    assert [state.direction for state in states] == ["right", "left"]
+
+
+def test_least_recently_seen_slot_is_reused():
+    analyzer = HandMotionAnalyzer(max_hands=2)
+    _run(analyzer, [(0.1 + 0.05 * i, 0.5) for i in range(4)])
+    analyzer.analyze_arrays(["right"], [_hand(0.5, 0.5)], IMAGE_SIZE)
+    state = analyzer.analyze_arrays(["p2_left"], [_hand(0.2, 0.2)], IMAGE_SIZE)[0]
+    assert state.velocity is None  # fresh history, not the evicted hand's
+
+
+def test_hands_beyond_max_hands_are_dropped():
+    analyzer = HandMotionAnalyzer(max_hands=2)
+    labels = ["p1_left", "p1_right", "p2_left"]
+    for i in range(4):
+        states = analyzer.analyze_arrays(
+            labels, [_hand(0.1 + 0.05 * i, 0.2 * k) for k in range(1, 4)], IMAGE_SIZE,
+            world_landmarks=[None] * 3, timestamp_s=i / FPS, scores=[0.9, 0.8, 0.7],
+        )
+    assert [state.handedness for state in states] == ["p1_left", "p1_right"]
+    assert [state.direction for state in states] == ["right", "right"]
+
+
+def test_history_expires_when_a_hand_is_gone():
+    analyzer = HandMotionAnalyzer(state_ttl_s=0.5)
+    _run(analyzer, [(0.1 + 0.05 * i, 0.5) for i in range(4)])
+    state = analyzer.analyze_arrays(["left"], [_hand(0.5, 0.5)], IMAGE_SIZE, timestamp_s=10.0)[0]
+    assert state.velocity is None and state.direction == "none"
+
+    analyzer.analyze_arrays(["left"], [_hand(0.6, 0.5)], IMAGE_SIZE, timestamp_s=10.1)
+    assert analyzer.release("Left")
+    state = analyzer.analyze_arrays(["left"], [_hand(0.7, 0.5)], IMAGE_SIZE, timestamp_s=10.2)[0]
+    assert state.velocity is None
+
+
+def test_analyze_accepts_mediapipe_shaped_results():
+    points = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(21)]
+    result = SimpleNamespace(
+        normalized=[SimpleNamespace(landmark=points)], handedness=["Left"]
+    )
+    states = HandMotionAnalyzer().analyze((480, 640, 3), result)
+    assert states[0].handedness == "left"
+    assert states[0].position == (320.0, 240.0)
@@ -0,0 +1,78 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from landmark_arrays import RESULT_COLUMNS, results_to_row
+from landmark_cache import LandmarkCache, fingerprint
+
+
+def _row(value):
+    row = {name: np.full(shape, value, dtype=np.float32) for name, shape in RESULT_COLUMNS.items()}
+    row["handedness"] = np.array(["left", ""])
+    return row
+
+
+def test_round_trip_and_keys(tmp_path):
+    cache = LandmarkCache(str(tmp_path), fingerprint="a")
+    key = cache.key(b"image bytes")
+    assert cache.get(key) is None
+    cache.put(key, _row(0.5))
+    row = cache.get(key)
+    assert row["body"].shape == (33, 3) and row["body"][0, 0] == pytest.approx(0.5)
+    assert row["handedness"].tolist() == ["left", ""]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    assert LandmarkCache(str(tmp_path), fingerprint="b").key(b"image bytes") != key
+    assert cache.key(b"other bytes") != key
+    assert fingerprint(model_complexity=1) != fingerprint(model_complexity=2)
+    # A second process sees the same entries.
+    assert LandmarkCache(str(tmp_path), fingerprint="a").get(key) is not None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LandmarkCache(str(tmp_path))
+    keys = [cache.key(bytes([index])) for index in range(4)]
+    for age, key in enumerate(keys):
+        cache.put(key, _row(age))
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    entry_size = cache.size_bytes // 4
+    cache.get(keys[0])  # now the most recently used
+
+    cache.max_bytes = entry_size * 4
+    cache.put(cache.key(b"new"), _row(9.0))
+    assert cache.size_bytes <= cache.max_bytes * 0.9
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+    assert cache.get(keys[3]) is not None
+
+
+def test_truncated_entry_is_a_miss(tmp_path):
+    cache = LandmarkCache(str(tmp_path))
+    key = cache.key(b"x")
+    cache.put(key, _row(1.0))
+    with open(cache._path(key), "wb") as handle:
+        handle.write(b"PK\x03")
+    assert cache.get(key) is None
+
+
+def _landmarks(count, value):
+    return SimpleNamespace(
+        landmark=[SimpleNamespace(x=value, y=value, z=value, visibility=0.7) for _ in range(count)]
+    )
+
+
+def test_results_round_trip_through_a_row():
+    pytest.importorskip("mediapipe")
+    from landmark_arrays import landmarks_to_array, row_to_results
+
+    body = SimpleNamespace(landmarks=_landmarks(33, 0.25), world_landmarks=_landmarks(33, 0.5))
+    hands = SimpleNamespace(
+        normalized=[_landmarks(21, 0.1)], world=[_landmarks(21, 0.2)], handedness=["left"], scores=[0.9]
+    )
+    body_result, hand_result = row_to_results(results_to_row(body, hands))
+    assert landmarks_to_array(body_result.landmarks)[0].tolist() == pytest.approx([0.25] * 3)
+    assert body_result.landmarks.landmark[0].visibility == pytest.approx(0.7)
+    assert hand_result.handedness == ["left"]
+    assert hand_result.scores == [pytest.approx(0.9)]
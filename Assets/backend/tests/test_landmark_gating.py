@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from arm_rotation_calculator import ArmRotationCalculator
+from gesture_calculator import BodyGestureRecognizer, PoseCalculator
+from hand_motion_analyzer import HandMotionAnalyzer
+from landmark_arrays import LandmarkGate, landmark_confidence
+from landmark_gesture_classifier import LandmarkGestureClassifier, builtin_templates, synthetic_hand
+from pose_formatter import PoseFormatter
+
+
+class _ProtoLandmark(SimpleNamespace):
+    """Mimics a protobuf landmark: unset optional fields read as 0.0."""
+
+    def HasField(self, name):
+        return name in self.__dict__
+
+    def __getattr__(self, name):
+        return 0.0
+
+
+def _landmarks(points, visibility):
+    return SimpleNamespace(
+        landmark=[
+            SimpleNamespace(x=x, y=y, z=z, visibility=v)
+            for (x, y, z), v in zip(points, visibility)
+        ]
+    )
+
+
+def _pose_points(left_wrist_y=0.2):
+    points = np.full((33, 3), 0.5)
+    points[11, :2] = (0.6, 0.4)
+    points[12, :2] = (0.4, 0.4)
+    points[13, :2] = (0.65, 0.55)
+    points[15, :2] = (0.65, left_wrist_y)
+    points[16, :2] = (0.35, 0.7)
+    return points
+
+
+def test_confidence_uses_visibility_and_presence():
+    points = [
+        _ProtoLandmark(x=0, y=0, z=0, visibility=0.9, presence=0.4),
+        _ProtoLandmark(x=0, y=0, z=0, visibility=0.7),
+        _ProtoLandmark(x=0, y=0, z=0),
+        SimpleNamespace(x=0, y=0, z=0),
+    ]
+    assert np.allclose(landmark_confidence(points), (0.4, 0.7, 1.0, 1.0))
+    assert landmark_confidence(None) is None
+
+
+def test_gate_holds_the_last_good_position_then_drops_it():
+    gate = LandmarkGate(min_confidence=0.5, hold_s=0.2)
+    points = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]])
+    gate.update(points, np.array([0.9, 0.9]), 0.0)
+
+    moved = points + 5.0
+    gated, valid = gate.update(moved, np.array([0.9, 0.1]), 0.1)
+    assert valid.tolist() == [True, True]
+    assert np.allclose(gated, [[5.0, 5.0, 5.0], [1.0, 1.0, 1.0]])
+
+    gated, valid = gate.update(moved, np.array([0.9, 0.1]), 0.35)
+    assert valid.tolist() == [True, False]
+    assert np.isnan(gated[1]).all()
+
+    _, valid = gate.update(moved, None, 0.4)
+    assert valid.all()
+
+
+def test_arm_segments_skip_occluded_joints_after_the_hold():
+    calculator = ArmRotationCalculator(hold_s=0.2)
+    points = _pose_points()
+    visible = np.ones(33)
+    segments = calculator.compute(SimpleNamespace(world_landmarks=_landmarks(points, visible)), 0.0)
+    before = {segment.config.name: segment.direction for segment in segments}
+
+    occluded = visible.copy()
+    occluded[15] = 0.1  # left wrist
+    jumped = points.copy()
+    jumped[15] = (3.0, 3.0, 3.0)
+    body = SimpleNamespace(world_landmarks=_landmarks(jumped, occluded))
+
+    held = {segment.config.name: segment.direction for segment in calculator.compute(body, 0.1)}
+    assert np.allclose(held["left_lower_arm"], before["left_lower_arm"])
+
+    names = [segment.config.name for segment in calculator.compute(body, 0.5)]
+    assert "left_lower_arm" not in names and "left_hand" not in names
+    assert "left_upper_arm" in names and "right_lower_arm" in names
+
+
+def test_head_smoothing_restarts_after_the_body_was_gone():
+    calculator = ArmRotationCalculator(smoothing_factor=0.5, state_ttl_s=1.0)
+    visible = np.ones(33)
+
+    def head(nose, timestamp):
+        points = _pose_points()
+        points[0, :2] = nose
+        body = SimpleNamespace(world_landmarks=_landmarks(points, visible))
+        return next(s.direction for s in calculator.compute(body, timestamp) if s.config.name == "head")
+
+    first = head((0.5, 0.1), 0.0)
+    blended = head((0.9, 0.4), 0.1)
+    assert not np.allclose(blended, first)
+    fresh = head((0.9, 0.4), 5.0)
+    later = head((0.9, 0.4), 5.1)
+    assert np.allclose(fresh, later)  # no pull towards the old direction
+
+
+def test_occluded_wrist_does_not_raise_a_gesture():
+    recognizer = BodyGestureRecognizer(temporal=False)
+    visibility = np.ones(33)
+    body = SimpleNamespace(landmarks=_landmarks(_pose_points(), visibility))
+    assert recognizer.get_body_gesture(body) == "left_hand_up"
+    visibility[15] = 0.2
+    body = SimpleNamespace(landmarks=_landmarks(_pose_points(), visibility))
+    assert recognizer.get_body_gesture(body) == "neutral"
+
+
+def test_metrics_and_payload_carry_confidence():
+    visibility = np.linspace(0.0, 1.0, 33)
+    body = SimpleNamespace(landmarks=_landmarks(_pose_points(), visibility), world_landmarks=None)
+    metrics = PoseCalculator(min_visibility=0.5).compute(body, None)
+    assert (metrics.body_landmark_count, metrics.body_visible_count) == (33, 17)
+
+    payload = PoseFormatter(schema_version=1).format((100, 200, 3), body, None, metrics, "neutral")
+    entries = payload.split("|")[0][len("body_image:"):].split(";")
+    assert entries[0] == "0:100.0,50.0,0.0,0"
+    assert entries[32].endswith(",100")
+    assert "metrics:body=33,hands=0,visible=17" in payload
+
+    plain = PoseFormatter(send_confidence=False, schema_version=1).format((100, 200, 3), body, None, metrics, "neutral")
+    assert plain.split("|")[0].split(";")[0] == "body_image:0:100.0,50.0,0.0"
+
+
+def test_hand_scores_reach_states_and_gate_gestures():
+    hand = synthetic_hand((False, True, False, False, False))
+    normalized = [SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in hand])] * 2
+    result = SimpleNamespace(normalized=normalized, world=None, handedness=["right", "left"], scores=[0.95, 0.3])
+
+    recognized = LandmarkGestureClassifier(templates=builtin_templates()).recognize(result)
+    assert [item.gesture for item in recognized] == ["pointing_up", None]
+
+    states = HandMotionAnalyzer().analyze((480, 640, 3), result, timestamp_s=0.0)
+    assert [state.score for state in states] == [0.95, 0.3]
+    assert ",score=0.95," in PoseFormatter()._format_hand_states(states[:1])
@@ -0,0 +1,126 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from gesture_training import train
+from landmark_gesture_classifier import (
+    GestureTemplates,
+    LandmarkGestureClassifier,
+    builtin_templates,
+    hand_features,
+    synthetic_hand,
+)
+
+VICTORY = (False, True, True, False, False)
+FIST = (False, False, False, False, False)
+POINTING = (False, True, False, False, False)
+
+
+def _noisy(hand, rng, noise=0.003):
+    scale = rng.uniform(0.6, 1.4)
+    return (hand - 0.5) * scale + rng.uniform(0.3, 0.7) + rng.normal(0, noise, hand.shape)
+
+
+def test_features_ignore_position_and_scale():
+    hand = synthetic_hand(VICTORY)
+    moved = (hand - 0.5) * 1.7 + 0.2
+    assert np.allclose(hand_features(hand[None]), hand_features(moved[None]))
+
+
+def test_left_hands_are_mirrored():
+    hand = synthetic_hand(VICTORY)
+    mirrored = hand.copy()
+    mirrored[:, 0] = 1.0 - mirrored[:, 0]
+    assert np.allclose(
+        hand_features(hand[None]), hand_features(mirrored[None], mirror=[True])
+    )
+
+
+def test_builtin_templates_classify_synthetic_poses():
+    classifier = LandmarkGestureClassifier(templates=builtin_templates())
+    rng = np.random.default_rng(0)
+    hands = [
+        _noisy(synthetic_hand(pose, rng.uniform(-15, 15)), rng)
+        for pose in (VICTORY, FIST, POINTING)
+    ]
+    hands[1][:, 0] = 1.0 - hands[1][:, 0]  # as seen for a left hand
+    results = classifier.classify_arrays(["right", "left", "right"], hands)
+    assert [result.gesture for result in results] == ["victory", "closed_fist", "pointing_up"]
+    assert all(0.0 < result.score <= 1.0 for result in results)
+
+
+def test_unknown_shapes_and_incomplete_hands_are_rejected():
+    classifier = LandmarkGestureClassifier(templates=builtin_templates())
+    rng = np.random.default_rng(1)
+    results = classifier.classify_arrays(
+        ["right", "left"], [rng.uniform(0, 1, (21, 3)), np.zeros((5, 3))]
+    )
+    assert [(result.gesture, result.score) for result in results] == [(None, 0.0), (None, 0.0)]
+
+
+def test_recognize_accepts_mediapipe_shaped_results():
+    points = [SimpleNamespace(x=x, y=y, z=z) for x, y, z in synthetic_hand(POINTING)]
+    result = SimpleNamespace(normalized=[SimpleNamespace(landmark=points)], handedness=["Right"])
+    recognized = LandmarkGestureClassifier(templates=builtin_templates()).recognize(result)
+    assert recognized[0].handedness == "right"
+    assert recognized[0].gesture == "pointing_up"
+
+
+def test_missing_model_file_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="gesture_training.py"):
+        LandmarkGestureClassifier(model_path=str(tmp_path / "missing.npz"))
+
+
+def test_train_from_sessions_and_reload(tmp_path, capsys):
+    rng = np.random.default_rng(2)
+    session = tmp_path / "session.jsonl"
+    with open(session, "w", encoding="utf-8") as handle:
+        for label, pose in (("peace", VICTORY), ("fist", FIST), ("point", POINTING)):
+            for _ in range(40):
+                hand = _noisy(synthetic_hand(pose, rng.uniform(-20, 20), rng.uniform(65, 95)), rng)
+                sample = {"label": label, "handedness": "right", "landmarks": hand.tolist()}
+                handle.write(json.dumps(sample) + "\n")
+
+    model_path = tmp_path / "model.npz"
+    accuracy = train([str(session)], str(model_path), templates_per_label=4)
+    assert accuracy >= 0.95
+    assert "held-out accuracy" in capsys.readouterr().out
+
+    model = GestureTemplates.load(str(model_path))
+    assert model.labels == ("fist", "peace", "point")
+    assert model.templates.shape == (12, hand_features(synthetic_hand(FIST)[None]).shape[1])
+
+    classifier = LandmarkGestureClassifier(model_path=str(model_path))
+    result = classifier.classify_arrays(["right"], [synthetic_hand(VICTORY)])[0]
+    assert result.gesture == "peace"
+
+
+def test_train_on_wide_frames_matches_recognize(tmp_path):
+    rng = np.random.default_rng(3)
+    aspect = 16.0 / 9.0
+    wide, square = tmp_path / "wide.jsonl", tmp_path / "square.jsonl"
+    with open(wide, "w", encoding="utf-8") as wide_out, open(square, "w", encoding="utf-8") as square_out:
+        for label, pose in (("peace", VICTORY), ("fist", FIST), ("point", POINTING)):
+            for _ in range(30):
+                hand = _noisy(synthetic_hand(pose, rng.uniform(-20, 20), rng.uniform(65, 95)), rng)
+                sample = {"label": label, "handedness": "right", "landmarks": hand.tolist()}
+                square_out.write(json.dumps(sample) + "\n")
+                hand[:, 0] /= aspect  # the same hand normalized on a 1280x720 frame
+                sample.update(landmarks=hand.tolist(), aspect=aspect)
+                wide_out.write(json.dumps(sample) + "\n")
+
+    for session in (wide, square):
+        assert train([str(session)], str(tmp_path / f"{session.stem}.npz"), templates_per_label=4) >= 0.95
+    wide_model = GestureTemplates.load(str(tmp_path / "wide.npz"))
+    square_model = GestureTemplates.load(str(tmp_path / "square.npz"))
+    assert np.allclose(wide_model.templates, square_model.templates)
+
+    classifier = LandmarkGestureClassifier(model_path=str(tmp_path / "wide.npz"))
+    for label, pose in (("peace", VICTORY), ("fist", FIST), ("point", POINTING)):
+        hand = synthetic_hand(pose, 10.0)
+        hand[:, 0] /= aspect
+        points = [SimpleNamespace(x=x, y=y, z=z) for x, y, z in hand]
+        result = SimpleNamespace(normalized=[SimpleNamespace(landmark=points)], handedness=["Right"])
+        assert classifier.recognize(result, frame_shape=(720, 1280, 3))[0].gesture == label
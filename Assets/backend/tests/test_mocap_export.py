@@ -0,0 +1,147 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from landmark_arrays import POSE_LANDMARK_COUNT
+from mocap_export import (
+    SKELETON,
+    TO_BVH_AXES,
+    ExtractOptions,
+    euler_zxy,
+    euler_zxy_matrix,
+    extract_video,
+    fill_gaps,
+    forward_kinematics,
+    plan_chunks,
+    solve_motion,
+    write_bvh,
+    write_csv,
+)
+
+# A rest pose in BVH axes (metres), facing +z.
+REST = {
+    0: (0.0, 0.62, 0.1), 7: (0.07, 0.6, 0.0), 8: (-0.07, 0.6, 0.0),
+    11: (0.18, 0.5, 0.0), 12: (-0.18, 0.5, 0.0), 13: (0.46, 0.5, 0.0), 14: (-0.46, 0.5, 0.0),
+    15: (0.72, 0.5, 0.0), 16: (-0.72, 0.5, 0.0), 17: (0.8, 0.5, 0.0), 18: (-0.8, 0.5, 0.0),
+    19: (0.8, 0.5, 0.0), 20: (-0.8, 0.5, 0.0), 23: (0.1, 0.0, 0.0), 24: (-0.1, 0.0, 0.0),
+    25: (0.1, -0.42, 0.0), 26: (-0.1, -0.42, 0.0), 27: (0.1, -0.82, 0.0),
+    28: (-0.1, -0.82, 0.0), 31: (0.1, -0.85, 0.15), 32: (-0.1, -0.85, 0.15),
+}
+
+
+def _rotation_y(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, 0.0, s], [0.0, 1.0, 0.0], [-s, 0.0, c]])
+
+
+def _rotation_z(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+def _performance(frames=40):
+    """Turning, walking and bending the left elbow, as MediaPipe would report it."""
+    rest = np.zeros((POSE_LANDMARK_COUNT, 3))
+    for index, point in REST.items():
+        rest[index] = point
+    clip = np.empty((frames, POSE_LANDMARK_COUNT, 3))
+    for frame in range(frames):
+        points = rest.copy()
+        elbow = points[13].copy()
+        bend = _rotation_z(frame * 0.05)
+        for index in (15, 17, 19):
+            points[index] = elbow + bend @ (points[index] - elbow)
+        turn = _rotation_y(frame * 0.2)
+        clip[frame] = points @ turn.T + np.array([0.01 * frame, 0.0, 0.0])
+    return clip * TO_BVH_AXES, clip
+
+
+def test_plan_chunks_overlap_and_read_to_the_end():
+    assert plan_chunks(0, 100, 10) == [(0, 0, None)]
+    assert plan_chunks(250, 100, 10) == [(0, 0, 100), (90, 100, 200), (190, 200, None)]
+
+
+def test_euler_round_trip():
+    angles = np.random.default_rng(3).uniform(-1.2, 1.2, size=(50, 3))
+    np.testing.assert_allclose(euler_zxy(euler_zxy_matrix(angles)), angles, atol=1e-9)
+
+
+def test_solved_rotations_reproduce_the_performance():
+    landmarks, expected = _performance()
+    clip = solve_motion(landmarks, fps=30.0)
+    assert clip.rotations.shape == (40, len(SKELETON), 3)
+    assert clip.offsets[[joint.name for joint in SKELETON].index("LeftForeArm")] == pytest.approx(
+        [0.28, 0.0, 0.0]
+    )
+    positions = forward_kinematics(clip)
+    for name, index in (("LeftHand", 15), ("LeftForeArm", 13), ("RightFoot", 28), ("LeftUpLeg", 23)):
+        np.testing.assert_allclose(positions[name], expected[:, index], atol=1e-6)
+    np.testing.assert_allclose(positions["LeftFoot_end"], expected[:, 31], atol=1e-6)
+    # The turn passes 180 degrees and the curves stay continuous.
+    assert np.abs(np.diff(clip.rotations, axis=0)).max() < 30.0
+
+
+def test_gaps_are_interpolated():
+    landmarks, _ = _performance(5)
+    landmarks[2] = np.nan
+    confidence = np.ones(landmarks.shape[:2])
+    confidence[3, 15] = 0.1
+    filled = fill_gaps(landmarks, confidence)
+    np.testing.assert_allclose(filled[2, :15], (landmarks[1, :15] + landmarks[3, :15]) / 2)
+    assert filled[3, 15] == pytest.approx(landmarks[1, 15] + (landmarks[4, 15] - landmarks[1, 15]) * 2 / 3)
+    with pytest.raises(ValueError, match="No body"):
+        fill_gaps(np.full((3, POSE_LANDMARK_COUNT, 3), np.nan))
+
+
+def test_writes_bvh_and_csv(tmp_path):
+    clip = solve_motion(_performance(6)[0], fps=25.0)
+    write_bvh(clip, str(tmp_path / "take.bvh"))
+    write_csv(clip, str(tmp_path / "out" / "take.csv"))
+
+    text = (tmp_path / "take.bvh").read_text()
+    header, motion = text.split("MOTION\n")
+    assert header.count("JOINT") == len(SKELETON) - 1 and header.count("End Site") == 5
+    assert header.count("{") == header.count("}")
+    lines = motion.splitlines()
+    assert lines[:2] == ["Frames: 6", "Frame Time: 0.040000"]
+    values = np.array([line.split() for line in lines[2:]], dtype=float)
+    assert values.shape == (6, 3 + 3 * len(SKELETON))
+    np.testing.assert_allclose(values[:, :3], clip.root_positions * 100.0, atol=1e-3)
+
+    table = np.genfromtxt(tmp_path / "out" / "take.csv", delimiter=",", names=True)
+    assert len(table) == 6 and table["time"][1] == pytest.approx(0.04)
+    assert table["LeftForeArm_zrot"] == pytest.approx(clip.rotations[:, 4, 0], abs=1e-3)
+
+
+class FakeBody:
+    """Reports the frame's brightness as the nose's x coordinate."""
+
+    def __init__(self, model_complexity):
+        self.model_complexity = model_complexity
+
+    def get_body_pose(self, frame):
+        value = float(frame.mean())
+        points = [SimpleNamespace(x=0.0, y=0.0, z=0.0, visibility=0.9) for _ in range(POSE_LANDMARK_COUNT)]
+        points[0].x = value
+        return SimpleNamespace(world_landmarks=SimpleNamespace(landmark=points))
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_chunks_are_stitched_in_order(tmp_path, workers):
+    path = str(tmp_path / "clip.avi")
+    video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+    for frame in range(12):
+        video.write(np.full((24, 32, 3), 20 * frame, np.uint8))
+    video.release()
+
+    options = ExtractOptions(chunk_frames=5, overlap=2, estimator=FakeBody)
+    points, confidence, fps = extract_video(path, workers=workers, options=options)
+    assert fps == pytest.approx(10.0)
+    assert points.shape == (12, POSE_LANDMARK_COUNT, 3)
+    np.testing.assert_allclose(points[:, 0, 0], 20 * np.arange(12), atol=3)
+    assert confidence[0, 0] == pytest.approx(0.9)
@@ -0,0 +1,170 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from backend_service import BackendService, reply_to_line
+from control_client import ControlClient
+from fake_stages import CountingSource
+from network_runtime import AsyncControlServer, AsyncPoseSender, NetworkRuntime
+from payload_schema import encode_payload, hello_message
+from pipeline_stages import STAGE_TYPES, AsyncSenderSink, FrameContext
+
+FRAME = {"body_world": [(0.1, 0.2, 0.3), (0.4, 0.5, 0.6)], "gesture": "neutral"}
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _read_until(connection, expected, timeout=2.0):
+    connection.settimeout(timeout)
+    data = b""
+    while expected.encode("utf-8") not in data:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode("utf-8")
+
+
+@pytest.fixture
+def runtime():
+    runtime = NetworkRuntime()
+    yield runtime
+    runtime.close()
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    server.settimeout(3.0)
+    yield server
+    server.close()
+
+
+@pytest.mark.parametrize("reply, version", [(b"hello:schema=2\n", 2), (b"", 1)])
+def test_stream_negotiates_greets_and_encodes_per_peer(runtime, listener, reply, version):
+    sender = AsyncPoseSender(
+        port=listener.getsockname()[1], greeting="status:ready|", handshake_timeout=0.2, runtime=runtime
+    )
+    try:
+        connection, _ = listener.accept()
+        assert connection.recv(256).decode("utf-8") == hello_message()
+        if reply:
+            connection.sendall(reply)
+        assert _wait_for(lambda: sender.peer_count == 1)
+        sender.publish(FRAME, encode_payload(FRAME), 2)
+        expected = "status:ready|" + encode_payload(FRAME, version)
+        assert _read_until(connection, "gesture:neutral") == expected
+        connection.close()
+    finally:
+        sender.close()
+    assert sender.connections == 1
+    assert sender.bytes_sent == len(encode_payload(FRAME, version))
+
+
+def test_subscribers_share_the_stream(runtime):
+    sender = AsyncPoseSender(connect=False, subscriber_port=0, schema_version=1, runtime=runtime)
+    subscribers = [socket.create_connection(sender.subscriber_address) for _ in range(3)]
+    try:
+        assert _wait_for(lambda: sender.peer_count == 3)
+        sender.send("gesture:neutral")
+        for subscriber in subscribers:
+            assert _read_until(subscriber, "gesture:neutral") == "gesture:neutral"
+    finally:
+        for subscriber in subscribers:
+            subscriber.close()
+        sender.close()
+    assert sender.payloads_sent == 3
+
+
+def test_stalled_peer_never_blocks_the_frame_loop(runtime):
+    sender = AsyncPoseSender(
+        connect=False, subscriber_port=0, schema_version=1, stall_timeout=0.3, runtime=runtime
+    )
+    stalled = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stalled.connect(sender.subscriber_address)  # never reads
+    healthy = socket.create_connection(sender.subscriber_address)
+    received = bytearray()
+
+    def drain():
+        try:
+            while True:
+                chunk = healthy.recv(1 << 20)
+                if not chunk:
+                    return
+                received.extend(chunk)
+        except OSError:
+            return
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    try:
+        assert _wait_for(lambda: sender.peer_count == 2)
+        payload = "gesture:" + "x" * 200_000
+        slowest = 0.0
+        deadline = time.monotonic() + 5.0
+        while sender.peer_count == 2 and time.monotonic() < deadline:
+            start = time.perf_counter()
+            sender.send(payload)
+            slowest = max(slowest, time.perf_counter() - start)
+            time.sleep(0.002)
+        assert sender.peer_count == 1  # the stalled peer was dropped
+        assert slowest < 0.05
+        sender.send("gesture:after")
+        assert _wait_for(lambda: received.endswith(b"gesture:after"), timeout=3.0)
+    finally:
+        stalled.close()
+        healthy.close()
+        sender.close()
+        reader.join(2.0)
+
+
+def test_sink_publishes_from_the_pipeline(listener):
+    sink = AsyncSenderSink(
+        "async_sender", {"port": listener.getsockname()[1], "schema_version": 1}
+    )
+    sink.open()
+    try:
+        connection, _ = listener.accept()
+        assert _wait_for(lambda: sink.counters()["reconnects"] == 0 and sink.component.peer_count)
+        context = FrameContext(
+            frame_index=0, timestamp_ms=0, pose_frame=FRAME, payload=encode_payload(FRAME), payload_version=2
+        )
+        assert sink.process(context)
+        assert _read_until(connection, "gesture:neutral") == encode_payload(FRAME, 1)
+        connection.close()
+    finally:
+        sink.close()
+
+
+def test_async_control_channel(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "counting", CountingSource)
+    service = BackendService(
+        {"source": {"type": "counting", "params": {"frames": -1}}, "startup": {"report": False}}
+    )
+    service.open()
+    server = AsyncControlServer(lambda line: reply_to_line(service, line))
+    try:
+        host, port = server.address
+        with ControlClient(host, port) as first, ControlClient(host, port) as second:
+            assert first.start()["streaming"]
+            assert _wait_for(lambda: second.stats()["frames"] > 0)
+            assert not first.request("nope")["ok"]
+        raw = socket.create_connection((host, port))
+        raw.sendall(b"not json\n")
+        assert "Bad request" in _read_until(raw, "\n")
+        raw.close()
+    finally:
+        server.close()
+        service.shutdown()
@@ -0,0 +1,233 @@
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from payload_schema import (
+    MIN_SCHEMA_VERSION,
+    SCHEMA_VERSION,
+    SECTIONS_BY_NAME,
+    PayloadSchemaError,
+    accepted_version,
+    decode_payload,
+    encode_payload,
+    hello_message,
+)
+from pipeline_stages import FrameContext, TcpSenderSink
+from pose_sender import PoseSender
+
+VERSIONS = range(MIN_SCHEMA_VERSION, SCHEMA_VERSION + 1)
+
+
+def _random_frame(rng):
+    """A frame with every section filled with random, encodable values."""
+    frame = {
+        "body_world": np.column_stack(
+            [rng.normal(0, 0.5, (33, 3)), rng.integers(0, 101, 33)]
+        ),
+        "hands": [
+            (f"hand{idx}", rng.uniform(0, 640, (21, 3)))
+            for idx in range(rng.integers(0, 3))
+        ],
+        "hand_states": [],
+        "metrics": {"body": 33, "hands": int(rng.integers(0, 43)), "visible": int(rng.integers(0, 34))},
+        "gesture": str(rng.choice(["neutral", "left_hand_up", "both_hands_up"])),
+        "arm_segments": [
+            (name, {"dir": rng.normal(size=3)}) for name in ("left_upper_arm", "head")
+        ],
+        "sequences": [("clap", {"conf": rng.uniform(), "start": 1.25, "end": rng.uniform(2, 3)})],
+    }
+    for handedness in ("left", "right")[: rng.integers(0, 3)]:
+        state = {
+            "x": rng.uniform(0, 640),
+            "y": rng.uniform(0, 480),
+            "dir": "up",
+            "pointing": bool(rng.integers(0, 2)),
+            "gesture": "victory",
+            "score": rng.uniform(),
+            "ts": rng.uniform(0, 100),
+            "vx": rng.normal(0, 500),
+            "vy": rng.normal(0, 500),
+            "wvz": rng.normal(),
+            "t8v": rng.normal(0, 100, 2),
+        }
+        if rng.integers(0, 2):
+            state["events"] = [("swipe", "left", 12.5), ("hold", None, 13.0)]
+        frame["hand_states"].append((handedness, state))
+    return frame
+
+
+def _assert_close(expected, decoded, tolerance):
+    if isinstance(expected, dict):
+        assert set(decoded) == set(expected)
+        for key in expected:
+            _assert_close(expected[key], decoded[key], tolerance)
+    elif isinstance(expected, (list, tuple, np.ndarray)) and not isinstance(expected, str):
+        assert len(decoded) == len(expected)
+        for left, right in zip(expected, decoded):
+            _assert_close(left, right, tolerance)
+    elif isinstance(expected, (float, np.floating)):
+        assert decoded == pytest.approx(float(expected), abs=tolerance)
+    else:
+        assert decoded == expected
+
+
+@pytest.mark.parametrize("version", VERSIONS)
+def test_random_frames_round_trip(version):
+    rng = np.random.default_rng(version)
+    for _ in range(50):
+        frame = _random_frame(rng)
+        decoded = decode_payload(encode_payload(frame, version))
+        sent = {name: value for name, value in frame.items() if len(value)}  # empty ones are left out
+        # Half a unit in the last sent decimal place (at most one decimal).
+        _assert_close(sent, decoded, 0.51e-1)
+        assert np.allclose(decoded["body_world"], frame["body_world"], atol=0.51e-5)
+
+
+def test_version_one_keeps_the_indexed_format():
+    frame = {
+        "body_image": [(100.0, 50.0, 0.0, 97), (10.04, 20.06, 0.0, 3)],
+        "hands": [("hand0", [(1.0, 2.0, 0.123456)])],
+        "hand_states": [("right", {"x": 1, "y": 2, "dir": "up", "pointing": True, "gesture": "none",
+                                   "vx": float("nan"), "events": [("swipe", "up", 0.0667)]})],
+        "metrics": {"body": 33, "hands": 21, "visible": 30},
+        "gesture": "neutral",
+        "arm_segments": [("head", {"dir": (0.1, 0.2, 0.3)})],
+    }
+    assert encode_payload(frame, 1) == (
+        "body_image:0:100.0,50.0,0.0,97;1:10.0,20.1,0.0,3"
+        "|hands:hand0:0:1.0,2.0,0.12346"
+        "|hand_states:right:x=1.0,y=2.0,dir=up,pointing=1,gesture=none,events=swipe_up@0.0667"
+        "|metrics:body=33,hands=21,visible=30"
+        "|gesture:neutral"
+        "|arm_segments:head:dir=0.10000,0.20000,0.30000"
+    )
+    assert encode_payload(frame, 2).startswith(
+        "body_image:100.0,50.0,0.0,97;10.0,20.1,0.0,3|hands:hand0:1.0,2.0,0.12346|"
+    )
+
+
+def test_newer_version_is_smaller():
+    frame = _random_frame(np.random.default_rng(7))
+    assert len(encode_payload(frame, 2)) < len(encode_payload(frame, 1)) - 33 * 2
+
+
+def test_decoder_skips_unknown_sections_and_keys():
+    decoded = decode_payload(
+        "future:1,2,3|gesture:neutral|hand_states:left:x=1.0,y=2.0,dir=up,"
+        "pointing=0,gesture=none,new_key=7|metrics:body=1,hands=0"
+    )
+    assert decoded["gesture"] == "neutral"
+    assert "future" not in decoded
+    assert decoded["hand_states"] == [
+        ("left", {"x": 1.0, "y": 2.0, "dir": "up", "pointing": False, "gesture": "none"})
+    ]
+    assert decoded["metrics"] == {"body": 1, "hands": 0}
+
+
+def test_optional_fields_are_left_out_and_versions_checked():
+    entry = {"x": 1, "y": 2, "dir": "none", "pointing": False, "gesture": "none",
+             "score": None, "ts": float("nan"), "t4v": (1.0, float("nan"))}
+    assert encode_payload({"hand_states": [("left", entry)]}) == (
+        "hand_states:left:x=1.0,y=2.0,dir=none,pointing=0,gesture=none"
+    )
+    assert encode_payload({"gesture": None, "hands": []}) == ""
+    with pytest.raises(PayloadSchemaError):
+        encode_payload({}, SCHEMA_VERSION + 1)
+    assert SECTIONS_BY_NAME["body_world"].fields[0].precision == 5
+
+
+def test_handshake_messages():
+    assert hello_message() == f"hello:schema={SCHEMA_VERSION},min={MIN_SCHEMA_VERSION}|"
+    assert accepted_version("hello:schema=2\n") == 2
+    assert accepted_version("hello:schema=99\n") == SCHEMA_VERSION
+    assert accepted_version("") == 1
+    assert accepted_version("garbage") == 1
+
+
+def _listener(reply):
+    """A one-connection TCP listener that answers the hello with ``reply``."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    server.settimeout(2.0)
+    received = []
+
+    def serve():
+        connection, _ = server.accept()
+        connection.settimeout(2.0)
+        data = connection.recv(1024)
+        if reply:
+            connection.sendall(reply.encode("utf-8"))
+        try:
+            while True:
+                chunk = connection.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        except socket.timeout:
+            pass
+        received.append(data.decode("utf-8"))
+        connection.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return server, thread, received
+
+
+@pytest.mark.parametrize("reply, expected", [("hello:schema=2\n", 2), ("", 1)])
+def test_sink_encodes_for_the_agreed_version(reply, expected):
+    server, thread, received = _listener(reply)
+    sink = TcpSenderSink(
+        "tcp_sender",
+        {"port": server.getsockname()[1], "handshake_timeout": 0.2},
+    )
+    sink.open()
+    try:
+        frame = {"body_world": [(0.1, 0.2, 0.3)], "gesture": "neutral"}
+        context = FrameContext(frame_index=0, timestamp_ms=0, pose_frame=frame,
+                               payload=encode_payload(frame), payload_version=SCHEMA_VERSION)
+        sink.process(context)
+        assert sink.component.schema_version == expected
+    finally:
+        sink.close()
+        thread.join(2.0)
+        server.close()
+
+    hello, _, payload = received[0].partition("|")
+    assert hello == hello_message()[:-1]
+    assert payload == encode_payload(frame, expected)
+
+
+def test_fixed_version_skips_the_handshake():
+    server, thread, received = _listener("")
+    sender = PoseSender(port=server.getsockname()[1], schema_version=1)
+    try:
+        assert sender.connect() == 1
+        sender.send("gesture:neutral")
+    finally:
+        sender.close()
+        thread.join(2.0)
+        server.close()
+    assert received == ["gesture:neutral"]
+
+
+def test_failed_connect_closes_its_socket(monkeypatch):
+    created = []
+
+    class TrackedSocket(socket.socket):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    closed.bind(("127.0.0.1", 0))
+    port = closed.getsockname()[1]
+    closed.close()  # nothing listens on the port any more
+    monkeypatch.setattr(socket, "socket", TrackedSocket)
+    sender = PoseSender(port=port)
+    assert sender.connect() is None
+    assert sender.connect() is None
+    assert len(created) == 2 and all(sock.fileno() == -1 for sock in created)
+    assert sender.connections == 0
@@ -0,0 +1,241 @@
+import json
+import sys
+
+import pytest
+
+from pipeline import PipelineRunner, build_stages, resolve_config
+from pipeline_presets import PRESETS
+from fake_stages import CountingSource, RecordingEstimator
+from pipeline_stages import STAGE_TYPES, PipelineConfigError, Stage
+
+
+class FractionStage(Stage):
+    """Analyzer backed by a stdlib class, so params can be checked offline."""
+
+    kind = "analyzer"
+    module = "fractions"
+    factory = "Fraction"
+
+
+@pytest.fixture
+def fraction_stage(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "fraction", FractionStage)
+
+
+@pytest.mark.parametrize("name", sorted(PRESETS))
+def test_presets_build(name):
+    stages = build_stages(PRESETS[name])
+    assert stages[0].kind == "source"
+
+
+def test_headless_preset_skips_visualizer():
+    names = [stage.name for stage in build_stages(PRESETS["headless"])]
+    assert "visualizer" not in names
+    assert "hand_gesture" not in names
+
+
+def test_unknown_section():
+    with pytest.raises(PipelineConfigError, match="Unknown pipeline sections: extra"):
+        build_stages({"source": "camera", "extra": []})
+
+
+def test_list_section_must_be_list():
+    with pytest.raises(PipelineConfigError, match="'estimators' must be a list"):
+        build_stages({"source": "camera", "estimators": "body_pose"})
+
+
+def test_single_section_must_not_be_list():
+    with pytest.raises(PipelineConfigError, match="'source' must be a single stage"):
+        build_stages({"source": ["camera"]})
+
+
+def test_stage_of_wrong_kind():
+    with pytest.raises(PipelineConfigError, match="is a estimator, not a sink"):
+        build_stages({"source": "camera", "sinks": ["body_pose"]})
+
+
+def test_unknown_stage_type():
+    with pytest.raises(PipelineConfigError, match="Unknown stage type 'nope'"):
+        build_stages({"source": "camera", "sinks": ["nope"]})
+
+
+def test_non_string_stage_type():
+    with pytest.raises(PipelineConfigError, match="non-string type"):
+        build_stages({"source": {"type": ["camera"]}})
+
+
+def test_params_must_be_mapping():
+    with pytest.raises(PipelineConfigError, match="must be a mapping"):
+        build_stages({"source": {"type": "camera", "params": [0]}})
+
+
+def test_missing_source():
+    with pytest.raises(PipelineConfigError, match="'source' stage"):
+        build_stages({"estimators": ["body_pose"]})
+
+
+def test_missing_upstream_field():
+    with pytest.raises(PipelineConfigError, match="needs payload"):
+        build_stages({"source": "camera", "sinks": ["tcp_sender"]})
+
+
+def test_duplicate_stage_names():
+    with pytest.raises(PipelineConfigError, match="Duplicate stage name 'body_pose'"):
+        build_stages({"source": "camera", "estimators": ["body_pose", "body_pose"]})
+
+
+def test_explicit_names_allow_repeated_types():
+    stages = build_stages(
+        {
+            "source": "camera",
+            "estimators": [
+                {"type": "body_pose", "name": "pose_a"},
+                {"type": "body_pose", "name": "pose_b"},
+            ],
+        }
+    )
+    assert [stage.name for stage in stages] == ["camera", "pose_a", "pose_b"]
+
+
+def test_console_sink_unknown_field():
+    with pytest.raises(PipelineConfigError, match="unknown field 'nope'"):
+        build_stages(
+            {"source": "camera", "sinks": [{"type": "console", "params": {"field": "nope"}}]}
+        )
+
+
+def test_check_params_rejects_unknown_argument(fraction_stage):
+    stage = build_stages(
+        {"source": "camera", "analyzers": [{"type": "fraction", "params": {"bogus": 1}}]}
+    )[1]
+    with pytest.raises(PipelineConfigError, match="Invalid parameters for stage 'fraction'"):
+        stage.check_params()
+
+
+def test_check_params_accepts_valid_arguments(fraction_stage):
+    stage = build_stages(
+        {"source": "camera", "analyzers": [{"type": "fraction", "params": {"numerator": 3}}]}
+    )[1]
+    stage.open()
+    assert stage.component == 3
+
+
+def test_building_does_not_import_components():
+    build_stages(PRESETS["full"])
+    assert "pose_visualizer" not in sys.modules
+    assert "hand_gesture_recognizer" not in sys.modules
+
+
+def test_resolve_preset_name():
+    assert resolve_config("simple") is PRESETS["simple"]
+
+
+def test_resolve_json_file(tmp_path):
+    path = tmp_path / "pipeline.json"
+    path.write_text(json.dumps(PRESETS["headless"]))
+    config = resolve_config(str(path))
+    assert config["sinks"] == PRESETS["headless"]["sinks"]
+
+
+def test_resolve_unsupported_file(tmp_path):
+    path = tmp_path / "pipeline.ini"
+    path.write_text("")
+    with pytest.raises(PipelineConfigError, match="Unsupported pipeline file type"):
+        resolve_config(str(path))
+
+
+def test_resolve_unknown_name():
+    with pytest.raises(PipelineConfigError, match="neither a preset"):
+        resolve_config("does-not-exist")
+
+
+def test_resolve_passes_mappings_through():
+    config = {"source": "camera"}
+    assert resolve_config(config) is config
+
+
+def test_formatter_and_analyzer_do_not_import_mediapipe_modules():
+    import hand_motion_analyzer  # noqa: F401
+    import pose_formatter  # noqa: F401
+
+    assert "hand_gesture_recognizer" not in sys.modules
+    assert "hand_pose_estimator" not in sys.modules
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "counting", CountingSource)
+    monkeypatch.setitem(STAGE_TYPES, "recording", RecordingEstimator)
+    RecordingEstimator.seen = []
+    RecordingEstimator.opened = 0
+
+
+def test_startup_must_be_mapping():
+    with pytest.raises(PipelineConfigError, match="'startup' must be a mapping"):
+        PipelineRunner({"source": "camera", "startup": "fast"})
+
+
+def test_unknown_startup_option():
+    with pytest.raises(PipelineConfigError, match="Unknown startup options: fast"):
+        PipelineRunner({"source": "camera", "startup": {"fast": True}})
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_warm_up_runs_before_frames_with_increasing_timestamps(fake_stages, parallel):
+    runner = PipelineRunner(
+        {
+            "source": "counting",
+            "estimators": ["recording"],
+            "startup": {"parallel": parallel, "report": False},
+        }
+    )
+    runner.run()
+    assert RecordingEstimator.seen == [0, 33, 66, 99]
+    steps = [step for step, _ in runner.startup_report.steps]
+    assert steps == [
+        "import counting",
+        "import recording",
+        "construct counting",
+        "construct recording",
+        "warm up recording",
+    ]
+
+
+def test_warm_up_can_be_disabled(fake_stages):
+    runner = PipelineRunner(
+        {
+            "source": "counting",
+            "estimators": ["recording"],
+            "startup": {"warm_up": False, "report": False},
+        }
+    )
+    runner.run()
+    assert RecordingEstimator.seen == [0, 33, 66]
+
+
+def test_sender_greets_every_new_connection():
+    import socket
+
+    from pipeline_stages import READY_PAYLOAD
+    from pose_sender import PoseSender
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(2)
+    server.settimeout(2.0)
+    port = server.getsockname()[1]
+
+    sender = PoseSender(port=port, schema_version=1)  # no handshake
+    try:
+        sender.set_greeting(READY_PAYLOAD)
+        sender.send("gesture:neutral")
+        connection, _ = server.accept()
+        connection.settimeout(2.0)
+        received = b""
+        while not received.endswith(b"gesture:neutral"):
+            received += connection.recv(1024)
+        assert received.decode("utf-8") == READY_PAYLOAD + "gesture:neutral"
+        connection.close()
+    finally:
+        sender.close()
+        server.close()
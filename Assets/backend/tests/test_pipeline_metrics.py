@@ -0,0 +1,162 @@
+import json
+import logging
+import socket
+import threading
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from fake_stages import CountingSource
+from pipeline import PipelineRunner, with_metrics
+from pipeline_metrics import MetricsRegistry
+from pipeline_stages import STAGE_TYPES, ConsoleSink, FrameContext, Stage
+from pose_sender import PoseSender
+
+
+class GappySource(CountingSource):
+    """Like CountingSource, but every third read delivers no frame."""
+
+    def process(self, context):
+        keep_going = super().process(context)
+        if self.component["remaining"] % 3 == 0:
+            context.frame = None
+        return keep_going
+
+
+class FakeDetector(Stage):
+    """Finds a body on every frame and two hands on every other one."""
+
+    kind = "estimator"
+    requires = ("frame",)
+    provides = ("body_result", "hand_result")
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        self.component = object()
+
+    def process(self, context):
+        context.body_result = SimpleNamespace(landmarks=[1])
+        context.hand_result = SimpleNamespace(normalized=[1, 2] if context.frame_index % 2 else [])
+        return True
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "gappy", GappySource)
+    monkeypatch.setitem(STAGE_TYPES, "detector", FakeDetector)
+
+
+def _run(config):
+    runner = PipelineRunner(dict(config, startup={"report": False, "warm_up": False}))
+    runner.open()
+    while runner.step() is not None:
+        pass
+    return runner
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs.", ("queue",)).inc(2, queue='a"b')
+    histogram = registry.histogram("wait_seconds", "Wait.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="a\\"b"} 2',
+        "# HELP wait_seconds Wait.",
+        "# TYPE wait_seconds histogram",
+        'wait_seconds_bucket{le="0.1"} 1',
+        'wait_seconds_bucket{le="1"} 2',
+        'wait_seconds_bucket{le="+Inf"} 3',
+        "wait_seconds_sum 5.55",
+        "wait_seconds_count 3",
+    ]
+    assert registry.snapshot()["wait_seconds"] == {"count": 3, "sum": 5.55}
+    with pytest.raises(ValueError, match="takes labels"):
+        registry.counter("jobs_total", "Jobs.", ("queue",)).inc()
+
+
+def test_runner_records_stages_detections_and_drops(fake_stages, tmp_path):
+    path = tmp_path / "stats.jsonl"
+    runner = _run(
+        {
+            "source": {"type": "gappy", "params": {"frames": 9}},
+            "estimators": ["detector"],
+            "metrics": {"jsonl_path": str(path)},
+        }
+    )
+    runner.close()
+    snapshot = runner.metrics.snapshot()
+    assert snapshot["pose_frames_total"] == 6
+    assert snapshot["pose_frames_dropped_total"] == 3
+    # The tenth read, which ends the stream, is timed as well.
+    assert snapshot["pose_stage_seconds"]["gappy,source"]["count"] == 10
+    assert snapshot["pose_stage_seconds"]["detector,estimator"]["count"] == 6
+    assert snapshot["pose_detections_total"] == {"body": 6, "hand": 6}
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["frame"] for record in records] == list(range(6))
+    assert set(records[0]["stages_ms"]) == {"gappy", "detector"}
+    assert [record["hands"] for record in records[:2]] == [0, 2]
+
+
+def test_metrics_can_be_disabled(fake_stages):
+    runner = _run({"source": {"type": "gappy", "params": {"frames": 2}}, "metrics": {"enabled": False}})
+    assert runner.metrics is None
+
+
+def test_http_endpoint_survives_a_switch(fake_stages):
+    config = with_metrics({"source": {"type": "gappy", "params": {"frames": 4}}}, port=0)
+    runner = _run(config)
+    host, port = runner.metrics.server_address
+    next_runner = PipelineRunner(config)
+    next_runner.adopt(runner)
+    runner.close()
+    try:
+        text = urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=2).read().decode()
+        assert "pose_frames_total 2" in text
+        assert 'pose_stage_seconds_count{stage="gappy",kind="source"} 5' in text
+        data = json.loads(urllib.request.urlopen(f"http://{host}:{port}/metrics.json", timeout=2).read())
+        assert data["pose_frames_dropped_total"] == 2
+    finally:
+        next_runner.close()
+
+
+def test_console_sink_logs_sampled_frames_at_debug_level(caplog):
+    sink = ConsoleSink("console", {"field": "body_gesture", "every": 2})
+    sink.open()
+    for index in range(5):
+        sink.process(FrameContext(frame_index=index, timestamp_ms=0, body_gesture="neutral"))
+    assert caplog.records == []
+
+    caplog.set_level(logging.DEBUG, logger="pose.pipeline")
+    for index in range(5):
+        sink.process(FrameContext(frame_index=index, timestamp_ms=0, body_gesture="neutral"))
+    assert [record.getMessage() for record in caplog.records] == [
+        f"frame {index} body_gesture: neutral" for index in (0, 2, 4)
+    ]
+
+
+def test_sender_counts_bytes_and_reconnects():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(2)
+    accepted = []
+    thread = threading.Thread(target=lambda: accepted.extend(server.accept() for _ in range(2)))
+    thread.start()
+    sender = PoseSender(port=server.getsockname()[1], schema_version=1)
+    try:
+        sender.send("gesture:neutral")
+        sender.close()
+        sender.send("gesture:neutral")
+        thread.join(2.0)
+    finally:
+        sender.close()
+        for connection, _ in accepted:
+            connection.close()
+        server.close()
+    assert (sender.bytes_sent, sender.payloads_sent, sender.connections) == (30, 2, 2)
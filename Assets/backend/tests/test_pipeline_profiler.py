@@ -0,0 +1,143 @@
+import os
+import pstats
+import signal
+import time
+
+import pytest
+
+from backend_service import BackendService
+from fake_stages import CountingSource
+from pipeline import PipelineRunner
+from pipeline_profiler import FrameProfiler, install_signal_handlers
+from pipeline_stages import STAGE_TYPES, Stage
+
+
+class SlowStage(Stage):
+    """Estimator that spends about a millisecond per frame."""
+
+    kind = "estimator"
+    requires = ("frame",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        self.component = object()
+
+    def process(self, context):
+        deadline = time.perf_counter() + 0.001
+        while time.perf_counter() < deadline:
+            pass
+        return True
+
+
+CONFIG = {
+    "source": {"type": "counting", "params": {"frames": -1}},
+    "estimators": ["slow"],
+    "startup": {"report": False, "warm_up": False},
+}
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "counting", CountingSource)
+    monkeypatch.setitem(STAGE_TYPES, "slow", SlowStage)
+    runner = PipelineRunner(CONFIG)
+    runner.open()
+    yield runner
+    runner.close()
+
+
+def _run_for(runner, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        runner.step()
+
+
+def test_profiler_is_idle_by_default(runner):
+    runner.step()
+    assert not runner.profiler.active
+    assert runner.profiler.report() == {}
+
+
+def test_stage_timing_report(runner):
+    runner.profiler.start_timing()
+    for _ in range(20):
+        runner.step()
+    report = runner.profiler.stop_timing()
+    assert set(report) == {"counting", "slow", "frame"}
+    assert report["slow"]["calls"] == 20
+    assert 1.0 <= report["slow"]["mean_ms"] <= report["slow"]["max_ms"]
+    assert 0.5 < report["slow"]["share"] < 1.0
+    assert "[profile] slow" in runner.profiler.format_report()
+    assert not runner.profiler.active
+
+
+def test_sampling_capture_writes_collapsed_stacks(runner, tmp_path):
+    path = runner.profiler.capture(seconds=0.2, path=str(tmp_path / "out" / "cap.folded"))
+    _run_for(runner, 0.4)
+    assert not runner.profiler.capturing
+    assert runner.profiler.last_capture == path
+    lines = open(path, encoding="utf-8").read().splitlines()
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    leaves = [stack.split(";")[-1] for stack in stacks]
+    # SlowStage.process on Python 3.11+, process before.
+    assert any(leaf.startswith("test_pipeline_profiler.py:") and "process" in leaf for leaf in leaves)
+    assert all(";" in stack for stack in stacks)
+    with pytest.raises(ValueError, match="Unknown capture mode"):
+        runner.profiler.capture(mode="perf")
+
+
+def test_cprofile_capture_writes_pstats(runner, tmp_path):
+    path = runner.profiler.capture(seconds=0.05, mode="cprofile", path=str(tmp_path / "cap.prof"))
+    with pytest.raises(RuntimeError, match="already running"):
+        runner.profiler.capture()
+    _run_for(runner, 0.15)
+    assert not runner.profiler.capturing
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert "process" in functions
+
+
+def test_service_profile_command(monkeypatch, tmp_path):
+    monkeypatch.setitem(STAGE_TYPES, "counting", CountingSource)
+    monkeypatch.setitem(STAGE_TYPES, "slow", SlowStage)
+    service = BackendService(dict(CONFIG, profiling={"output_dir": str(tmp_path)}))
+    service.open()
+    try:
+        assert service.handle({"command": "profile", "action": "start"}) == {"timing": True, "ok": True}
+        service.start()
+        time.sleep(0.1)
+        reply = service.handle({"command": "profile", "action": "stop"})
+        assert reply["report"]["slow"]["calls"] > 0
+        reply = service.handle({"command": "profile", "action": "capture", "seconds": 0.05})
+        assert reply["capture"].startswith(str(tmp_path))
+        deadline = time.monotonic() + 2.0
+        while service.profiler.capturing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert os.path.exists(reply["capture"])
+        assert not service.handle({"command": "profile", "action": "nope"})["ok"]
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs POSIX signals")
+def test_signals_toggle_timing_and_start_a_capture(tmp_path, capsys):
+    profiler = FrameProfiler(output_dir=str(tmp_path))
+    previous = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    try:
+        assert install_signal_handlers(lambda: profiler)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert not profiler.timing and profiler.active
+        profiler.frame_started()
+        assert profiler.timing
+        with profiler._lock:  # as if the signal arrived inside record_stage
+            os.kill(os.getpid(), signal.SIGUSR1)
+        profiler.frame_started()
+        assert not profiler.timing
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert profiler.capturing
+    finally:
+        signal.signal(signal.SIGUSR1, previous[0])
+        signal.signal(signal.SIGUSR2, previous[1])
+        profiler.close()
+    assert "[profile] stage" in capsys.readouterr().out
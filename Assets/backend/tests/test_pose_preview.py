@@ -0,0 +1,82 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from landmark_arrays import POSE_LANDMARK_COUNT, landmarks_to_array
+from pose_preview import PreviewSnapshot, PreviewWorker, draw_overlay, make_snapshot
+
+
+def _landmark_list(count, offset=0.0):
+    points = [
+        SimpleNamespace(x=0.2 + 0.6 * i / count + offset, y=0.5, z=0.0)
+        for i in range(count)
+    ]
+    return SimpleNamespace(landmark=points)
+
+
+def _results():
+    body = SimpleNamespace(landmarks=_landmark_list(POSE_LANDMARK_COUNT))
+    hands = SimpleNamespace(normalized=[_landmark_list(21, 0.05)])
+    return body, hands
+
+
+def test_landmarks_to_array():
+    array = landmarks_to_array(_landmark_list(3))
+    assert array.shape == (3, 3)
+    assert array.dtype == np.float32
+
+
+def test_snapshot_downscales_and_copies():
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    body, hands = _results()
+    snapshot = make_snapshot(frame, body, hands, frame_index=7, scale=0.5)
+    assert snapshot.frame.shape == (50, 100, 3)
+    assert snapshot.body.shape == (POSE_LANDMARK_COUNT, 3)
+    assert len(snapshot.hands) == 1
+    snapshot.frame[:] = 255
+    assert frame.max() == 0
+
+
+def test_draw_overlay_marks_pixels():
+    body, hands = _results()
+    snapshot = make_snapshot(np.zeros((60, 80, 3), np.uint8), body, hands, 0, 1.0)
+    image = draw_overlay(snapshot.frame, snapshot, labels=True)
+    assert image.any()
+
+
+def test_draw_overlay_without_landmarks_is_noop():
+    image = np.zeros((10, 10, 3), np.uint8)
+    draw_overlay(image, PreviewSnapshot(frame=image, frame_index=0))
+    assert not image.any()
+
+
+def test_headless_worker_skips_all_work():
+    worker = PreviewWorker(keep_latest=False)
+    try:
+        body, hands = _results()
+        assert worker.submit(np.zeros((8, 8, 3), np.uint8), body, hands, 0) is False
+        assert worker.latest() == (None, -1)
+    finally:
+        worker.close()
+
+
+def test_worker_decimates_and_feeds_consumers():
+    rendered = []
+    done = threading.Event()
+
+    def consumer(image, frame_index):
+        rendered.append(frame_index)
+        done.set()
+
+    worker = PreviewWorker(preview_hz=1.0, scale=1.0, keep_latest=False)
+    worker.add_consumer(consumer)
+    try:
+        body, hands = _results()
+        frame = np.zeros((20, 20, 3), np.uint8)
+        accepted = [worker.submit(frame, body, hands, idx) for idx in range(30)]
+        assert accepted.count(True) == 1
+        assert done.wait(2.0)
+        assert rendered == [0]
+    finally:
+        worker.close()
@@ -0,0 +1,162 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pipeline import PipelineRunner
+from pipeline_stages import STAGE_TYPES, PipelineConfigError, Stage
+from presence_gate import MotionGate, PresenceMonitor
+from quality_governor import QualityLevel
+
+
+def _frame(level, spot=None):
+    frame = np.full((48, 64, 3), level, dtype=np.uint8)
+    if spot is not None:
+        frame[:, spot : spot + 8] = 255
+    return frame
+
+
+def test_motion_gate_ignores_noise_and_sees_movement():
+    gate = MotionGate(width=32)
+    assert gate.moved(_frame(40))  # nothing to compare with yet
+    noisy = np.clip(_frame(40).astype(int) + np.random.default_rng(0).integers(-4, 5, (48, 64, 3)), 0, 255)
+    assert not gate.moved(noisy.astype(np.uint8))
+    assert gate.moved(_frame(40, spot=10))
+    assert not gate.moved(_frame(40, spot=10))
+    assert gate.changed_fraction(_frame(40, spot=20)) > 0.1
+
+
+def test_monitor_idles_checks_and_wakes():
+    monitor = PresenceMonitor(idle_after_s=5.0, heartbeat_s=2.0)
+    assert not monitor.observe(True, 100.0)
+    assert not monitor.observe(False, 104.0)
+    assert monitor.observe(False, 105.0) and monitor.idle
+
+    assert monitor.should_check(_frame(0), 105.1)  # the gate's first frame
+    assert not monitor.should_check(_frame(0), 106.0)
+    assert monitor.should_check(_frame(0, spot=5), 106.2)  # motion
+    assert not monitor.should_check(_frame(0, spot=5), 108.1)
+    assert monitor.should_check(_frame(0, spot=5), 108.3)  # heartbeat
+    assert monitor.checks == 3
+
+    monitor.wake(109.0)
+    assert not monitor.idle and not monitor.observe(False, 113.0)
+    with pytest.raises(ValueError):
+        PresenceMonitor(check_scale=0.0)
+
+
+class ScriptedSource(Stage):
+    """Yields ``params['frames']`` frames of those brightness levels, then stops."""
+
+    kind = "source"
+    provides = ("frame",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        self.component = list(self.params["frames"])
+
+    def process(self, context):
+        if not self.component:
+            return False
+        context.frame = _frame(self.component.pop(0))
+        return True
+
+
+class BrightBodyEstimator(Stage):
+    """Finds a body in bright frames and records the quality of each call."""
+
+    kind = "estimator"
+    requires = ("frame",)
+    provides = ("body_result",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        self.component = {"calls": [], "graphs": set()}
+
+    def prepare_quality(self, model_complexities):
+        self.component["graphs"].update(model_complexities)
+
+    def process(self, context, level=None):
+        self.component["calls"].append(level)
+        found = context.frame.mean() > 100
+        context.body_result = SimpleNamespace(landmarks=[object()] if found else None)
+        return True
+
+    def detect_presence(self, context, level):
+        self.process(context, level)
+        return bool(context.body_result.landmarks)
+
+
+class CountingAnalyzer(Stage):
+    kind = "analyzer"
+    requires = ("body_result",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        self.component = []
+
+    def process(self, context):
+        self.component.append(context.frame_index)
+        return True
+
+
+@pytest.fixture
+def presence_stages(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "scripted", ScriptedSource)
+    monkeypatch.setitem(STAGE_TYPES, "bright_body", BrightBodyEstimator)
+    monkeypatch.setitem(STAGE_TYPES, "counting_analyzer", CountingAnalyzer)
+
+
+def _config(frames, **presence):
+    return {
+        "source": {"type": "scripted", "params": {"frames": frames}},
+        "estimators": ["bright_body"],
+        "analyzers": ["counting_analyzer"],
+        "startup": {"report": False},
+        "presence": dict(
+            {"enabled": True, "idle_after_s": 0.0, "idle_fps": None, "heartbeat_s": 1000.0}, **presence
+        ),
+    }
+
+
+def test_runner_skips_static_idle_frames(presence_stages, capsys):
+    # A person, an empty static scene, then the person again.
+    runner = PipelineRunner(_config([150, 0, 0, 0, 0, 150, 150]))
+    runner.run()
+    # Frames 2-4 are idle: the first gets a check, the static ones none.
+    assert runner.metrics.idle_frames.value() == 3
+    assert runner.metrics.presence_idle.value() == 0
+    assert runner.frame_index == 4
+    output = capsys.readouterr().out
+    assert "[presence] no body for 0 s" in output and "[presence] body detected" in output
+
+
+def test_runner_records_checks(presence_stages):
+    runner = PipelineRunner(_config([150, 0, 0, 0, 150]))
+    runner.open()
+    try:
+        estimator, analyzer = runner.stages[1].component, runner.stages[2].component
+        assert estimator["graphs"] == {0}  # the check's model is built up front
+        while runner.step() is not None:
+            pass
+        check = QualityLevel(0.5, 0)
+        # The check that found the person feeds the full pass of that frame.
+        assert estimator["calls"] == [None, None, check, check]
+        assert analyzer == [0, 1, 2]
+    finally:
+        runner.close()
+
+
+def test_presence_needs_a_body_estimator(presence_stages):
+    config = _config([0])
+    del config["estimators"], config["analyzers"]
+    with pytest.raises(PipelineConfigError, match="provides body_result"):
+        PipelineRunner(config)
+    with pytest.raises(PipelineConfigError, match="Invalid presence options"):
+        PipelineRunner(_config([0], check_complexity=3))
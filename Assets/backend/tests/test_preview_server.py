@@ -0,0 +1,97 @@
+import threading
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from preview_server import MjpegPreviewServer
+
+
+@pytest.fixture
+def server():
+    server = MjpegPreviewServer(port=0, max_fps=100.0, scale=1.0)
+    yield server
+    server.close()
+
+
+def _pump(server, stop):
+    frame = np.full((24, 32, 3), 80, np.uint8)
+    body = SimpleNamespace(landmarks=None)
+    hands = SimpleNamespace(normalized=None)
+    index = 0
+    while not stop.is_set():
+        server.update(frame, body, hands, index)
+        index += 1
+        time.sleep(0.005)
+
+
+def test_no_viewers_means_no_encoding(server):
+    frame = np.zeros((24, 32, 3), np.uint8)
+    for index in range(20):
+        server.update(frame, None, None, index)
+    time.sleep(0.05)
+    assert server.frames_encoded == 0
+    assert server.viewer_count == 0
+
+
+def test_snapshot_served_and_viewer_released(server):
+    stop = threading.Event()
+    pump = threading.Thread(target=_pump, args=(server, stop), daemon=True)
+    pump.start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/snapshot.jpg", timeout=3) as reply:
+            body = reply.read()
+        assert reply.headers["Content-Type"] == "image/jpeg"
+        assert body[:2] == b"\xff\xd8"
+    finally:
+        stop.set()
+        pump.join()
+    assert server.viewer_count == 0
+    encoded = server.frames_encoded
+    server.update(np.zeros((24, 32, 3), np.uint8), None, None, 10_000)
+    time.sleep(0.05)
+    assert server.frames_encoded == encoded
+
+
+def test_stream_sends_multipart_frames(server):
+    stop = threading.Event()
+    pump = threading.Thread(target=_pump, args=(server, stop), daemon=True)
+    pump.start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/stream.mjpg?fps=50", timeout=3) as reply:
+            assert "multipart/x-mixed-replace" in reply.headers["Content-Type"]
+            chunk = reply.read(2048)
+            assert server.viewer_count == 1
+        assert b"--poseframe" in chunk
+    finally:
+        stop.set()
+        pump.join()
+
+
+def test_unknown_path_is_404(server):
+    host, port = server.address
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(f"http://{host}:{port}/nope", timeout=3)
+    assert info.value.code == 404
+
+
+@pytest.mark.parametrize("fps", ["abc", "nan", "inf", "0", "-5"])
+def test_bad_fps_is_400(server, fps):
+    host, port = server.address
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(f"http://{host}:{port}/stream.mjpg?fps={fps}", timeout=3)
+    assert info.value.code == 400
+    assert server.viewer_count == 0
+
+
+def test_stream_fps_is_capped_at_max_fps(server):
+    host, port = server.address
+    with urllib.request.urlopen(f"http://{host}:{port}/stream.mjpg?fps=1000", timeout=3):
+        deadline = time.monotonic() + 3.0
+        while server.viewer_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert list(server._viewers.values()) == [100.0]
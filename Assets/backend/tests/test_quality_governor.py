@@ -0,0 +1,134 @@
+import time
+
+import numpy as np
+import pytest
+
+from fake_stages import CountingSource
+from pipeline import PipelineRunner
+from pipeline_stages import STAGE_TYPES, PipelineConfigError, Stage
+from quality_governor import QualityGovernor, QualityLevel, parse_levels, scale_frame
+
+LEVELS = [(1.0, 2), (1.0, 1), (0.5, 0)]
+
+
+def _feed(governor, latency_ms, frames):
+    """Feed ``frames`` equal latencies; return the level after each change."""
+    changes = []
+    for _ in range(frames):
+        if governor.update(latency_ms):
+            changes.append(governor.index)
+    return changes
+
+
+def test_steps_down_when_over_budget():
+    governor = QualityGovernor(target_fps=50.0, levels=LEVELS, start_level=0, min_frames=10)
+    assert _feed(governor, 30.0, 9) == []  # not before min_frames
+    assert _feed(governor, 30.0, 1) == [1]
+    assert _feed(governor, 30.0, 10) == [2]
+    assert _feed(governor, 30.0, 50) == []  # already the cheapest level
+    assert governor.level == QualityLevel(0.5, 0)
+
+
+def test_hysteresis_holds_between_thresholds():
+    governor = QualityGovernor(target_fps=50.0, levels=LEVELS, start_level=1, min_frames=10)
+    # 16 ms is under the 20 ms budget but over 70% of it.
+    assert _feed(governor, 16.0, 200) == []
+    assert _feed(governor, 10.0, 10) == [0]
+
+
+def test_failed_upgrades_back_off():
+    governor = QualityGovernor(target_fps=50.0, levels=LEVELS, start_level=1, min_frames=10)
+    assert _feed(governor, 10.0, 10) == [0]
+    assert _feed(governor, 30.0, 10) == [1]  # the upgrade did not hold
+    assert _feed(governor, 10.0, 19) == []  # waits twice as long now
+    assert _feed(governor, 10.0, 1) == [0]
+    assert _feed(governor, 30.0, 10) == [1]
+    assert _feed(governor, 10.0, 39) == []
+    assert _feed(governor, 10.0, 1) == [0]
+
+
+def test_levels_are_validated():
+    assert parse_levels([[0.5, 0]]) == [QualityLevel(0.5, 0)]
+    assert QualityGovernor(levels=LEVELS).model_complexities() == [2, 1, 0]
+    for levels in ([], [(1.5, 1)], [(1.0, 3)]):
+        with pytest.raises(ValueError):
+            parse_levels(levels)
+    with pytest.raises(ValueError, match="start_level"):
+        QualityGovernor(levels=LEVELS, start_level=3)
+
+
+def test_scale_frame():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    assert scale_frame(frame, 1.0) is frame
+    assert scale_frame(frame, 0.5).shape == (240, 320, 3)
+
+
+class ScalableEstimator(Stage):
+    """Estimator whose cost is ``cost_ms`` at full quality."""
+
+    kind = "estimator"
+    warms_up = True
+    requires = ("frame",)
+    provides = ("body_result",)
+
+    def check_params(self):
+        pass
+
+    def open(self):
+        self.component = {"graphs": set(), "level": None, "warmed": []}
+
+    def warm_up(self, context):
+        self.component["warmed"] = sorted(self.component["graphs"])
+
+    def prepare_quality(self, model_complexities):
+        self.component["graphs"].update(model_complexities)
+
+    def set_quality(self, level):
+        self.component["level"] = level
+
+    def process(self, context):
+        level = self.component["level"]
+        cost_ms = self.params["cost_ms"] * level.input_scale ** 2
+        deadline = time.perf_counter() + cost_ms / 1000.0
+        while time.perf_counter() < deadline:
+            pass
+        return True
+
+
+def _config(cost_ms, **quality):
+    return {
+        "source": {"type": "counting", "params": {"frames": -1}},
+        "estimators": [{"type": "scalable", "params": {"cost_ms": cost_ms}}],
+        "startup": {"report": False},
+        "quality": dict({"enabled": True, "target_fps": 200.0, "levels": LEVELS, "min_frames": 5}, **quality),
+    }
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    monkeypatch.setitem(STAGE_TYPES, "counting", CountingSource)
+    monkeypatch.setitem(STAGE_TYPES, "scalable", ScalableEstimator)
+
+
+def test_runner_applies_levels(fake_stages, capsys):
+    runner = PipelineRunner(_config(cost_ms=8.0))  # 5 ms budget; 2 ms at scale 0.5
+    runner.open()
+    try:
+        estimator = runner.stages[1]
+        assert estimator.component["warmed"] == [0, 1, 2]
+        assert estimator.component["level"] == QualityLevel(1.0, 1)
+        for _ in range(20):
+            runner.step()
+        assert estimator.component["level"] == QualityLevel(0.5, 0)
+        assert runner.metrics.quality_level.value() == 2
+    finally:
+        runner.close()
+    assert "[quality] level 2 (scale 0.5, complexity 0)" in capsys.readouterr().out
+
+
+def test_quality_is_off_unless_enabled(fake_stages):
+    config = _config(cost_ms=0.0)
+    del config["quality"]
+    assert PipelineRunner(config).governor is None
+    with pytest.raises(PipelineConfigError, match="Invalid quality options"):
+        PipelineRunner(_config(cost_ms=0.0, levels=[(2.0, 1)]))
@@ -0,0 +1,160 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pose_formatter import PoseFormatter
+from sequence_recognizer import (
+    FEATURE_SIZE,
+    SequenceMatch,
+    SequenceRecognizer,
+    SequenceTemplate,
+    builtin_sequences,
+    load_templates,
+    save_templates,
+    sequence_features,
+    template_from_recording,
+)
+import sequence_recognizer
+
+FPS = 30.0
+
+
+def _features(frames):
+    features = np.full((len(frames), FEATURE_SIZE), np.nan)
+    features[:, :12] = frames.reshape(len(frames), -1)
+    return features
+
+
+def _resample(frames, length):
+    return template_from_recording("tmp", frames, length=length).frames
+
+
+REST = _features(np.repeat(sequence_recognizer._REST[None], 30, axis=0))
+WAVE_RIGHT = _features(sequence_recognizer._wave(1))
+CLAP = _features(sequence_recognizer._clap())
+
+
+def _stream(recognizer, frames, noise=0.04, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = frames.copy()
+    frames[:, :12] += rng.normal(0.0, noise, (len(frames), 12))
+    matches = []
+    for idx, row in enumerate(frames):
+        matches += recognizer.update(row, idx / FPS)
+    return matches
+
+
+def _reference_costs(template, stream, penalty):
+    """Plain per-cell subsequence DTW, as in the SPRING paper."""
+    length = len(template)
+    cost = np.full(length + 1, np.inf)
+    cost[0] = 0.0
+    for row in stream:
+        local = np.linalg.norm(row - template, axis=1)
+        new = np.empty_like(cost)
+        new[0] = 0.0
+        for i in range(1, length + 1):
+            vertical = new[i - 1] + (penalty if i > 1 else 0.0)
+            new[i] = local[i - 1] + min(vertical, cost[i], cost[i - 1])
+        cost = new
+    return cost
+
+
+def test_incremental_costs_match_full_dtw():
+    rng = np.random.default_rng(3)
+    templates = [
+        SequenceTemplate("a", rng.normal(size=(7, FEATURE_SIZE)), -1.0),
+        SequenceTemplate("b", rng.normal(size=(3, FEATURE_SIZE)), -1.0),
+    ]
+    stream = rng.normal(size=(25, FEATURE_SIZE))
+    recognizer = SequenceRecognizer(templates=templates, max_duration_s=1e9)
+    for idx, row in enumerate(stream):
+        recognizer.update(row, float(idx))
+    for row, template in enumerate(templates):
+        expected = _reference_costs(template.frames, stream, penalty=0.2)
+        assert np.allclose(recognizer._cost[row, : len(template.frames) + 1], expected)
+
+
+def test_state_size_does_not_grow_with_the_stream():
+    recognizer = SequenceRecognizer(templates=builtin_sequences())
+    shape = recognizer._cost.shape
+    _stream(recognizer, np.concatenate([REST] * 10))
+    assert recognizer._cost.shape == shape
+
+
+@pytest.mark.parametrize("length", [14, 24, 40])
+def test_wave_and_clap_recognized_with_timestamps(length):
+    wave = _resample(WAVE_RIGHT, length)
+    frames = np.concatenate([REST, wave, REST, CLAP, REST])
+    matches = _stream(SequenceRecognizer(templates=builtin_sequences()), frames)
+    assert [match.name for match in matches] == ["wave_right", "clap"]
+
+    wave_start, wave_end = 30 / FPS, (30 + length - 1) / FPS
+    clap_start = (60 + length) / FPS
+    assert abs(matches[0].start - wave_start) <= 10 / FPS
+    assert abs(matches[0].end - wave_end) <= 4 / FPS
+    assert abs(matches[1].start - clap_start) <= 4 / FPS
+    assert all(0.0 < match.confidence <= 1.0 for match in matches)
+
+
+def test_standing_still_matches_nothing():
+    assert _stream(SequenceRecognizer(templates=builtin_sequences()), np.concatenate([REST] * 4)) == []
+
+
+def test_matches_never_exceed_max_duration():
+    pose_a, pose_b = np.zeros(FEATURE_SIZE), np.ones(FEATURE_SIZE)
+    template = SequenceTemplate("a_then_b", np.stack([pose_a, pose_b]), threshold=1.0)
+    # Hold A for five seconds, then move to B.
+    frames = np.concatenate([np.repeat(pose_a[None], 150, axis=0), pose_b[None], REST[:5]])
+
+    unlimited = _stream(SequenceRecognizer(templates=[template], max_duration_s=10.0), frames, noise=0)
+    assert [(match.start, match.end) for match in unlimited] == [(0.0, 5.0)]
+
+    limited = _stream(SequenceRecognizer(templates=[template], max_duration_s=2.0), frames, noise=0)
+    assert len(limited) == 1
+    assert limited[0].end == 5.0 and limited[0].end - limited[0].start <= 2.0
+
+
+def test_features_from_body_and_hands():
+    body = np.zeros((33, 3))
+    body[11, :2] = (0.6, 0.4)
+    body[12, :2] = (0.4, 0.4)
+    body[15, :2] = (0.7, 0.2)
+    hand = np.zeros((21, 3))
+    hand[9, :2] = (0.0, 0.1)
+    hand[[4, 8, 12, 16, 20], :2] = (0.0, 0.2)
+    features = sequence_features(body, {"right": hand})
+    assert np.allclose(features[0:2], (0.5, 0.0))
+    assert np.allclose(features[8:10], (1.0, -1.0))
+    assert np.isnan(features[12]) and features[13] == pytest.approx(2.0)
+    assert sequence_features(None) is None
+
+
+def test_recognize_accepts_pipeline_results():
+    recognizer = SequenceRecognizer(templates=builtin_sequences())
+    body = SimpleNamespace(landmarks=[SimpleNamespace(x=0.5, y=0.5, z=0.0)] * 33)
+    assert recognizer.recognize((480, 640, 3), body, None, timestamp_s=0.0) == []
+    assert recognizer.recognize((480, 640, 3), None) == []
+
+
+def test_templates_round_trip(tmp_path):
+    path = str(tmp_path / "sequences.npz")
+    save_templates(path, builtin_sequences() + [template_from_recording("custom", CLAP, length=10)])
+    loaded = load_templates(path)
+    assert [template.name for template in loaded] == ["wave_left", "wave_right", "clap", "custom"]
+    assert loaded[3].frames.shape == (10, FEATURE_SIZE)
+    assert np.allclose(loaded[2].frames, builtin_sequences()[2].frames, equal_nan=True)
+
+
+def test_missing_library_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="gesture_training.py sequence"):
+        SequenceRecognizer(library_path=str(tmp_path / "missing.npz"))
+
+
+def test_formatter_sends_sequence_matches():
+    match = SequenceMatch("clap", 0.8123, start=1.5, end=2.25, distance=1.0)
+    assert (
+        PoseFormatter()._format_sequences([match])
+        == "sequences:clap:conf=0.812,start=1.5000,end=2.2500"
+    )
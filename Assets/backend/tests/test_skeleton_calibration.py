@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from skeleton_calibration import (
+    LIMB_BONES,
+    SkeletonCalibrator,
+    SkeletonProfile,
+    normalize_bones,
+    robust_lengths,
+)
+
+BONES = np.array(LIMB_BONES)
+
+
+def _skeleton(rng):
+    return rng.normal(0.0, 0.3, (33, 3))
+
+
+def _bone_lengths(points):
+    return np.linalg.norm(points[..., BONES[:, 1], :] - points[..., BONES[:, 0], :], axis=-1)
+
+
+def _calibrated(tmp_path, frames):
+    calibrator = SkeletonCalibrator(
+        profile_path=str(tmp_path / "profile.json"), calibration_frames=len(frames)
+    )
+    for points in frames:
+        calibrator.update(points)
+    return calibrator
+
+
+def test_robust_lengths_ignore_outliers_and_missing_bones():
+    rng = np.random.default_rng(0)
+    samples = 0.3 + rng.normal(0.0, 0.005, (60, 3))
+    samples[::10, 0] = 0.9  # bad detections
+    samples[:, 2] = np.nan  # never visible
+    lengths = robust_lengths(samples)
+    assert lengths[0] == pytest.approx(0.3, abs=0.005)
+    assert lengths[1] == pytest.approx(0.3, abs=0.005)
+    assert np.isnan(lengths[2])
+
+
+def test_calibration_enforces_lengths_and_keeps_directions(tmp_path, capsys):
+    rng = np.random.default_rng(1)
+    true = _skeleton(rng)
+    frames = [true + rng.normal(0.0, 0.01, true.shape) for _ in range(30)]
+    calibrator = _calibrated(tmp_path, frames)
+    assert calibrator.calibrated
+    assert "Skeleton calibrated from 30 frames" in capsys.readouterr().out
+    assert np.allclose(calibrator.profile.lengths, _bone_lengths(true), atol=0.01)
+
+    noisy = true + rng.normal(0.0, 0.03, true.shape)
+    normalized = calibrator.update(noisy)
+    assert np.allclose(_bone_lengths(normalized), calibrator.profile.lengths)
+    # Torso roots are untouched and every bone keeps its measured direction.
+    assert np.allclose(normalized[[11, 12, 23, 24]], noisy[[11, 12, 23, 24]])
+    measured = noisy[BONES[:, 1]] - noisy[BONES[:, 0]]
+    result = normalized[BONES[:, 1]] - normalized[BONES[:, 0]]
+    cosine = np.einsum("bd,bd->b", measured, result) / (
+        np.linalg.norm(measured, axis=1) * np.linalg.norm(result, axis=1)
+    )
+    assert np.allclose(cosine, 1.0)
+
+
+def test_normalization_is_vectorized_over_frames(tmp_path):
+    rng = np.random.default_rng(2)
+    calibrator = _calibrated(tmp_path, [_skeleton(rng) for _ in range(5)])
+    batch = rng.normal(0.0, 0.3, (7, 33, 3))
+    normalized = normalize_bones(batch, calibrator.profile)
+    assert normalized.shape == batch.shape
+    assert np.allclose(normalized[3], normalize_bones(batch[3], calibrator.profile))
+    assert np.allclose(_bone_lengths(normalized), calibrator.profile.lengths)
+
+
+def test_profile_is_cached_and_reused(tmp_path):
+    rng = np.random.default_rng(3)
+    first = _calibrated(tmp_path, [_skeleton(rng) for _ in range(5)])
+
+    cached = SkeletonCalibrator(profile_path=first.profile_path)
+    assert cached.calibrated
+    assert np.allclose(cached.profile.lengths, first.profile.lengths, atol=1e-5)
+    assert SkeletonProfile.load(first.profile_path).bones == LIMB_BONES
+
+    fresh = SkeletonCalibrator(profile_path=first.profile_path, recalibrate=True)
+    assert not fresh.calibrated
+
+
+def test_low_visibility_bones_are_not_sampled(tmp_path):
+    rng = np.random.default_rng(4)
+    true = _skeleton(rng)
+    visibility = np.ones(33)
+    visibility[15] = 0.1  # left wrist hidden during calibration
+    calibrator = SkeletonCalibrator(profile_path=str(tmp_path / "p.json"), calibration_frames=3)
+    for _ in range(3):
+        calibrator.update(true, visibility)
+    lengths = dict(zip(LIMB_BONES, calibrator.profile.lengths))
+    assert np.isnan(lengths[(13, 15)]) and np.isnan(lengths[(15, 17)])
+    assert lengths[(11, 13)] == pytest.approx(_bone_lengths(true)[0])
+
+    stretched = true.copy()
+    stretched[15] = stretched[13] + 2.0 * (true[15] - true[13])
+    assert np.allclose(calibrator.update(stretched)[15], stretched[15])
+
+
+def test_process_writes_back_into_the_result(tmp_path):
+    rng = np.random.default_rng(5)
+    true = _skeleton(rng)
+    calibrator = _calibrated(tmp_path, [true] * 3)
+    moved = true * 1.5
+    landmarks = [SimpleNamespace(x=x, y=y, z=z) for x, y, z in moved]
+    body = SimpleNamespace(world_landmarks=SimpleNamespace(landmark=landmarks))
+    assert calibrator.process(body)
+    points = np.array([[point.x, point.y, point.z] for point in landmarks])
+    assert np.allclose(_bone_lengths(points), _bone_lengths(true))
+    assert not calibrator.process(SimpleNamespace(world_landmarks=None))
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from subject_state import SubjectStateStore
+
+
+def test_rows_are_leased_reset_and_reused():
+    store = SubjectStateStore(capacity=2, ttl_s=1.0)
+    history = store.add("history", (3,), fill=np.nan)
+    counts = store.add("counts", (), np.intp)
+
+    left, right = store.acquire(["left", "right"], 0.0)
+    history[left], counts[left] = 1.0, 5
+    assert store.acquire(["left"], 0.5).tolist() == [left]
+    assert counts[left] == 5 and store["history"] is history
+
+    # "right" was seen at 0.0 and "left" at 0.5: the newcomer takes the
+    # least recently seen row, reset to the fill values.
+    (newcomer,) = store.acquire(["p2_left"], 0.9)
+    assert newcomer == right and "right" not in store
+    assert store.labels == ["left", "p2_left"]
+    with pytest.raises(ValueError):
+        store.acquire(["a", "b", "c"], 1.0)
+
+
+def test_unseen_subjects_expire_after_the_ttl():
+    store = SubjectStateStore(capacity=3, ttl_s=1.0)
+    values = store.add("values")
+    (row,) = store.acquire(["left"], 0.0)
+    values[row] = 7.0
+    store.acquire(["right"], 0.8)
+    assert store.expire(1.5) == ["left"]
+    assert values[row] == 0.0 and len(store) == 1
+    # Coming back after the TTL starts from scratch.
+    (again,) = store.acquire(["left"], 1.6)
+    assert values[again] == 0.0
+
+    assert store.release("right") and not store.release("right")
+    store.reset()
+    assert len(store) == 0 and np.isnan(store.last_seen).all()
+    assert SubjectStateStore(1, ttl_s=None).expire(1e9) == []
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from gesture_calculator import PoseMetrics
+from landmark_arrays import landmark_confidence, landmarks_to_array
+from payload_schema import decode_payload
+from pose_formatter import PoseFormatter
+from synthetic_pose import FOREARM, UPPER_ARM, SyntheticPoseGenerator
+
+
+def test_results_look_like_tracked_people():
+    generator = SyntheticPoseGenerator(persons=2, seed=1)
+    wrists = []
+    for t, person, body, hands in generator.stream(fps=30.0, frames=20):
+        world = landmarks_to_array(body.world_landmarks, dtype=np.float64)
+        image = landmarks_to_array(body.landmarks)
+        assert world.shape == image.shape == (33, 3)
+        assert np.linalg.norm(world[13] - world[11]) == pytest.approx(UPPER_ARM, abs=0.02)
+        assert np.linalg.norm(world[15] - world[13]) == pytest.approx(FOREARM, abs=0.02)
+        assert (image[:, :2] > 0).all() and (image[:, :2] < 1).all()
+        # Each person keeps to their half of the image.
+        assert (image[:, 0] < 0.5).all() if person == 0 else (image[:, 0] > 0.5).all()
+        assert landmark_confidence(body.landmarks)[27] < 0.75  # legs are less visible
+        assert hands.handedness == ["Left", "Right"] and len(hands.world[0].landmark) == 21
+        np.testing.assert_allclose(landmarks_to_array(hands.normalized[0])[0], image[15], atol=0.01)
+        if person == 0:
+            wrists.append(world[15])
+    assert np.ptp(wrists, axis=0).max() > 0.05  # the arms move
+
+    again = SyntheticPoseGenerator(persons=2, seed=1).results(0.0, 1)[0]
+    assert again == SyntheticPoseGenerator(persons=2, seed=1).results(0.0, 1)[0]
+    with pytest.raises(IndexError):
+        generator.results(0.0, 2)
+
+
+def test_formatter_accepts_synthetic_results():
+    body, hands = SyntheticPoseGenerator().results(0.5)
+    payload = PoseFormatter().format((480, 640, 3), body, hands, PoseMetrics(33, 42, 33), "neutral")
+    frame = decode_payload(payload)
+    assert len(frame["body_world"]) == 33 and len(frame["body_world"][0]) == 4
+    assert [key for key, _ in frame["hands"]] == ["hand0", "hand1"]
+
@@ -0,0 +1,43 @@
+import pytest
+
+from transport_benchmark import HELLO_REPLY, TRANSPORTS, _Stream, run_transport, synthetic_frames
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = b""
+
+    def sendall(self, data):
+        self.sent += data
+
+
+def _payload(seq, sent_ns, body="gesture:neutral"):
+    return f"status:bench {seq} {sent_ns} {len(body)}|{body}".encode()
+
+
+def test_stream_answers_hello_and_frames_payloads():
+    stream = _Stream(FakeSocket(), decode=False)
+    data = b"hello:schema=2,min=1|" + _payload(0, 100) + _payload(1, 200) + b"garbage|" + _payload(2, 300)
+    stream.feed(data[:10], 1000)
+    assert stream.sock.sent == b""  # the hello is not complete yet
+    stream.feed(data[10:40], 1000)
+    assert stream.sock.sent == HELLO_REPLY
+    stream.feed(data[40:], 1500)
+    assert stream.received == 3 and stream.malformed == 1
+    assert stream.latencies == [1400, 1300, 1200]
+    assert not stream.buffer
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return synthetic_frames(persons=1, frames=10)
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_loopback_run(frames, transport):
+    result = run_transport(transport, frames, fps=100.0, seconds=0.3, subscribers=2, decode=True)
+    assert result.sent >= 20 and result.malformed == 0
+    assert result.subscribers == (2 if transport == "subscribers" else 1)
+    # At 100 payloads a second every sender keeps up.
+    assert result.delivered > 0.9
+    assert 0 < result.latency(50) < 100 and result.cpu_us > 0
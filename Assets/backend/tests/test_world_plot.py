@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+import pytest
+
+from landmark_arrays import POSE_LANDMARK_COUNT
+from world_plot import BACKGROUND, WorldRaster, load_session, render_session_video
+
+
+def _skeleton(shift=0.0):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-0.5, 0.5, size=(POSE_LANDMARK_COUNT, 3))
+    points[:, 0] += shift
+    return points
+
+
+def test_raster_draws_both_views_into_one_buffer():
+    renderer = WorldRaster(view_size=200)
+    points = _skeleton()
+    points[5] = np.nan  # a missing landmark is skipped, with its bones
+    image = renderer.render(points, "title")
+    assert image.shape == (200, 400, 3)
+    drawn = (image != BACKGROUND).any(axis=2)
+    assert drawn[:, :200].sum() > 500 and drawn[:, 200:].sum() > 500
+    assert renderer.render(_skeleton(), "") is image  # reused, not reallocated
+
+
+def _drawn_columns(image):
+    return np.flatnonzero((image[:, :200] != BACKGROUND).any(axis=(0, 2)))
+
+
+def test_fit_holds_the_framing():
+    renderer = WorldRaster(view_size=200)
+    renderer.fit(np.stack([_skeleton(), _skeleton(shift=2.0)]))
+    left = renderer.render(_skeleton()).copy()
+    right = renderer.render(_skeleton(shift=2.0))
+    assert _drawn_columns(left).mean() < _drawn_columns(right).mean()
+
+
+def test_session_renders_to_video(tmp_path):
+    sources = np.array(["a.mp4"] * 3 + ["b.mp4"] * 2)
+    frames = np.array([4, 0, 2, 0, 1], dtype=np.int32)
+    body_world = np.stack([_skeleton(shift=float(index)) for index in range(5)]).astype(np.float32)
+    path = str(tmp_path / "landmarks.npz")
+    np.savez(path, source=sources, frame=frames, body_world=body_world, body=body_world)
+
+    with pytest.raises(ValueError, match="2 sources"):
+        load_session(path)
+    points, session_frames = load_session(path, "a.mp4")
+    assert session_frames.tolist() == [0, 2, 4]
+    assert points[0, 0, 0] == pytest.approx(body_world[1, 0, 0])
+
+    output = str(tmp_path / "out" / "session.mp4")
+    assert render_session_video(points, output, fps=10.0, renderer=WorldRaster(view_size=64)) == 3
+    capture = cv2.VideoCapture(output)
+    count = 0
+    while capture.read()[0]:
+        count += 1
+    capture.release()
+    assert count == 3
+
+
+def test_figure_reuses_its_artists(tmp_path):
+    pytest.importorskip("matplotlib")
+    from world_plot import WorldPlotFigure
+
+    figure = WorldPlotFigure(dpi=50)
+    collections = list(figure.ax2d.collections), list(figure.ax3d.collections)
+    first = figure.save(_skeleton(), tmp_path, "one", "one.jpg")
+    second = figure.save(_skeleton(shift=1.0), tmp_path, "two", "two.jpg", separate=False)
+    assert collections == (list(figure.ax2d.collections), list(figure.ax3d.collections))
+    assert [path.name for path in first] == [
+        "one_world_plot_combined.png", "one_world_plot_2d.png", "one_world_plot_3d.png"
+    ]
+    assert len(second) == 1
+    combined = cv2.imread(str(first[0]))
+    view = cv2.imread(str(first[1]))
+    assert view.shape[1] < combined.shape[1]
@@ -0,0 +1,406 @@
+"""Throughput, latency and CPU cost of the formatter and the pose senders.
+
+Usage:
+    python transport_benchmark.py [--persons 1 4] [--fps 0 60] [--seconds 3]
+        [--transports tcp async subscribers] [--subscribers 1 8] [--decode]
+
+Landmarks come from ``SyntheticPoseGenerator`` and go through the real
+analyzers and ``PoseFormatter``, so no camera or model is needed. Each
+person is sent as a payload of its own, the way one pipeline per camera
+person would send them. ``--fps`` is the camera rate (0 sends as fast as
+the sender accepts), so a run offers ``fps * persons`` payloads a second.
+
+Transports, all on loopback:
+
+- ``tcp``: ``PoseSender`` streaming to one listener.
+- ``async``: ``AsyncPoseSender`` connecting to one listener.
+- ``subscribers``: ``AsyncPoseSender`` serving ``--subscribers`` connections.
+
+The listeners are reference consumers in a separate process, so the CPU
+time reported per payload is the sender's own (frame loop and network
+thread). They answer the ``hello`` handshake like ``MyListener.cs`` and,
+with ``--decode``, parse every payload with ``decode_payload``. Each
+payload leads with a ``status:bench <seq> <sent_ns> <length>`` section;
+the consumer uses the length to find the end of the payload and the send
+time for its latency, measured when its last byte arrives.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import selectors
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from arm_rotation_calculator import ArmRotationCalculator
+from gesture_calculator import BodyGestureRecognizer, PoseCalculator
+from hand_motion_analyzer import HandMotionAnalyzer
+from network_runtime import AsyncPoseSender, NetworkRuntime
+from payload_schema import SCHEMA_VERSION, decode_payload
+from pose_formatter import PoseFormatter
+from pose_sender import PoseSender
+from synthetic_pose import SyntheticPoseGenerator
+
+TRANSPORTS = ("tcp", "async", "subscribers")
+FRAME_SHAPE = (480, 640, 3)
+MARKER = b"status:bench "
+HELLO_REPLY = f"hello:schema={SCHEMA_VERSION}\n".encode("utf-8")
+# Consumers give up on a connection that stays silent this long.
+CONSUMER_TIMEOUT_S = 10.0
+
+
+def synthetic_inputs(persons: int = 1, frames: int = 120, fps: float = 30.0, seed: int = 0) -> List[Tuple]:
+    """``PoseFormatter.build_frame`` arguments for ``frames`` camera frames of ``persons`` people.
+
+    The list is frame-major. Every person has their own analyzers, so hand
+    states and arm segments evolve as they would in the pipeline.
+    """
+    generator = SyntheticPoseGenerator(persons, seed=seed)
+    calculator = PoseCalculator()
+    analyzers = [
+        (BodyGestureRecognizer(), ArmRotationCalculator(), HandMotionAnalyzer()) for _ in range(persons)
+    ]
+    inputs = []
+    for t, person, body, hands in generator.stream(fps, frames):
+        gestures, arms, motion = analyzers[person]
+        inputs.append(
+            (
+                FRAME_SHAPE,
+                body,
+                hands,
+                calculator.compute(body, hands),
+                gestures.get_body_gesture(body, t),
+                arms.compute(body, t),
+                motion.analyze(FRAME_SHAPE, hands, timestamp_s=t),
+            )
+        )
+    return inputs
+
+
+def synthetic_frames(
+    persons: int = 1, frames: int = 120, fps: float = 30.0, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Formatter frame dicts built from ``synthetic_inputs``."""
+    formatter = PoseFormatter()
+    inputs = synthetic_inputs(persons, frames, fps, seed)
+    return [formatter.build_frame(*args[:6], hand_states=args[6]) for args in inputs]
+
+
+@dataclass
+class FormatterResult:
+    persons: int
+    payload_bytes: float  # mean
+    build_us: float  # per payload
+    encode_us: float
+
+    @property
+    def rate(self) -> float:
+        return 1e6 / (self.build_us + self.encode_us)
+
+
+def measure_formatter(persons: int = 1, frames: int = 300, seed: int = 0) -> FormatterResult:
+    """Time ``build_frame`` and ``encode`` per payload, on synthetic people."""
+    inputs = synthetic_inputs(persons, frames, seed=seed)
+    formatter = PoseFormatter()
+    start = time.perf_counter()
+    built = [formatter.build_frame(*args[:6], hand_states=args[6]) for args in inputs]
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    payloads = [formatter.encode(frame) for frame in built]
+    encode_s = time.perf_counter() - start
+    return FormatterResult(
+        persons=persons,
+        payload_bytes=sum(len(payload) for payload in payloads) / len(inputs),
+        build_us=build_s * 1e6 / len(inputs),
+        encode_us=encode_s * 1e6 / len(inputs),
+    )
+
+
+# --- Reference consumer -----------------------------------------------------
+
+
+class _Stream:
+    """One consumer connection: handshake, framing and latency."""
+
+    def __init__(self, sock: socket.socket, decode: bool) -> None:
+        self.sock = sock
+        self.decode = decode
+        self.buffer = bytearray()
+        self.greeted = False
+        self.received = 0
+        self.bytes = 0
+        self.malformed = 0
+        self.latencies: List[int] = []
+
+    def feed(self, data: bytes, now_ns: int) -> None:
+        self.buffer += data
+        self.bytes += len(data)
+        if not self.greeted:
+            if self.buffer.startswith(b"hello:"):
+                end = self.buffer.find(b"|")
+                if end < 0:
+                    return
+                self.sock.sendall(HELLO_REPLY)
+                del self.buffer[: end + 1]
+            self.greeted = True
+        while True:
+            end = self.buffer.find(b"|")
+            if end < 0:
+                return
+            parts = bytes(self.buffer[:end]).split(b" ")
+            if not self.buffer.startswith(MARKER) or len(parts) != 4:
+                # Lost track of the framing: skip to the next payload.
+                self.malformed += 1
+                start = self.buffer.find(MARKER, 1)
+                del self.buffer[: start if start > 0 else len(self.buffer)]
+                continue
+            total = end + 1 + int(parts[3])
+            if len(self.buffer) < total:
+                return
+            if self.decode and "body_world" not in decode_payload(self.buffer[:total].decode("utf-8")):
+                self.malformed += 1
+            self.latencies.append(now_ns - int(parts[2]))
+            self.received += 1
+            del self.buffer[:total]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "bytes": self.bytes,
+            "malformed": self.malformed,
+            "latencies_ns": np.array(self.latencies, dtype=np.int64),
+        }
+
+
+def _consume(address: Optional[Tuple[str, int]], connections: int, decode: bool, queue) -> None:
+    """Consumer process: listen on a free port, or connect to ``address``."""
+    if address is None:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(connections)
+        server.settimeout(CONSUMER_TIMEOUT_S)
+        queue.put(server.getsockname()[:2])
+        socks = [server.accept()[0] for _ in range(connections)]
+        server.close()
+    else:
+        socks = [socket.create_connection(address, CONSUMER_TIMEOUT_S) for _ in range(connections)]
+        queue.put(address)
+
+    selector = selectors.DefaultSelector()
+    streams = [_Stream(sock, decode) for sock in socks]
+    for stream in streams:
+        stream.sock.setblocking(False)
+        selector.register(stream.sock, selectors.EVENT_READ, stream)
+    open_streams = len(streams)
+    while open_streams:
+        events = selector.select(CONSUMER_TIMEOUT_S)
+        if not events:
+            break
+        # Perf counters are system-wide on Linux and Windows, so the
+        # producer's send times can be compared with ours.
+        now_ns = time.perf_counter_ns()
+        for key, _ in events:
+            stream = key.data
+            try:
+                data = stream.sock.recv(1 << 16)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if data:
+                stream.feed(data, now_ns)
+                continue
+            selector.unregister(stream.sock)
+            stream.sock.close()
+            open_streams -= 1
+    queue.put([stream.summary() for stream in streams])
+
+
+# --- Producer ---------------------------------------------------------------
+
+
+@dataclass
+class TransportResult:
+    transport: str
+    persons: int
+    fps: float
+    subscribers: int
+    seconds: float
+    sent: int
+    received: int  # over all subscribers
+    bytes_received: int
+    malformed: int
+    cpu_us: float  # sender CPU time per payload sent, encoding included
+    latencies_ms: np.ndarray
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.seconds
+
+    @property
+    def delivered(self) -> float:
+        """Fraction of the payloads sent that reached each subscriber."""
+        return self.received / max(1, self.sent * self.subscribers)
+
+    def latency(self, percentile: float) -> float:
+        if not len(self.latencies_ms):
+            return float("nan")
+        return float(np.percentile(self.latencies_ms, percentile))
+
+
+def _wait_for(condition, timeout: float, what: str) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Timed out waiting for {what}")
+        time.sleep(0.01)
+
+
+def _drive(
+    send, frames: Sequence[Dict[str, Any]], persons: int, fps: float, seconds: float
+) -> Tuple[int, float, float]:
+    """Encode and send at ``fps`` camera frames a second; returns (sent, wall s, CPU s)."""
+    formatter = PoseFormatter()
+    interval = 1.0 / fps if fps else 0.0
+    sent = 0
+    start = next_frame = time.perf_counter()
+    cpu_start = time.process_time()
+    while True:
+        now = time.perf_counter()
+        if now - start >= seconds:
+            break
+        if interval:
+            if next_frame > now:
+                time.sleep(next_frame - now)
+            next_frame += interval
+        for _ in range(persons):
+            body = formatter.encode(frames[sent % len(frames)])
+            # The body is ASCII, so its length in characters is in bytes.
+            send(f"{MARKER.decode()}{sent} {time.perf_counter_ns()} {len(body)}|{body}")
+            sent += 1
+    return sent, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def run_transport(
+    transport: str,
+    frames: Sequence[Dict[str, Any]],
+    persons: int = 1,
+    fps: float = 0.0,
+    seconds: float = 3.0,
+    subscribers: int = 1,
+    decode: bool = False,
+    linger_s: float = 0.25,
+) -> TransportResult:
+    """Stream ``frames`` over ``transport`` to a reference consumer process."""
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{transport}'; expected one of {', '.join(TRANSPORTS)}")
+    connections = subscribers if transport == "subscribers" else 1
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    runtime = sender = None
+    consumer = None
+    try:
+        if transport == "subscribers":
+            runtime = NetworkRuntime(name="benchmark-network")
+            sender = AsyncPoseSender(connect=False, subscriber_port=0, runtime=runtime)
+            address = sender.subscriber_address
+        else:
+            address = None
+        consumer = context.Process(target=_consume, args=(address, connections, decode, queue), daemon=True)
+        consumer.start()
+        host, port = queue.get(timeout=CONSUMER_TIMEOUT_S)
+        if transport == "tcp":
+            sender = PoseSender(host, port)
+            if sender.connect() is None:
+                raise RuntimeError(f"PoseSender could not connect to {host}:{port}")
+        elif transport == "async":
+            runtime = NetworkRuntime(name="benchmark-network")
+            sender = AsyncPoseSender(host, port, runtime=runtime)
+        _wait_for(
+            lambda: transport == "tcp" or sender.peer_count == connections,
+            CONSUMER_TIMEOUT_S,
+            f"{connections} consumer connection(s)",
+        )
+
+        sent, elapsed, cpu = _drive(sender.send, frames, persons, fps, seconds)
+        time.sleep(linger_s)  # let queued payloads arrive before closing
+        sender.close()
+        sender = None
+        streams = queue.get(timeout=CONSUMER_TIMEOUT_S)
+    finally:
+        if sender is not None:
+            sender.close()
+        if runtime is not None:
+            runtime.close()
+        if consumer is not None:
+            consumer.join(timeout=CONSUMER_TIMEOUT_S)
+            if consumer.is_alive():
+                consumer.terminate()
+
+    latencies = np.concatenate([stream["latencies_ns"] for stream in streams]) / 1e6
+    return TransportResult(
+        transport=transport,
+        persons=persons,
+        fps=fps,
+        subscribers=connections,
+        seconds=elapsed,
+        sent=sent,
+        received=sum(stream["received"] for stream in streams),
+        bytes_received=sum(stream["bytes"] for stream in streams),
+        malformed=sum(stream["malformed"] for stream in streams),
+        cpu_us=cpu * 1e6 / max(1, sent),
+        latencies_ms=latencies,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--persons", type=int, nargs="+", default=[1, 4])
+    parser.add_argument(
+        "--fps", type=float, nargs="+", default=[0.0, 60.0], help="camera rate; 0 = unthrottled"
+    )
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each run")
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument(
+        "--subscribers", type=int, nargs="+", default=[1, 8], help="for the subscribers transport"
+    )
+    parser.add_argument("--decode", action="store_true", help="consumers parse every payload")
+    args = parser.parse_args()
+
+    print(f"{'persons':>7} {'bytes':>6} {'build us':>9} {'encode us':>9} {'payloads/s':>10}")
+    for persons in args.persons:
+        result = measure_formatter(persons)
+        print(
+            f"{persons:>7} {result.payload_bytes:>6.0f} {result.build_us:>9.1f} "
+            f"{result.encode_us:>9.1f} {result.rate:>10.0f}"
+        )
+
+    print(
+        f"\n{'transport':>11} {'persons':>7} {'fps':>5} {'subs':>4} {'sent/s':>8} {'MB/s':>6} "
+        f"{'delivered':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'cpu us':>7}"
+    )
+    for persons in args.persons:
+        frames = synthetic_frames(persons)
+        for transport in args.transports:
+            for subscribers in args.subscribers if transport == "subscribers" else [1]:
+                for fps in args.fps:
+                    result = run_transport(
+                        transport, frames, persons, fps, args.seconds, subscribers, args.decode
+                    )
+                    print(
+                        f"{transport:>11} {persons:>7} {fps:>5.0f} {subscribers:>4} {result.rate:>8.0f} "
+                        f"{result.bytes_received / result.seconds / 1e6:>6.1f} {result.delivered:>9.1%} "
+                        f"{result.latency(50):>7.2f} {result.latency(95):>7.2f} {result.latency(99):>7.2f} "
+                        f"{result.latency(100):>7.2f} {result.cpu_us:>7.1f}"
+                    )
+                    if result.malformed:
+                        print(f"[benchmark] {result.malformed} malformed payloads")
+
+
+if __name__ == "__main__":
+    main()
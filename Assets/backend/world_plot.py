@@ -0,0 +1,340 @@
+"""Render world landmarks as a front (2D) view and a 3D view.
+
+Two backends draw the same pair of views:
+
+- ``WorldPlotFigure`` builds one matplotlib figure and its artists once,
+  then only updates their data for every skeleton. Bones are one line
+  collection per view. One draw yields the combined image, and the 2D and
+  3D views are cropped out of it.
+- ``WorldRaster`` draws with OpenCV into a reused buffer. It needs no
+  matplotlib and is much faster, for bulk or headless rendering.
+
+``render_session_video`` renders a recorded session (the rows of one
+source in a ``batch_landmarks`` file) to a video:
+
+    python world_plot.py landmarks.npz --source clip.mp4 --output clip_world.mp4
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from landmark_arrays import POSE_CONNECTIONS
+
+BONE_COLOR = (200, 120, 30)  # BGR
+JOINT_COLOR = (0, 0, 220)
+LABEL_COLOR = (0, 0, 200)
+BACKGROUND = (255, 255, 255)
+
+
+def _bounds(points: np.ndarray, margin: float = 1.1) -> Tuple[np.ndarray, float]:
+    """Center and half-size of a cube around the finite ``(..., 3)`` points."""
+    finite = points.reshape(-1, 3)
+    finite = finite[np.isfinite(finite).all(axis=1)]
+    if not len(finite):
+        return np.zeros(3), 1.0
+    low, high = finite.min(axis=0), finite.max(axis=0)
+    half = max(float((high - low).max()) * 0.5, 1e-3) * margin
+    return (low + high) * 0.5, half
+
+
+def _valid_bones(connections: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    connections = connections[(connections < len(valid)).all(axis=1)]
+    return connections[valid[connections].all(axis=1)]
+
+
+class WorldPlotFigure:
+    """Matplotlib figure with both views, reused for every skeleton.
+
+    ``interactive`` creates the figure through pyplot so ``plt.show()``
+    can display it; otherwise it draws off-screen with Agg.
+    """
+
+    def __init__(
+        self,
+        connections: np.ndarray = POSE_CONNECTIONS,
+        labels: bool = True,
+        dpi: int = 100,
+        interactive: bool = False,
+    ) -> None:
+        from matplotlib.collections import LineCollection
+        from mpl_toolkits.mplot3d import Axes3D  # noqa: F401  registers the 3d projection
+        from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+        if interactive:
+            import matplotlib.pyplot as plt
+
+            figure = plt.figure(figsize=(12, 6), dpi=dpi)
+        else:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            figure = Figure(figsize=(12, 6), dpi=dpi)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self._interactive = interactive
+        self._connections = np.asarray(connections)
+        count = int(self._connections.max()) + 1
+
+        self.ax2d = ax2d = figure.add_subplot(1, 2, 1)
+        self._bones2d = LineCollection([], colors="tab:blue", linewidths=1.5)
+        ax2d.add_collection(self._bones2d)
+        self._joints2d = ax2d.scatter(
+            [], [], s=60, facecolors="none", edgecolors="red", linewidths=1.2
+        )
+        ax2d.set_xlabel("X (world)")
+        ax2d.set_ylabel("Y (world)")
+        ax2d.set_aspect("equal")
+        ax2d.grid(True, linestyle="--", alpha=0.4)
+
+        self.ax3d = ax3d = figure.add_subplot(1, 2, 2, projection="3d")
+        # A placeholder segment: some matplotlib versions cannot add an empty one.
+        self._bones3d = Line3DCollection([[(0, 0, 0), (0, 0, 0)]], colors="tab:blue", linewidths=1.5)
+        ax3d.add_collection3d(self._bones3d)
+        self._joints3d = ax3d.scatter([], [], [], c="blue", s=20, alpha=0.8)
+        ax3d.set_xlabel("X (world)")
+        ax3d.set_ylabel("Y (world)")
+        ax3d.set_zlabel("Z (world)")
+
+        text = {"color": "red", "fontsize": 8, "ha": "center", "va": "center", "visible": False}
+        self._labels2d = []
+        self._labels3d = []
+        if labels:
+            self._labels2d = [ax2d.text(0, 0, str(idx), **text) for idx in range(count)]
+            self._labels3d = [ax3d.text(0, 0, 0, str(idx), **text) for idx in range(count)]
+        figure.tight_layout()
+
+    def render(self, points: np.ndarray, title: str = "") -> np.ndarray:
+        """Draw ``(N, 3)`` world landmarks; returns the RGBA image."""
+        points = np.asarray(points, dtype=np.float64)
+        valid = np.isfinite(points).all(axis=1)
+        segments = points[_valid_bones(self._connections, valid)]
+        shown = points[valid]
+
+        self._bones2d.set_segments(segments[:, :, :2])
+        self._bones3d.set_segments(segments)
+        self._joints2d.set_offsets(shown[:, :2])
+        self._joints3d._offsets3d = (shown[:, 0], shown[:, 1], shown[:, 2])
+        for idx, (label2d, label3d) in enumerate(zip(self._labels2d, self._labels3d)):
+            visible = idx < len(points) and bool(valid[idx])
+            label2d.set_visible(visible)
+            label3d.set_visible(visible)
+            if visible:
+                x, y, z = points[idx]
+                label2d.set_position((x, y))
+                label3d.set_position((x, y))
+                label3d.set_3d_properties(z, None)
+
+        center, half = _bounds(shown)
+        low, high = center - half, center + half
+        self.ax2d.set_xlim(low[0], high[0])
+        self.ax2d.set_ylim(high[1], low[1])  # image coordinates: y points down
+        self.ax3d.set_xlim(low[0], high[0])
+        self.ax3d.set_ylim(low[1], high[1])
+        self.ax3d.set_zlim(low[2], high[2])
+        self.ax2d.set_title(f"{title} (2D Projection)")
+        self.ax3d.set_title(f"{title} (3D)")
+
+        self.figure.canvas.draw()
+        return np.asarray(self.figure.canvas.buffer_rgba())
+
+    def _crop(self, image: np.ndarray, axes) -> np.ndarray:
+        box = axes.get_tightbbox(self.figure.canvas.get_renderer())
+        height, width = image.shape[:2]
+        x0, x1 = max(int(box.x0), 0), min(int(math.ceil(box.x1)), width)
+        y0, y1 = max(int(height - box.y1), 0), min(int(math.ceil(height - box.y0)), height)
+        return image[y0:y1, x0:x1]
+
+    def save(
+        self,
+        points: np.ndarray,
+        output_dir: Path,
+        stem: str,
+        title: str = "",
+        separate: bool = True,
+    ) -> List[Path]:
+        """Render once and write the combined image, plus each view with ``separate``."""
+        image = cv2.cvtColor(self.render(points, title), cv2.COLOR_RGBA2BGR)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        outputs = [(output_dir / f"{stem}_world_plot_combined.png", image)]
+        if separate:
+            outputs.append((output_dir / f"{stem}_world_plot_2d.png", self._crop(image, self.ax2d)))
+            outputs.append((output_dir / f"{stem}_world_plot_3d.png", self._crop(image, self.ax3d)))
+        for path, view in outputs:
+            cv2.imwrite(str(path), view)
+        return [path for path, _ in outputs]
+
+    def close(self) -> None:
+        if self._interactive:
+            import matplotlib.pyplot as plt
+
+            plt.close(self.figure)
+
+
+class WorldRaster:
+    """Both views drawn with OpenCV into one reused ``view_size`` x 2 image.
+
+    The 3D view is an orthographic projection turned by ``yaw_deg`` and
+    tilted by ``pitch_deg``. Each skeleton is framed on its own unless
+    ``fit`` fixed the framing, as ``render_session_video`` does so the
+    camera holds still.
+    """
+
+    def __init__(
+        self,
+        view_size: int = 480,
+        connections: np.ndarray = POSE_CONNECTIONS,
+        yaw_deg: float = 40.0,
+        pitch_deg: float = 20.0,
+        labels: bool = False,
+    ) -> None:
+        self.view_size = int(view_size)
+        self.labels = labels
+        self._connections = np.asarray(connections)
+        self.image = np.empty((self.view_size, 2 * self.view_size, 3), dtype=np.uint8)
+        yaw, pitch = math.radians(yaw_deg), math.radians(pitch_deg)
+        turn = np.array(
+            [
+                [math.cos(yaw), 0.0, math.sin(yaw)],
+                [0.0, 1.0, 0.0],
+                [-math.sin(yaw), 0.0, math.cos(yaw)],
+            ]
+        )
+        tilt = np.array(
+            [
+                [1.0, 0.0, 0.0],
+                [0.0, math.cos(pitch), -math.sin(pitch)],
+                [0.0, math.sin(pitch), math.cos(pitch)],
+            ]
+        )
+        self._rotation = tilt @ turn
+        self._framing: Optional[Tuple[np.ndarray, float]] = None
+
+    def fit(self, points: Optional[np.ndarray]) -> None:
+        """Frame every later render around ``points`` (any ``(..., 3)``); None resets."""
+        self._framing = None if points is None else _bounds(np.asarray(points, dtype=np.float64))
+
+    def render(self, points: np.ndarray, title: str = "") -> np.ndarray:
+        """Draw ``(N, 3)`` world landmarks into ``image`` and return it.
+
+        The buffer is reused by the next call; copy it to keep it.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        valid = np.isfinite(points).all(axis=1)
+        center, half = self._framing or _bounds(points[valid])
+        scale = self.view_size * 0.45 / half
+        size = self.view_size
+        image = self.image
+        image[:] = BACKGROUND
+        cv2.line(image, (size, 0), (size, size), (210, 210, 210), 1)
+
+        centered = np.where(valid[:, None], points - center, 0.0)
+        views = (("front", centered), ("3d", centered @ self._rotation.T))
+        for view, (name, projected) in enumerate(views):
+            offset = np.array([size * view + size * 0.5, size * 0.5])
+            pixels = np.rint(projected[:, :2] * scale + offset).astype(np.int32)
+            bones = _valid_bones(self._connections, valid)
+            if len(bones):
+                # One call draws every bone: each is a 2-point polyline.
+                cv2.polylines(image, list(pixels[bones]), False, BONE_COLOR, 2, cv2.LINE_AA)
+            for idx in np.flatnonzero(valid):
+                x, y = pixels[idx]
+                cv2.circle(image, (int(x), int(y)), 3, JOINT_COLOR, -1, cv2.LINE_AA)
+                if self.labels:
+                    cv2.putText(
+                        image, str(idx), (int(x) + 4, int(y) - 4),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.3, LABEL_COLOR, 1,
+                    )
+            cv2.putText(
+                image, name, (size * view + 8, size - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.45, (120, 120, 120), 1, cv2.LINE_AA,
+            )
+        if title:
+            cv2.putText(
+                image, title, (8, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA
+            )
+        return image
+
+
+def load_session(
+    path: str, source: Optional[str] = None, column: str = "body_world"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``(points, frames)`` of one source in a ``batch_landmarks`` file, by frame."""
+    from batch_landmarks import load_landmarks
+
+    columns = load_landmarks(path)
+    sources = list(dict.fromkeys(columns["source"].tolist()))
+    if source is None:
+        if len(sources) != 1:
+            raise ValueError(
+                f"{path} holds {len(sources)} sources; pick one of: {', '.join(sources)}"
+            )
+        source = sources[0]
+    rows = np.flatnonzero(columns["source"] == source)
+    if not len(rows):
+        raise ValueError(f"No rows for source {source} in {path}")
+    rows = rows[np.argsort(columns["frame"][rows], kind="stable")]
+    return columns[column][rows], columns["frame"][rows]
+
+
+def render_session_video(
+    points: np.ndarray,
+    output_path: str,
+    fps: float = 30.0,
+    renderer: Optional[WorldRaster] = None,
+    titles: Optional[Sequence[str]] = None,
+) -> int:
+    """Write one ``WorldRaster`` frame per ``(N, 3)`` skeleton in ``points``.
+
+    The framing is fixed over the whole session. Returns the frame count.
+    """
+    renderer = renderer or WorldRaster()
+    renderer.fit(points)
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    height, width = renderer.image.shape[:2]
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise OSError(f"Cannot write video to {output_path}")
+    try:
+        for idx, skeleton in enumerate(points):
+            writer.write(renderer.render(skeleton, titles[idx] if titles is not None else ""))
+    finally:
+        writer.release()
+    return len(points)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render a session of world landmarks to a video.")
+    parser.add_argument("landmarks", help="File written by batch_landmarks.py.")
+    parser.add_argument("--output", required=True, help="Video file to write (.mp4).")
+    parser.add_argument("--source", help="Input whose rows to render; needed when there are several.")
+    parser.add_argument("--column", default="body_world", choices=("body_world", "body"))
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--size", type=int, default=480, help="Pixels per view.")
+    parser.add_argument("--labels", action="store_true", help="Number every joint.")
+    args = parser.parse_args(argv)
+
+    points, frames = load_session(args.landmarks, args.source, args.column)
+    count = render_session_video(
+        points,
+        args.output,
+        fps=args.fps,
+        renderer=WorldRaster(view_size=args.size, labels=args.labels),
+        titles=[f"frame {frame}" for frame in frames],
+    )
+    print(f"[world_plot] wrote {count} frames to {args.output}")
+
+
+if __name__ == "__main__":
+    main()